@@ -0,0 +1,156 @@
+"""
+请求模板微基准
+对比轮询热路径每次请求在客户端消耗的 CPU 时间：
+- 旧路径: 每次重建 querySetting/json.dumps、解析 Cookie 字符串、构造请求头，
+  再由 requests.Session.request 合并会话头与 Cookie 并编码请求体；
+- 新路径: 会话纪元内预构造的请求模板（含环境代理设置），每次只盖时间戳并 Session.send。
+网络层替换为立即返回固定响应的适配器，只统计客户端开销。
+
+用法: python benchmarks/bench_request_templates.py [次数]
+"""
+import os
+import sys
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui.workers import MultiGrabWorker  # noqa: E402
+from xk_spider.gui.config import BASE_URL  # noqa: E402
+
+
+TOKEN = 'bench-token-0123456789abcdef'
+COOKIES = 'JSESSIONID=0123456789ABCDEF0123456789ABCDEF; route=abcdef0123456789; _WEU=bench'
+COURSE = {'JXBID': '202420252000001', 'KCM': '高等数学', 'number': 'MATH1001', 'type': 'recommend'}
+
+
+class CannedAdapter(BaseAdapter):
+    """立即返回固定 JSON 响应，并记录最后一次收到的请求。"""
+
+    def __init__(self):
+        super().__init__()
+        self.last_request = None
+
+    def send(self, request, **kwargs):
+        self.last_request = request
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"code":"1","dataList":[]}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def _make_worker():
+    worker = MultiGrabWorker([COURSE], '20240001', 'batch-1', TOKEN, COOKIES, max_workers=1)
+    adapter = CannedAdapter()
+    session = requests.Session()
+    session.headers.update(worker.HTTP_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    worker._session_local.session = session
+    return worker, session, adapter
+
+
+def _parse_cookies(cookies_str):
+    cookie_dict = {}
+    for item in cookies_str.split('; '):
+        if '=' in item:
+            k, v = item.split('=', 1)
+            cookie_dict[k] = v
+    return cookie_dict
+
+
+def legacy_capacity(worker, session, key):
+    return session.request(
+        'POST', f"{BASE_URL}/elective/{key[1]}",
+        headers=worker._get_headers(),
+        cookies=_parse_cookies(worker.cookies),
+        data=worker._capacity_query_data(key),
+        timeout=(3, 5), allow_redirects=False,
+    )
+
+
+def template_capacity(worker, session, key):
+    return worker._capacity_template(key).send(session, timeout=(3, 5), allow_redirects=False)
+
+
+def legacy_select(worker, session, course):
+    payload, _ = worker._select_payload(course)
+    return session.request(
+        'POST', f"{BASE_URL}/elective/volunteer.do",
+        headers=worker._get_headers(),
+        cookies=_parse_cookies(worker.cookies),
+        data=payload,
+        timeout=(3, 5), allow_redirects=False,
+    )
+
+
+def template_select(worker, session, course):
+    return worker._select_template(course).send(session, timeout=(3, 5), allow_redirects=False)
+
+
+def legacy_selected(worker, session, _):
+    return session.request(
+        'GET', f"{BASE_URL}/elective/courseResult.do",
+        params=worker._selected_courses_params(),
+        headers=worker._get_headers(),
+        cookies=_parse_cookies(worker.cookies),
+        timeout=(3, 5),
+    )
+
+
+def template_selected(worker, session, _):
+    return worker._selected_courses_template().send(session, timeout=(3, 5))
+
+
+def _wire(request):
+    """请求在线路上的形态（去掉时间戳），用于确认两条路径发出的请求一致。"""
+    url = request.url.split('timestamp=', 1)[0]
+    headers = {k.lower(): v for k, v in request.headers.items()}
+    return request.method, url, headers, request.body
+
+
+def _cpu_per_call(func, worker, session, arg, count):
+    func(worker, session, arg)
+    started = time.process_time()
+    for _ in range(count):
+        func(worker, session, arg)
+    return (time.process_time() - started) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    worker, session, adapter = _make_worker()
+    key = worker._capacity_keys(COURSE)[0]
+    cases = [
+        ('余量列表 querySetting', legacy_capacity, template_capacity, key),
+        ('选课 addParam', legacy_select, template_select, COURSE),
+        ('已选核实 courseResult', legacy_selected, template_selected, None),
+    ]
+
+    print(f"每种请求 {count} 次，单位: 微秒 CPU / 请求")
+    print(f"{'请求':<24}{'旧路径':>10}{'模板':>10}{'加速':>8}")
+    for name, legacy, template, arg in cases:
+        legacy(worker, session, arg)
+        legacy_wire = _wire(adapter.last_request)
+        template(worker, session, arg)
+        if _wire(adapter.last_request) != legacy_wire:
+            raise SystemExit(f"{name}: 模板请求与旧路径不一致")
+        before = _cpu_per_call(legacy, worker, session, arg, count)
+        after = _cpu_per_call(template, worker, session, arg, count)
+        print(f"{name:<24}{before * 1e6:>10.1f}{after * 1e6:>10.1f}{before / after:>7.1f}x")
+
+    epoch = worker._request_templates.epoch
+    worker._update_session(TOKEN + '-relogin', COOKIES)
+    rebuilt = worker._capacity_template(key)
+    print(f"会话纪元 {epoch} -> {rebuilt.epoch}，模板共构造 {worker._request_templates.build_count} 次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+上课时间解析与冲突判断基准
+对比旧实现（每次调用重新 re.search/re.findall、构造周次/节次 set）与
+timeslots 模块（预编译正则 + LRU 缓存 + 位掩码）：
+- 解析整份课程目录的 SKSJ（冷缓存 / 热缓存）
+- 待抢列表两两冲突判断（_build_pending_conflict_groups 的工作量）
+
+用法:
+    python benchmarks/bench_timeslots.py [catalog.json] [待抢课程数]
+catalog.json 可以是课程列表接口的原始响应（dataList/tcList）、monitor_state.json，
+或课程字典列表；不提供时使用按教务系统常见格式生成的目录。
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui.timeslots import check_time_conflict, parse_time_slots, slots_conflict  # noqa: E402
+
+
+TIME_KEYS = ('SKSJ', 'classTime', 'teachingTime', 'time')
+
+
+def legacy_parse_time_slots(time_str):
+    """旧实现（MainWindow/MultiGrabWorker._parse_time_slots，去掉日志）。"""
+    if not time_str:
+        return []
+    slots = []
+    segments = re.split(r'[,;，；/]', str(time_str))
+    day_map = {
+        '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7,
+        '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
+    }
+    for segment in segments:
+        segment = segment.strip()
+        if not segment:
+            continue
+        slot = {'weeks': set(), 'day': 0, 'periods': set()}
+        week_match = re.search(r'第?(\d+)-(\d+)周(?:\(([单双])\))?', segment)
+        if week_match:
+            odd_even = week_match.group(3)
+            for week in range(int(week_match.group(1)), int(week_match.group(2)) + 1):
+                if odd_even == '单' and week % 2 == 0:
+                    continue
+                if odd_even == '双' and week % 2 == 1:
+                    continue
+                slot['weeks'].add(week)
+        else:
+            single_week = re.search(r'第?(\d+)周', segment)
+            if single_week:
+                slot['weeks'].add(int(single_week.group(1)))
+        day_match = re.search(r'(?:星期|周|礼拜)([一二三四五六日天1-7])', segment)
+        if day_match:
+            slot['day'] = day_map.get(day_match.group(1), 0)
+        period_match = re.search(r'第?(\d+)-(\d+)节', segment)
+        if period_match:
+            for period in range(int(period_match.group(1)), int(period_match.group(2)) + 1):
+                slot['periods'].add(period)
+        else:
+            period_singles = re.findall(r'第(\d+)节', segment)
+            if period_singles:
+                for period in period_singles:
+                    slot['periods'].add(int(period))
+            else:
+                for period in re.findall(r'(\d+)节', segment):
+                    slot['periods'].add(int(period))
+                comma_periods = re.search(r'(\d+(?:,\d+)+)节', segment)
+                if comma_periods:
+                    for period in comma_periods.group(1).split(','):
+                        if period.strip():
+                            slot['periods'].add(int(period.strip()))
+        if slot['weeks'] and slot['day'] and slot['periods']:
+            slots.append(slot)
+        elif slot['day'] and slot['periods']:
+            slot['weeks'] = set(range(1, 19))
+            slots.append(slot)
+    return slots
+
+
+def legacy_check_time_conflict(time_str1, time_str2):
+    slots1 = legacy_parse_time_slots(time_str1)
+    slots2 = legacy_parse_time_slots(time_str2)
+    if not slots1 or not slots2:
+        return False
+    for slot1 in slots1:
+        for slot2 in slots2:
+            if slot1['day'] != slot2['day']:
+                continue
+            if not (slot1['weeks'] & slot2['weeks']):
+                continue
+            if slot1['periods'] & slot2['periods']:
+                return True
+    return False
+
+
+def _time_text(item):
+    for key in TIME_KEYS:
+        if item.get(key):
+            return str(item[key])
+    return ''
+
+
+def load_catalog(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'courses' in data:
+        items = data['courses']
+    elif isinstance(data, dict):
+        items = []
+        for entry in data.get('dataList', []) or []:
+            items.extend(entry.get('tcList', []) or [entry])
+    else:
+        items = data
+    return [text for text in (_time_text(item) for item in items) if text]
+
+
+def generate_catalog(count=3000, seed=2024):
+    """按教务系统常见格式生成上课时间文本。"""
+    rng = random.Random(seed)
+    days = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '周日']
+    weeks = ['1-18周', '1-16周', '1-17周(单)', '2-18周(双)', '1-8周', '9-16周', '第3-14周', '第10周']
+    texts = []
+    for _ in range(count):
+        segments = []
+        for _ in range(rng.choice((1, 1, 2, 2, 3))):
+            start = rng.choice((1, 3, 5, 7, 9, 11))
+            length = rng.choice((1, 2, 2, 3))
+            period = f"{start}-{start + length - 1}节" if length > 1 else f"第{start}节"
+            segments.append(f"{rng.choice(weeks)} {rng.choice(days)} {period}")
+        texts.append(', '.join(segments))
+    return texts
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    args = sys.argv[1:]
+    texts = load_catalog(args[0]) if args and not args[0].isdigit() else generate_catalog()
+    pending = int(args[-1]) if args and args[-1].isdigit() else 150
+    unique = len(set(texts))
+    print(f"课程目录: {len(texts)} 条上课时间（去重 {unique} 条），待抢课程 {pending} 门")
+
+    parse_time_slots.cache_clear()
+    legacy_parse, _ = _timed(lambda: [legacy_parse_time_slots(text) for text in texts])
+    cold, _ = _timed(lambda: [parse_time_slots(text) for text in texts])
+    warm, _ = _timed(lambda: [parse_time_slots(text) for text in texts])
+    per = 1e6 / len(texts)
+    print(f"解析整份目录: 旧实现 {legacy_parse * per:.1f}us/条, "
+          f"新实现 冷缓存 {cold * per:.1f}us/条, 热缓存 {warm * per:.2f}us/条")
+
+    watch = texts[:pending]
+    pairs = [(a, b) for i, a in enumerate(watch) for b in watch[i + 1:]]
+    legacy_pairs, legacy_result = _timed(
+        lambda: [legacy_check_time_conflict(a, b) for a, b in pairs]
+    )
+    slots = [parse_time_slots(text) for text in watch]
+    new_pairs, new_result = _timed(
+        lambda: [slots_conflict(a, b) for i, a in enumerate(slots) for b in slots[i + 1:]]
+    )
+    if legacy_result != new_result or legacy_result != [check_time_conflict(a, b) for a, b in pairs]:
+        raise SystemExit("新旧实现的冲突判断结果不一致")
+    print(f"两两冲突判断 {len(pairs)} 对（冲突 {sum(new_result)} 对）: "
+          f"旧实现 {legacy_pairs * 1000:.1f}ms, 新实现 {new_pairs * 1000:.1f}ms, "
+          f"加速 {legacy_pairs / max(new_pairs, 1e-9):.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+HTTP 传输后端基准
+在独立进程中启动本机模拟服务器（HTTP/1.1 keep-alive，以及安装了 h2 时的 HTTP/2 明文 h2c），
+用 --threads 个线程经由各传输后端发送余量列表请求模板（与监控热路径相同），对比：
+- 客户端每个请求消耗的 CPU 时间（服务器在另一个进程中，不计入）；
+- 请求延迟 p50 / p99；
+- 服务器一侧实际接受的 TCP 连接数。
+服务器对每个请求固定延迟 --delay 毫秒，模拟到选课系统的往返时间。
+开始前先检查 h2 不可用时以 http_transport=http2 创建两种监控引擎都能退回 requests。
+
+用法:
+    python benchmarks/bench_transports.py [--requests 次数] [--threads 线程数] [--delay 毫秒]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui import async_engine, transports, workers  # noqa: E402
+from xk_spider.gui.transports import HTTP2_AVAILABLE, RequestsTransport, get_http2_error  # noqa: E402
+
+
+BASE_PATH = '/xsxkapp/sys/xsxkapp'
+COURSE = {'JXBID': '202420252000001', 'KCM': '高等数学', 'number': 'MATH1001', 'type': 'recommend'}
+BODY = json.dumps({
+    'code': '1',
+    'dataList': [{'tcList': [
+        {
+            'teachingClassID': f'2024202520000{index:02d}', 'classCapacity': '120',
+            'numberOfFirstVolunteer': '120', 'isFull': '1', 'isConflict': '0', 'isChoose': '0',
+            'teacherName': '教师', 'teachingPlace': '1-18周 星期一 1-2节 文汇楼',
+        }
+        for index in range(12)
+    ]}],
+}, ensure_ascii=False).encode('utf-8')
+
+
+# ---------- 模拟服务器（子进程） ----------
+def _serve_http1(port_pipe, connections, delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # 响应头与响应体分两次写出，不关 Nagle 会叠加客户端的延迟确认
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with connections.get_lock():
+                connections.value += 1
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json;charset=UTF-8')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    port_pipe.send(server.server_port)
+    server.serve_forever()
+
+
+def _serve_h2c(port_pipe, connections, delay):
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+
+    class H2Protocol(asyncio.Protocol):
+        def connection_made(self, transport):
+            with connections.get_lock():
+                connections.value += 1
+            self.transport = transport
+            self.conn = h2.connection.H2Connection(
+                config=h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+            )
+            self.conn.initiate_connection()
+            transport.write(self.conn.data_to_send())
+
+        def data_received(self, data):
+            try:
+                events = self.conn.receive_data(data)
+            except h2.exceptions.ProtocolError:
+                self.transport.write(self.conn.data_to_send())
+                self.transport.close()
+                return
+            for event in events:
+                if isinstance(event, h2.events.DataReceived):
+                    self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                if isinstance(event, h2.events.StreamEnded):
+                    asyncio.get_running_loop().call_later(delay, self._respond, event.stream_id)
+            self.transport.write(self.conn.data_to_send())
+
+        def _respond(self, stream_id):
+            if self.transport.is_closing():
+                return
+            try:
+                self.conn.send_headers(stream_id, [
+                    (':status', '200'),
+                    ('content-type', 'application/json;charset=UTF-8'),
+                    ('content-length', str(len(BODY))),
+                ])
+                self.conn.send_data(stream_id, BODY, end_stream=True)
+            except h2.exceptions.ProtocolError:
+                return
+            self.transport.write(self.conn.data_to_send())
+
+    async def main():
+        server = await asyncio.get_running_loop().create_server(H2Protocol, '127.0.0.1', 0)
+        port_pipe.send(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def start_server(target, delay):
+    parent, child = multiprocessing.Pipe()
+    connections = multiprocessing.Value('i', 0)
+    process = multiprocessing.Process(target=target, args=(child, connections, delay), daemon=True)
+    process.start()
+    return process, parent.recv(), connections
+
+
+# ---------- 客户端 ----------
+def check_http2_fallback():
+    """模拟未安装 h2：以 http_transport=http2 创建监控引擎，确认不报错并退回 requests"""
+    engines = [workers.MultiGrabWorker]
+    if async_engine.ASYNC_ENGINE_AVAILABLE:
+        engines.append(async_engine.AsyncGrabWorker)
+    saved = transports.HTTP2_AVAILABLE, async_engine.HTTP2_AVAILABLE
+    transports.HTTP2_AVAILABLE = async_engine.HTTP2_AVAILABLE = False
+    try:
+        for engine in engines:
+            worker = engine(
+                [COURSE], '20240001', 'batch-1', 'bench-token', 'JSESSIONID=bench',
+                max_workers=1, http_transport='http2',
+            )
+            try:
+                assert isinstance(worker._transport, RequestsTransport), type(worker._transport).__name__
+            finally:
+                worker._close_http_sessions()
+    finally:
+        transports.HTTP2_AVAILABLE, async_engine.HTTP2_AVAILABLE = saved
+    return [engine.__name__ for engine in engines]
+
+
+def run_case(transport_name, port, count, threads):
+    workers.BASE_URL = f"http://127.0.0.1:{port}{BASE_PATH}"
+    worker = workers.MultiGrabWorker(
+        [COURSE], '20240001', 'batch-1', 'bench-token', 'JSESSIONID=bench',
+        max_workers=threads, http_transport=transport_name,
+    )
+    template = worker._capacity_template(worker._capacity_keys(COURSE)[0])
+    transport = worker._transport
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def client(share):
+        local = []
+        for _ in range(share):
+            started = time.perf_counter()
+            try:
+                resp = transport.send_template(template, timeout=(3, 5), allow_redirects=False)
+                resp.json()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    # 预热：建立连接、触发各后端的延迟初始化
+    client(threads)
+    latencies.clear()
+    shares = [count // threads + (1 if index < count % threads else 0) for index in range(threads)]
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    pool = [threading.Thread(target=client, args=(share,)) for share in shares]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    worker._close_http_sessions()
+    latencies.sort()
+    done = len(latencies)
+    if not done:
+        return None, errors
+    return {
+        'cpu_us': cpu / done * 1e6,
+        'p50': latencies[done // 2] * 1000,
+        'p99': latencies[min(done - 1, int(done * 0.99))] * 1000,
+        'rps': done / wall,
+        'done': done,
+    }, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP 传输后端基准（本机模拟服务器）')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=5)
+    parser.add_argument('--delay', type=float, default=20.0, help='服务器每个请求的固定延迟（毫秒）')
+    args = parser.parse_args()
+    os.environ.setdefault('NO_PROXY', '127.0.0.1,localhost')
+    delay = args.delay / 1000
+
+    checked = check_http2_fallback()
+    print(f"h2 不可用时的回退: {', '.join(checked)} 均已改用 requests")
+
+    cases = [('requests', _serve_http1, 'HTTP/1.1'), ('urllib3', _serve_http1, 'HTTP/1.1')]
+    if HTTP2_AVAILABLE:
+        cases.append(('http2', _serve_h2c, 'h2c'))
+    else:
+        print(f"跳过 HTTP/2: {get_http2_error()}（pip install h2）")
+
+    print(f"{args.requests} 次请求, {args.threads} 个线程, 服务器延迟 {args.delay:g}ms")
+    print(f"{'后端':<10}{'协议':<10}{'CPU µs/请求':>12}{'p50 ms':>9}{'p99 ms':>9}{'请求/秒':>9}{'连接数':>7}")
+    for name, target, protocol in cases:
+        process, port, connections = start_server(target, delay)
+        try:
+            result, errors = run_case(name, port, args.requests, args.threads)
+        finally:
+            process.terminate()
+            process.join()
+        if result is None:
+            print(f"{name:<10}{protocol:<10}全部失败: {errors[:1]}")
+            continue
+        print(
+            f"{name:<10}{protocol:<10}{result['cpu_us']:>12.0f}{result['p50']:>9.1f}"
+            f"{result['p99']:>9.1f}{result['rps']:>9.0f}{connections.value:>7}"
+            + (f"  失败 {len(errors)} 次: {errors[0]}" if errors else '')
+        )
+
+
+if __name__ == '__main__':
+    main()
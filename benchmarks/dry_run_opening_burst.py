@@ -0,0 +1,181 @@
+"""
+定时开抢演练
+在本机启动一个模拟选课系统（时钟相对本机偏移 --skew 秒，Date 头按该时钟给出），
+用与登录相同的方式快速同步服务器时钟，再以 MultiGrabWorker 的定时开抢模式在 T0 连发选课
+（预热阶段会做多样本精确校准，--coarse 跳过校准以作对比）。
+模拟服务器按自己的时钟记录每个 volunteer.do 的到达时刻：T0 之前到达的请求返回“未开放”，
+之后按名额受理。输出各课程首个选课请求到达时刻相对 T0 的误差。
+
+用法:
+    python benchmarks/dry_run_opening_burst.py [--skew 秒] [--courses 门数] [--lead 秒] [--window 秒] [--coarse]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PyQt5.QtCore import Qt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui import workers  # noqa: E402
+from xk_spider.gui.server_clock import shared_server_clock  # noqa: E402
+
+
+BASE_PATH = '/xsxkapp/sys/xsxkapp'
+
+
+class StandIn:
+    """模拟选课系统的状态：偏移时钟、开放时刻、名额与请求到达记录。"""
+
+    def __init__(self, skew, seats):
+        self.skew = skew
+        self.t0 = None
+        self.seats = dict(seats)
+        self.selected = {}
+        self.arrivals = {}     # tc_id -> [服务器时刻, ...]
+        self.early = 0
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.time() + self.skew
+
+
+def make_handler(stand_in):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def date_time_string(self, timestamp=None):
+            # send_response 自动附带的 Date 头改用偏移后的时钟
+            return formatdate(stand_in.now() if timestamp is None else timestamp, usegmt=True)
+
+        def _send(self, obj, status=200):
+            body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_GET(self):
+            self._dispatch(parse_qs(urlparse(self.path).query))
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self._dispatch(parse_qs(self.rfile.read(length).decode('utf-8')) if length else {})
+
+        def _dispatch(self, fields):
+            arrived = stand_in.now()
+            endpoint = urlparse(self.path).path.rsplit('/', 1)[-1]
+            with stand_in.lock:
+                if endpoint == 'courseResult.do':
+                    return self._send({'code': '1', 'dataList': list(stand_in.selected.values())})
+                if endpoint == 'volunteer.do':
+                    data = json.loads(fields['addParam'][0])['data']
+                    tc_id = data['teachingClassId']
+                    stand_in.arrivals.setdefault(tc_id, []).append(arrived)
+                    if arrived < stand_in.t0:
+                        stand_in.early += 1
+                        return self._send({'code': '0', 'msg': '选课尚未开放'})
+                    if stand_in.seats.get(tc_id, 0) <= 0:
+                        return self._send({'code': '0', 'msg': '课程已满'})
+                    stand_in.seats[tc_id] -= 1
+                    stand_in.selected[tc_id] = {'teachingClassID': tc_id, 'courseName': tc_id}
+                    return self._send({'code': '1', 'msg': '选课成功'})
+                tc_list = [
+                    {
+                        'teachingClassID': tc_id, 'classCapacity': '1',
+                        'numberOfFirstVolunteer': str(1 - seats), 'isFull': '0' if seats else '1',
+                        'isConflict': '0', 'isChoose': '1' if tc_id in stand_in.selected else '0',
+                    }
+                    for tc_id, seats in stand_in.seats.items()
+                ]
+                return self._send({'code': '1', 'dataList': [{'tcList': tc_list}]})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定时开抢演练（本机模拟服务器）')
+    parser.add_argument('--skew', type=float, default=1.37, help='模拟服务器时钟相对本机的偏移（秒）')
+    parser.add_argument('--courses', type=int, default=4)
+    parser.add_argument('--lead', type=float, default=16.0, help='T0 距离现在的秒数（服务器时间）')
+    parser.add_argument('--window', type=float, default=2.0)
+    parser.add_argument('--coarse', action='store_true', help='只用单样本快速同步，不做精确校准')
+    args = parser.parse_args()
+
+    course_ids = [f'DRY{index:02d}' for index in range(args.courses)]
+    stand_in = StandIn(args.skew, {tc_id: 1 for tc_id in course_ids})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stand_in))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}{BASE_PATH}"
+    workers.BASE_URL = base_url
+
+    clock = shared_server_clock()
+    if not clock.sync(f"{base_url}/*default/index.do"):
+        raise SystemExit("同步模拟服务器时钟失败")
+    actual_offset = args.skew
+    print(f"快速同步: 估计 {clock.describe()}，实际 {actual_offset * 1000:+.0f}ms")
+    if args.coarse:
+        workers.CLOCK_MAX_ERROR = math.inf
+
+    # T0 取整秒，与真实轮次开放时刻一致
+    stand_in.t0 = math.ceil(stand_in.now() + args.lead)
+    courses = [
+        {'JXBID': tc_id, 'KCM': tc_id, 'number': tc_id, 'type': 'recommend'}
+        for tc_id in course_ids
+    ]
+    worker = workers.MultiGrabWorker(
+        courses, 'dry-run', 'dry-batch', 'dry-token', 'JSESSIONID=dry',
+        max_workers=min(5, args.courses),
+        opening_burst={'t0': stand_in.t0, 'window': args.window, 'prepare_lead': args.lead - 1},
+    )
+    worker._health_check_loop = lambda: None
+    # 没有 Qt 事件循环，状态信号直接在发出线程中打印
+    worker.status.connect(
+        lambda message: message.startswith('[定时]') and print(message), Qt.DirectConnection
+    )
+
+    runner = threading.Thread(target=worker.run, daemon=True)
+    runner.start()
+    runner.join(timeout=args.lead + args.window + 10)
+    worker.stop()
+    runner.join(timeout=5)
+    server.shutdown()
+
+    print(f"\n最终时钟估计 {clock.describe()}（{clock.sample_count} 个样本），"
+          f"实际误差 {(clock.offset - actual_offset) * 1000:+.1f}ms")
+    print(f"T0 = {stand_in.t0:.0f}（模拟服务器时间）")
+    firsts = []
+    for tc_id in course_ids:
+        arrivals = stand_in.arrivals.get(tc_id, [])
+        if not arrivals:
+            print(f"  {tc_id}: 未收到选课请求")
+            continue
+        first = (arrivals[0] - stand_in.t0) * 1000
+        firsts.append(first)
+        status = '已选中' if tc_id in stand_in.selected else '未选中'
+        print(f"  {tc_id}: 首个选课到达 T0{first:+.1f}ms, 共 {len(arrivals)} 次, {status}")
+    if firsts:
+        print(
+            f"首发到达误差: 最早 {min(firsts):+.1f}ms 最晚 {max(firsts):+.1f}ms，"
+            f"T0 前到达（被拒）{stand_in.early} 次"
+        )
+
+
+if __name__ == '__main__':
+    main()
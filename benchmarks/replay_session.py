@@ -0,0 +1,73 @@
+"""
+会话回放
+在虚拟时钟下回放 record_session 录制的会话（logs/session_*.jsonl.gz），不访问教务系统，
+监控代码按录制时的响应与耗时运行。给出多个 --poll-interval 时在同一份录制上逐一回放，
+对比不同轮询间隔下的请求次数、选课结果与发现→选课时间。
+
+用法:
+    python benchmarks/replay_session.py 录制文件 [--poll-interval 秒 ...] [--budget 次/秒]
+                                        [--duration 秒] [--trace-dir 目录] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui.replay import replay_session  # noqa: E402
+
+
+def _format_trace(traces):
+    parts = []
+    for kind, series in traces.items():
+        stats = series.get('detect_to_sent')
+        if stats:
+            parts.append(f"{kind} p50/p99={stats['p50']:.0f}/{stats['p99']:.0f}ms(n={stats['n']})")
+    return ', '.join(parts) or '—'
+
+
+def _print_report(label, report):
+    events = report['events']
+    selected = events.get('grab:succeeded', 0)
+    print(
+        f"{label:<10}{report['virtual_seconds']:>10.1f}{report['real_seconds']:>9.2f}"
+        f"{report['polls']:>8}{sum(report['requests'].values()):>8}{selected:>6}"
+        f"{report['unmatched']:>8}  {_format_trace(report['traces'])}"
+    )
+    for name, count in sorted(report['requests'].items()):
+        print(f"{'':<10}  {name}: {count}")
+    if events:
+        print(f"{'':<10}  事件: " + ', '.join(f"{name}={count}" for name, count in events.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在虚拟时钟下回放录制的监控会话')
+    parser.add_argument('path', help='录制文件（logs/session_*.jsonl.gz）')
+    parser.add_argument('--poll-interval', type=float, nargs='*', default=[],
+                        help='轮询间隔（秒），可给多个逐一对比；缺省使用监控的默认值')
+    parser.add_argument('--budget', type=float, default=None, help='余量轮询的总频率预算（次/秒）')
+    parser.add_argument('--duration', type=float, default=None, help='只回放前若干秒（虚拟时间）')
+    parser.add_argument('--trace-dir', default=None, help='写出回放的关键路径追踪文件的目录')
+    parser.add_argument('--json', action='store_true', help='输出 JSON 而不是表格')
+    args = parser.parse_args()
+
+    intervals = args.poll_interval or [None]
+    reports = []
+    for interval in intervals:
+        report = replay_session(
+            args.path, duration=args.duration, poll_interval=interval,
+            poll_budget_rps=args.budget, trace_dir=args.trace_dir,
+        )
+        reports.append(('默认' if interval is None else f"{interval:g}s", report))
+
+    if args.json:
+        print(json.dumps({label: report for label, report in reports}, ensure_ascii=False, indent=2))
+        return
+    print(f"{'轮询间隔':<10}{'虚拟秒':>10}{'实际秒':>9}{'轮询':>8}{'请求':>8}{'选课':>6}{'未匹配':>8}  发现→选课发出")
+    for label, report in reports:
+        _print_report(label, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+本机选课系统模拟服务器
+按 xk.ynu.edu.cn 的接口协议在本机提供登录、课程查询、选课、退课与课表接口（见 xk_spider/gui/stand_in.py），
+运行到 Ctrl+C 为止，每 --report 秒输出一行各接口请求数与注入的故障数。
+客户端以环境变量 XK_BASE_URL 指向启动时打印的地址即可连到模拟服务器，例如:
+    XK_BASE_URL=http://127.0.0.1:8765/xsxkapp/sys/xsxkapp python -m xk_spider.gui.main
+
+用法:
+    python benchmarks/run_stand_in.py [--port 端口] [--classes 教学班数] [--catalog 目录.json]
+        [--latency 毫秒] [--jitter 毫秒] [--churn 秒] [--session-ttl 秒] [--expiry 302|code]
+        [--error-rate 比例] [--stall-rate 比例] [--reset-rate 比例] [--fault-endpoints 接口 ...]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xk_spider.gui.stand_in import (  # noqa: E402
+    DEFAULT_STUDENT, EXPIRY_MODES, ElectiveState, FaultPlan, StandInServer, generate_catalog,
+)
+
+
+def _format_stats(stats):
+    hits = ', '.join(
+        f"{name[4:]}={count}" for name, count in sorted(stats.items()) if name.startswith('hit:')
+    )
+    others = ', '.join(
+        f"{name}={count}" for name, count in sorted(stats.items()) if not name.startswith('hit:')
+    )
+    return f"请求: {hits or '无'}" + (f" | {others}" if others else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本机选课系统模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='0 表示随机空闲端口')
+    parser.add_argument('--classes', type=int, default=200, help='生成的教学班数（未指定 --catalog 时）')
+    parser.add_argument('--open-ratio', type=float, default=0.1, help='初始有空位的教学班比例')
+    parser.add_argument('--catalog', default=None, help='课程目录 JSON（教学班字典列表，字段同 generate_catalog）')
+    parser.add_argument('--selected', nargs='*', default=[], help='学生初始已选的教学班 ID')
+    parser.add_argument('--student', default=DEFAULT_STUDENT, help='模拟学生的学号')
+    parser.add_argument('--password', default=None, help='设置后只接受该密码，否则任意账号密码均可登录')
+    parser.add_argument('--latency', type=float, default=20.0, help='每个请求的固定延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外随机延迟的上限（毫秒）')
+    parser.add_argument('--churn', type=float, default=0.0, help='名额变动间隔（秒），0 表示名额不变')
+    parser.add_argument('--session-ttl', type=float, default=0.0, help='登录态有效期（秒），0 表示不过期')
+    parser.add_argument('--expiry', choices=EXPIRY_MODES, default='302',
+                        help='登录态过期的表现：302 跳转或 {"code": "-1"}')
+    parser.add_argument('--captcha-error-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 --error-status 的比例')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='挂起 --stall 秒后才响应的比例')
+    parser.add_argument('--stall', type=float, default=10.0)
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='直接断开连接的比例')
+    parser.add_argument('--fault-endpoints', nargs='*', default=None,
+                        help='只对这些接口注入错误（如 volunteer.do），缺省为全部接口')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', type=float, default=10.0, help='统计输出间隔（秒）')
+    args = parser.parse_args()
+
+    if args.catalog:
+        with open(args.catalog, 'r', encoding='utf-8') as handle:
+            catalog = json.load(handle)
+    else:
+        catalog = generate_catalog(args.classes, open_ratio=args.open_ratio, seed=args.seed)
+    state = ElectiveState(
+        catalog, selected=args.selected, student_code=args.student, password=args.password,
+        session_ttl=args.session_ttl, expiry=args.expiry,
+        captcha_error_rate=args.captcha_error_rate, churn_interval=args.churn, seed=args.seed,
+    )
+    faults = FaultPlan(
+        latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+        error_rate=args.error_rate, error_status=args.error_status,
+        stall_rate=args.stall_rate, stall=args.stall, reset_rate=args.reset_rate,
+        endpoints=args.fault_endpoints, seed=args.seed,
+    )
+    server = StandInServer(state, faults, host=args.host, port=args.port).start()
+    open_classes = sum(
+        1 for entry in state.classes.values()
+        if entry['numberOfFirstVolunteer'] < entry['classCapacity']
+    )
+    print(f"模拟服务器: {server.base_url}")
+    print(f"  export XK_BASE_URL={server.base_url}")
+    print(f"  {len(state.classes)} 个教学班（{open_classes} 个有空位），学号 {state.student_code}，"
+          f"批次 {state.batch['code']}")
+    print(f"  免登录 token: {server.issue_session()}")
+    try:
+        while True:
+            time.sleep(args.report)
+            print(f"[{time.strftime('%H:%M:%S')}] {_format_stats(server.stats())}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"已停止。{_format_stats(server.stats())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,731 @@
+"""
+asyncio 监控引擎
+与 MultiGrabWorker 相同的 查询 → 选课 → 核实 → 换课/救援 状态机，
+改为单个事件循环上的协程：每门课程只是一个挂起的协程，共用一个带连接池的
+异步 HTTP 客户端，不再为等待而占用线程。QThread 外壳只负责运行事件循环，
+事件仍通过原有的 Qt 信号发给界面。
+"""
+import asyncio
+import json
+
+from .capacity import AsyncCapacityBatcher, build_capacity_index
+from .connections import KEEPALIVE_REFRESH_AFTER
+from .metrics import body_size, endpoint_name, response_size
+from .rescue import SEAT_CHOSEN
+from .scheduler import STOP
+from .swap_plan import SwapTimer
+from .tracing import current_trace, trace_span
+from .request_templates import build_session_headers
+from .throttle import AsyncPriorityAdmission, classify_endpoint, is_critical
+from .transports import HTTP2_AVAILABLE
+from .workers import MultiGrabWorker
+
+ASYNC_ENGINE_AVAILABLE = False
+_async_import_error = ''
+
+try:
+    import httpx
+    ASYNC_ENGINE_AVAILABLE = True
+except Exception as error:
+    httpx = None
+    _async_import_error = f"{type(error).__name__}: {error}"
+
+
+def get_async_engine_error():
+    return _async_import_error
+
+
+class AsyncGrabWorker(MultiGrabWorker):
+    """
+    asyncio 抢课 Worker
+    复用 MultiGrabWorker 的课程列表、冲突组、通知与安全判定逻辑，
+    只替换网络层与调度层。max_workers 仍表示同时在途的 HTTP 请求上限。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._capacity_batcher = AsyncCapacityBatcher(
+            self._afetch_capacity_listing, clock=self._clock
+        )
+        self._loop = None
+        self._client = None
+        self._async_slots = None
+        self._async_relogin_lock = None
+        self._wakeup = None
+        self._course_tasks = {}
+        self._plan_tasks = set()
+        # 被对冲请求抢先后仍在进行的请求：不取消（取消会断开连接），保留引用直到结束
+        self._straggler_tasks = set()
+
+    # ---------- 事件循环与 HTTP 客户端 ----------
+    def _create_async_client(self):
+        limits = httpx.Limits(
+            max_connections=self.max_workers,
+            max_keepalive_connections=self.max_workers,
+            # httpx 默认空闲 5 秒即关闭连接，放宽到服务器 keep-alive 超时以内
+            keepalive_expiry=KEEPALIVE_REFRESH_AFTER,
+        )
+        # http_transport=http2 时同样改用 HTTP/2，所有协程的请求复用同一条连接
+        http2 = self._http_transport == 'http2' and HTTP2_AVAILABLE
+        return httpx.AsyncClient(
+            headers=self.HTTP_HEADERS,
+            limits=limits,
+            timeout=httpx.Timeout(5.0, connect=3.0),
+            follow_redirects=False,
+            http2=http2,
+            transport=httpx.AsyncHTTPTransport(retries=2, limits=limits, http2=http2),
+        )
+
+    def _session_headers(self):
+        """httpx 客户端自带默认请求头，模板只合并会话头、token/Referer 与 Cookie。"""
+        return self._request_templates.session_headers(
+            lambda: build_session_headers(
+                self.HTTP_HEADERS, self._get_headers(), self.cookies, include_defaults=False
+            )
+        )
+
+    async def _arequest(self, method, url, endpoint_class=None, send=None, **kwargs):
+        """
+        通过请求预算与有界并发槽发送异步请求，记录实际并发峰值与请求指标。
+        send 缺省为 self._client.request。
+        """
+        if not self._running:
+            raise RuntimeError("监控已停止")
+        endpoint_class = endpoint_class or classify_endpoint(url)
+        delay = self._request_budget.reserve(endpoint_class)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        queued = self._clock()
+        await self._async_slots.acquire(critical=is_critical(endpoint_class))
+        self._active_requests += 1
+        self._peak_active_requests = max(
+            self._peak_active_requests, self._active_requests
+        )
+        started = self._clock()
+        status, bytes_in = None, 0
+        resp = error = None
+        try:
+            self._request_budget.mark_sent()
+            resp = await (send or self._client.request)(method, url, **kwargs)
+            status, bytes_in = resp.status_code, response_size(resp)
+            return resp
+        except Exception as e:
+            status, error = type(e).__name__, e
+            raise
+        finally:
+            finished = self._clock()
+            self._active_requests -= 1
+            await self._async_slots.release()
+            endpoint = endpoint_name(url)
+            self._metrics.record(
+                endpoint, status, finished - started, started - queued, bytes_in,
+                body_size(kwargs.get('content', kwargs.get('data'))),
+            )
+            trace = current_trace()
+            if trace is not None:
+                trace.request(endpoint, queued, started, finished, status)
+            recorder = self._recorder
+            if recorder is not None:
+                recorder.record(
+                    method, url, kwargs.get('content'), started, finished - started,
+                    response=resp, error=error,
+                )
+            self._report_request_rate()
+
+    async def _atimed_request(self, template, timeout):
+        """发送模板并把时延（不含预算与并发槽等待）记入 _latency。"""
+        async def send(method, url, **kwargs):
+            started = self._clock()
+            try:
+                resp = await self._client.request(method, url, **kwargs)
+            except httpx.TimeoutException:
+                self._latency.record_timeout(template.endpoint, timeout.read)
+                raise
+            self._latency.record(template.endpoint, self._clock() - started)
+            return resp
+        return await self._arequest(
+            template.method, template.url(),
+            endpoint_class=template.endpoint_class, send=send,
+            headers=template.headers, content=template.body, timeout=timeout,
+        )
+
+    async def _ahedged_request(self, template):
+        """只读查询：读超时按 p99 自适应，首发到 p95 未返回时再发一个，取先成功返回的响应。"""
+        endpoint = template.endpoint
+        timeout = httpx.Timeout(self._latency.read_timeout(endpoint, 5.0), connect=3.0)
+        hedge_after = self._latency.hedge_delay(endpoint)
+        if hedge_after is None:
+            return await self._atimed_request(template, timeout)
+
+        primary = self._loop.create_task(self._atimed_request(template, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done or not self._running or not self._latency.try_hedge(endpoint):
+            return await primary
+
+        backup = self._loop.create_task(self._atimed_request(template, timeout))
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup:
+                        self._latency.record_hedge_win(endpoint)
+                    for straggler in pending:
+                        self._straggler_tasks.add(straggler)
+                        straggler.add_done_callback(self._discard_straggler)
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def _discard_straggler(self, task):
+        self._straggler_tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _ahandle_session_expired(self, token_used):
+        """
+        Session 过期处理：同一时刻只有一个协程执行重登，
+        其它协程等待后若发现 token 已更新则直接重试。
+        重登仍使用同步实现（OCR + 登录），在线程池中执行，不阻塞事件循环。
+        """
+        async with self._async_relogin_lock:
+            if self.token and self.token != token_used:
+                return True
+            return await self._loop.run_in_executor(None, self._handle_session_expired)
+
+    async def _asend(self, make_template, retry_on_expired=True, hedged=False):
+        """
+        发送预构造的请求模板并处理 Session 过期
+        make_template() 返回当前会话纪元的模板，重登后重试时会取到新模板。
+        hedged=True 用于只读查询（自适应超时 + 请求对冲，见 _ahedged_request）。
+        返回: (status, result)，status 为 'ok' / 'session_expired' / 'failed'；
+        'failed' 时 result 为 HTTP 状态码描述或异常信息
+        """
+        token_used = self.token
+        try:
+            template = make_template()
+            if hedged:
+                resp = await self._ahedged_request(template)
+            else:
+                resp = await self._arequest(
+                    template.method, template.url(),
+                    endpoint_class=template.endpoint_class,
+                    headers=template.headers, content=template.body,
+                )
+            # 检查 302 跳转
+            if resp.status_code == 302 or self._is_session_expired(response=resp):
+                result = None
+            elif resp.status_code != 200:
+                return 'failed', f"HTTP {resp.status_code}"
+            else:
+                result = resp.json()
+                msg = result.get('msg', '') if isinstance(result, dict) else ''
+                if not self._is_session_expired(result=result, msg=msg):
+                    return 'ok', result
+        except httpx.TimeoutException:
+            return 'failed', "请求超时"
+        except Exception as e:
+            return 'failed', str(e)[:50]
+
+        if retry_on_expired and await self._ahandle_session_expired(token_used):
+            return await self._asend(make_template, retry_on_expired=False, hedged=hedged)
+        return 'session_expired', None
+
+    # ---------- 异步 API ----------
+    async def _afetch_capacity_listing(self, key):
+        generation = self._selected_state.generation
+        status, result = await self._asend(lambda: self._capacity_template(key), hedged=True)
+        if status != 'ok':
+            return status, {}
+        index = build_capacity_index(result.get('dataList', []))
+        self._observe_chosen(index, generation)
+        return 'ok', index
+
+    async def _aquery_course_capacity(self, course):
+        tc_id = course.get('JXBID', '')
+        entry = None
+        for key in self._capacity_keys(course):
+            status, entry = await self._capacity_batcher.lookup(key, tc_id)
+            if status == 'session_expired':
+                return 'session_expired', None, None
+            if status != 'ok' or entry is not None:
+                break
+        if entry is None:
+            return None, None, None
+        capacity, selected, course_info = entry
+        return capacity - selected, capacity, dict(course_info)
+
+    async def _aselect_course(self, course):
+        tc_id = course.get('JXBID', '')
+        self._events.inc('grab', 'attempted')
+        self._logger.info(f"选课请求: tc_id={tc_id}, type={self._course_type_code(course)}")
+        status, result = await self._asend(lambda: self._select_template(course))
+        if status == 'session_expired':
+            return False, "session_expired", False
+        if status != 'ok':
+            self._logger.error(f"选课失败: {result}")
+            # 超时等情况下服务端可能已受理，已选课程缓存必须失效
+            self._selected_state.invalidate()
+            return False, result, False
+        self._logger.info(f"选课响应: {json.dumps(result, ensure_ascii=False)}")
+        return self._interpret_select_result(tc_id, result.get('code', ''), result.get('msg', ''))
+
+    async def _adelete_course(self, tc_id):
+        self._logger.info(f"退课请求: tc_id={tc_id}")
+        status, result = await self._asend(lambda: self._delete_template(tc_id))
+        if status == 'session_expired':
+            return False, "session_expired"
+        if status != 'ok':
+            self._logger.error(f"退课失败: {result}")
+            self._selected_state.invalidate(deleted=[tc_id])
+            return False, result
+        self._logger.info(f"退课响应: {json.dumps(result, ensure_ascii=False)}")
+        return self._interpret_delete_result(tc_id, result.get('code', ''), result.get('msg', ''))
+
+    async def _afetch_selected_courses(self):
+        """
+        请求一次已选课程接口（由 _selected_state 合并调用），返回值同 _fetch_selected_courses
+        code=-1 与其它接口一样按 _is_session_expired 计为登录态失效。
+        """
+        return await self._asend(
+            self._selected_courses_template, retry_on_expired=False, hedged=True
+        )
+
+    async def _aget_selected_courses(self, max_age=None):
+        """返回已选课程详情列表，失败返回 None。"""
+        status, result = await self._selected_state.aget(
+            self._afetch_selected_courses, max_age=max_age
+        )
+        if status != 'ok':
+            self._logger.warning(f"获取已选课程失败: {result or status}")
+            return None
+        return self._parse_selected_courses(result)
+
+    async def _averify_course_selected(self, tc_id, max_attempts=3, retry_interval=0.3):
+        has_false = False
+        for i in range(max_attempts):
+            if self._selected_state.is_confirmed(tc_id):
+                self._logger.info(f"余量列表 isChoose 已确认选中: {tc_id}")
+                return True
+            # 首次可复用选课/退课之后的查询结果；重试必须重新查询
+            selected = await self._aget_selected_courses(max_age=None if i == 0 else 0)
+            if selected is not None:
+                if any(item['id'] == tc_id for item in selected):
+                    return True
+                has_false = True
+            if i < max_attempts - 1:
+                await asyncio.sleep(retry_interval)
+        if has_false:
+            return False
+        return None
+
+    # ---------- 换课与紧急救援 ----------
+    def _start_swap_plan_refresh(self, course):
+        # 事件循环只持有任务的弱引用，解析完成前由 _plan_tasks 保持
+        task = self._loop.create_task(self._arefresh_swap_plan(course))
+        self._plan_tasks.add(task)
+        task.add_done_callback(self._plan_tasks.discard)
+
+    async def _arefresh_swap_plan(self, course):
+        tc_id = course.get('JXBID', '')
+        try:
+            generation = self._selected_state.generation
+            selected_courses = await self._aget_selected_courses()
+            if selected_courses is not None:
+                self._store_swap_plan(course, selected_courses, generation)
+        except Exception as e:
+            self._logger.error(f"换课计划解析异常: {tc_id}, {type(e).__name__}: {e}")
+        finally:
+            self._swap_plans.end_refresh(tc_id)
+
+    async def _ahandle_conflict_rollback(self, course):
+        """与 _handle_conflict_rollback 相同的换课 / 救援流程（含分步计时）。"""
+        timer = SwapTimer(clock=self._clock, trace=current_trace())
+        try:
+            return await self._arun_conflict_rollback(course, timer)
+        finally:
+            self._report_swap_timing(course, timer)
+
+    async def _arun_conflict_rollback(self, course, timer):
+        tc_id = course.get('JXBID', '')
+        course_name = course.get('KCM', '')
+        target_time = course.get('SKSJ', '') or course.get('classTime', '')
+
+        self.status.emit(f"[换课] 开始处理时间冲突: {course_name}")
+        self._logger.info(f"开始换课流程: {course_name}, 时间: {target_time}")
+
+        # Step 1: 优先使用预解析的换课计划，否则实时定位冲突课程（唯一匹配，否则拒绝退课）
+        conflict_course = self._take_swap_plan(course, timer)
+        if conflict_course:
+            self.status.emit(f"[换课] Step 1: 使用预解析的换课计划")
+        else:
+            self.status.emit(f"[换课] Step 1: 定位冲突课程...")
+            selected_courses = await self._aget_selected_courses()
+            conflict_course = self._match_conflict_course(course, selected_courses)
+        timer.mark('resolve')
+        if not conflict_course:
+            self.status.emit(f"[换课] 无法定位冲突课程，请手动处理")
+            self._logger.warning(f"无法定位冲突课程: {course_name}")
+            return False, None
+
+        conflict_tc_id = conflict_course['id']
+        conflict_name = conflict_course['name']
+        self.status.emit(f"[换课] 发现冲突: {conflict_name}")
+        self._logger.info(f"冲突课程: {conflict_name} (ID: {conflict_tc_id})")
+
+        # Step 2: 退掉冲突的旧课
+        self.status.emit(f"[换课] Step 2: 退选 {conflict_name}...")
+        timer.open_window()
+        success, msg = await self._adelete_course(conflict_tc_id)
+        timer.mark('delete')
+        if not success:
+            timer.cancel_window()
+            self.status.emit(f"[换课] 退课失败: {msg}")
+            self._logger.error(f"退课失败: {conflict_name}, 原因: {msg}")
+            return False, conflict_course
+
+        self._logger.info(f"退课成功: {conflict_name}")
+
+        # Step 3: 立即抢入目标课程；仍报冲突时等待退课生效后重试一次
+        self.status.emit(f"[换课] Step 3: 选课 {course_name}...")
+        success, msg, need_rollback = await self._aselect_course(course)
+        timer.mark('select')
+        if need_rollback:
+            await asyncio.sleep(self.SWAP_SETTLE_DELAY)
+            timer.mark('settle')
+            success, msg, _ = await self._aselect_course(course)
+            timer.mark('select')
+        target_uncertain = False
+        if success:
+            # Step 4: 核实
+            is_selected = await self._averify_course_selected(tc_id)
+            timer.mark('verify')
+            if is_selected:
+                timer.close_window()
+                self.status.emit(f"[换课] Step 4: 换课成功！{conflict_name} → {course_name}")
+                self._logger.info(f"换课成功: {conflict_name} → {course_name}")
+                return True, conflict_course
+            elif is_selected is None:
+                target_uncertain = True
+                msg = "目标课核实查询失败"
+                self.status.emit(f"[换课] Step 4: 核实查询失败，进入安全救援")
+                self._logger.warning(f"换课核实失败，进入安全救援: {course_name}")
+            else:
+                msg = "目标课核实未选中"
+
+        # Step 5: 紧急救援 - 持续抢回旧课直到成功或监控停止
+        self.status.emit(f"[换课] Step 5: 选课失败({msg})，进入紧急救援模式...")
+        self._logger.warning(f"选课失败: {course_name}, 原因: {msg}, 开始亡命回滚")
+        self.status.emit(f"[紧急救援] 开始盯守 {conflict_name} 的余量，出现名额立即抢回...")
+        self._logger.error(f"进入紧急救援模式: 尝试抢回 {conflict_name}")
+
+        rescue_course = self._rollback_course(conflict_course, course)
+        cadence = self._rescue_cadence()
+        # 目标课状态不确定时先核实，确认已选则视为换课成功
+        verify_due = target_uncertain
+        while self._running:
+            if cadence.next_round() or verify_due:
+                verify_due = False
+                with trace_span('rescue.check'):
+                    checked = await self._acheck_swap_courses(tc_id, conflict_tc_id, max_age=0)
+                settled = self._settle_rescue_check(course, conflict_name, cadence, timer, checked)
+                if settled is not None:
+                    return settled, conflict_course
+
+            remain, _, course_info = await self._aquery_course_capacity(rescue_course)
+            self._increment_request_count()
+            seat = cadence.observe(remain, course_info)
+            if seat == SEAT_CHOSEN:
+                verify_due = True
+
+            burst = cadence.burst_size(seat)
+            for shot in range(burst):
+                cadence.select_count += 1
+                if cadence.select_count % 10 == 1:
+                    self.status.emit(f"[紧急救援] 第{cadence.select_count}次尝试抢回 {conflict_name}")
+                with trace_span('rescue.select', attempt=cadence.select_count):
+                    rollback_success, rollback_msg, _ = await self._aselect_course(rescue_course)
+
+                if rollback_success:
+                    with trace_span('rescue.check'):
+                        checked = await self._acheck_swap_courses(tc_id, conflict_tc_id)
+                    settled = self._settle_rescue_check(
+                        course, conflict_name, cadence, timer, checked
+                    )
+                    if settled is not None:
+                        return settled, conflict_course
+                    verify_due = True
+
+                if rollback_msg and ('已选' in rollback_msg or '重复' in rollback_msg):
+                    self._settle_rescue_check(
+                        course, conflict_name, cadence, timer, (False, True), 'already_selected'
+                    )
+                    return False, conflict_course
+                if rollback_success or rollback_msg == "课程已满":
+                    break
+                if shot < burst - 1:
+                    await asyncio.sleep(cadence.burst_interval)
+
+            await asyncio.sleep(cadence.next_delay())
+
+        timer.mark('rescue')
+        self._logger.info(f"救援节奏: {conflict_name}, {cadence.describe()}")
+        self._report_rescue_result(course, conflict_name, cadence.select_count, 'interrupted')
+        return False, conflict_course
+
+    async def _acheck_swap_courses(self, tc_id, conflict_tc_id, max_age=None):
+        """与 _check_swap_courses 相同：一次查询联合核实目标课与旧课。"""
+        if self._selected_state.is_confirmed(tc_id):
+            return True, False
+        if self._selected_state.is_confirmed(conflict_tc_id):
+            return False, True
+        selected = await self._aget_selected_courses(max_age=max_age)
+        if selected is None:
+            return None
+        selected_ids = {item['id'] for item in selected}
+        return tc_id in selected_ids, conflict_tc_id in selected_ids
+
+    # ---------- 单门课程协程 ----------
+    async def _apoll_course(self, tc_id):
+        """与 _poll_course 相同的一次检查，返回值含义一致（换课在协程内完成）。"""
+        # 各课程协程是独立任务，当前追踪互不影响
+        with self._tracer.scope():
+            return await self._apoll_course_once(tc_id)
+
+    async def _apoll_course_once(self, tc_id):
+        if not self._running:
+            return STOP
+        course = self._find_course(tc_id)
+        if course is None:
+            self._drop_course_state(tc_id)
+            return STOP
+
+        course_name = course.get('KCM', '')
+        started = self._clock()
+        remain, capacity, course_info = await self._aquery_course_capacity(course)
+        answered = self._clock()
+        self._increment_request_count()
+
+        state = self._course_states.ensure(tc_id)
+        state.record_poll(answered - started)
+
+        if remain == 'session_expired':
+            self.need_relogin.emit()
+            self._drop_course_state(tc_id)
+            return STOP
+
+        # 安全策略 1: 查询失败直接跳过，绝不盲抢
+        if remain is None:
+            if state.set_status('query_failed'):
+                self.status.emit(f"[SKIP] {course_name} 查询失败，跳过本次循环（安全模式）")
+                self._logger.warning(f"查询失败，跳过: {course_name}")
+            return self.QUERY_FAILED_DELAY
+
+        action = self._evaluate_capacity(
+            course, state, remain, capacity, course_info, started, answered
+        )
+        if action == 'chosen':
+            self._handle_success_cleanup(course)
+            self._drop_course_state(tc_id)
+            return STOP
+        if action == 'wait':
+            return None
+        if action == 'swap':
+            return await self._aswap(course)
+
+        self.status.emit(f"[GRAB] 尝试选课: {course_name}...")
+        success, msg, need_rollback = await self._aselect_course(course)
+        self._logger.info(f"选课结果: {course_name}, success={success}, msg={msg}, need_rollback={need_rollback}")
+
+        if success:
+            with trace_span('verify'):
+                is_selected = await self._averify_course_selected(tc_id)
+            if is_selected is True:
+                self._report_grab_success(course)
+                self._handle_success_cleanup(course)
+                self._drop_course_state(tc_id)
+                return STOP
+            if is_selected is None:
+                self.status.emit(f"[WARN] 选课返回成功但核实查询失败，暂不发送成功通知，继续监控...")
+            else:
+                self.status.emit(f"[WARN] 选课返回成功但核实未选中，继续监控...")
+        elif msg == "session_expired":
+            self.need_relogin.emit()
+            self._drop_course_state(tc_id)
+            return STOP
+        elif need_rollback:
+            self.status.emit(f"[CONFLICT] {course_name} 服务器返回冲突，启动换课...")
+            state.set_status('conflict')
+            return await self._aswap(course)
+        else:
+            self.status.emit(f"[FAIL] {course_name} 选课失败: {msg}")
+
+        return self.GRAB_RETRY_DELAY
+
+    async def _aswap(self, course):
+        swap_success, conflict_info = await self._ahandle_conflict_rollback(course)
+        if self._finish_swap(course, swap_success, conflict_info):
+            self._drop_course_state(course.get('JXBID', ''))
+            return STOP
+        return 2.0
+
+    async def _course_loop(self, tc_id, delay):
+        """固定频率轮询单门课程，语义与 DeadlineScheduler 一致，间隔取自适应频率。"""
+        loop = self._loop
+        due = loop.time() + delay
+        try:
+            while self._running:
+                wait = due - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    result = await self._apoll_course(tc_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._logger.error(f"课程协程异常: {tc_id}, {type(e).__name__}: {e}")
+                    result = None
+                if result is STOP:
+                    break
+                now = loop.time()
+                if result is None:
+                    due = max(due + self._poll_rates.interval(tc_id), now)
+                else:
+                    due = now + result
+        finally:
+            if self._course_tasks.get(tc_id) is asyncio.current_task():
+                del self._course_tasks[tc_id]
+            self._wakeup.set()
+
+    def _spawn_course(self, tc_id, delay):
+        task = self._course_tasks.get(tc_id)
+        if task is not None and not task.done():
+            return
+        self._course_tasks[tc_id] = self._loop.create_task(
+            self._course_loop(tc_id, delay)
+        )
+
+    # ---------- 覆盖线程引擎的调度接口 ----------
+    def _schedule_course(self, course, delay=0.0):
+        tc_id = course.get('JXBID', '')
+        loop = self._loop
+        if not tc_id or loop is None:
+            return
+        self._course_states.reset(tc_id)
+        self._poll_rates.track(tc_id, priority=self._course_weight(course))
+        self._warm_request_templates(course)
+        loop.call_soon_threadsafe(self._spawn_course, tc_id, delay)
+
+    def _wake_main(self):
+        """从任意线程唤醒主协程重新检查运行状态。"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _unschedule_course(self, tc_id):
+        # 不取消协程：正在换课/救援的课程必须走完回滚流程，
+        # 其余课程在下一次检查发现已不在列表中时自行结束。
+        self._drop_course_state(tc_id)
+        self._wake_main()
+
+    def stop(self):
+        super().stop()
+        self._wake_main()
+
+    async def _async_health_loop(self):
+        """轻量健康检查：重新拉起脱离调度的课程协程。"""
+        while self._running:
+            await asyncio.sleep(self._health_check_interval)
+            missing = [
+                course for course in self._get_courses_snapshot()
+                if course.get('JXBID', '') not in self._course_tasks
+            ]
+            if missing:
+                self.status.emit(
+                    f"[健康检查] 检测到 {len(missing)} 门课程未在调度中，已重新排期"
+                )
+                self._logger.warning(f"健康检查: 缺失调度任务 {len(missing)} 个")
+                for course in missing:
+                    self._schedule_course(course)
+
+    async def _amain(self, courses):
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        # 协程版优先准入；自动重登等同步请求仍走线程版 _request_slots
+        self._async_slots = AsyncPriorityAdmission(
+            self.max_workers, reserved=self.RESERVED_CRITICAL_SLOTS
+        )
+        self._async_relogin_lock = asyncio.Lock()
+        self._client = self._create_async_client()
+        health_task = self._loop.create_task(self._async_health_loop())
+        try:
+            for course in courses:
+                self._schedule_course(course)
+            # 主协程等待所有课程处理完毕或被停止；新增课程由 add_course 直接排期
+            while self._running:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not self._watchlist:
+                    self.status.emit("[INFO] 所有课程已处理完毕")
+                    break
+        finally:
+            self._running = False
+            health_task.cancel()
+            tasks = list(self._course_tasks.values())
+            if tasks:
+                # 给正在进行的选课/救援一个收尾窗口，随后取消仍在等待的协程
+                await asyncio.wait(tasks, timeout=2)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for task in list(self._straggler_tasks):
+                task.cancel()
+            await self._client.aclose()
+            self._loop = None
+
+    def run(self):
+        courses = self._get_courses_snapshot()
+        if not courses:
+            self.status.emit("[INFO] 没有待抢课程")
+            return
+
+        self.status.emit(
+            f"[INFO] 启动监控(asyncio): {len(courses)} 门课程，HTTP并发上限: {self.max_workers}"
+        )
+        self._start_metrics_reporter()
+        self._start_metrics_exporter()
+        self._start_session_recorder()
+        # 定时开抢阶段沿用线程引擎的同步实现，结束后再启动事件循环
+        if self._opening_burst is not None:
+            self._run_opening_burst()
+            courses = self._get_courses_snapshot()
+            if not self._running:
+                self._close_http_sessions()
+                return
+        try:
+            asyncio.run(self._amain(courses))
+        except Exception as e:
+            self._logger.error(f"asyncio 监控引擎异常: {type(e).__name__}: {e}")
+            self.failed.emit(f"监控引擎异常: {str(e)[:50]}")
+
+        # 自动重登使用的同步 Session
+        self._close_http_sessions()
+        self._logger.info(
+            f"HTTP并发统计(asyncio): 配置={self.max_workers}, 实际峰值={self._peak_active_requests}"
+        )
+        self._logger.info(
+            f"余量查询合并: 课程查询={self._capacity_batcher.lookup_count}, "
+            f"实际列表请求={self._capacity_batcher.request_count}"
+        )
+        self._log_poll_rate_summary()
+        self._log_request_budget_summary(self._async_slots)
+        self._log_swap_summary()
+        self._log_latency_summary()
+        self._log_metrics_summary()
+        self._log_trace_summary()
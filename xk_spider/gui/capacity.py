@@ -0,0 +1,172 @@
+"""
+余量批量查询模块
+同一 (教学班类型, 接口, 查询词) 的待抢课程共用一次列表请求，响应只索引一次，
+再按教学班 ID 扇出 remain/isFull/isChoose 给每门课程。
+"""
+import asyncio
+import threading
+import time
+
+from .config import (
+    get_api_endpoint, get_course_type_code,
+    parse_bool_field, parse_int_field,
+)
+
+
+def capacity_group_key(course, query_content=None):
+    """返回课程所属的余量查询分组 (teachingClassType, endpoint, queryContent)。"""
+    course_type = course.get('type', 'recommend')
+    if query_content is None:
+        # 优先使用课程号查询，更精确
+        query_content = course.get('number', '') or course.get('KCM', '')
+    return (
+        get_course_type_code(course_type),
+        get_api_endpoint(course_type),
+        str(query_content or ''),
+    )
+
+
+def _index_entry(tc):
+    capacity = parse_int_field(tc.get('classCapacity') or tc.get('KRL'))
+    selected = parse_int_field(tc.get('numberOfFirstVolunteer') or tc.get('YXRS'))
+    info = dict(tc)
+    # 正确解析状态字段
+    info['isFull'] = parse_bool_field(tc.get('isFull'))
+    info['isConflict'] = parse_bool_field(tc.get('isConflict'))
+    info['isChoose'] = parse_bool_field(tc.get('isChoose') or tc.get('isChosen'))
+    return capacity, selected, info
+
+
+def build_capacity_index(data_list):
+    """把列表接口的 dataList（含 tcList 嵌套或单层结构）索引为 {教学班ID: (容量, 已选, 信息)}。"""
+    index = {}
+    for item in data_list or []:
+        if not isinstance(item, dict):
+            continue
+        tc_list = item.get('tcList', [])
+        entries = tc_list if tc_list else [item]
+        for tc in entries:
+            if not isinstance(tc, dict):
+                continue
+            tc_id = tc.get('teachingClassID') or tc.get('JXBID', '')
+            if tc_id and tc_id not in index:
+                index[tc_id] = _index_entry(tc)
+    return index
+
+
+class _CapacityGroup:
+    __slots__ = ('status', 'index', 'fetched_at', 'inflight')
+
+    def __init__(self):
+        self.status = None
+        self.index = {}
+        self.fetched_at = 0.0
+        self.inflight = None
+
+
+class CapacityBatcher:
+    """
+    余量查询合并器（single-flight）
+    同组已有请求在途时直接等待其结果；结果在 max_age 秒内复用，不再重复请求。
+    fetch(key) 返回 (status, index)，status 为 'ok' / 'session_expired' / 'failed'。
+    clock 为计算缓存年龄的单调时钟。
+    """
+
+    def __init__(self, fetch, max_age=0.8, wait_timeout=10.0, clock=time.monotonic):
+        self._fetch = fetch
+        self.max_age = max_age
+        self._wait_timeout = wait_timeout
+        self._clock = clock
+        self._groups = {}
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.lookup_count = 0
+
+    def lookup(self, key, tc_id):
+        """
+        查询单个教学班
+        返回: (status, entry)，entry 为 (容量, 已选, 信息) 或 None（列表中未找到）
+        """
+        with self._lock:
+            self.lookup_count += 1
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _CapacityGroup()
+            if group.status == 'ok' and self._clock() - group.fetched_at < self.max_age:
+                return 'ok', group.index.get(tc_id)
+            event = group.inflight
+            leader = event is None
+            if leader:
+                event = group.inflight = threading.Event()
+                self.request_count += 1
+
+        if not leader:
+            if not event.wait(self._wait_timeout):
+                return 'failed', None
+            with self._lock:
+                status = group.status
+                entry = group.index.get(tc_id) if status == 'ok' else None
+            return status or 'failed', entry
+
+        status, index = 'failed', {}
+        try:
+            status, index = self._fetch(key)
+        finally:
+            with self._lock:
+                group.status = status
+                group.index = index if status == 'ok' else {}
+                if status == 'ok':
+                    group.fetched_at = self._clock()
+                group.inflight = None
+            event.set()
+        return status, (index.get(tc_id) if status == 'ok' else None)
+
+    def invalidate(self, key=None):
+        """丢弃缓存结果（选课/退课后余量会变化）。"""
+        with self._lock:
+            groups = [self._groups.get(key)] if key is not None else list(self._groups.values())
+            for group in groups:
+                if group is not None:
+                    group.fetched_at = 0.0
+
+    def discard_unused(self, active_keys):
+        """清理已不在监控列表中的分组。"""
+        with self._lock:
+            for key in list(self._groups):
+                if key not in active_keys and self._groups[key].inflight is None:
+                    del self._groups[key]
+
+
+class AsyncCapacityBatcher(CapacityBatcher):
+    """
+    asyncio 版余量查询合并器
+    在事件循环内使用：同组在途请求以 Future 共享，fetch(key) 为协程。
+    """
+
+    async def lookup(self, key, tc_id):
+        self.lookup_count += 1
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _CapacityGroup()
+        if group.status == 'ok' and self._clock() - group.fetched_at < self.max_age:
+            return 'ok', group.index.get(tc_id)
+        if group.inflight is None:
+            self.request_count += 1
+            group.inflight = asyncio.ensure_future(self._refresh(key, group))
+        try:
+            status = await asyncio.wait_for(asyncio.shield(group.inflight), self._wait_timeout)
+        except asyncio.TimeoutError:
+            return 'failed', None
+        return status, (group.index.get(tc_id) if status == 'ok' else None)
+
+    async def _refresh(self, key, group):
+        status, index = 'failed', {}
+        try:
+            status, index = await self._fetch(key)
+        finally:
+            group.status = status
+            group.index = index if status == 'ok' else {}
+            if status == 'ok':
+                group.fetched_at = self._clock()
+            group.inflight = None
+        return status
@@ -2,6 +2,8 @@
 配置与常量模块
 存放所有全局常量和纯逻辑辅助函数
 """
+import os
+
 from xk_spider.storage import MONITOR_STATE_FILE, WATCHDOG_SIGNAL_FILE
 
 # ========== 课程类型映射 ==========
@@ -41,8 +43,9 @@ COURSE_NAME_TO_TYPE = {
     '体育课程': 'sport',
 }
 
-# API 基础 URL
-BASE_URL = "https://xk.ynu.edu.cn/xsxkapp/sys/xsxkapp"
+# API 基础 URL（环境变量 XK_BASE_URL 可改指本机模拟服务器，见 stand_in.py）
+DEFAULT_BASE_URL = "https://xk.ynu.edu.cn/xsxkapp/sys/xsxkapp"
+BASE_URL = (os.environ.get('XK_BASE_URL') or DEFAULT_BASE_URL).strip().rstrip('/')
 
 def get_api_endpoint(course_type):
     """获取课程类型对应的 API 端点"""
@@ -72,3 +75,31 @@ def parse_int(value, default=0):
         return int(value)
     except (ValueError, TypeError):
         return default
+
+
+# ========== 状态解析工具 ==========
+def parse_bool_field(value):
+    """解析 API 返回的布尔字段（可能是 "0"/"1"/True/False/None）"""
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value == "1" or value.lower() == "true"
+    if isinstance(value, int):
+        return value == 1
+    return False
+
+
+def parse_int_field(value, default=0):
+    """安全解析整数字段"""
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return default
+    return default
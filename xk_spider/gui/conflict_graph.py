@@ -0,0 +1,138 @@
+"""
+待抢列表冲突图
+按 (星期, 节次) 分桶索引待抢课程的上课时间，加入课程时只与同桶课程比较周次，
+冲突边用并查集合并为连通冲突组。加入一门课程的代价与同时段课程数 k 成正比，
+不再在每次开始监控时对整张列表做 O(n²) 的两两比较。
+移除课程时只重建它所在的那个连通分量。
+"""
+from .timeslots import parse_time_slots, slots_conflict
+
+
+def _slot_cells(slots):
+    cells = set()
+    for day, _weeks, periods in slots:
+        period = 0
+        while periods:
+            if periods & 1:
+                cells.add((day, period))
+            periods >>= 1
+            period += 1
+    return cells
+
+
+class ConflictGraph:
+    """
+    增量冲突图（只在主线程使用）
+    - add(tc_id, time_text) / remove(tc_id) 维护分桶、邻接表与并查集；
+    - groups() 返回至少两门课程的连通冲突组（教学班 ID 列表），按加入顺序排列，
+      结果在图未变化时复用。
+    无法解析上课时间的课程只记录顺序，不参与冲突判断。
+    """
+
+    def __init__(self):
+        self._order = {}        # tc_id -> 加入序号
+        self._slots = {}        # tc_id -> TimeSlot 元组
+        self._cells = {}        # tc_id -> {(星期, 节次)}
+        self._buckets = {}      # (星期, 节次) -> {tc_id}
+        self._edges = {}        # tc_id -> {冲突的 tc_id}
+        self._parent = {}
+        self._members = {}      # 根 -> {成员 tc_id}
+        self._sequence = 0
+        self._groups = None
+        self.version = 0
+
+    def __contains__(self, tc_id):
+        return tc_id in self._order
+
+    def __len__(self):
+        return len(self._order)
+
+    # ---------- 并查集 ----------
+    def _find(self, tc_id):
+        root = tc_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[tc_id] != root:
+            self._parent[tc_id], tc_id = root, self._parent[tc_id]
+        return root
+
+    def _union(self, left, right):
+        left_root, right_root = self._find(left), self._find(right)
+        if left_root == right_root:
+            return
+        if len(self._members[left_root]) < len(self._members[right_root]):
+            left_root, right_root = right_root, left_root
+        self._parent[right_root] = left_root
+        self._members[left_root] |= self._members.pop(right_root)
+
+    # ---------- 修改 ----------
+    def add(self, tc_id, time_text):
+        """加入课程，返回与它直接冲突的课程 ID 集合；已存在时不做处理。"""
+        if not tc_id or tc_id in self._order:
+            return set()
+        self._sequence += 1
+        self._order[tc_id] = self._sequence
+        self._parent[tc_id] = tc_id
+        self._members[tc_id] = {tc_id}
+        self._edges[tc_id] = set()
+        slots = parse_time_slots(time_text)
+        if slots:
+            self._slots[tc_id] = slots
+            cells = self._cells[tc_id] = _slot_cells(slots)
+            candidates = set()
+            for cell in cells:
+                bucket = self._buckets.setdefault(cell, set())
+                candidates |= bucket
+                bucket.add(tc_id)
+            for other in candidates:
+                # 同星期同节次只说明可能冲突，周次也有交集才算冲突
+                if slots_conflict(slots, self._slots[other]):
+                    self._edges[tc_id].add(other)
+                    self._edges[other].add(tc_id)
+                    self._union(tc_id, other)
+        self._changed()
+        return set(self._edges[tc_id])
+
+    def remove(self, tc_id):
+        """移除课程，返回是否存在；所在冲突组按剩余的边重新划分。"""
+        if tc_id not in self._order:
+            return False
+        component = self._members.pop(self._find(tc_id))
+        for cell in self._cells.pop(tc_id, ()):
+            bucket = self._buckets.get(cell)
+            if bucket is not None:
+                bucket.discard(tc_id)
+                if not bucket:
+                    del self._buckets[cell]
+        for other in self._edges.pop(tc_id):
+            self._edges[other].discard(tc_id)
+        del self._order[tc_id]
+        del self._parent[tc_id]
+        self._slots.pop(tc_id, None)
+        component.discard(tc_id)
+        # 并查集不支持删除：只把受影响的分量拆开后按剩余的边重新合并
+        for member in component:
+            self._parent[member] = member
+            self._members[member] = {member}
+        for member in component:
+            for other in self._edges[member]:
+                self._union(member, other)
+        self._changed()
+        return True
+
+    def _changed(self):
+        self.version += 1
+        self._groups = None
+
+    # ---------- 查询 ----------
+    def groups(self):
+        """所有至少两门课程的冲突组，按组内最早加入的课程排序。"""
+        if self._groups is None:
+            groups = [
+                sorted(members, key=self._order.__getitem__)
+                for members in self._members.values()
+                if len(members) >= 2
+            ]
+            groups.sort(key=lambda group: self._order[group[0]])
+            self._groups = groups
+        return [list(group) for group in self._groups]
@@ -0,0 +1,397 @@
+"""
+连接保温
+监控的所有线程共用一个连接池：同一个 HTTPAdapter 挂到每个线程的 Session 上
+（urllib3 连接池本身线程安全，Cookie 等状态仍留在各线程自己的 Session 里）。
+- 新的课程线程、登录检测、重登 Session 直接取用已建立的 keep-alive 连接；
+- 后台保温线程把连接池补足到 warm_target 条，并在连接空闲接近服务器 keep-alive
+  超时前用轻量 HEAD 请求刷新，选课时取到的连接不需要再握手；
+- 新建连接时带上同一主机上次的 TLS 会话（会话恢复，省去完整握手），CA 证书只加载一次。
+ConnectionStats 记录握手次数与耗时、TLS 会话恢复和连接复用情况。
+"""
+import collections
+import ssl
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.util.connection import is_connection_dropped
+
+
+DEFAULT_WARM_TARGET = 4
+# 连接空闲超过该秒数即刷新（Tomcat 默认 keepAliveTimeout 为 20 秒）
+KEEPALIVE_REFRESH_AFTER = 12.0
+WARM_CHECK_INTERVAL = 4.0
+
+
+class ConnectionStats:
+    """连接层统计（线程安全）：取用、新建连接与握手耗时、TLS 会话恢复、保温刷新。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.request_connects = 0
+        self.warm_connects = 0
+        self.connect_ms = collections.deque(maxlen=200)
+        self.tls_handshakes = 0
+        self.tls_resumed = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_connect(self, elapsed, warming=False):
+        with self._lock:
+            if warming:
+                self.warm_connects += 1
+            else:
+                self.request_connects += 1
+            self.connect_ms.append(elapsed * 1000)
+
+    def record_tls(self, resumed):
+        with self._lock:
+            self.tls_handshakes += 1
+            if resumed:
+                self.tls_resumed += 1
+
+    def record_refresh(self, ok):
+        with self._lock:
+            if ok:
+                self.refreshes += 1
+            else:
+                self.refresh_failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            connect_ms = sorted(self.connect_ms)
+            reused = max(0, self.checkouts - self.request_connects)
+            return {
+                'checkouts': self.checkouts,
+                'reused': reused,
+                'reuse_ratio': reused / self.checkouts if self.checkouts else None,
+                'request_connects': self.request_connects,
+                'warm_connects': self.warm_connects,
+                'connect_avg_ms': sum(connect_ms) / len(connect_ms) if connect_ms else None,
+                'connect_max_ms': connect_ms[-1] if connect_ms else None,
+                'tls_handshakes': self.tls_handshakes,
+                'tls_resumed': self.tls_resumed,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+            }
+
+    def summary(self):
+        snap = self.snapshot()
+        if not snap['checkouts'] and not snap['warm_connects']:
+            return "无请求"
+        text = f"取用连接 {snap['checkouts']} 次"
+        if snap['reuse_ratio'] is not None:
+            text += f"（复用 {snap['reuse_ratio']:.0%}）"
+        text += (
+            f", 请求路径新建连接 {snap['request_connects']} 次, "
+            f"保温新建 {snap['warm_connects']} 次"
+        )
+        if snap['connect_avg_ms'] is not None:
+            text += f", 建连 平均={snap['connect_avg_ms']:.0f}ms 最长={snap['connect_max_ms']:.0f}ms"
+        if snap['tls_handshakes']:
+            text += f", TLS 会话恢复 {snap['tls_resumed']}/{snap['tls_handshakes']}"
+        text += f", 保温刷新 {snap['refreshes']} 次"
+        if snap['refresh_failures']:
+            text += f"（失败 {snap['refresh_failures']} 次）"
+        return text
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    按主机缓存 TLS 会话的 SSLContext
+    新建连接时带上该主机最近一次连接的会话请求恢复（服务器不接受时自动退回完整握手）；
+    TLS 1.3 的会话票据在握手之后才到达，所以在下次新建连接时才从上一条连接取会话。
+    requests 每次建连都会要求加载 CA 证书，同一来源只真正加载一次。
+    """
+
+    def __init__(self, *args, **kwargs):
+        # 协议参数由 ssl.SSLContext.__new__ 处理
+        self.tls_stats = None
+        self._tls_lock = threading.Lock()
+        self._tls_sessions = {}
+        self._last_sockets = {}
+        self._loaded_locations = set()
+
+    def load_verify_locations(self, cafile=None, capath=None, cadata=None):
+        key = (cafile, capath, cadata)
+        with self._tls_lock:
+            if key in self._loaded_locations:
+                return
+        super().load_verify_locations(cafile, capath, cadata)
+        with self._tls_lock:
+            self._loaded_locations.add(key)
+
+    def _cached_session(self, host):
+        with self._tls_lock:
+            ref = self._last_sockets.get(host)
+            sock = ref() if ref is not None else None
+            if sock is not None:
+                try:
+                    session = sock.session
+                except (AttributeError, OSError, ValueError):
+                    session = None
+                if session is not None:
+                    self._tls_sessions[host] = session
+            return self._tls_sessions.get(host)
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        if session is None and not server_side and server_hostname:
+            session = self._cached_session(server_hostname)
+        ssl_sock = super().wrap_socket(
+            sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname,
+            session=session,
+        )
+        if not server_side and server_hostname:
+            with self._tls_lock:
+                self._last_sockets[server_hostname] = weakref.ref(ssl_sock)
+            if self.tls_stats is not None and do_handshake_on_connect:
+                self.tls_stats.record_tls(ssl_sock.session_reused)
+        return ssl_sock
+
+
+def create_ssl_context(stats=None):
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    context.tls_stats = stats
+    return context
+
+
+class _TimedConnectMixin:
+    """建立连接（TCP + TLS）计时；保温线程建立的连接单独计数。"""
+
+    conn_stats = None
+    warming = False
+    last_used = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        if self.conn_stats is not None:
+            self.conn_stats.record_connect(time.perf_counter() - started, warming=self.warming)
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _WarmPoolMixin:
+    """记录取用次数，归还时打上空闲起点。"""
+
+    conn_stats = None
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.conn_stats = self.conn_stats
+        return conn
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        if self.conn_stats is not None:
+            self.conn_stats.record_checkout()
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn.last_used = time.monotonic()
+        super()._put_conn(conn)
+
+
+class WarmHTTPConnectionPool(_WarmPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class WarmHTTPSConnectionPool(_WarmPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class WarmPoolManager(PoolManager):
+    """为每个主机创建带统计的连接池，并登记给 ConnectionWarmer 保温。"""
+
+    def __init__(self, warmer, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._warmer = warmer
+        self.pool_classes_by_scheme = {
+            'http': WarmHTTPConnectionPool,
+            'https': WarmHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context=request_context)
+        pool.conn_stats = self._warmer.stats
+        self._warmer._register_pool(pool)
+        return pool
+
+
+class WarmHTTPAdapter(HTTPAdapter):
+    """各线程 Session 共用的 HTTPAdapter，连接池见 WarmPoolManager。"""
+
+    def __init__(self, warmer, **kwargs):
+        self._warmer = warmer
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        pool_kwargs.setdefault('ssl_context', self._warmer.ssl_context)
+        self.poolmanager = WarmPoolManager(
+            self._warmer, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs
+        )
+
+
+class ConnectionWarmer:
+    """
+    共享连接池与后台保温
+    用法:
+        warmer.mount(session)          # 每个线程的 Session 创建时挂载
+        warmer.start(url, admit=...)   # 开始保温 url 所在主机
+        warmer.stop()
+    admit(send) 负责为每次保温请求走请求预算与并发槽并调用 send()。
+    """
+
+    def __init__(self, maxsize, warm_target=DEFAULT_WARM_TARGET,
+                 refresh_after=KEEPALIVE_REFRESH_AFTER, retries=None):
+        self.stats = ConnectionStats()
+        self.ssl_context = create_ssl_context(self.stats)
+        self.maxsize = max(1, int(maxsize))
+        self.warm_target = max(0, min(int(warm_target), self.maxsize))
+        self.refresh_after = float(refresh_after)
+        self._pools = weakref.WeakSet()
+        self._pools_lock = threading.Lock()
+        adapter_kwargs = {'pool_connections': 2, 'pool_maxsize': self.maxsize, 'pool_block': True}
+        if retries is not None:
+            adapter_kwargs['max_retries'] = retries
+        self.adapter = WarmHTTPAdapter(self, **adapter_kwargs)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def mount(self, session):
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def _register_pool(self, pool):
+        with self._pools_lock:
+            self._pools.add(pool)
+
+    def _pools_for(self, host):
+        with self._pools_lock:
+            return [pool for pool in self._pools if pool.host == host and pool.pool is not None]
+
+    def start(self, url, headers=None, admit=None, interval=WARM_CHECK_INTERVAL):
+        """启动后台保温线程（重复调用无效）。"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._warm_loop, args=(url, headers, admit, interval),
+            name='connection-warmer', daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _warm_loop(self, url, headers, admit, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.warm(url, headers=headers, admit=admit)
+            except Exception:
+                pass
+            self._stop_event.wait(interval)
+
+    def warm(self, url, headers=None, admit=None):
+        """
+        一轮保温：刷新空闲超过 refresh_after 的连接，并把连接总数补足到 warm_target
+        只处理请求路径已经创建过的连接池（连接池的 TLS 参数由 requests 决定）。
+        返回本轮刷新的连接数。
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        refreshed = 0
+        for pool in self._pools_for(parts.hostname):
+            for conn in self._plan_refresh(pool):
+                if self._stop_event.is_set():
+                    return refreshed
+                send = lambda conn=conn: self._refresh(pool, conn, path, headers)
+                try:
+                    ok = admit(send) if admit is not None else send()
+                except Exception:
+                    ok = False
+                refreshed += 1 if ok else 0
+        return refreshed
+
+    def _plan_refresh(self, pool):
+        """返回需要刷新的空闲连接，以及为补足数量新建连接用的空位（None）。"""
+        now = time.monotonic()
+        with pool.pool.mutex:
+            items = list(pool.pool.queue)
+        checked_out = pool.pool.maxsize - len(items)
+        idle = [item for item in items if item is not None]
+        stale = [
+            conn for conn in idle
+            if conn.sock is None or now - conn.last_used >= self.refresh_after
+        ]
+        missing = max(0, self.warm_target - len(idle) - checked_out)
+        free_slots = len(items) - len(idle)
+        return stale + [None] * min(missing, free_slots)
+
+    def _take(self, pool, conn):
+        """从连接池取出指定的空闲连接（或一个空位），已被其它线程取走时返回 False。"""
+        with pool.pool.mutex:
+            try:
+                pool.pool.queue.remove(conn)
+            except ValueError:
+                return False
+            return True
+
+    def _refresh(self, pool, conn, path, headers):
+        if not self._take(pool, conn):
+            return False
+        if conn is None:
+            conn = pool._new_conn()
+        elif time.monotonic() - conn.last_used < self.refresh_after and conn.sock is not None:
+            # 取到之前刚被请求路径用过，不必刷新
+            pool._put_conn(conn)
+            return False
+        ok = False
+        conn.warming = True
+        try:
+            if conn.sock is not None and is_connection_dropped(conn):
+                conn.close()
+            conn.request('HEAD', path, headers=headers or {})
+            resp = conn.getresponse()
+            resp.read()
+            if str(resp.headers.get('Connection', '')).lower() == 'close':
+                conn.close()
+            else:
+                ok = True
+        except Exception:
+            conn.close()
+        finally:
+            conn.warming = False
+            self.stats.record_refresh(ok)
+            pool._put_conn(conn)
+        return ok
+
+    def close(self):
+        self.stop()
+        self.adapter.close()
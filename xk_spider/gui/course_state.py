@@ -0,0 +1,179 @@
+"""
+课程监控状态表
+每个教学班一条定长 __slots__ 记录（余量、容量、标志位、时延、轮询次数、变化时间），
+取代原先各线程随手读写的状态字典。写入与读取都经过表锁，健康检查与界面统计
+只需一次加锁遍历。
+"""
+import threading
+import time
+
+
+# 尚未查询到余量
+UNKNOWN_REMAIN = -999
+
+# 标志位
+FLAG_FULL = 1
+FLAG_CONFLICT = 2
+FLAG_CHOSEN = 4
+
+
+class CourseState:
+    """
+    单门课程的监控状态
+    同一门课程同一时刻只由一个轮询任务写入；字段写入仍在表锁内完成，
+    保证读取方看到的一组字段来自同一次更新。
+    """
+
+    __slots__ = (
+        'tc_id', 'last_remain', 'capacity', 'status', 'flags',
+        'last_latency', 'poll_count', 'last_update', 'last_change', '_lock', '_clock',
+    )
+
+    def __init__(self, tc_id, lock, now=None, clock=time.time):
+        now = clock() if now is None else now
+        self.tc_id = tc_id
+        self.last_remain = UNKNOWN_REMAIN
+        self.capacity = 0
+        self.status = ''
+        self.flags = 0
+        self.last_latency = 0.0
+        self.poll_count = 0
+        self.last_update = now
+        self.last_change = now
+        self._lock = lock
+        self._clock = clock
+
+    def record_poll(self, latency=None):
+        """记录一次余量查询（无论成败），latency 为本次查询耗时（秒）。"""
+        with self._lock:
+            self.poll_count += 1
+            if latency is not None:
+                self.last_latency = latency
+            self.last_update = self._clock()
+
+    def observe(self, remain, capacity, course_info=None):
+        """
+        记录一次成功查询到的余量与标志位
+        返回: 上一次的余量（首次为 UNKNOWN_REMAIN），供状态变化判断使用
+        """
+        flags = 0
+        if course_info:
+            if course_info.get('isFull'):
+                flags |= FLAG_FULL
+            if course_info.get('isConflict'):
+                flags |= FLAG_CONFLICT
+            if course_info.get('isChoose'):
+                flags |= FLAG_CHOSEN
+        with self._lock:
+            previous = self.last_remain
+            if previous != UNKNOWN_REMAIN and (
+                previous != remain or self.capacity != capacity
+            ):
+                self.last_change = self._clock()
+            self.last_remain = remain
+            self.capacity = capacity
+            self.flags = flags
+            return previous
+
+    def set_status(self, status):
+        """设置状态，返回是否发生变化（用于只在变化时打印日志）。"""
+        with self._lock:
+            if self.status == status:
+                return False
+            self.status = status
+            return True
+
+    def as_tuple(self):
+        with self._lock:
+            return (
+                self.tc_id, self.last_remain, self.capacity, self.status, self.flags,
+                self.last_latency, self.poll_count, self.last_update, self.last_change,
+            )
+
+
+class CourseStateTable:
+    """课程状态表（线程安全），clock 为记录更新/变化时间的墙上时钟。"""
+
+    def __init__(self, clock=time.time):
+        self._lock = threading.RLock()
+        self._states = {}
+        self._clock = clock
+
+    def reset(self, tc_id):
+        """创建（或覆盖为）全新的状态记录，课程重新排期时调用。"""
+        state = CourseState(tc_id, self._lock, clock=self._clock)
+        with self._lock:
+            self._states[tc_id] = state
+        return state
+
+    def ensure(self, tc_id):
+        """取状态记录，不存在时创建。"""
+        state = self._states.get(tc_id)
+        if state is not None:
+            return state
+        with self._lock:
+            state = self._states.get(tc_id)
+            if state is None:
+                state = self._states[tc_id] = CourseState(tc_id, self._lock, clock=self._clock)
+            return state
+
+    def get(self, tc_id):
+        return self._states.get(tc_id)
+
+    def discard(self, tc_id):
+        with self._lock:
+            return self._states.pop(tc_id, None) is not None
+
+    def __contains__(self, tc_id):
+        return tc_id in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def stale(self, max_age, now=None):
+        """返回超过 max_age 秒没有查询记录的课程 ID。"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            return [
+                tc_id for tc_id, state in self._states.items()
+                if now - state.last_update > max_age
+            ]
+
+    def snapshot(self):
+        """返回 [(tc_id, 余量, 容量, 状态, 标志位, 时延, 轮询次数, 更新时间, 变化时间)]。"""
+        with self._lock:
+            return [state.as_tuple() for state in self._states.values()]
+
+    def remains(self):
+        """
+        返回 [(tc_id, 余量, 容量)]，不加表锁（供指标导出在抓取时读取，不阻塞轮询线程）
+        单条记录的余量与容量可能分属相邻两次更新。
+        """
+        return [
+            (state.tc_id, state.last_remain, state.capacity)
+            for state in list(self._states.values())
+        ]
+
+    def summary(self):
+        """
+        汇总统计
+        返回: {'courses', 'available', 'full', 'polls', 'avg_latency'}
+        """
+        with self._lock:
+            courses = len(self._states)
+            available = full = polls = 0
+            latency_total = 0.0
+            for state in self._states.values():
+                polls += state.poll_count
+                latency_total += state.last_latency
+                if state.status == 'available':
+                    available += 1
+                elif state.status == 'full':
+                    full += 1
+        return {
+            'courses': courses,
+            'available': available,
+            'full': full,
+            'polls': polls,
+            'avg_latency': latency_total / courses if courses else 0.0,
+        }
@@ -0,0 +1,155 @@
+"""
+请求时延跟踪与对冲模块
+按接口（URL 最后一段，如 courseResult.do）记录最近的请求时延，由观测到的分位数推出：
+- 自适应读超时: clamp(p99 × TIMEOUT_FACTOR, TIMEOUT_FLOOR, 固定超时)。服务器变慢时 p99 上升，
+  超时随之放宽；超时的请求按“至少等了这么久”记入样本（截尾样本），防止超时越收越紧。
+- 对冲时刻: 只读查询（余量列表、已选课程）等到 p95 仍未返回时，再发一个相同请求，
+  取先返回的结果。对冲请求按查询次数的 HEDGE_RATIO 限额，慢到普遍超过 p95 时不会让请求量翻倍。
+样本不足 MIN_SAMPLES 时不做自适应，按固定超时发送且不对冲。
+"""
+import math
+import threading
+from collections import deque
+
+
+WINDOW_SIZE = 256
+MIN_SAMPLES = 20
+TIMEOUT_FACTOR = 2.0
+TIMEOUT_FLOOR = 1.0
+HEDGE_RATIO = 0.1
+HEDGE_BURST = 3.0
+HEDGE_MIN_DELAY = 0.02
+# 分位数缓存每记录多少个样本重新排序一次
+_REFRESH_EVERY = 8
+
+
+class _EndpointLatency:
+    __slots__ = ('samples', 'fresh', 'p95', 'p99', 'queries', 'timeouts', 'hedges', 'hedge_wins')
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.fresh = 0
+        self.p95 = None
+        self.p99 = None
+        self.queries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+class LatencyTracker:
+    """
+    各接口的时延窗口与对冲限额（线程安全）
+    record / record_timeout 由发送方调用；read_timeout / hedge_delay 供下一次请求决策。
+    """
+
+    def __init__(self, window=WINDOW_SIZE, min_samples=MIN_SAMPLES,
+                 timeout_factor=TIMEOUT_FACTOR, timeout_floor=TIMEOUT_FLOOR,
+                 hedge_ratio=HEDGE_RATIO, hedge_burst=HEDGE_BURST):
+        self.window = int(window)
+        self.min_samples = int(min_samples)
+        self.timeout_factor = float(timeout_factor)
+        self.timeout_floor = float(timeout_floor)
+        self.hedge_ratio = float(hedge_ratio)
+        self.hedge_burst = float(hedge_burst)
+        self._hedge_tokens = float(hedge_burst)
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, endpoint):
+        entry = self._endpoints.get(endpoint)
+        if entry is None:
+            entry = self._endpoints[endpoint] = _EndpointLatency(self.window)
+        return entry
+
+    @staticmethod
+    def _refresh(entry):
+        ordered = sorted(entry.samples)
+        entry.p95 = _quantile(ordered, 0.95)
+        entry.p99 = _quantile(ordered, 0.99)
+        entry.fresh = 0
+
+    def _record(self, endpoint, seconds):
+        entry = self._entry(endpoint)
+        entry.samples.append(seconds)
+        entry.fresh += 1
+        if entry.p95 is None or entry.fresh >= _REFRESH_EVERY:
+            self._refresh(entry)
+        return entry
+
+    # ---------- 观测 ----------
+    def record(self, endpoint, seconds):
+        with self._lock:
+            self._record(endpoint, max(0.0, float(seconds)))
+
+    def record_timeout(self, endpoint, timeout):
+        """超时请求记为等于超时值的截尾样本，并立即刷新分位数。"""
+        with self._lock:
+            entry = self._record(endpoint, float(timeout))
+            entry.timeouts += 1
+            self._refresh(entry)
+
+    # ---------- 决策 ----------
+    def quantiles(self, endpoint):
+        """返回 (p95, p99)；样本不足时为 (None, None)。"""
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None or len(entry.samples) < self.min_samples:
+                return None, None
+            return entry.p95, entry.p99
+
+    def read_timeout(self, endpoint, default):
+        """由 p99 推出读超时，不超过固定超时 default。"""
+        _, p99 = self.quantiles(endpoint)
+        if p99 is None:
+            return default
+        return min(default, max(self.timeout_floor, p99 * self.timeout_factor))
+
+    def hedge_delay(self, endpoint):
+        """
+        登记一次只读查询并返回对冲等待时间（p95，秒）；样本不足返回 None
+        每次查询为对冲限额增加 hedge_ratio 个令牌，最多积累 hedge_burst 个。
+        """
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry.queries += 1
+            self._hedge_tokens = min(self.hedge_burst, self._hedge_tokens + self.hedge_ratio)
+            if len(entry.samples) < self.min_samples:
+                return None
+            return max(HEDGE_MIN_DELAY, entry.p95)
+
+    def try_hedge(self, endpoint):
+        """消耗一个对冲令牌，限额用尽返回 False。"""
+        with self._lock:
+            if self._hedge_tokens < 1.0:
+                return False
+            self._hedge_tokens -= 1.0
+            self._entry(endpoint).hedges += 1
+            return True
+
+    def record_hedge_win(self, endpoint):
+        with self._lock:
+            self._entry(endpoint).hedge_wins += 1
+
+    # ---------- 统计 ----------
+    def summary(self):
+        """各接口的一行统计，没有查询记录返回空串。"""
+        with self._lock:
+            parts = []
+            for endpoint, entry in sorted(self._endpoints.items()):
+                if not entry.samples:
+                    continue
+                if entry.fresh:
+                    self._refresh(entry)
+                text = (
+                    f"{endpoint} p95={entry.p95 * 1000:.0f}ms p99={entry.p99 * 1000:.0f}ms"
+                    f" 超时={entry.timeouts}"
+                )
+                if entry.queries:
+                    text += f" 对冲={entry.hedges}/{entry.queries}(备份先返回 {entry.hedge_wins})"
+                parts.append(text)
+            return '; '.join(parts)
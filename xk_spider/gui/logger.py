@@ -3,6 +3,7 @@
 支持按日期轮转 + 保留策略 + 崩溃/重启可追溯
 """
 import os
+import re
 import sys
 import glob
 import logging
@@ -128,15 +129,19 @@ class AppLogger:
             patterns = (
                 os.path.join(self.LOG_DIR, f'{self.LOG_FILE_PREFIX}_*.log'),
                 os.path.join(self.LOG_DIR, 'crash_*.log'),
+                os.path.join(self.LOG_DIR, 'trace_*.jsonl'),
+                os.path.join(self.LOG_DIR, 'session_*.jsonl.gz'),
             )
 
             for log_file in (path for pattern in patterns for path in glob.glob(pattern)):
                 try:
                     # 从文件名解析日期
                     filename = os.path.basename(log_file)
-                    # 格式: run_YYYY-MM-DD.log / crash_YYYY-MM-DD.log
-                    date_str = filename.rsplit('_', 1)[-1].replace('.log', '')
-                    file_date = datetime.strptime(date_str, '%Y-%m-%d')
+                    # 格式: run_YYYY-MM-DD.log / crash_YYYY-MM-DD.log / trace_YYYY-MM-DD_HHMMSS.jsonl
+                    match = re.search(r'_(\d{4}-\d{2}-\d{2})', filename)
+                    if not match:
+                        continue
+                    file_date = datetime.strptime(match.group(1), '%Y-%m-%d')
                     
                     if file_date < cutoff_date:
                         os.remove(log_file)
@@ -0,0 +1,326 @@
+"""
+请求指标模块
+每个经过并发槽发出的请求按接口（URL 最后一段）记录：状态码、收发字节数、等待并发槽的时间与请求耗时。
+耗时用 HDR 风格的对数-线性直方图计量：每个 2 倍区间再等分 16 格，相对误差不超过 1/16，
+100µs ~ 100s 共 321 个计数器，记录一次只是一次下标计算和一次自增。
+
+记录路径不加锁：每个线程写自己的分片（首次记录时登记一次），snapshot() 读取时合并所有分片。
+合并读到的可能是某个分片“写了一半”的一次记录，对统计没有影响。
+快照之间可以相减（since），得到一个时间窗口内的分位数与速率。
+
+选课、换课、救援、重登、OCR 等低频事件另由 EventCounters 计数（加锁，但每次运行只有几十次）。
+"""
+import math
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+MIN_VALUE = 1e-4
+SUB_BUCKETS = 16
+OCTAVES = 20
+BUCKET_COUNT = 1 + OCTAVES * SUB_BUCKETS
+
+
+def bucket_index(seconds):
+    units = seconds / MIN_VALUE
+    if units < 1.0:
+        return 0
+    mantissa, exponent = math.frexp(units)
+    index = 1 + (exponent - 1) * SUB_BUCKETS + int((mantissa * 2.0 - 1.0) * SUB_BUCKETS)
+    return min(index, BUCKET_COUNT - 1)
+
+
+def bucket_upper(index):
+    """桶的上沿（秒），分位数按上沿报告，只会高估不会低估。"""
+    if index <= 0:
+        return MIN_VALUE
+    octave, sub = divmod(index - 1, SUB_BUCKETS)
+    return MIN_VALUE * (2.0 ** octave) * (1.0 + (sub + 1) / SUB_BUCKETS)
+
+
+def percentile(counts, q):
+    """按桶计数求分位数（秒），没有样本返回 None。"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= rank:
+            return bucket_upper(index)
+    return bucket_upper(len(counts) - 1)
+
+
+def endpoint_name(url):
+    """URL 的最后一段（如 courseResult.do），与 RequestTemplate.endpoint 一致。"""
+    return urlsplit(str(url)).path.rsplit('/', 1)[-1] or 'other'
+
+
+def body_size(body):
+    """请求体字节数：bytes/str 直接计长度，表单 dict 按 URL 编码后的长度。"""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, dict):
+        return len(urlencode(body))
+    return 0
+
+
+def response_size(resp):
+    content = getattr(resp, 'content', None)
+    return len(content) if isinstance(content, (bytes, bytearray)) else 0
+
+
+class _EndpointShard:
+    __slots__ = (
+        'count', 'errors', 'statuses', 'bytes_in', 'bytes_out',
+        'latency', 'slot_wait', 'latency_max', 'latency_sum',
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency = [0] * BUCKET_COUNT
+        self.slot_wait = [0] * BUCKET_COUNT
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+
+class EndpointStats:
+    """一个接口在某段时间内的合计（快照或两次快照之差）。"""
+
+    __slots__ = (
+        'count', 'errors', 'statuses', 'bytes_in', 'bytes_out',
+        'latency', 'slot_wait', 'latency_max', 'latency_sum',
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency = [0] * BUCKET_COUNT
+        self.slot_wait = [0] * BUCKET_COUNT
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+    def add(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        for status, count in dict(other.statuses).items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.slot_wait = [a + b for a, b in zip(self.slot_wait, other.slot_wait)]
+        self.latency_max = max(self.latency_max, other.latency_max)
+        self.latency_sum += other.latency_sum
+
+    def minus(self, other):
+        delta = EndpointStats()
+        delta.count = self.count - other.count
+        delta.errors = self.errors - other.errors
+        delta.statuses = {
+            status: count - other.statuses.get(status, 0)
+            for status, count in self.statuses.items()
+            if count - other.statuses.get(status, 0)
+        }
+        delta.bytes_in = self.bytes_in - other.bytes_in
+        delta.bytes_out = self.bytes_out - other.bytes_out
+        delta.latency = [a - b for a, b in zip(self.latency, other.latency)]
+        delta.slot_wait = [a - b for a, b in zip(self.slot_wait, other.slot_wait)]
+        # 窗口内的最大值无法由累计值相减得到，取窗口内最高非空桶的上沿
+        top = max((index for index, count in enumerate(delta.latency) if count), default=None)
+        delta.latency_max = min(self.latency_max, bucket_upper(top)) if top is not None else 0.0
+        delta.latency_sum = self.latency_sum - other.latency_sum
+        return delta
+
+    def to_dict(self, elapsed):
+        return {
+            'count': self.count,
+            'rate': self.count / elapsed if elapsed > 0 else 0.0,
+            'errors': self.errors,
+            'error_rate': self.errors / self.count if self.count else 0.0,
+            'statuses': dict(self.statuses),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'p50': percentile(self.latency, 0.50),
+            'p95': percentile(self.latency, 0.95),
+            'p99': percentile(self.latency, 0.99),
+            'max': self.latency_max if self.count else None,
+            'slot_wait_p50': percentile(self.slot_wait, 0.50),
+            'slot_wait_p95': percentile(self.slot_wait, 0.95),
+            'slot_wait_p99': percentile(self.slot_wait, 0.99),
+        }
+
+
+class MetricsSnapshot:
+    """
+    某一时刻的累计指标
+    endpoints: {接口: EndpointStats}；taken_at/started_at 为 RequestMetrics 的时钟读数（缺省 time.monotonic()）。
+    """
+
+    def __init__(self, endpoints, started_at, taken_at):
+        self.endpoints = endpoints
+        self.started_at = started_at
+        self.taken_at = taken_at
+
+    @property
+    def elapsed(self):
+        return max(0.0, self.taken_at - self.started_at)
+
+    def since(self, previous):
+        """与更早的快照相减，得到两次快照之间的窗口。previous 为 None 时返回自身。"""
+        if previous is None:
+            return self
+        empty = EndpointStats()
+        endpoints = {}
+        for name, stats in self.endpoints.items():
+            delta = stats.minus(previous.endpoints.get(name, empty))
+            if delta.count:
+                endpoints[name] = delta
+        return MetricsSnapshot(endpoints, previous.taken_at, self.taken_at)
+
+    def total(self):
+        total = EndpointStats()
+        for stats in self.endpoints.values():
+            total.add(stats)
+        return total
+
+    def to_dict(self):
+        """
+        转成便于界面/导出使用的字典
+        {'elapsed', 'total': {...}, 'endpoints': {接口: {...}}}，时间单位为秒，无样本的分位数为 None。
+        """
+        elapsed = self.elapsed
+        return {
+            'elapsed': elapsed,
+            'total': self.total().to_dict(elapsed),
+            'endpoints': {
+                name: stats.to_dict(elapsed) for name, stats in sorted(self.endpoints.items())
+            },
+        }
+
+    def summary(self):
+        """日志用的一行统计，没有请求返回空串。"""
+        data = self.to_dict()
+        total = data['total']
+        if not total['count']:
+            return ''
+        parts = [
+            f"共 {total['count']} 次 {total['rate']:.1f} 次/秒, 错误率 {total['error_rate'] * 100:.1f}%, "
+            f"并发槽等待 p95={_ms(total['slot_wait_p95'])}"
+        ]
+        for name, stats in data['endpoints'].items():
+            parts.append(
+                f"{name} {stats['count']} 次 p50/p95/p99={_ms(stats['p50'], unit='')}/"
+                f"{_ms(stats['p95'], unit='')}/{_ms(stats['p99'])} 错误={stats['errors']} "
+                f"收/发={stats['bytes_in'] / 1024:.0f}/{stats['bytes_out'] / 1024:.0f}KB"
+            )
+        return '; '.join(parts)
+
+
+def _ms(seconds, unit='ms'):
+    return '—' if seconds is None else f"{seconds * 1000:.0f}{unit}"
+
+
+class RequestMetrics:
+    """
+    请求指标收集器
+    record() 在发出请求的线程中调用，不加锁；snapshot() 可在任意线程调用。
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.started_at = clock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, endpoint, status, latency, slot_wait=0.0, bytes_in=0, bytes_out=0):
+        """
+        记录一次请求
+        status 为 HTTP 状态码，请求异常时为异常类名，没有状态码（如连接保温）时为 None；
+        异常与 4xx/5xx 计为错误。
+        """
+        shard = self._shard()
+        stats = shard.get(endpoint)
+        if stats is None:
+            stats = shard[endpoint] = _EndpointShard()
+        stats.count += 1
+        if isinstance(status, str) or (status is not None and status >= 400):
+            stats.errors += 1
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.latency[bucket_index(latency)] += 1
+        stats.slot_wait[bucket_index(slot_wait)] += 1
+        stats.latency_sum += latency
+        if latency > stats.latency_max:
+            stats.latency_max = latency
+
+    def snapshot(self):
+        with self._lock:
+            shards = list(self._shards)
+        endpoints = {}
+        for shard in shards:
+            for name, stats in list(shard.items()):
+                merged = endpoints.get(name)
+                if merged is None:
+                    merged = endpoints[name] = EndpointStats()
+                merged.add(stats)
+        return MetricsSnapshot(endpoints, self.started_at, self._clock())
+
+
+class EventCounters:
+    """
+    低频事件的计数器与耗时直方图（线程安全）
+    计数器按 (名称, 标签值...) 计数；snapshot() 在锁内只做浅拷贝，导出时的渲染不持锁。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._histograms = {}
+
+    def inc(self, name, *labels):
+        key = (name,) + labels
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * BUCKET_COUNT, 0.0]
+            histogram[0][bucket_index(seconds)] += 1
+            histogram[1] += seconds
+
+    def count(self, name, *labels):
+        return self._counts.get((name,) + labels, 0)
+
+    def snapshot(self):
+        """返回 ({(名称, 标签值...): 次数}, {名称: (桶计数, 总耗时)})。"""
+        with self._lock:
+            counts = dict(self._counts)
+            histograms = {
+                name: (list(buckets), total) for name, (buckets, total) in self._histograms.items()
+            }
+        return counts, histograms
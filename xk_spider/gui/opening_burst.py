@@ -0,0 +1,109 @@
+"""
+定时开抢
+选课轮次在已知时刻开放。开启“定时开抢”后，监控在开放时刻 T0（服务器时间）之前：
+- 提前 prepare_lead 秒校验登录态、预构造所有课程的选课请求，
+  服务器时钟误差超过 CLOCK_MAX_ERROR 时先精确校准（多样本估计需要数秒）；
+- 提前 CONNECT_LEAD 秒由各开抢线程预先建立好连接；
+到 T0（按服务器时钟偏差换算成本地时刻）时按有界节奏为每门课程连发选课，
+持续 window 秒后回到正常的余量监控。
+"""
+import threading
+import time
+from datetime import datetime
+
+
+DEFAULT_WINDOW = 5.0
+DEFAULT_INTERVAL = 0.2
+DEFAULT_PREPARE_LEAD = 20.0
+CONNECT_LEAD = 3.0
+CLOCK_MAX_ERROR = 0.1
+MAX_SHOTS_PER_COURSE = 30
+
+
+class OpeningBurst:
+    """定时开抢配置：t0 为开放时刻（服务器时间，Unix 秒）。"""
+
+    __slots__ = ('t0', 'window', 'interval', 'prepare_lead')
+
+    def __init__(self, t0, window=DEFAULT_WINDOW, interval=DEFAULT_INTERVAL,
+                 prepare_lead=DEFAULT_PREPARE_LEAD):
+        self.t0 = float(t0)
+        self.window = max(0.0, float(window))
+        self.interval = max(0.05, float(interval))
+        self.prepare_lead = max(CONNECT_LEAD, float(prepare_lead))
+
+    @classmethod
+    def from_config(cls, config):
+        """由 {'t0': ..., 'window': ..., 'interval': ...} 构造；未配置或无效时返回 None。"""
+        if not isinstance(config, dict) or not config.get('t0'):
+            return None
+        try:
+            return cls(
+                config['t0'],
+                window=config.get('window', DEFAULT_WINDOW),
+                interval=config.get('interval', DEFAULT_INTERVAL),
+                prepare_lead=config.get('prepare_lead', DEFAULT_PREPARE_LEAD),
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def t0_text(self):
+        return datetime.fromtimestamp(self.t0).strftime('%Y-%m-%d %H:%M:%S')
+
+    def shot_offsets(self, course_count, select_rate=None):
+        """
+        每门课程的开抢时刻（相对 T0 的秒数）
+        所有课程同一轮同时发出；课程较多时放宽间隔，使持续速率不超过选课类别预算。
+        """
+        interval = self.interval
+        if select_rate:
+            interval = max(interval, course_count / float(select_rate))
+        shots = min(MAX_SHOTS_PER_COURSE, int(self.window / interval) + 1)
+        return [index * interval for index in range(max(1, shots))]
+
+
+def sleep_until(deadline, running=None, spin=0.02, clock=time.time, sleep=time.sleep):
+    """
+    睡到本地时刻 deadline（clock() 的读数，缺省 time.time()）
+    远处分段粗睡，最后 spin 秒内以亚毫秒步长逼近；running() 返回 False 时提前返回 False。
+    """
+    while True:
+        if running is not None and not running():
+            return False
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return True
+        if remaining > spin:
+            sleep(min(remaining - spin, 0.5))
+        else:
+            sleep(0.0005)
+
+
+class BurstTimingLog:
+    """开抢请求的实际发出时刻相对计划时刻的误差（线程安全，毫秒）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.first_error = None
+        self.errors = []
+
+    def record(self, scheduled, sent, first=False):
+        """scheduled / sent 均为服务器时间（秒）。"""
+        error = (sent - scheduled) * 1000
+        with self._lock:
+            self.errors.append(error)
+            if first and (self.first_error is None or error < self.first_error):
+                self.first_error = error
+
+    def summary(self):
+        with self._lock:
+            if not self.errors:
+                return "未发出选课请求"
+            magnitudes = sorted(abs(error) for error in self.errors)
+            text = f"选课 {len(self.errors)} 次"
+            if self.first_error is not None:
+                text += f", 首发相对计划 {self.first_error:+.1f}ms"
+            return (
+                f"{text}, 计划时刻误差 平均={sum(magnitudes) / len(magnitudes):.1f}ms "
+                f"最大={magnitudes[-1]:.1f}ms"
+            )
@@ -0,0 +1,161 @@
+"""
+OpenMetrics 导出模块
+监控引擎可选地在本机端口上提供 /metrics，供 Prometheus 等抓取（config.json 中 "metrics_port"，
+0 或缺省表示关闭；关闭时不创建线程与套接字）。
+
+抓取时由 collect() 取一次各统计的快照（只在拷贝时短暂持有各自的锁），渲染文本不持有任何锁，
+抓取再频繁也不会阻塞轮询线程。请求头 Accept 含 application/openmetrics-text 时按 OpenMetrics 1.0
+输出，否则按 Prometheus 文本格式 0.0.4 输出。
+"""
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import bucket_upper
+
+
+DEFAULT_HOST = '127.0.0.1'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 导出的直方图桶上界（秒）；内部直方图的桶按上沿归入不小于它的第一个导出桶
+EXPORT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escape_help(text):
+    return str(text).replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+def export_buckets(counts):
+    """把内部直方图的桶计数换算成 [(上界, 累计次数)]，最后一项为 (+Inf, 总次数)。"""
+    cumulative = []
+    seen = 0
+    index = 0
+    for bound in EXPORT_BUCKETS:
+        while index < len(counts) and bucket_upper(index) <= bound:
+            seen += counts[index]
+            index += 1
+        cumulative.append((bound, seen))
+    cumulative.append((math.inf, sum(counts)))
+    return cumulative
+
+
+class MetricFamily:
+    """
+    一个指标族：名称（计数器不含 _total 后缀）、类型、说明与样本
+    样本为 (后缀, 标签 ((名称, 值), ...), 值)。
+    """
+
+    __slots__ = ('name', 'type', 'help', 'samples')
+
+    def __init__(self, name, metric_type, help_text):
+        self.name = name
+        self.type = metric_type
+        self.help = help_text
+        self.samples = []
+
+    def add(self, value, labels=()):
+        suffix = '_total' if self.type == 'counter' else ''
+        self.samples.append((suffix, tuple(labels), value))
+
+    def add_histogram(self, counts, total, labels=()):
+        labels = tuple(labels)
+        for bound, seen in export_buckets(counts):
+            self.samples.append(('_bucket', labels + (('le', _format_value(bound)),), seen))
+        self.samples.append(('_count', labels, sum(counts)))
+        self.samples.append(('_sum', labels, total))
+
+
+def render(families, openmetrics=True):
+    lines = []
+    for family in families:
+        # Prometheus 0.0.4 文本格式中计数器族名带 _total 后缀，OpenMetrics 中不带
+        name = family.name
+        if family.type == 'counter' and not openmetrics:
+            name += '_total'
+        lines.append(f"# HELP {name} {_escape_help(family.help)}")
+        lines.append(f"# TYPE {name} {family.type}")
+        for suffix, labels, value in family.samples:
+            lines.append(f"{family.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """
+    本机 HTTP 指标端点
+    collect() 返回 [MetricFamily]，每次抓取调用一次（在服务线程中执行）。
+    """
+
+    def __init__(self, collect, port, host=DEFAULT_HOST):
+        self._collect = collect
+        self.host = host
+        self.port = int(port)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """绑定端口并在后台线程中服务，返回实际端口；端口被占用时抛出 OSError。"""
+        collect = self._collect
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                try:
+                    body = render(collect(), openmetrics=openmetrics).encode('utf-8')
+                except Exception as e:
+                    self.send_error(500, f"{type(e).__name__}: {e}")
+                    return
+                self.send_response(200)
+                self.send_header(
+                    'Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else TEXT_CONTENT_TYPE
+                )
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((self.host, self.port), Handler)
+        server.daemon_threads = True
+        self._server = server
+        self.port = server.server_port
+        self._thread = threading.Thread(
+            target=server.serve_forever, name='metrics-exporter', daemon=True
+        )
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
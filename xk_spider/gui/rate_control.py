@@ -0,0 +1,151 @@
+"""
+自适应轮询频率模块
+按每个教学班余量/已选人数的变化频率分配轮询频率：名额经常变动的课程查得更勤，
+长时间没有变化的课程逐步降频，所有课程的轮询频率之和不超过全局预算。
+"""
+import math
+import threading
+import time
+
+
+class _CourseRate:
+    __slots__ = ('priority', 'churn', 'signature', 'observed_at', 'rate')
+
+    def __init__(self, priority, churn, now, rate):
+        self.priority = priority
+        self.churn = churn
+        self.signature = None
+        self.observed_at = now
+        self.rate = rate
+
+
+class PollRateController:
+    """
+    轮询频率控制器（线程安全）
+    - churn: 指数衰减的变化事件速率（次/秒），时间常数为 half_life 对应的 tau；
+      新课程以 prior_churn 起步，没有变化时逐步衰减。
+    - 分配: 频率按 priority × (churn + floor_churn) 的比例瓜分预算，再夹到
+      [1/max_interval, 1/min_interval] 区间；夹住的课程固定后，剩余预算继续按比例分配。
+    - 预算: budget_rps 为 None 时等于“所有课程都按 base_interval 轮询”的总频率，
+      即只重新分配频率，不增加总请求量。最低频率优先保证，课程过多时可能略超预算。
+    """
+
+    def __init__(self, base_interval=1.0, budget_rps=None, min_interval=0.25,
+                 max_interval=4.0, half_life=120.0, prior_churn=0.02, floor_churn=0.002,
+                 clock=time.monotonic):
+        self.base_interval = float(base_interval)
+        self.budget_rps = budget_rps
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self._tau = float(half_life) / math.log(2)
+        self.prior_churn = float(prior_churn)
+        self.floor_churn = float(floor_churn)
+        self._clock = clock
+        self._courses = {}
+        self._lock = threading.Lock()
+        self.change_count = 0
+
+    # ---------- 课程管理 ----------
+    def track(self, key, priority=1.0):
+        """开始跟踪课程（已跟踪时只更新优先级，保留历史）。"""
+        with self._lock:
+            entry = self._courses.get(key)
+            priority = max(0.05, float(priority or 1.0))
+            if entry is None:
+                self._courses[key] = _CourseRate(
+                    priority, self.prior_churn, self._clock(), 1.0 / self.base_interval
+                )
+            else:
+                entry.priority = priority
+
+    def untrack(self, key):
+        with self._lock:
+            self._courses.pop(key, None)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._courses
+
+    def __len__(self):
+        with self._lock:
+            return len(self._courses)
+
+    # ---------- 观测与分配 ----------
+    def observe(self, key, signature, now=None):
+        """
+        记录一次成功查询的结果签名（如 (余量, 容量, 已选)）
+        返回: 与上次相比是否发生变化（首次观测返回 False）
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            entry = self._courses.get(key)
+            if entry is None:
+                return False
+            elapsed = max(0.0, now - entry.observed_at)
+            entry.churn *= math.exp(-elapsed / self._tau)
+            changed = entry.signature is not None and signature != entry.signature
+            if changed:
+                entry.churn += 1.0 / self._tau
+                self.change_count += 1
+            entry.signature = signature
+            entry.observed_at = now
+            return changed
+
+    def budget(self):
+        with self._lock:
+            return self._budget_locked()
+
+    def _budget_locked(self):
+        if self.budget_rps:
+            return float(self.budget_rps)
+        return len(self._courses) / self.base_interval
+
+    def rebalance(self):
+        """重新分配各课程轮询频率，返回 {key: interval 秒}。"""
+        with self._lock:
+            if not self._courses:
+                return {}
+            low = 1.0 / self.max_interval
+            high = 1.0 / self.min_interval
+            remaining_budget = self._budget_locked()
+            scores = {
+                key: entry.priority * (entry.churn + self.floor_churn)
+                for key, entry in self._courses.items()
+            }
+            rates = {}
+            while scores:
+                total = sum(scores.values())
+                clamped = {}
+                for key, score in scores.items():
+                    rate = remaining_budget * score / total if total > 0 else low
+                    if rate <= low:
+                        clamped[key] = low
+                    elif rate >= high:
+                        clamped[key] = high
+                if not clamped:
+                    for key, score in scores.items():
+                        rates[key] = remaining_budget * score / total
+                    break
+                for key, rate in clamped.items():
+                    rates[key] = rate
+                    remaining_budget -= rate
+                    del scores[key]
+                remaining_budget = max(0.0, remaining_budget)
+
+            for key, rate in rates.items():
+                self._courses[key].rate = rate
+            return {key: 1.0 / rate for key, rate in rates.items()}
+
+    def interval(self, key):
+        """当前分配给课程的轮询间隔（秒），未跟踪时返回基准间隔。"""
+        with self._lock:
+            entry = self._courses.get(key)
+            return 1.0 / entry.rate if entry is not None else self.base_interval
+
+    def snapshot(self):
+        """返回 {key: (churn 次/秒, interval 秒)}，用于日志与调试。"""
+        with self._lock:
+            return {
+                key: (entry.churn, 1.0 / entry.rate)
+                for key, entry in self._courses.items()
+            }
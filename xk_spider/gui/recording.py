@@ -0,0 +1,274 @@
+"""
+会话录制模块
+config.json 中 "record_session": true 时，监控期间经由传输后端（线程引擎）或异步客户端（asyncio 引擎）
+发出的每个请求与响应写入 logs/session_YYYY-MM-DD_HHMMSS.jsonl.gz，供 replay.py 离线回放。
+- 脱敏：token、学号、账号、密码与 Cookie 的取值在 URL、请求体与响应体中一律替换为 ***，
+  名为 token/password 等的参数不论取值一律替换；请求头（含 Cookie）不录制。
+- 紧凑：相同的响应体只写一次（{"body": 编号, "text": 内容}），之后的请求只引用编号；文件整体 gzip 压缩。
+- 登录流程（验证码、登录表单）不录制，自动重登只记录耗时与结果（{"ev": "relogin", ...}）。
+请求记录每行一条：
+    {"t": 相对录制开始的秒数, "m": 方法, "u": 相对 BASE_URL 的路径与查询, "b": 请求体, "l": 耗时,
+     "s": 状态码, "r": 响应体编号, "h": {"content-type", "location"}, "e": 异常类名}
+第一行是文件头：录制时间、监控课程、批次与校区。
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl, quote, quote_plus, urlencode, urlsplit
+
+from xk_spider.storage import LOG_DIR
+
+
+FORMAT_VERSION = 1
+REDACTED = '***'
+SESSION_FILE_PREFIX = 'session'
+# 不论取值一律脱敏的参数名（小写比较）
+SENSITIVE_FIELDS = frozenset({
+    'token', 'vtoken', 'password', 'pwd', 'loginpwd', 'loginname', 'username',
+    'verifycode', 'cookie', 'jsessionid',
+})
+# 匹配回放请求时忽略的参数
+VOLATILE_FIELDS = frozenset({'timestamp'})
+_RECORDED_HEADERS = ('content-type', 'location')
+
+
+def _text(body):
+    if body is None:
+        return ''
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body).decode('utf-8', errors='replace')
+    if isinstance(body, dict):
+        return urlencode(body)
+    return str(body)
+
+
+class Sanitizer:
+    """把已知的凭据取值与敏感参数替换为 ***（线程安全：secrets 只整体替换）。"""
+
+    def __init__(self, secrets=()):
+        self._secrets = ()
+        self.add(*secrets)
+
+    def add(self, *values):
+        found = set(self._secrets)
+        for value in values:
+            value = str(value or '')
+            # 太短的值（如空串、校区代码）替换会误伤正常内容
+            if len(value) >= 4:
+                found.update({value, quote(value, safe=''), quote_plus(value)})
+        # 先替换长的，避免一个凭据是另一个的前缀时只替换一半
+        self._secrets = tuple(sorted(found, key=len, reverse=True))
+
+    def add_cookies(self, cookies):
+        """Cookie 字符串中每个值都视为凭据。"""
+        values = []
+        for part in str(cookies or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if value:
+                values.append(value)
+        self.add(*values)
+
+    def scrub(self, text):
+        for secret in self._secrets:
+            if secret in text:
+                text = text.replace(secret, REDACTED)
+        return text
+
+    def scrub_form(self, text):
+        """表单 / 查询串：先替换凭据取值，再把敏感参数名的值整体替换。"""
+        text = self.scrub(text)
+        if not text or '=' not in text:
+            return text
+        pairs = parse_qsl(text, keep_blank_values=True)
+        if not any(name.lower() in SENSITIVE_FIELDS for name, _ in pairs):
+            return text
+        return urlencode([
+            (name, REDACTED if name.lower() in SENSITIVE_FIELDS else value) for name, value in pairs
+        ])
+
+
+def relative_url(url, base_url):
+    """去掉 BASE_URL 前缀；其它站点的地址保留路径与查询。"""
+    url = str(url)
+    if base_url and url.startswith(base_url):
+        return url[len(base_url):] or '/'
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+def _canonical_form(text):
+    if not text or '=' not in text:
+        return text or ''
+    pairs = parse_qsl(text, keep_blank_values=True)
+    return urlencode(sorted((name, value) for name, value in pairs if name not in VOLATILE_FIELDS))
+
+
+def request_key(method, url, body):
+    """回放时匹配请求用的键：方法 + 路径 + 去掉时间戳后排序的查询参数与表单。"""
+    path, _, query = str(url).partition('?')
+    return f"{method.upper()} {path}?{_canonical_form(query)}|{_canonical_form(body)}"
+
+
+def endpoint_key(method, url):
+    return f"{method.upper()} {str(url).split('?', 1)[0]}"
+
+
+class SessionRecorder:
+    """
+    请求 / 响应录制器
+    record() 可在任意线程（或事件循环）中调用，写入在锁内完成；文件在 close() 时关闭。
+    """
+
+    def __init__(self, base_url, header=None, secrets=(), directory=None, clock=time.monotonic):
+        self.base_url = base_url
+        self.clock = clock
+        self.sanitizer = Sanitizer(secrets)
+        self.count = 0
+        self._origin = clock()
+        self._bodies = {}
+        self._lock = threading.Lock()
+        directory = str(directory or LOG_DIR)
+        os.makedirs(directory, exist_ok=True)
+        now = datetime.now()
+        self.path = os.path.join(
+            directory, f"{SESSION_FILE_PREFIX}_{now.strftime('%Y-%m-%d_%H%M%S')}.jsonl.gz"
+        )
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        record = {'v': FORMAT_VERSION, 'recorded': now.isoformat(timespec='seconds'),
+                  'wall': time.time(), 'base': self.sanitizer.scrub(base_url)}
+        record.update(header or {})
+        self._write(self._scrub_json(record))
+
+    def _scrub_json(self, record):
+        return json.loads(self.sanitizer.scrub(json.dumps(record, ensure_ascii=False)))
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def update_secrets(self, token='', cookies=''):
+        """登录态变化（自动重登）后登记新的 token 与 Cookie。"""
+        self.sanitizer.add(token)
+        self.sanitizer.add_cookies(cookies)
+
+    def record(self, method, url, body, started, latency, response=None, error=None):
+        """记录一次请求；response 需有 status_code/headers/content，请求失败时传入异常 error。"""
+        sanitizer = self.sanitizer
+        record = {
+            't': round(started - self._origin, 4),
+            'm': method.upper(),
+            'u': sanitizer.scrub_form(relative_url(url, self.base_url)),
+            'l': round(latency, 4),
+        }
+        body = sanitizer.scrub_form(_text(body))
+        if body:
+            record['b'] = body
+        text = None
+        if error is not None:
+            record['e'] = type(error).__name__
+        elif response is not None:
+            record['s'] = response.status_code
+            headers = {
+                name: sanitizer.scrub(str(response.headers.get(name)))
+                for name in _RECORDED_HEADERS if response.headers.get(name)
+            }
+            if headers:
+                record['h'] = headers
+            content = getattr(response, 'content', b'') or b''
+            content_type = headers.get('content-type', '')
+            if content and ('json' in content_type or 'text' in content_type or not content_type):
+                text = sanitizer.scrub(content.decode('utf-8', errors='replace'))
+        with self._lock:
+            if self._file is None:
+                return
+            if text is not None:
+                body_id = self._bodies.get(text)
+                if body_id is None:
+                    body_id = self._bodies[text] = len(self._bodies)
+                    self._write({'body': body_id, 'text': text})
+                record['r'] = body_id
+            self._write(record)
+            self.count += 1
+
+    def event(self, name, started, duration, **fields):
+        """记录非请求事件（如自动重登的耗时与结果）。"""
+        record = {'ev': name, 't': round(started - self._origin, 4), 'l': round(duration, 4)}
+        record.update(fields)
+        with self._lock:
+            if self._file is not None:
+                self._write(record)
+
+    def close(self):
+        with self._lock:
+            handle, self._file = self._file, None
+        if handle is not None:
+            handle.close()
+
+
+class RecordingTransport:
+    """包装传输后端：照常发送，并把每个请求 / 响应交给 SessionRecorder。"""
+
+    def __init__(self, inner, recorder):
+        self._inner = inner
+        self._recorder = recorder
+        self.name = inner.name
+
+    def _send(self, method, url, body, send):
+        clock = self._recorder.clock
+        started = clock()
+        try:
+            resp = send()
+        except Exception as e:
+            self._recorder.record(method, url, body, started, clock() - started, error=e)
+            raise
+        self._recorder.record(method, url, body, started, clock() - started, response=resp)
+        return resp
+
+    def send_template(self, template, **kwargs):
+        return self._send(
+            template.method, template.url(), template.body,
+            lambda: self._inner.send_template(template, **kwargs),
+        )
+
+    def request(self, method, url, **kwargs):
+        params = kwargs.get('params')
+        recorded_url = f"{url}?{urlencode(params)}" if params else url
+        return self._send(
+            method, recorded_url, kwargs.get('data'),
+            lambda: self._inner.request(method, url, **kwargs),
+        )
+
+    def close(self):
+        self._inner.close()
+
+
+def read_session(path):
+    """
+    读取录制文件，返回 (文件头, 请求记录列表, 事件列表)
+    请求记录中的响应体编号已换成 'text'；文件因进程异常退出而截断时读取到截断处为止。
+    """
+    header, exchanges, events, bodies = None, [], [], {}
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        try:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if header is None:
+                    header = record
+                elif 'body' in record:
+                    bodies[record['body']] = record['text']
+                elif 'ev' in record:
+                    events.append(record)
+                else:
+                    if 'r' in record:
+                        record['text'] = bodies.get(record['r'], '')
+                    exchanges.append(record)
+        except (EOFError, OSError):
+            pass
+    if header is None:
+        raise ValueError(f"不是有效的会话录制文件: {path}")
+    return header, exchanges, events
@@ -0,0 +1,300 @@
+"""
+会话回放模块
+把 recording.py 录制的会话喂回 MultiGrabWorker 的同一套 查询 → 判定 → 选课 → 核实 / 换课 / 救援 代码，
+时间由虚拟时钟驱动：虚拟时钟的 monotonic/time/sleep 作为 clock/wall_clock/sleep 注入 ReplayWorker
+及其组件（缓存、令牌桶、轮询频率、状态表、指标与追踪），请求按录制时的耗时推进时钟，不真正等待，
+一小时的会话几秒内回放完，结果可重复。time 模块不被替换，进程内同时运行的监控与指标导出不受影响。
+
+- 只读查询（余量列表、已选课程）按“回放时刻”取录制中该时刻之前最近的一次响应，
+  轮询策略不同（频率、合并方式）时看到的是当时真实的余量变化；
+- 选课、退课等写请求按录制顺序依次取用，取完后重复最后一次；
+- 回放时请求与录制中的请求按 方法 + 路径 + 参数（去掉时间戳）匹配，匹配不到时退回同一接口的记录；
+- 自动重登按录制的重登事件推进时钟并返回当时的结果，不发送登录请求。
+回放在单个线程中进行：调度、换课、换课计划解析与登录检测都在回放线程内依次执行，不启动后台线程。
+"""
+import bisect
+import heapq
+import itertools
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import rate_control, selected_cache, throttle, workers
+from .recording import REDACTED, endpoint_key, read_session, relative_url, request_key
+from .scheduler import DEFER, STOP
+from .tracing import SessionTracer
+from .transports import TransportResponse
+
+# 按回放时刻取响应的接口类别（见 throttle.classify_endpoint）
+READ_CLASSES = frozenset({'query', 'verify'})
+# 虚拟单调时钟的起点，避免与缓存中“从未获取”的 0 时间戳混淆
+VIRTUAL_EPOCH = 1000.0
+
+
+class VirtualClock:
+    """虚拟时钟：sleep() 直接推进时间；time() 从录制开始时的墙上时间起算。"""
+
+    def __init__(self, start=VIRTUAL_EPOCH, wall_start=None):
+        self._now = float(start)
+        self.start = self._now
+        self._wall_offset = (time.time() if wall_start is None else float(wall_start)) - self._now
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self._now
+
+    def time(self):
+        return self._now + self._wall_offset
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._now += seconds
+            self.slept += seconds
+
+    def advance_to(self, moment):
+        self.sleep(moment - self._now)
+
+    @property
+    def elapsed(self):
+        return self._now - self.start
+
+
+class SessionLog:
+    """录制内容的回放索引。"""
+
+    def __init__(self, header, exchanges, events):
+        self.header = header
+        self.events = sorted(events, key=lambda event: event['t'])
+        self.duration = max(
+            [record['t'] + record.get('l', 0.0) for record in exchanges]
+            + [event['t'] + event.get('l', 0.0) for event in events] + [0.0]
+        )
+        self.exchange_count = len(exchanges)
+        self._by_key = {}
+        self._by_endpoint = {}
+        for record in sorted(exchanges, key=lambda record: record['t']):
+            url = record['u']
+            self._by_key.setdefault(request_key(record['m'], url, record.get('b', '')), []).append(record)
+            self._by_endpoint.setdefault(endpoint_key(record['m'], url), []).append(record)
+        self._times = {id(records): [record['t'] for record in records]
+                       for records in list(self._by_key.values()) + list(self._by_endpoint.values())}
+        self._cursors = {}
+        self._event_cursor = 0
+
+    @classmethod
+    def load(cls, path):
+        return cls(*read_session(path))
+
+    @property
+    def courses(self):
+        return list(self.header.get('courses') or [])
+
+    def lookup(self, method, url, body, offset, read):
+        """
+        取回放响应记录；offset 为相对录制开始的秒数
+        read=True 取 offset 之前最近的一次（没有则取第一次），否则按顺序依次取用。
+        返回 (记录, 是否精确匹配)，同一接口也没有记录时返回 (None, False)。
+        """
+        records = self._by_key.get(request_key(method, url, body))
+        exact = records is not None
+        if records is None:
+            records = self._by_endpoint.get(endpoint_key(method, url))
+            if records is None:
+                return None, False
+        if read:
+            index = bisect.bisect_right(self._times[id(records)], offset) - 1
+            return records[max(0, index)], exact
+        cursor = self._cursors.get(id(records), 0)
+        self._cursors[id(records)] = cursor + 1
+        return records[min(cursor, len(records) - 1)], exact
+
+    def next_event(self, name, offset):
+        """offset 之后（含）第一个未用过的 name 事件，没有返回 None。"""
+        for index in range(self._event_cursor, len(self.events)):
+            event = self.events[index]
+            if event['ev'] == name and event['t'] >= offset:
+                self._event_cursor = index + 1
+                return event
+        return None
+
+
+class ReplayTransport:
+    """按回放时刻从 SessionLog 取响应的传输后端，按录制的耗时推进虚拟时钟。"""
+
+    name = 'replay'
+
+    def __init__(self, log, clock, base_url):
+        self._log = log
+        self._clock = clock
+        self._base_url = base_url
+        self.request_count = 0
+        self.exact_count = 0
+        self.miss_count = 0
+
+    def send_template(self, template, **kwargs):
+        timestamp = int(self._clock.time() * 1000)
+        return self._send(template.method, template.url(timestamp), template.body)
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        prepared = requests.Request(method, url, params=params, data=data).prepare()
+        return self._send(prepared.method, prepared.url, prepared.body)
+
+    def _send(self, method, url, body):
+        self.request_count += 1
+        relative = relative_url(url, self._base_url)
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode('utf-8', errors='replace')
+        offset = self._clock.elapsed
+        record, exact = self._log.lookup(
+            method, relative, body or '', offset, throttle.classify_endpoint(relative) in READ_CLASSES
+        )
+        if record is None:
+            self.miss_count += 1
+            raise requests.exceptions.ConnectionError(f"回放记录中没有该接口: {method} {relative}")
+        self.exact_count += int(exact)
+        self._clock.sleep(record.get('l', 0.0))
+        if 'e' in record:
+            error = getattr(requests.exceptions, record['e'], None)
+            if not (isinstance(error, type) and issubclass(error, requests.exceptions.RequestException)):
+                error = requests.exceptions.RequestException
+            raise error(f"回放: {record['e']}")
+        headers = CaseInsensitiveDict(record.get('h') or {})
+        return TransportResponse(
+            record.get('s', 200), headers, record.get('text', '').encode('utf-8'), url
+        )
+
+    def close(self):
+        pass
+
+
+class ReplayWorker(workers.MultiGrabWorker):
+    """
+    在虚拟时钟下回放录制会话的 MultiGrabWorker
+    clock 为 VirtualClock；poll_interval 等参数用于对比不同的轮询策略。
+    """
+
+    def __init__(self, log, clock, courses=None, poll_interval=None, poll_budget_rps=None,
+                 request_rate=0, request_burst=0, trace_dir=None):
+        header = log.header
+        super().__init__(
+            courses if courses is not None else log.courses,
+            REDACTED, header.get('batch_code', ''), REDACTED, '',
+            campus=header.get('campus', '02'), max_workers=1,
+            request_rate=request_rate, request_burst=request_burst,
+            clock=clock.monotonic, wall_clock=clock.time, sleep=clock.sleep,
+        )
+        self._log = log
+        self._virtual = clock
+        # 已选课程缓存不与界面和实时监控共用（shared_selected_state 按真实时钟计算缓存年龄）
+        self._selected_state = selected_cache.SelectedCoursesState(clock=clock.monotonic)
+        self._transport = ReplayTransport(log, clock, workers.BASE_URL)
+        self._tracer = SessionTracer(
+            directory=trace_dir, engine='replay', clock=clock.monotonic, write=trace_dir is not None
+        )
+        if poll_interval is not None:
+            self.POLL_INTERVAL = float(poll_interval)
+        if poll_interval is not None or poll_budget_rps is not None:
+            self.POLL_BUDGET_RPS = poll_budget_rps
+            self._poll_rates = rate_control.PollRateController(
+                base_interval=self.POLL_INTERVAL, budget_rps=poll_budget_rps, clock=clock.monotonic
+            )
+        self._due = []
+        self._seq = itertools.count()
+        self._replaying = False
+
+    # ---------- 覆盖线程引擎的调度、换课与重登 ----------
+    def _schedule_course(self, course, delay=0.0):
+        tc_id = course.get('JXBID', '')
+        if not tc_id or not self._replaying:
+            return
+        self._course_states.reset(tc_id)
+        self._poll_rates.track(tc_id, priority=self._course_weight(course))
+        self._warm_request_templates(course)
+        heapq.heappush(self._due, (self._clock() + delay, next(self._seq), tc_id))
+
+    def _unschedule_course(self, tc_id):
+        self._drop_course_state(tc_id)
+
+    def _start_swap(self, course):
+        swap_success, conflict_info = self._handle_conflict_rollback(course)
+        if self._finish_swap(course, swap_success, conflict_info):
+            self._drop_course_state(course.get('JXBID', ''))
+            return STOP
+        return 2.0
+
+    def _start_swap_plan_refresh(self, course):
+        self._resolve_swap_plan(course)
+
+    def _start_login_check(self):
+        self._check_login_status_safe()
+
+    def _do_relogin(self):
+        event = self._log.next_event('relogin', self._virtual.elapsed)
+        if event is None:
+            return False, '', ''
+        self._sleep(event.get('l', 0.0))
+        if not event.get('ok'):
+            return False, '', ''
+        self._update_session(REDACTED, '')
+        return True, REDACTED, ''
+
+    def _send_read_template(self, template, endpoint_class=None, timeout=(3, 5), **kwargs):
+        # 对冲依赖线程池的真实等待，回放中只发首发请求
+        return self._timed_send(template, endpoint_class, timeout, **kwargs)
+
+    # ---------- 回放 ----------
+    def replay(self, duration=None):
+        """
+        回放到录制结束（或 duration 秒），返回统计字典
+        调度语义与 DeadlineScheduler 相同：固定频率，返回数字 N 表示 N 秒后再查。
+        """
+        clock = self._virtual
+        end = clock.start + (self._log.duration if duration is None else float(duration))
+        real_started = time.perf_counter()
+        self._replaying = True
+        for course in self._get_courses_snapshot():
+            self._schedule_course(course)
+        polls = 0
+        while self._due and self._running:
+            due, _, tc_id = heapq.heappop(self._due)
+            if due > end:
+                break
+            clock.advance_to(due)
+            result = self._poll_course(tc_id)
+            polls += 1
+            if result is STOP or result is DEFER:
+                continue
+            if result is None:
+                due = max(due + self._poll_rates.interval(tc_id), clock.monotonic())
+            else:
+                due = clock.monotonic() + result
+            heapq.heappush(self._due, (due, next(self._seq), tc_id))
+        self._replaying = False
+        self._running = False
+        self._tracer.close()
+        return self._replay_report(polls, time.perf_counter() - real_started)
+
+    def _replay_report(self, polls, real_elapsed):
+        counts, _ = self._events.snapshot()
+        snapshot = self.metrics_snapshot()
+        transport = self._transport
+        return {
+            'virtual_seconds': self._virtual.elapsed,
+            'real_seconds': real_elapsed,
+            'polls': polls,
+            'requests': {name: stats['count'] for name, stats in snapshot['endpoints'].items()},
+            'matched': transport.exact_count,
+            'unmatched': transport.request_count - transport.exact_count,
+            'missing': transport.miss_count,
+            'events': {':'.join(key): count for key, count in sorted(counts.items())},
+            'remaining_courses': [course.get('JXBID', '') for course in self._get_courses_snapshot()],
+            'traces': self._tracer.summary_dict(),
+        }
+
+
+def replay_session(path, duration=None, **options):
+    """加载录制文件并在虚拟时钟下回放，返回统计字典（options 见 ReplayWorker）。"""
+    log = SessionLog.load(path)
+    clock = VirtualClock(wall_start=log.header.get('wall'))
+    return ReplayWorker(log, clock, **options).replay(duration)
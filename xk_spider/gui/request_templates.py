@@ -0,0 +1,171 @@
+"""
+预构造请求模板模块
+轮询热路径上的请求（余量列表、选课、退课、已选核实）在课程加入监控时构造一次：
+请求头（含 token/Referer/Cookie）合并完毕、表单 JSON 序列化并 URL 编码完毕，
+发送时只需盖上时间戳。登录态（token/Cookie）变化时会话纪元 +1，旧模板按需重建。
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.utils import default_headers, get_environ_proxies
+
+from .throttle import classify_endpoint
+
+
+TIMESTAMP_FIELD = 'timestamp'
+_STAMP_MARK = '__xk_timestamp__'
+
+
+def build_session_headers(base_headers, extra_headers, cookies, include_defaults=True):
+    """
+    合并出一次会话内不变的完整请求头
+    include_defaults=True 时与 requests.Session 的合并结果一致：默认头 + 会话头 +
+    每次请求的头（token/Referer）；其它客户端自带默认头时传 False。
+    Cookie 直接使用登录得到的 Cookie 字符串，不再经过 CookieJar。
+    """
+    headers = default_headers() if include_defaults else {}
+    headers.update(base_headers)
+    headers.update(extra_headers)
+    if cookies:
+        headers['Cookie'] = cookies
+    return dict(headers)
+
+
+def environment_send_options(url):
+    """
+    与 Session.request 相同地解析环境变量中的代理与 CA 设置
+    Session.send 在未传 proxies 时每次都会重新扫描环境变量，模板只解析一次。
+    """
+    verify = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or True
+    return {'proxies': get_environ_proxies(url), 'verify': verify}
+
+
+class RequestTemplate:
+    """
+    一次构造、反复发送的请求
+    - 不带时间戳的请求（余量列表、选课）所有发送共用同一个 PreparedRequest；
+    - 带 timestamp 参数的请求（退课、已选查询）只替换 URL 中的时间戳。
+    headers/body 也供 httpx 等其它客户端直接使用；endpoint 为 URL 最后一段（如 courseResult.do），
+    用于按接口统计时延。
+    """
+
+    __slots__ = (
+        'method', 'epoch', 'endpoint', 'endpoint_class', 'headers', 'body', 'send_options',
+        '_prepared', '_url_head', '_url_tail',
+    )
+
+    def __init__(self, method, url, headers, params=None, data=None, epoch=0):
+        stamped = bool(params) and TIMESTAMP_FIELD in params
+        if stamped:
+            params = dict(params)
+            params[TIMESTAMP_FIELD] = _STAMP_MARK
+        prepared = requests.Request(
+            method, url, headers=headers, params=params, data=data
+        ).prepare()
+        self.method = prepared.method
+        self.epoch = epoch
+        self.endpoint = urlsplit(url).path.rsplit('/', 1)[-1]
+        self.endpoint_class = classify_endpoint(url)
+        self.headers = dict(prepared.headers)
+        self.body = prepared.body
+        self.send_options = environment_send_options(prepared.url)
+        self._prepared = prepared
+        if stamped:
+            self._url_head, self._url_tail = prepared.url.split(_STAMP_MARK, 1)
+        else:
+            self._url_head, self._url_tail = prepared.url, None
+
+    @property
+    def stamped(self):
+        return self._url_tail is not None
+
+    def url(self, timestamp=None):
+        """返回本次发送的 URL（带时间戳的模板盖上当前毫秒时间戳）。"""
+        if self._url_tail is None:
+            return self._url_head
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        return f"{self._url_head}{timestamp}{self._url_tail}"
+
+    def prepared(self):
+        """
+        返回可直接交给 Session.send 的 PreparedRequest
+        请求头、请求体与 Cookie 对象在各次发送间共享（发送过程不会修改它们）。
+        """
+        base = self._prepared
+        if self._url_tail is None:
+            return base
+        request = requests.PreparedRequest()
+        request.method = base.method
+        request.url = self.url()
+        request.headers = base.headers
+        request.body = base.body
+        request._cookies = base._cookies
+        request.hooks = base.hooks
+        return request
+
+    def send(self, session, **kwargs):
+        """用 requests.Session 发送（kwargs 为 timeout/allow_redirects 等）。"""
+        return session.send(self.prepared(), **self.send_options, **kwargs)
+
+
+class RequestTemplateCache:
+    """
+    按会话纪元失效的模板缓存（线程安全）
+    bump_epoch() 在 token/Cookie 更新后调用；旧纪元的模板在下次取用时重建。
+    同一模板可能被两个线程同时重建，结果相同，后写入者覆盖即可。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._headers = None
+        self.epoch = 0
+        self.build_count = 0
+
+    def bump_epoch(self):
+        with self._lock:
+            self.epoch += 1
+            self._templates.clear()
+            self._headers = None
+            return self.epoch
+
+    def session_headers(self, build):
+        """当前纪元的完整请求头，过期时调用 build() 重建。"""
+        cached = self._headers
+        epoch = self.epoch
+        if cached is not None and cached[0] == epoch:
+            return cached[1]
+        headers = build()
+        with self._lock:
+            if epoch == self.epoch:
+                self._headers = (epoch, headers)
+        return headers
+
+    def get(self, key, build):
+        """
+        取出 key 对应的模板，不存在或已过期时调用 build(epoch) 构造
+        build 返回 RequestTemplate
+        """
+        template = self._templates.get(key)
+        epoch = self.epoch
+        if template is not None and template.epoch == epoch:
+            return template
+        template = build(epoch)
+        with self._lock:
+            if template.epoch == self.epoch:
+                self._templates[key] = template
+            self.build_count += 1
+        return template
+
+    def discard(self, predicate):
+        """丢弃 key 满足 predicate 的模板（课程移出监控时调用）。"""
+        with self._lock:
+            for key in [key for key in self._templates if predicate(key)]:
+                del self._templates[key]
+
+    def __len__(self):
+        return len(self._templates)
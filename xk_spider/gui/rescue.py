@@ -0,0 +1,90 @@
+"""
+紧急救援节奏
+换课失败后要抢回旧课，救援可能持续一个小时以上。与其每 0.7 秒盲发一次选课，
+不如走正常的余量查询路径盯住旧课（同组列表请求还能与其它监控课程合并）：
+- 看不到名额时查询间隔从基础间隔按倍数放慢到上限；
+- 看到名额（remain>0 且 isFull=False）时立即连发几次选课，
+  随后一段时间内按快速间隔盯守（名额往往成批释放，也可能被人抢走后再放出）；
+- 余量查询失败（旧课不在列表中等）时退化为按基础间隔单发选课，不比原来更慢。
+"""
+import time
+
+
+SEAT_OPEN = 'open'
+SEAT_CLOSED = 'closed'
+SEAT_UNKNOWN = 'unknown'
+SEAT_CHOSEN = 'chosen'
+
+
+class RescueCadence:
+    """
+    一次紧急救援的节奏与请求计数（只在救援所在的线程 / 协程内使用）
+    用法:
+        seat = cadence.observe(remain, course_info)
+        for _ in range(cadence.burst_size(seat)): 选课...
+        sleep(cadence.next_delay())
+    """
+
+    def __init__(self, base_interval=0.7, max_interval=3.0, fast_interval=0.3,
+                 backoff=1.5, burst=3, burst_interval=0.15, hot_window=10.0,
+                 verify_every=5, clock=time.monotonic):
+        self.base_interval = float(base_interval)
+        self.max_interval = float(max_interval)
+        self.fast_interval = float(fast_interval)
+        self.backoff = float(backoff)
+        self.burst = max(1, int(burst))
+        self.burst_interval = float(burst_interval)
+        self.hot_window = float(hot_window)
+        self.verify_every = max(1, int(verify_every))
+        self._clock = clock
+        self._interval = self.base_interval
+        self._hot_until = 0.0
+        self.rounds = 0
+        self.poll_count = 0
+        self.opening_count = 0
+        self.select_count = 0
+
+    def next_round(self):
+        """开始新一轮，返回本轮是否需要联合核实目标课与旧课。"""
+        self.rounds += 1
+        return self.rounds % self.verify_every == 0
+
+    def observe(self, remain, course_info):
+        """
+        记录一次旧课余量查询结果
+        返回 SEAT_OPEN / SEAT_CLOSED / SEAT_UNKNOWN（查询失败）/ SEAT_CHOSEN（列表显示旧课已选）
+        """
+        self.poll_count += 1
+        if remain is None or remain == 'session_expired' or not course_info:
+            # 看不到余量时按基础间隔盲发，不再继续放慢
+            self._interval = self.base_interval
+            return SEAT_UNKNOWN
+        if course_info.get('isChoose'):
+            return SEAT_CHOSEN
+        if remain > 0 and not course_info.get('isFull', False):
+            self.opening_count += 1
+            self._hot_until = self._clock() + self.hot_window
+            self._interval = self.base_interval
+            return SEAT_OPEN
+        return SEAT_CLOSED
+
+    def burst_size(self, seat):
+        if seat == SEAT_OPEN:
+            return self.burst
+        if seat == SEAT_UNKNOWN:
+            return 1
+        return 0
+
+    def next_delay(self):
+        """下一轮之前的等待：名额出现后的 hot_window 内用快速间隔，否则指数放慢。"""
+        if self._clock() < self._hot_until:
+            return self.fast_interval
+        delay = self._interval
+        self._interval = min(self._interval * self.backoff, self.max_interval)
+        return delay
+
+    def describe(self):
+        return (
+            f"{self.rounds} 轮, 余量查询 {self.poll_count} 次, 发现名额 {self.opening_count} 次, "
+            f"选课 {self.select_count} 次"
+        )
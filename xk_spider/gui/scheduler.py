@@ -0,0 +1,201 @@
+"""
+中央调度模块
+用一个按到期时间排序的堆驱动所有课程的轮询，由固定数量的工作线程执行，
+线程数与监控课程数无关。
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from .logger import get_logger
+
+
+# 回调返回值：停止该任务 / 暂不重新排期（等待 resume）
+STOP = object()
+DEFER = object()
+
+
+class _Job:
+    __slots__ = ('key', 'weight', 'due', 'running', 'queued', 'resume_delay')
+
+    def __init__(self, key, weight, due):
+        self.key = key
+        self.weight = weight
+        self.due = due
+        self.running = False
+        self.queued = False
+        self.resume_delay = None
+
+
+class DeadlineScheduler:
+    """
+    截止时间调度器
+    - 固定频率（fixed-rate）：下次到期 = 本次计划时间 + 周期 / 权重，不累积请求耗时；
+      落后超过一个周期时直接对齐到当前时间，不补发积压的轮询。
+    - 回调返回数字 N 表示 N 秒后再执行；返回 STOP 移除任务；返回 DEFER 挂起，
+      直到 resume() 重新排期。
+    - 同一任务不会被两个工作线程同时执行。
+    - 被 DEFER 挂起的任务仍保留在任务表中（key in scheduler 为真），不会被 add() 替换，
+      只能由 resume() 重新排期或 remove() 移除；健康检查据此区分脱离调度与挂起等待的课程。
+    """
+
+    def __init__(self, callback, workers=4, period=1.0, name='scheduler'):
+        self._callback = callback
+        self._workers = max(1, int(workers))
+        self.period = float(period)
+        self._name = name
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads = []
+        self._logger = get_logger()
+
+    # ---------- 任务管理 ----------
+    def add(self, key, weight=1.0, delay=0.0):
+        """
+        添加（或替换排队中的）任务，delay 秒后首次执行
+        任务正在执行或被 DEFER 挂起时不替换，返回 False。
+        """
+        with self._cond:
+            if self._is_busy_locked(key):
+                return False
+            job = _Job(key, max(0.05, float(weight or 1.0)), time.monotonic() + max(0.0, delay))
+            self._jobs[key] = job
+            self._push_locked(job)
+            self._cond.notify()
+            return True
+
+    def remove(self, key):
+        with self._cond:
+            self._jobs.pop(key, None)
+            self._cond.notify()
+
+    def resume(self, key, delay=0.0):
+        """重新排期被 DEFER 挂起的任务。"""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None or job.queued:
+                return False
+            if job.running:
+                # 回调尚未返回 DEFER，记下延迟，返回时直接排期
+                job.resume_delay = max(0.0, delay)
+                return True
+            job.due = time.monotonic() + max(0.0, delay)
+            self._push_locked(job)
+            self._cond.notify()
+            return True
+
+    def is_busy(self, key):
+        """任务正在执行，或被 DEFER 挂起等待 resume()。"""
+        with self._cond:
+            return self._is_busy_locked(key)
+
+    def set_weight(self, key, weight):
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is not None:
+                job.weight = max(0.05, float(weight or 1.0))
+
+    def interval_for(self, job):
+        return self.period / job.weight
+
+    def __contains__(self, key):
+        with self._cond:
+            return key in self._jobs
+
+    def __len__(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def keys(self):
+        with self._cond:
+            return list(self._jobs)
+
+    # ---------- 运行控制 ----------
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for index in range(self._workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"{self._name}-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    # ---------- 内部实现 ----------
+    def _is_busy_locked(self, key):
+        job = self._jobs.get(key)
+        return job is not None and (job.running or not job.queued)
+
+    def _push_locked(self, job):
+        job.queued = True
+        heapq.heappush(self._heap, (job.due, -job.weight, next(self._seq), job))
+
+    def _next_job_locked(self):
+        while self._running:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            due, _, _, job = self._heap[0]
+            if self._jobs.get(job.key) is not job or job.due != due:
+                # 已移除或已被替换的过期堆项
+                heapq.heappop(self._heap)
+                continue
+            wait = due - time.monotonic()
+            if wait > 0:
+                self._cond.wait(wait)
+                continue
+            heapq.heappop(self._heap)
+            job.queued = False
+            job.running = True
+            return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job_locked()
+            if job is None:
+                return
+
+            try:
+                result = self._callback(job.key)
+            except Exception as e:
+                self._logger.error(f"调度任务异常: {job.key}, {type(e).__name__}: {e}")
+                result = None
+
+            with self._cond:
+                job.running = False
+                if self._jobs.get(job.key) is not job:
+                    continue
+                if result is STOP:
+                    del self._jobs[job.key]
+                    continue
+                now = time.monotonic()
+                if result is DEFER:
+                    if job.resume_delay is None:
+                        continue
+                    result = job.resume_delay
+                job.resume_delay = None
+                if result is None:
+                    next_due = job.due + self.interval_for(job)
+                    if next_due < now:
+                        next_due = now
+                else:
+                    next_due = now + max(0.0, float(result))
+                job.due = next_due
+                self._push_locked(job)
+                self._cond.notify()
@@ -0,0 +1,176 @@
+"""
+已选课程状态缓存
+courseResult.do 会被登录检测、选课核实、换课定位、紧急救援和界面的“查看已选课程”
+分别请求。同一学生同一批次共用一个状态对象：
+- 同一时刻只有一个请求在途，其余调用方等待并共享结果（single-flight）；
+- 成功结果在短 TTL 内复用；
+- 选课/退课后 invalidate() 递增代次，之前发出的请求结果不再写入缓存或被复用，
+  核实一定基于变更之后发出的查询；
+- 余量列表里 isChoose=True 的教学班记为“已选确认”，核实时可直接采信，不必再查。
+"""
+import asyncio
+import threading
+import time
+
+
+DEFAULT_MAX_AGE = 2.0
+
+
+class _Flight:
+    __slots__ = ('generation', 'event', 'status', 'result')
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.event = threading.Event()
+        self.status = 'failed'
+        self.result = None
+
+
+class SelectedCoursesState:
+    """
+    已选课程状态（线程安全）
+    fetch() 返回 (status, result)：status 为 'ok' / 'session_expired' / 'failed'，
+    'ok' 时 result 为 courseResult.do 的响应字典，其余情况为失败原因。
+    get() 供线程调用，aget() 供 asyncio 事件循环内调用；两者共用缓存、代次与已选确认，
+    各自只在同类调用方之间合并在途请求。
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE, wait_timeout=15.0, clock=time.monotonic):
+        self.max_age = max_age
+        self._wait_timeout = wait_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._result = None
+        self._result_generation = -1
+        self._fetched_at = 0.0
+        self._flight = None
+        self._async_flight = None
+        self._chosen = {}       # tc_id -> 观察到 isChoose 的请求发出时的代次
+        self._deleted_at = {}   # tc_id -> 退课后的代次
+        self.request_count = 0
+        self.hit_count = 0
+        self.confirm_count = 0
+
+    # ---------- 读取 ----------
+    def _cached(self, max_age):
+        """在锁内调用：返回可复用的结果或 None。"""
+        if (
+            self._result is not None
+            and self._result_generation == self.generation
+            and self._clock() - self._fetched_at < max_age
+        ):
+            self.hit_count += 1
+            return self._result
+        return None
+
+    def _store(self, generation, status, result):
+        """在锁内调用：只缓存当前代次发出的成功结果。"""
+        if status == 'ok' and generation == self.generation:
+            self._result = result
+            self._result_generation = generation
+            self._fetched_at = self._clock()
+
+    def get(self, fetch, max_age=None):
+        """
+        取已选课程（线程版）
+        max_age=0 表示必须使用本次调用之后完成的查询（仍会加入当前代次的在途请求）。
+        返回: (status, result)
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            cached = self._cached(max_age)
+            if cached is not None:
+                return 'ok', cached
+            flight = self._flight
+            leader = flight is None or flight.generation != self.generation
+            if leader:
+                flight = self._flight = _Flight(self.generation)
+                self.request_count += 1
+
+        if not leader:
+            if not flight.event.wait(self._wait_timeout):
+                return 'failed', "等待已选课程查询超时"
+            return flight.status, flight.result
+
+        try:
+            flight.status, flight.result = fetch()
+        except Exception as error:
+            flight.status, flight.result = 'failed', str(error)[:50]
+        finally:
+            with self._lock:
+                self._store(flight.generation, flight.status, flight.result)
+                if self._flight is flight:
+                    self._flight = None
+            flight.event.set()
+        return flight.status, flight.result
+
+    async def aget(self, fetch, max_age=None):
+        """取已选课程（asyncio 版），fetch 为返回 (status, result) 的协程函数。"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            cached = self._cached(max_age)
+            if cached is not None:
+                return 'ok', cached
+            generation = self.generation
+            flight = self._async_flight
+            if flight is None or flight[0] != generation or flight[1].done():
+                flight = (generation, asyncio.ensure_future(self._arefresh(fetch, generation)))
+                self._async_flight = flight
+                self.request_count += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight[1]), self._wait_timeout)
+        except asyncio.TimeoutError:
+            return 'failed', "等待已选课程查询超时"
+
+    async def _arefresh(self, fetch, generation):
+        status, result = 'failed', None
+        try:
+            status, result = await fetch()
+        except Exception as error:
+            status, result = 'failed', str(error)[:50]
+        finally:
+            with self._lock:
+                self._store(generation, status, result)
+        return status, result
+
+    # ---------- 失效与确认 ----------
+    def invalidate(self, deleted=()):
+        """
+        选课/退课（无论结果是否确定）后调用
+        deleted 中的教学班撤销此前的已选确认，退课之前发出的余量列表也不再能确认它。
+        """
+        with self._lock:
+            self.generation += 1
+            for tc_id in deleted:
+                self._deleted_at[tc_id] = self.generation
+                self._chosen.pop(tc_id, None)
+
+    def observe_chosen(self, tc_ids, generation):
+        """记录余量列表中 isChoose=True 的教学班；generation 为发出该列表请求时的代次。"""
+        with self._lock:
+            for tc_id in tc_ids:
+                if generation >= self._deleted_at.get(tc_id, 0):
+                    self._chosen[tc_id] = max(generation, self._chosen.get(tc_id, -1))
+
+    def is_confirmed(self, tc_id):
+        """是否已由余量列表的 isChoose 确认在课表中（免查询）。"""
+        with self._lock:
+            confirmed = tc_id in self._chosen
+            if confirmed:
+                self.confirm_count += 1
+            return confirmed
+
+
+_shared_states = {}
+_shared_lock = threading.Lock()
+
+
+def shared_selected_state(student_code, batch_code):
+    """同一学生同一选课批次在进程内共用一个已选课程状态（监控线程与界面 Worker 共享）。"""
+    key = (str(student_code or ''), str(batch_code or ''))
+    with _shared_lock:
+        state = _shared_states.get(key)
+        if state is None:
+            state = _shared_states[key] = SelectedCoursesState()
+        return state
@@ -0,0 +1,214 @@
+"""
+服务器时钟
+按 HEAD 请求的 Date 响应头估计 服务器时间 - 本地时间 的偏差，进程内共享：
+登录时同步一次，定时开抢等需要按服务器时间行动的组件直接读取。
+
+Date 头只有秒级精度，单次采样的误差上界约 1 秒。ClockEstimator 按 NTP 的思路用多次采样
+收紧偏差区间：一次采样在本地 [发出, 收到] 之间的某一刻被服务器盖上整秒 D，
+所以偏差 θ 满足 D - 收到 < θ < D + 1 - 发出。多个样本的区间取交集；后续采样
+有意安排在预计的“秒跳变”时刻到达服务器，每次约把区间折半，最终精度受往返时间限制。
+"""
+import math
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+import requests
+
+
+# 本地时钟相对服务器的漂移上限，用于估计结果随时间老化的误差（秒/秒）
+DRIFT_RATE = 50e-6
+DEFAULT_TARGET_ERROR = 0.05
+DEFAULT_MAX_SAMPLES = 10
+DEFAULT_REFRESH_INTERVAL = 600.0
+
+
+def parse_date_header(value):
+    """把 HTTP Date 头解析为 Unix 整秒，无法解析返回 None。"""
+    parsed = parsedate_tz(value) if value else None
+    return mktime_tz(parsed) if parsed else None
+
+
+def make_head_probe(url, session=None, timeout=(2, 3)):
+    """
+    返回一次采样函数 probe() -> (发出时刻, 收到时刻, 服务器整秒) 或 None
+    复用同一个 Session，除首个样本外不含握手时间，往返时间更短、区间更窄。
+    """
+    session = session or requests.Session()
+
+    def probe():
+        try:
+            sent = time.time()
+            resp = session.head(url, timeout=timeout, allow_redirects=False)
+            received = time.time()
+        except Exception:
+            return None
+        server_second = parse_date_header(resp.headers.get('Date'))
+        if server_second is None:
+            return None
+        return sent, received, server_second
+
+    return probe
+
+
+class ClockEstimator:
+    """
+    一次多样本偏差估计
+    estimate() 返回 (偏差, 误差上界) 或 None（没有可用样本）；误差上界是区间半宽。
+    """
+
+    def __init__(self, probe, max_samples=DEFAULT_MAX_SAMPLES,
+                 target_error=DEFAULT_TARGET_ERROR, sleep=time.sleep, clock=time.time):
+        self._probe = probe
+        self.max_samples = max(1, int(max_samples))
+        self.target_error = float(target_error)
+        self._sleep = sleep
+        self._clock = clock
+        self.samples = []
+        self.reset_count = 0
+
+    def _aim(self, lower, upper, rtt):
+        """等到合适时刻，使下一次请求预计在某个服务器秒跳变时到达（按当前区间中点）。"""
+        middle = (lower + upper) / 2
+        now = self._clock()
+        # 下一个来得及的服务器整秒 N：本地 N - middle 时刻服务器盖章，提前半个往返发出
+        boundary = math.ceil(now + middle + rtt / 2 + 0.05)
+        send_at = boundary - middle - rtt / 2
+        delay = send_at - now
+        if delay > 0:
+            self._sleep(delay)
+
+    def estimate(self):
+        lower, upper = -math.inf, math.inf
+        best_rtt = None
+        for _ in range(self.max_samples):
+            if best_rtt is not None and upper - lower <= 2 * self.target_error:
+                break
+            if math.isfinite(lower):
+                self._aim(lower, upper, best_rtt)
+            sample = self._probe()
+            if sample is None:
+                continue
+            sent, received, server_second = sample
+            self.samples.append(sample)
+            rtt = max(0.0, received - sent)
+            best_rtt = rtt if best_rtt is None else min(best_rtt, rtt)
+            sample_lower = server_second - received
+            sample_upper = server_second + 1 - sent
+            new_lower, new_upper = max(lower, sample_lower), min(upper, sample_upper)
+            if new_lower > new_upper:
+                # 与此前样本矛盾（服务器时钟跳变或负载均衡到不同后端），以新样本重新开始
+                self.reset_count += 1
+                new_lower, new_upper = sample_lower, sample_upper
+            lower, upper = new_lower, new_upper
+        if not math.isfinite(lower):
+            return None
+        return (lower + upper) / 2, (upper - lower) / 2
+
+
+class ServerClock:
+    """
+    服务器时钟偏差（线程安全）
+    offset 为 服务器时间 - 本地时间（秒）；error 为测量时的误差上界（秒），未同步时为 None，
+    current_error() 再加上测量之后可能的时钟漂移。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.offset = 0.0
+        self.error = None
+        self.synced_at = 0.0
+        self.sample_count = 0
+        self._refresh_url = None
+        self._refresh_thread = None
+        self._refresh_interval = DEFAULT_REFRESH_INTERVAL
+
+    @property
+    def synced(self):
+        return self.error is not None
+
+    def current_error(self):
+        if self.error is None:
+            return None
+        return self.error + max(0.0, time.time() - self.synced_at) * DRIFT_RATE
+
+    def update(self, offset, error, sample_count=1):
+        """
+        写入一次估计；比当前（含漂移老化后的）误差更大的估计不覆盖已有结果，
+        避免单样本的粗同步冲掉多样本的精确结果。返回是否采用。
+        """
+        with self._lock:
+            current = self.current_error()
+            if current is not None and error > current:
+                return False
+            self.offset = float(offset)
+            self.error = float(error)
+            self.synced_at = time.time()
+            self.sample_count = sample_count
+            return True
+
+    def now(self):
+        """当前服务器时间（Unix 秒）。"""
+        return time.time() + self.offset
+
+    def to_local(self, server_time):
+        """服务器时间对应的本地 time.time() 时刻。"""
+        return server_time - self.offset
+
+    def describe(self):
+        error = self.current_error()
+        if error is None:
+            return "未同步"
+        return f"{self.offset * 1000:+.0f}ms ±{error * 1000:.0f}ms"
+
+    def sync(self, url, session=None, timeout=(2, 3)):
+        """单次 HEAD 的快速同步（误差上界约 1 秒加半个往返时间），成功返回 True。"""
+        return self.refine(url, session=session, timeout=timeout, max_samples=1)
+
+    def refine(self, url, session=None, timeout=(2, 3), max_samples=DEFAULT_MAX_SAMPLES,
+               target_error=DEFAULT_TARGET_ERROR):
+        """
+        多样本精确同步（阻塞，通常需要数秒），成功得到估计返回 True
+        已有更精确的结果时保留原结果，仍返回 True。
+        """
+        estimator = ClockEstimator(
+            make_head_probe(url, session=session, timeout=timeout),
+            max_samples=max_samples, target_error=target_error,
+        )
+        result = estimator.estimate()
+        if result is None:
+            return False
+        offset, error = result
+        self.update(offset, error, sample_count=len(estimator.samples))
+        return True
+
+    def start_refresh(self, url, interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        在后台线程中立即做一次精确同步，此后每 interval 秒重新同步
+        进程内只运行一个刷新线程，重复调用只更新地址与周期。
+        """
+        with self._lock:
+            self._refresh_url = url
+            self._refresh_interval = float(interval)
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name='server-clock', daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                url, interval = self._refresh_url, self._refresh_interval
+            # 周期刷新时旧结果已老化，新的精确结果总能覆盖
+            self.refine(url)
+            time.sleep(interval)
+
+
+_shared_clock = ServerClock()
+
+
+def shared_server_clock():
+    """进程内共用的服务器时钟（登录线程同步，监控线程读取）。"""
+    return _shared_clock
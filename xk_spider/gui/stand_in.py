@@ -0,0 +1,602 @@
+"""
+本机选课系统模拟服务器
+按 xk.ynu.edu.cn 的接口协议（路径、参数、响应结构与 code/msg 约定）实现登录、课程查询、选课、退课与课表
+用到的全部接口，供压测、演练与回放对比使用，不访问教务系统。客户端设置环境变量
+XK_BASE_URL=http://127.0.0.1:端口/xsxkapp/sys/xsxkapp 后启动即连到模拟服务器（见 config.BASE_URL）。
+
+接口（相对 BASE_PATH）：
+- *default/index.do（GET 下发 JSESSIONID，HEAD 供时钟同步读取 Date 头）
+- student/4/vcode.do、student/vcode/image.do、student/check/login.do、student/xklcqr.do
+- student/{学号}.do（校区与当前轮次）、elective/batch.do
+- elective/recommendedCourse.do、programCourse.do、publicCourse.do（querySetting 表单）
+- elective/volunteer.do、deleteVolunteer.do、courseResult.do、teachingTime.do、noArranged.do
+
+可配置的行为：
+- ElectiveState: 课程目录与名额、名额变动（每 churn_interval 秒随机一个教学班空出或占满一个名额）、
+  会话有效期（session_ttl 秒后过期，按 expiry 返回 302 跳转或 {"code": "-1"}）、验证码错误率；
+- FaultPlan: 每个请求的延迟（固定 + 随机抖动，可按接口指定）与错误注入（HTTP 错误状态、
+  挂起到客户端超时、直接断开连接），可限定只对部分接口生效。
+随机数都由 seed 决定，同样的请求序列得到同样的结果。
+"""
+import json
+import random
+import re
+import secrets
+import struct
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from .config import API_ENDPOINT_MAP
+from .timeslots import check_time_conflict, mask_values, parse_time_slots
+
+
+BASE_PATH = '/xsxkapp/sys/xsxkapp'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_STUDENT = '20240000001'
+DEFAULT_BATCH = {'code': 'STANDIN-2026-1', 'name': '模拟选课轮次'}
+CAMPUS = {'02': '呈贡校区', '01': '东陆校区'}
+EXPIRY_MODES = ('302', 'code')
+LISTING_ENDPOINTS = frozenset(API_ENDPOINT_MAP.values())
+
+JSON_CONTENT_TYPE = 'application/json;charset=UTF-8'
+HTML_CONTENT_TYPE = 'text/html;charset=UTF-8'
+INDEX_PAGE = '<html><head><title>选课系统</title></head><body></body></html>'.encode('utf-8')
+
+_DAY_NAMES = '一二三四五六日'
+_STUDENT_PATH = re.compile(r'^/student/([^/]+)\.do$')
+_VCODE_PATH = re.compile(r'^/student/\d+/vcode\.do$')
+
+
+def _first_values(pairs):
+    fields = {}
+    for name, value in pairs:
+        fields.setdefault(name, value)
+    return fields
+
+
+def _json_field(fields, name):
+    """取 querySetting/addParam/deleteParam 等 JSON 参数的 data 部分；格式不对返回 None。"""
+    try:
+        value = json.loads(fields.get(name) or '')
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _week_name(mask):
+    """周次位掩码 → "1-8,10-18周"。"""
+    ranges = []
+    for week in mask_values(mask):
+        if ranges and ranges[-1][1] == week - 1:
+            ranges[-1][1] = week
+        else:
+            ranges.append([week, week])
+    return ','.join(f"{start}-{end}" if end != start else str(start) for start, end in ranges) + '周'
+
+
+def _captcha_png(width=80, height=30, seed=0):
+    """生成一张噪点 PNG（客户端只检查大小并交给 OCR，内容无需可读）。"""
+    rng = random.Random(seed)
+    rows = b''.join(
+        b'\x00' + bytes(rng.randrange(160, 256) for _ in range(width)) for _ in range(height)
+    )
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def generate_catalog(count=200, open_ratio=0.1, seed=0):
+    """
+    生成模拟课程目录：count 个教学班，分属五类课程，每门课程 1~4 个教学班
+    多数教学班初始满员，约 open_ratio 的教学班有 1~3 个空位。
+    """
+    rng = random.Random(seed)
+    type_codes = ('TJKC', 'FANKC', 'FAWKC', 'XGXK', 'TYKC')
+    catalog = []
+    course_index = 0
+    while len(catalog) < count:
+        course_index += 1
+        type_code = type_codes[course_index % len(type_codes)]
+        course_number = f"{type_code[:2]}{course_index:05d}"
+        for section in range(1, rng.randint(1, 4) + 1):
+            if len(catalog) >= count:
+                break
+            capacity = rng.choice((30, 40, 60, 90, 120))
+            free = rng.randint(1, 3) if rng.random() < open_ratio else 0
+            first, last = rng.choice(((1, 18), (1, 16), (1, 9), (10, 18)))
+            begin = rng.choice((1, 3, 5, 7, 9, 11))
+            catalog.append({
+                'teachingClassID': f"{course_number}{section:03d}",
+                'courseName': f"模拟课程{course_index}",
+                'courseNumber': course_number,
+                'teachingClassType': type_code,
+                'teacherName': f"教师{rng.randint(1, 80)}",
+                'classTime': f"{first}-{last}周 星期{_DAY_NAMES[rng.randint(0, 6)]} {begin}-{begin + 1}节",
+                'classroom': f"{rng.choice(('文汇楼', '格物楼', '明远楼', '体育馆'))}{rng.randint(1, 5)}{rng.randint(1, 20):02d}",
+                'classCapacity': capacity,
+                'numberOfFirstVolunteer': capacity - free,
+                'credit': rng.choice((1, 2, 3)),
+            })
+    return catalog
+
+
+class FaultPlan:
+    """
+    延迟与错误注入（每个请求独立抽样，线程安全）
+    - latency / jitter: 每个响应前固定等待 latency 秒，再加 [0, jitter) 的随机抖动；
+      endpoint_latency 可按接口名（如 'volunteer.do'）覆盖 latency；
+    - error_rate: 返回 error_status（HTTP 5xx 等）的比例；
+    - stall_rate: 挂起 stall 秒后才响应的比例（用于触发客户端超时）；
+    - reset_rate: 不响应直接断开连接的比例；
+    - endpoints: 只对这些接口注入错误，None 表示全部接口（延迟总是生效）。
+    """
+
+    def __init__(self, latency=0.02, jitter=0.0, endpoint_latency=None, error_rate=0.0,
+                 error_status=503, stall_rate=0.0, stall=10.0, reset_rate=0.0,
+                 endpoints=None, seed=None):
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.endpoint_latency = dict(endpoint_latency or {})
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.stall_rate = float(stall_rate)
+        self.stall = float(stall)
+        self.reset_rate = float(reset_rate)
+        self.endpoints = frozenset(endpoints) if endpoints else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint):
+        base = self.endpoint_latency.get(endpoint, self.latency)
+        if not self.jitter:
+            return base
+        with self._lock:
+            return base + self._rng.random() * self.jitter
+
+    def pick(self, endpoint):
+        """返回本次请求注入的故障：None / ('error', 状态码) / ('stall', 秒) / ('reset',)。"""
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return None
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.reset_rate:
+            return ('reset',)
+        roll -= self.reset_rate
+        if roll < self.error_rate:
+            return ('error', self.error_status)
+        roll -= self.error_rate
+        if roll < self.stall_rate:
+            return ('stall', self.stall)
+        return None
+
+
+class ElectiveState:
+    """
+    模拟选课系统的业务状态：课程目录、各学生已选课程、登录会话与名额变动
+    所有方法在 lock 内执行；时间取 clock()（默认 time.monotonic），名额变动在请求到达时按经过的时间补齐，
+    不需要后台线程。
+    """
+
+    def __init__(self, catalog=None, selected=None, student_code=DEFAULT_STUDENT,
+                 batch=None, campus='02', password=None, session_ttl=0.0, expiry='302',
+                 captcha_error_rate=0.0, churn_interval=0.0, seed=None, clock=time.monotonic):
+        if expiry not in EXPIRY_MODES:
+            raise ValueError(f"expiry 只能是 {EXPIRY_MODES}: {expiry!r}")
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.classes = {}
+        for item in (generate_catalog(seed=seed or 0) if catalog is None else catalog):
+            entry = dict(item)
+            entry['classCapacity'] = int(entry.get('classCapacity') or 0)
+            entry['numberOfFirstVolunteer'] = int(entry.get('numberOfFirstVolunteer') or 0)
+            self.classes[str(entry['teachingClassID'])] = entry
+        self.student_code = str(student_code)
+        self.batch = dict(batch or DEFAULT_BATCH)
+        self.campus = campus
+        self.password = password
+        self.session_ttl = float(session_ttl or 0)
+        self.expiry = expiry
+        self.captcha_error_rate = float(captcha_error_rate)
+        self.churn_interval = float(churn_interval or 0)
+        self.selected = {}         # 学号 -> [教学班ID, ...]（按选课顺序）
+        self.sessions = {}         # token -> {'student': 学号, 'expires': 时刻或 None}
+        self.vtokens = {}          # vtoken -> 签发时刻
+        self.counters = {}
+        self._rng = random.Random(seed)
+        self._next_churn = clock() + self.churn_interval if self.churn_interval > 0 else None
+        for tc_id in selected or ():
+            self._take(self.student_code, str(tc_id), count_seat=False)
+
+    # ---------- 会话 ----------
+    def issue_session(self, student_code=None):
+        """直接签发一个登录态（不走验证码流程），返回 token。"""
+        token = secrets.token_hex(16)
+        expires = self.clock() + self.session_ttl if self.session_ttl > 0 else None
+        self.sessions[token] = {'student': str(student_code or self.student_code), 'expires': expires}
+        return token
+
+    def session_student(self, token):
+        """token 对应的学号；未登录或已过期返回 None。"""
+        session = self.sessions.get(token or '')
+        if session is None:
+            return None
+        if session['expires'] is not None and self.clock() >= session['expires']:
+            del self.sessions[token]
+            self.count('session_expired')
+            return None
+        return session['student']
+
+    def expire_sessions(self):
+        """让所有登录态立即过期（模拟服务器踢下线）。"""
+        self.sessions.clear()
+
+    def new_vtoken(self):
+        vtoken = secrets.token_hex(8)
+        self.vtokens[vtoken] = self.clock()
+        return vtoken
+
+    def login(self, username, password, verify_code, vtoken):
+        """check/login.do 的业务判定，返回响应字典（code 1 成功 / 2 账号密码错误 / 3 验证码错误）。"""
+        if self.vtokens.pop(vtoken or '', None) is None:
+            return {'code': '3', 'msg': '验证码已失效，请刷新验证码'}
+        if len(verify_code or '') != 4 or self._rng.random() < self.captcha_error_rate:
+            self.count('captcha_error')
+            return {'code': '3', 'msg': '验证码错误'}
+        if not username or (self.password is not None and password != self.password):
+            return {'code': '2', 'msg': '用户名或密码错误'}
+        # 模拟一名学生：任何账号登录后都是 student_code
+        token = self.issue_session()
+        self.count('login')
+        return {'code': '1', 'msg': '登录成功', 'data': {
+            'token': token, 'number': self.student_code, 'name': '模拟学生',
+        }}
+
+    # ---------- 名额 ----------
+    def count(self, name):
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def advance(self):
+        """补齐到当前时刻为止应发生的名额变动：随机一个教学班，满员则空出一个名额，否则被别人占去一个。"""
+        if self._next_churn is None or not self.classes:
+            return
+        now = self.clock()
+        ids = None
+        while self._next_churn <= now:
+            self._next_churn += self.churn_interval
+            ids = ids or sorted(self.classes)
+            entry = self.classes[self._rng.choice(ids)]
+            if entry['numberOfFirstVolunteer'] >= entry['classCapacity']:
+                entry['numberOfFirstVolunteer'] -= 1
+                self.count('churn_release')
+            else:
+                entry['numberOfFirstVolunteer'] += 1
+                self.count('churn_take')
+
+    def _take(self, student, tc_id, count_seat=True):
+        chosen = self.selected.setdefault(student, [])
+        if tc_id not in chosen:
+            chosen.append(tc_id)
+            if count_seat:
+                self.classes[tc_id]['numberOfFirstVolunteer'] += 1
+
+    def _conflict_with(self, student, entry):
+        for tc_id in self.selected.get(student, ()):
+            other = self.classes.get(tc_id)
+            if other is not None and other is not entry and check_time_conflict(
+                entry.get('classTime', ''), other.get('classTime', '')
+            ):
+                return other
+        return None
+
+    # ---------- 接口 ----------
+    def listing(self, student, data, page_size, page_number):
+        """课程列表：按 teachingClassType 与 queryContent 过滤，按课程分组为 dataList[{..., tcList}]。"""
+        type_code = str(data.get('teachingClassType') or '')
+        query = str(data.get('queryContent') or '').strip()
+        chosen = set(self.selected.get(student, ()))
+        groups = {}
+        for tc_id, entry in self.classes.items():
+            if type_code and entry.get('teachingClassType') != type_code:
+                continue
+            if query and not any(query in str(entry.get(key, '')) for key in (
+                'courseNumber', 'courseName', 'teachingClassID', 'teacherName'
+            )):
+                continue
+            conflict = None if tc_id in chosen else self._conflict_with(student, entry)
+            capacity, taken = entry['classCapacity'], entry['numberOfFirstVolunteer']
+            groups.setdefault(entry['courseNumber'], {
+                'courseNumber': entry['courseNumber'],
+                'courseName': entry['courseName'],
+                'credit': str(entry.get('credit', '')),
+                'tcList': [],
+            })['tcList'].append({
+                'teachingClassID': tc_id,
+                'teacherName': entry.get('teacherName', ''),
+                'teachingPlace': f"{entry.get('classTime', '')} {entry.get('classroom', '')}".strip(),
+                'classCapacity': str(capacity),
+                'numberOfFirstVolunteer': str(taken),
+                'isFull': '1' if taken >= capacity else '0',
+                'isConflict': '1' if conflict is not None else '0',
+                'conflictDesc': f"与{conflict['courseName']}上课时间冲突" if conflict is not None else '',
+                'isChoose': '1' if tc_id in chosen else '0',
+            })
+        courses = [groups[number] for number in sorted(groups)]
+        start = page_number * page_size
+        return {
+            'code': '1', 'msg': '查询成功', 'totalCount': len(courses),
+            'dataList': courses[start:start + page_size],
+        }
+
+    def select(self, student, tc_id):
+        """volunteer.do 的业务判定，返回响应字典。"""
+        entry = self.classes.get(tc_id)
+        if entry is None:
+            return {'code': '0', 'msg': '教学班不存在'}
+        if tc_id in self.selected.get(student, ()):
+            return {'code': '0', 'msg': '该教学班已选，请勿重复选择'}
+        conflict = self._conflict_with(student, entry)
+        if conflict is not None:
+            return {'code': '0', 'msg': f"所选课程与已选课程【{conflict['courseName']}】上课时间冲突"}
+        if entry['numberOfFirstVolunteer'] >= entry['classCapacity']:
+            self.count('select_full')
+            return {'code': '0', 'msg': '该教学班人数已满，课程容量不足'}
+        self._take(student, tc_id)
+        self.count('select_ok')
+        return {'code': '1', 'msg': '选课成功'}
+
+    def delete(self, student, tc_id):
+        chosen = self.selected.get(student, [])
+        if tc_id not in chosen:
+            return {'code': '0', 'msg': '未选该教学班，无法退选'}
+        chosen.remove(tc_id)
+        entry = self.classes.get(tc_id)
+        if entry is not None:
+            entry['numberOfFirstVolunteer'] = max(0, entry['numberOfFirstVolunteer'] - 1)
+        self.count('delete_ok')
+        return {'code': '1', 'msg': '退选成功'}
+
+    def _selected_entries(self, student):
+        return [self.classes[tc_id] for tc_id in self.selected.get(student, ()) if tc_id in self.classes]
+
+    def course_result(self, student):
+        return {'code': '1', 'msg': '查询成功', 'dataList': [
+            {
+                'teachingClassID': entry['teachingClassID'],
+                'courseName': entry['courseName'],
+                'courseNumber': entry['courseNumber'],
+                'teachingClassType': entry.get('teachingClassType', ''),
+                'teacherName': entry.get('teacherName', ''),
+                'classTime': entry.get('classTime', ''),
+                'credit': str(entry.get('credit', '')),
+            }
+            for entry in self._selected_entries(student)
+        ]}
+
+    def teaching_time(self, student):
+        """已排课条目：每个教学班的每段上课时间一条（dayOfWeek / beginSection / endSection / weekName）。"""
+        items = []
+        for entry in self._selected_entries(student):
+            for day, weeks, periods in parse_time_slots(entry.get('classTime', '')):
+                sections = mask_values(periods)
+                items.append({
+                    'teachingClassID': entry['teachingClassID'],
+                    'courseName': entry['courseName'],
+                    'courseNumber': entry['courseNumber'],
+                    'teacherName': entry.get('teacherName', ''),
+                    'teachingPlace': entry.get('classroom', ''),
+                    'weekName': _week_name(weeks),
+                    'dayOfWeek': str(day),
+                    'beginSection': str(sections[0]),
+                    'endSection': str(sections[-1]),
+                })
+        return {'code': '1', 'msg': '查询成功', 'dataList': items}
+
+    def no_arranged(self, student):
+        return {'code': '1', 'msg': '查询成功', 'dataList': [
+            {
+                'teachingClassID': entry['teachingClassID'],
+                'courseName': entry['courseName'],
+                'courseNumber': entry['courseNumber'],
+                'teacherName': entry.get('teacherName', ''),
+            }
+            for entry in self._selected_entries(student)
+            if not parse_time_slots(entry.get('classTime', ''))
+        ]}
+
+    def student_info(self, student):
+        return {'code': '1', 'msg': '查询成功', 'data': {
+            'code': student, 'name': '模拟学生',
+            'campus': self.campus, 'campusName': CAMPUS.get(self.campus, self.campus),
+            'electiveBatch': {**self.batch, 'canSelect': '1'},
+        }}
+
+    def batches(self):
+        return {'code': '1', 'msg': '查询成功', 'dataList': [{**self.batch, 'canSelect': '1'}]}
+
+
+def _json(payload, headers=()):
+    return 200, json.dumps(payload, ensure_ascii=False).encode('utf-8'), JSON_CONTENT_TYPE, headers
+
+
+def make_handler(state, faults, base_path=BASE_PATH):
+    def expired():
+        if state.expiry == '302':
+            return 302, b'', HTML_CONTENT_TYPE, (('Location', f"{base_path}/*default/index.do"),)
+        return _json({'code': '-1', 'msg': '登录已过期，请重新登录'})
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # 响应头与响应体分两次写出，不关 Nagle 会叠加客户端的延迟确认
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def date_time_string(self, timestamp=None):
+            return formatdate(time.time() if timestamp is None else timestamp, usegmt=True)
+
+        def _send(self, status, body=b'', content_type=HTML_CONTENT_TYPE, headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def do_HEAD(self):
+            self._dispatch({})
+
+        def do_GET(self):
+            self._dispatch({})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length).decode('utf-8', errors='replace') if length else ''
+            self._dispatch(_first_values(parse_qsl(body, keep_blank_values=True)))
+
+        def _dispatch(self, form):
+            parts = urlsplit(self.path)
+            if not parts.path.startswith(base_path):
+                self._send(404)
+                return
+            path = parts.path[len(base_path):]
+            endpoint = path.rsplit('/', 1)[-1]
+            fields = _first_values(parse_qsl(parts.query, keep_blank_values=True))
+            fields.update(form)
+
+            fault = faults.pick(endpoint)
+            time.sleep(faults.delay(endpoint))
+            with state.lock:
+                state.count(f"hit:{endpoint}")
+                if fault is not None:
+                    state.count(f"fault:{fault[0]}")
+            if fault is not None:
+                if fault[0] == 'reset':
+                    self.close_connection = True
+                    return
+                if fault[0] == 'error':
+                    self._send(fault[1], b'<html><body>Service Unavailable</body></html>')
+                    return
+                time.sleep(fault[1])
+
+            # 响应在锁内生成，写出不持锁
+            with state.lock:
+                state.advance()
+                response = self._route(path, endpoint, fields)
+            self._send(*response)
+
+        def _route(self, path, endpoint, fields):
+            """返回 (状态码, 响应体, Content-Type, 额外响应头)。"""
+            if path == '/*default/index.do':
+                cookie = self.headers.get('Cookie') or ''
+                headers = () if 'JSESSIONID=' in cookie else (
+                    ('Set-Cookie', f"JSESSIONID={secrets.token_hex(16).upper()}; Path=/; HttpOnly"),
+                )
+                return 200, INDEX_PAGE, HTML_CONTENT_TYPE, headers
+            if _VCODE_PATH.match(path):
+                return _json({'code': '1', 'msg': '', 'data': {'token': state.new_vtoken()}})
+            if path == '/student/vcode/image.do':
+                seed = zlib.crc32(fields.get('vtoken', '').encode('utf-8'))
+                return 200, _captcha_png(seed=seed), 'image/png', ()
+            if path == '/student/check/login.do':
+                return _json(state.login(
+                    fields.get('loginName', ''), fields.get('loginPwd', ''),
+                    fields.get('verifyCode', ''), fields.get('vtoken', ''),
+                ))
+
+            student = state.session_student(self.headers.get('token'))
+            if student is None:
+                return expired()
+            if path == '/student/xklcqr.do':
+                return _json({'code': '1', 'msg': '确认成功'})
+            if _STUDENT_PATH.match(path):
+                return _json(state.student_info(student))
+            if path == '/elective/batch.do':
+                return _json(state.batches())
+            if path.startswith('/elective/') and endpoint in LISTING_ENDPOINTS:
+                setting = _json_field(fields, 'querySetting')
+                if setting is None or not isinstance(setting.get('data'), dict):
+                    return _json({'code': '0', 'msg': '查询参数错误'})
+                try:
+                    page_size = max(1, int(setting.get('pageSize') or 10))
+                    page_number = max(0, int(setting.get('pageNumber') or 0))
+                except (TypeError, ValueError):
+                    page_size, page_number = 10, 0
+                return _json(state.listing(student, setting['data'], page_size, page_number))
+            if path in ('/elective/volunteer.do', '/elective/deleteVolunteer.do'):
+                param = _json_field(fields, 'addParam' if endpoint == 'volunteer.do' else 'deleteParam')
+                data = param.get('data') if param else None
+                if not isinstance(data, dict) or not data.get('teachingClassId'):
+                    return _json({'code': '0', 'msg': '参数错误'})
+                action = state.select if endpoint == 'volunteer.do' else state.delete
+                return _json(action(student, str(data['teachingClassId'])))
+            if path == '/elective/courseResult.do':
+                return _json(state.course_result(student))
+            if path == '/elective/teachingTime.do':
+                return _json(state.teaching_time(student))
+            if path == '/elective/noArranged.do':
+                return _json(state.no_arranged(student))
+            return 404, b'', HTML_CONTENT_TYPE, ()
+
+    return Handler
+
+
+class StandInServer:
+    """
+    在后台线程中运行的模拟服务器
+        server = StandInServer(ElectiveState(...), FaultPlan(...)).start()
+        token = server.issue_session()    # 不走登录流程直接取得登录态
+        ... 客户端使用 server.base_url ...
+        server.stop()
+    """
+
+    def __init__(self, state=None, faults=None, host=DEFAULT_HOST, port=0):
+        self.state = state if state is not None else ElectiveState()
+        self.faults = faults if faults is not None else FaultPlan()
+        self.host = host
+        self.port = int(port)
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}{BASE_PATH}"
+
+    def start(self):
+        """绑定端口并在后台线程中服务，返回自身；端口被占用时抛出 OSError。"""
+        server = ThreadingHTTPServer((self.host, self.port), make_handler(self.state, self.faults))
+        server.daemon_threads = True
+        self._server = server
+        self.port = server.server_port
+        self._thread = threading.Thread(target=server.serve_forever, name='xk-stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def issue_session(self, student_code=None):
+        with self.state.lock:
+            return self.state.issue_session(student_code)
+
+    def stats(self):
+        """{计数名: 次数}：hit:接口、fault:类型、select_ok、churn_release 等。"""
+        with self.state.lock:
+            return dict(self.state.counters)
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
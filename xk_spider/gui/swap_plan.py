@@ -0,0 +1,181 @@
+"""
+换课计划与换课计时
+冲突课程在监控期间（通常还是满员时）就在后台定位好要退的旧课，连同退课 / 选课 /
+回滚请求模板一起准备好。名额出现时换课的关键路径只剩 退课 → 选课 → 核实，
+不再临时请求已选课程接口、做正则匹配。
+计划绑定已选课程状态的代次：任何选课/退课之后旧计划失效，由下一次轮询重新解析。
+SwapTimer 记录换课各步骤耗时与旧课空窗（退课发出到目标课核实选中或旧课抢回），
+有当前追踪时同时记为追踪片段（见 tracing.py）。
+"""
+import threading
+import time
+
+
+DEFAULT_PLAN_MAX_AGE = 30.0
+
+STEP_LABELS = {
+    'resolve': '定位',
+    'delete': '退课',
+    'settle': '等待生效',
+    'select': '选课',
+    'verify': '核实',
+    'rescue': '救援',
+}
+
+
+class SwapPlan:
+    __slots__ = ('tc_id', 'conflict', 'conflict_desc', 'generation', 'resolved_at')
+
+    def __init__(self, tc_id, conflict, conflict_desc, generation, resolved_at):
+        self.tc_id = tc_id
+        self.conflict = conflict          # {'id', 'name', 'type', ...}，与 _match_conflict_course 一致
+        self.conflict_desc = conflict_desc
+        self.generation = generation
+        self.resolved_at = resolved_at
+
+
+class SwapPlanBook:
+    """
+    各冲突课程的换课计划（线程安全）
+    get() 只返回代次一致、冲突说明未变化且未超过 max_age 的计划；
+    begin_refresh() / end_refresh() 保证同一课程同一时刻只有一个后台解析在进行。
+    """
+
+    def __init__(self, max_age=DEFAULT_PLAN_MAX_AGE, clock=time.monotonic):
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._refreshing = set()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def _valid(self, plan, generation, conflict_desc):
+        return (
+            plan is not None
+            and plan.generation == generation
+            and plan.conflict_desc == conflict_desc
+            and self._clock() - plan.resolved_at < self.max_age
+        )
+
+    def is_fresh(self, tc_id, generation, conflict_desc=''):
+        with self._lock:
+            return self._valid(self._plans.get(tc_id), generation, conflict_desc)
+
+    def get(self, tc_id, generation, conflict_desc=''):
+        """换课时取计划并计入命中/未命中，不可用时返回 None。"""
+        with self._lock:
+            plan = self._plans.get(tc_id)
+            if self._valid(plan, generation, conflict_desc):
+                self.hit_count += 1
+                return plan
+            self.miss_count += 1
+            return None
+
+    def store(self, tc_id, conflict, conflict_desc, generation):
+        """generation 为解析所用的已选课程查询发出前的代次。"""
+        plan = SwapPlan(tc_id, conflict, conflict_desc, generation, self._clock())
+        with self._lock:
+            self._plans[tc_id] = plan
+        return plan
+
+    def discard(self, tc_id):
+        with self._lock:
+            self._plans.pop(tc_id, None)
+
+    def begin_refresh(self, tc_id):
+        with self._lock:
+            if tc_id in self._refreshing:
+                return False
+            self._refreshing.add(tc_id)
+            return True
+
+    def end_refresh(self, tc_id):
+        with self._lock:
+            self._refreshing.discard(tc_id)
+
+
+class SwapTimer:
+    """一次换课的分步计时（毫秒）与旧课空窗；trace 不为 None 时各步骤另记为 swap.* 片段。"""
+
+    def __init__(self, clock=None, trace=None):
+        if clock is None:
+            clock = trace.clock if trace is not None else time.perf_counter
+        self._clock = clock
+        self._trace = trace
+        self._last = clock()
+        self.steps = []
+        self.window_started = None
+        self.window = None
+        self.plan_hit = False
+
+    def mark(self, step):
+        """记录从上一个标记到现在的耗时，归入 step。"""
+        now = self._clock()
+        self.steps.append((step, (now - self._last) * 1000))
+        if self._trace is not None:
+            self._trace.record(f"swap.{step}", self._last, now)
+        self._last = now
+
+    def open_window(self):
+        """旧课退课请求即将发出。"""
+        self.window_started = self._clock()
+
+    def close_window(self):
+        """目标课核实选中或旧课已抢回，旧课不再暴露。"""
+        if self.window_started is not None and self.window is None:
+            now = self._clock()
+            self.window = (now - self.window_started) * 1000
+            if self._trace is not None:
+                self._trace.record('exposure', self.window_started, now)
+
+    def cancel_window(self):
+        """退课失败，旧课未离开课表。"""
+        self.window_started = None
+
+    def describe(self):
+        parts = []
+        for step, elapsed in self.steps:
+            label = STEP_LABELS.get(step, step)
+            if step == 'resolve':
+                label += '(预解析)' if self.plan_hit else '(实时查询)'
+            parts.append(f"{label} {elapsed:.0f}ms")
+        text = ' '.join(parts) or '无'
+        if self.window_started is None:
+            return text
+        if self.window is None:
+            return f"{text}，旧课空窗未闭合"
+        return f"{text}，旧课空窗 {self.window:.0f}ms"
+
+
+class SwapStats:
+    """每个 Worker 的换课统计：计划命中与旧课空窗分布。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.swap_count = 0
+        self.windows = []
+        self.open_count = 0
+
+    def record(self, timer):
+        with self._lock:
+            self.swap_count += 1
+            if timer.window is not None:
+                self.windows.append(timer.window)
+            elif timer.window_started is not None:
+                self.open_count += 1
+
+    def summary(self):
+        with self._lock:
+            if not self.swap_count:
+                return ''
+            text = f"换课 {self.swap_count} 次"
+            if self.windows:
+                windows = sorted(self.windows)
+                text += (
+                    f", 旧课空窗 中位={windows[len(windows) // 2]:.0f}ms "
+                    f"最长={windows[-1]:.0f}ms"
+                )
+            if self.open_count:
+                text += f", 空窗未闭合 {self.open_count} 次"
+            return text
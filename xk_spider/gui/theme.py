@@ -200,7 +200,7 @@ def build_stylesheet(mode="light"):
         font-size: 12px;
         min-height: 18px;
     }}
-    QLineEdit, QComboBox, QSpinBox {{
+    QLineEdit, QComboBox, QSpinBox, QDateTimeEdit {{
         background-color: {c.SURFACE0};
         border: 1px solid {c.SURFACE2};
         border-radius: 13px;
@@ -247,14 +247,14 @@ def build_stylesheet(mode="light"):
     }}
     QToolButton#loginEyeButton:hover {{ background-color: {c.SURFACE1}; }}
     QToolButton#loginEyeButton:pressed {{ background-color: {c.SURFACE2}; }}
-    QLineEdit:hover, QComboBox:hover, QSpinBox:hover {{
+    QLineEdit:hover, QComboBox:hover, QSpinBox:hover, QDateTimeEdit:hover {{
         border-color: {c.OVERLAY0};
     }}
-    QLineEdit:focus, QComboBox:focus, QSpinBox:focus {{
+    QLineEdit:focus, QComboBox:focus, QSpinBox:focus, QDateTimeEdit:focus {{
         border: 2px solid {c.BLUE};
         padding: 8px 11px;
     }}
-    QLineEdit:disabled, QComboBox:disabled, QSpinBox:disabled {{
+    QLineEdit:disabled, QComboBox:disabled, QSpinBox:disabled, QDateTimeEdit:disabled {{
         background-color: {c.SURFACE1};
         color: {c.OVERLAY0};
     }}
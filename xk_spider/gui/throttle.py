@@ -0,0 +1,278 @@
+"""
+请求速率预算与准入模块
+令牌桶限制“每秒发出的请求数”，与限制“同时在途请求数”的并发槽互补：
+服务器响应很快时，N 个并发槽也不会把请求速率推到配置值以上。
+所有请求先扣全局桶，再扣所属接口类别的桶；类别预算只在配置了全局速率时启用。
+关键路径请求（选课、退课、核实）走优先通道：不在全局桶上排队，
+并发槽中预留专用名额且优先于轮询请求获得空闲槽位。
+"""
+import asyncio
+import collections
+import threading
+import time
+
+
+# 接口类别：余量轮询 / 选退课 / 已选核实 / 登录与重登 / 其它
+ENDPOINT_CLASSES = ('query', 'select', 'verify', 'login', 'other')
+
+# 各类别独立预算 (每秒请求数, 突发数)，None 表示只受全局预算约束；
+# 全局速率为 0（不限）时不启用，各类别同样不限速
+DEFAULT_CLASS_BUDGETS = {
+    'query': None,
+    'select': (5.0, 5),
+    'verify': (4.0, 4),
+    'login': (2.0, 4),
+    'other': (2.0, 2),
+}
+
+# 关键路径类别：发现余量后的选课/换课/救援/核实，时延直接决定能否抢到
+CRITICAL_CLASSES = frozenset({'select', 'verify'})
+
+_SELECT_ENDPOINTS = ('volunteer.do', 'deleteVolunteer.do')
+_VERIFY_ENDPOINTS = ('courseResult.do',)
+_LOGIN_ENDPOINTS = ('index.do', 'vcode.do', 'image.do', 'login.do')
+
+
+def classify_endpoint(url):
+    """按 URL 末段判断接口类别。"""
+    path = str(url or '').split('?', 1)[0].rstrip('/')
+    name = path.rsplit('/', 1)[-1]
+    if name in _SELECT_ENDPOINTS:
+        return 'select'
+    if name in _VERIFY_ENDPOINTS:
+        return 'verify'
+    if name in _LOGIN_ENDPOINTS:
+        return 'login'
+    if '/elective/' in path:
+        return 'query'
+    return 'other'
+
+
+def is_critical(endpoint_class):
+    return endpoint_class in CRITICAL_CLASSES
+
+
+class TokenBucket:
+    """
+    令牌桶（线程安全，预约式）
+    reserve() 立即扣除一个令牌并返回需要等待的秒数；令牌不足时余额为负，
+    表示前面已有请求在排队，后来者按顺序顺延。rate<=0 表示不限速。
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=None):
+        with self._lock:
+            self.rate = max(0.0, float(rate or 0))
+            self.burst = max(1.0, float(burst or self.rate or 1))
+            self._tokens = self.burst
+            self._updated = self._clock()
+
+    def reserve(self, now=None):
+        if self.rate <= 0:
+            return 0.0
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateMeter:
+    """滑动窗口实际速率统计（次/秒）。"""
+
+    def __init__(self, window=5.0, clock=time.monotonic):
+        self.window = float(window)
+        self._clock = clock
+        self._events = collections.deque()
+        self._lock = threading.Lock()
+        self._started = clock()
+
+    def mark(self, now=None):
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._events.append(now)
+            self._trim_locked(now)
+
+    def rate(self, now=None):
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._trim_locked(now)
+            span = min(self.window, max(now - self._started, 1e-3))
+            return len(self._events) / span
+
+    def _trim_locked(self, now):
+        cutoff = now - self.window
+        while self._events and self._events[0] < cutoff:
+            self._events.popleft()
+
+
+class RequestBudget:
+    """
+    全局 + 分类别请求预算
+    rate 为全局持续速率（次/秒，<=0 不限速），burst 为全局突发数；
+    配置了全局速率时按 DEFAULT_CLASS_BUDGETS 启用类别预算，class_budgets 覆盖其中的类别
+    （不限速时只启用 class_budgets 中显式给出的类别）。
+    """
+
+    def __init__(self, rate, burst=None, class_budgets=None, clock=time.monotonic):
+        self.rate = max(0.0, float(rate or 0))
+        self.burst = burst or self.rate
+        self._clock = clock
+        self._global = TokenBucket(self.rate, self.burst, clock=clock)
+        budgets = dict(DEFAULT_CLASS_BUDGETS) if self.rate > 0 else {}
+        budgets.update(class_budgets or {})
+        self._classes = {
+            name: TokenBucket(*budget, clock=clock)
+            for name, budget in budgets.items() if budget
+        }
+        self.meter = RateMeter(clock=clock)
+        self._class_counts = collections.Counter()
+        self._waited = 0.0
+        self._stats_lock = threading.Lock()
+
+    def reserve(self, endpoint_class):
+        """
+        为一次请求预约令牌，返回需要等待的秒数。
+        关键路径请求照常扣除全局令牌（计入总量、让后续轮询顺延），
+        但不在全局桶上等待，只受本类别预算约束。
+        """
+        now = self._clock()
+        delay = self._global.reserve(now)
+        if is_critical(endpoint_class):
+            delay = 0.0
+        bucket = self._classes.get(endpoint_class)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve(now))
+        with self._stats_lock:
+            self._class_counts[endpoint_class] += 1
+            self._waited += delay
+        return delay
+
+    def class_rate(self, endpoint_class):
+        """该类别的持续速率（次/秒），未启用类别预算时返回 None。"""
+        bucket = self._classes.get(endpoint_class)
+        return bucket.rate if bucket is not None and bucket.rate > 0 else None
+
+    def mark_sent(self):
+        self.meter.mark()
+
+    def achieved_rate(self):
+        return self.meter.rate()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._class_counts), self._waited
+
+
+class _AdmissionBase:
+    """
+    两级并发准入的公共逻辑
+    capacity 个槽位中预留 reserved 个只给关键请求；轮询请求只能使用其余槽位，
+    且有关键请求在等待时不与其争抢空闲槽位。
+    """
+
+    def __init__(self, capacity, reserved=1):
+        self.capacity = max(1, int(capacity))
+        self.reserved = max(0, min(int(reserved), self.capacity - 1))
+        self._in_use = 0
+        self._critical_waiting = 0
+        self.critical_count = 0
+        self.critical_wait_total = 0.0
+        self.critical_wait_max = 0.0
+
+    def _can_enter(self, critical):
+        if critical:
+            return self._in_use < self.capacity
+        return (
+            self._critical_waiting == 0
+            and self._in_use < self.capacity - self.reserved
+        )
+
+    def _record_critical_wait(self, waited):
+        self.critical_count += 1
+        self.critical_wait_total += waited
+        self.critical_wait_max = max(self.critical_wait_max, waited)
+
+    def stats(self):
+        """返回 (关键请求数, 平均排队秒数, 最长排队秒数)。"""
+        count = self.critical_count
+        average = self.critical_wait_total / count if count else 0.0
+        return count, average, self.critical_wait_max
+
+
+class PriorityAdmission(_AdmissionBase):
+    """线程版两级准入，用法与 BoundedSemaphore 相同。"""
+
+    def __init__(self, capacity, reserved=1):
+        super().__init__(capacity, reserved)
+        self._cond = threading.Condition()
+
+    def acquire(self, critical=False, timeout=None, cancelled=None):
+        """
+        获取槽位；cancelled 为可选回调，每 0.2 秒检查一次，返回 True 时放弃等待。
+        返回: 是否获得槽位
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            if critical:
+                self._critical_waiting += 1
+            try:
+                while not self._can_enter(critical):
+                    if cancelled is not None and cancelled():
+                        return False
+                    wait = 0.2
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                        if wait <= 0:
+                            return False
+                    self._cond.wait(wait)
+            finally:
+                if critical:
+                    self._critical_waiting -= 1
+                    # 关键请求离开等待队列后，被挡住的轮询请求可能可以进入
+                    self._cond.notify_all()
+            self._in_use += 1
+            if critical:
+                self._record_critical_wait(time.monotonic() - started)
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+
+
+class AsyncPriorityAdmission(_AdmissionBase):
+    """asyncio 版两级准入（仅在事件循环内使用）。"""
+
+    def __init__(self, capacity, reserved=1):
+        super().__init__(capacity, reserved)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, critical=False):
+        started = time.monotonic()
+        async with self._cond:
+            if critical:
+                self._critical_waiting += 1
+            try:
+                await self._cond.wait_for(lambda: self._can_enter(critical))
+            finally:
+                if critical:
+                    self._critical_waiting -= 1
+                    self._cond.notify_all()
+            self._in_use += 1
+            if critical:
+                self._record_critical_wait(time.monotonic() - started)
+
+    async def release(self):
+        async with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
@@ -0,0 +1,157 @@
+"""
+上课时间解析与冲突判断模块
+教务系统时间文本（如 "1-18周 星期二 5-6节"、"1-9周(单) 周一 第1-2节, 11-18周 周一 1-2节"）
+解析为紧凑的 (星期, 周次位掩码, 节次位掩码) 三元组：第 n 周 / 第 n 节对应第 n 位。
+正则只编译一次，解析结果按原字符串做 LRU 缓存；两段时间是否冲突只需几次整数与运算。
+工作线程与主窗口共用本模块。
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from .logger import get_logger
+
+
+# 没有周次信息时视为 1-18 周
+DEFAULT_WEEKS_MASK = sum(1 << week for week in range(1, 19))
+
+TimeSlot = namedtuple('TimeSlot', 'day weeks periods')
+
+_SEGMENT_SPLIT = re.compile(r'[,;，；/]')
+_WEEK_RANGE = re.compile(r'第?(\d+)-(\d+)周(?:\(([单双])\))?')
+_WEEK_SINGLE = re.compile(r'第?(\d+)周')
+_DAY = re.compile(r'(?:星期|周|礼拜)([一二三四五六日天1-7])')
+_PERIOD_RANGE = re.compile(r'第?(\d+)-(\d+)节')
+_PERIOD_ORDINAL = re.compile(r'第(\d+)节')
+_PERIOD_PLAIN = re.compile(r'(\d+)节')
+_PERIOD_LIST = re.compile(r'(\d+(?:,\d+)+)节')
+_WEEK_PART = re.compile(r'(\d+)(?:-(\d+))?(?:周)?(?:\(([单双])\))?')
+
+_DAY_MAP = {
+    '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7,
+    '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
+}
+
+
+def _range_mask(start, end, parity=None):
+    mask = 0
+    for value in range(start, end + 1):
+        if parity == '单' and value % 2 == 0:
+            continue
+        if parity == '双' and value % 2 == 1:
+            continue
+        mask |= 1 << value
+    return mask
+
+
+def _parse_segment(segment):
+    weeks = 0
+    match = _WEEK_RANGE.search(segment)
+    if match:
+        weeks = _range_mask(int(match.group(1)), int(match.group(2)), match.group(3))
+    else:
+        # 单周: "第5周" 或 "5周"
+        match = _WEEK_SINGLE.search(segment)
+        if match:
+            weeks = 1 << int(match.group(1))
+
+    match = _DAY.search(segment)
+    day = _DAY_MAP.get(match.group(1), 0) if match else 0
+
+    # 节次: "5-6节" / "第5-6节" / "第5节" / "5节" / "5,6节"
+    periods = 0
+    match = _PERIOD_RANGE.search(segment)
+    if match:
+        periods = _range_mask(int(match.group(1)), int(match.group(2)))
+    else:
+        singles = _PERIOD_ORDINAL.findall(segment)
+        if singles:
+            for period in singles:
+                periods |= 1 << int(period)
+        else:
+            for period in _PERIOD_PLAIN.findall(segment):
+                periods |= 1 << int(period)
+            match = _PERIOD_LIST.search(segment)
+            if match:
+                for period in match.group(1).split(','):
+                    if period.strip():
+                        periods |= 1 << int(period.strip())
+
+    if not (day and periods):
+        return None
+    # 没有周次信息时假设是全周
+    return TimeSlot(day, weeks or DEFAULT_WEEKS_MASK, periods)
+
+
+@lru_cache(maxsize=4096)
+def parse_time_slots(time_str):
+    """
+    解析时间文本为 TimeSlot 元组（结果按字符串缓存）
+    无法解析的片段被忽略；整段都无法解析时返回空元组。
+    """
+    if not time_str:
+        return ()
+    slots = []
+    for segment in _SEGMENT_SPLIT.split(str(time_str)):
+        segment = segment.strip()
+        if segment:
+            slot = _parse_segment(segment)
+            if slot is not None:
+                slots.append(slot)
+    if not slots:
+        get_logger().warning(f"时间解析失败: {time_str}")
+    return tuple(slots)
+
+
+@lru_cache(maxsize=512)
+def parse_weeks_mask(week_text):
+    """
+    解析周次文本（如课表接口的 weekName: "1-16周"、"1-8,10-17周(单)"）为周次位掩码
+    无法解析时返回 DEFAULT_WEEKS_MASK。
+    """
+    mask = 0
+    for match in _WEEK_PART.finditer(str(week_text or '')):
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        mask |= _range_mask(start, end, match.group(3))
+    return mask or DEFAULT_WEEKS_MASK
+
+
+def find_slot_conflict(slots1, slots2):
+    """返回第一处冲突 TimeSlot(星期, 共同周次掩码, 共同节次掩码)，无冲突返回 None。"""
+    for day, weeks, periods in slots1:
+        for other_day, other_weeks, other_periods in slots2:
+            if day != other_day:
+                continue
+            common_weeks = weeks & other_weeks
+            if not common_weeks:
+                continue
+            common_periods = periods & other_periods
+            if common_periods:
+                return TimeSlot(day, common_weeks, common_periods)
+    return None
+
+
+def slots_conflict(slots1, slots2):
+    return find_slot_conflict(slots1, slots2) is not None
+
+
+def check_time_conflict(time_str1, time_str2):
+    """两段时间文本是否冲突；任一无法解析时视为不冲突。"""
+    slots1 = parse_time_slots(time_str1)
+    if not slots1:
+        return False
+    slots2 = parse_time_slots(time_str2)
+    return bool(slots2) and find_slot_conflict(slots1, slots2) is not None
+
+
+def mask_values(mask):
+    """把位掩码还原为编号列表（用于日志）。"""
+    values = []
+    value = 0
+    while mask:
+        if mask & 1:
+            values.append(value)
+        mask >>= 1
+        value += 1
+    return values
@@ -0,0 +1,271 @@
+"""
+课表位图索引
+每个教学班的上课时间展开为 (7 天 × 节次 × 周次) 的位图，整份课程目录在拉取后
+一次性构建为 (教学班数, 7×节次) 的周次掩码矩阵；当前已选课程合成一张位图。
+目录中所有教学班的冲突状态由一次向量化的 按位与 + any 归约得出，已选集合变化时
+只需重算这一步，不再依赖课程列表接口返回时就可能过期的 isConflict/conflictDesc。
+未安装 NumPy 时退化为 Python 大整数位图，结果一致。
+"""
+from .timeslots import parse_time_slots, parse_weeks_mask
+
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+
+
+DAYS = 7
+PERIODS = 16   # 第 0-15 节（第 0 位不用）
+WEEKS = 32     # 第 0-31 周（第 0 位不用）
+
+_PERIOD_LIMIT = (1 << PERIODS) - 1
+_WEEK_LIMIT = (1 << WEEKS) - 1
+
+TIME_KEYS = ('SKSJ', 'classTime', 'teachingTime', 'time')
+
+
+def course_time_text(course):
+    for key in TIME_KEYS:
+        value = course.get(key)
+        if value:
+            return str(value)
+    return ''
+
+
+def _item_id(item):
+    return str(
+        item.get('teachingClassID') or item.get('JXBID') or item.get('tcId') or ''
+    )
+
+
+def _item_name(item):
+    return str(item.get('courseName') or item.get('KCM') or item.get('name') or '')
+
+
+def _item_slots(item):
+    """
+    已选课程条目的上课时间
+    - teachingTime.do 已排课条目: dayOfWeek / beginSection / endSection / weekName
+    - courseResult.do 等带时间文本的条目: 按 TIME_KEYS 解析
+    """
+    if item.get('dayOfWeek') not in (None, ''):
+        try:
+            day = int(item.get('dayOfWeek'))
+            begin = int(item.get('beginSection'))
+            end = int(item.get('endSection') or begin)
+        except (TypeError, ValueError):
+            return ()
+        if not (1 <= day <= DAYS) or begin <= 0 or end < begin:
+            return ()
+        periods = sum(1 << period for period in range(begin, end + 1))
+        return ((day, parse_weeks_mask(item.get('weekName')), periods),)
+    return parse_time_slots(course_time_text(item))
+
+
+def _slots_int(slots):
+    """无 NumPy 时的位图：第 ((星期-1)*PERIODS + 节次)*WEEKS + 周次 位。"""
+    bitmap = 0
+    for day, weeks, periods in slots:
+        if not 1 <= day <= DAYS:
+            continue
+        weeks &= _WEEK_LIMIT
+        periods &= _PERIOD_LIMIT
+        period = 0
+        while periods:
+            if periods & 1:
+                bitmap |= weeks << (((day - 1) * PERIODS + period) * WEEKS)
+            periods >>= 1
+            period += 1
+    return bitmap
+
+
+def _pack_slots(slot_lists):
+    """
+    把每行的 TimeSlot 列表打包为 (行数, DAYS*PERIODS) 的 uint32 矩阵
+    第 (星期-1)*PERIODS + 节次 列是该节次所在的周次位掩码，即按周次维压位的
+    (7 天 × 节次 × 周次) 位图。
+    """
+    rows, columns, week_masks = [], [], []
+    for row, slots in enumerate(slot_lists):
+        for day, weeks, periods in slots:
+            if not 1 <= day <= DAYS:
+                continue
+            weeks &= _WEEK_LIMIT
+            periods &= _PERIOD_LIMIT
+            base = (day - 1) * PERIODS
+            period = 0
+            while periods:
+                if periods & 1:
+                    rows.append(row)
+                    columns.append(base + period)
+                    week_masks.append(weeks)
+                periods >>= 1
+                period += 1
+    matrix = np.zeros((len(slot_lists), DAYS * PERIODS), dtype=np.uint32)
+    if rows:
+        # 同一教学班同一节次可能出现在多段时间里，按位或累积
+        np.bitwise_or.at(
+            matrix, (np.array(rows), np.array(columns)), np.array(week_masks, dtype=np.uint32)
+        )
+    return matrix
+
+
+class TimetableIndex:
+    """
+    课程目录的课表位图索引（只在主线程使用）
+    用法:
+        index = TimetableIndex(courses)        # 每次拉取到课程目录后构建一次
+        index.set_selected(curriculum_items)   # 已选课程变化时调用
+        index.annotate()                       # 写回各课程的 isConflict / conflictDesc
+    已选课程尚未加载（set_selected 未调用）时 annotate() 不改动课程，
+    保留接口返回的冲突标记。
+    """
+
+    def __init__(self, courses, use_numpy=None):
+        self._use_numpy = NUMPY_AVAILABLE if use_numpy is None else (use_numpy and NUMPY_AVAILABLE)
+        self._courses = [course for course in courses if isinstance(course, dict)]
+        self._ids = [str(course.get('JXBID', '') or '') for course in self._courses]
+        self._rows = {tc_id: row for row, tc_id in enumerate(self._ids) if tc_id}
+        slot_lists = [parse_time_slots(course_time_text(course)) for course in self._courses]
+        self._timed = [bool(slots) for slots in slot_lists]
+        if self._use_numpy:
+            self._bitmaps = _pack_slots(slot_lists)
+        else:
+            self._bitmaps = [_slots_int(slots) for slots in slot_lists]
+        self._selected_ids = []
+        self._selected_names = []
+        self._selected_bitmaps = None
+        self._selected_union = None
+        self._result = None
+
+    @classmethod
+    def from_grouped(cls, courses_grouped, use_numpy=None):
+        """由 CourseFetchWorker 的 {课程名: [教学班, ...]} 结果构建。"""
+        return cls(
+            [course for tc_list in (courses_grouped or {}).values() for course in tc_list or []],
+            use_numpy=use_numpy,
+        )
+
+    def __len__(self):
+        return len(self._courses)
+
+    def __contains__(self, tc_id):
+        return tc_id in self._rows
+
+    @property
+    def has_selected(self):
+        return self._selected_bitmaps is not None
+
+    # ---------- 已选课程 ----------
+    def set_selected(self, items):
+        """
+        设置当前已选课程（teachingTime.do 已排课条目或 courseResult.do 条目）
+        同一教学班的多条时间合并为一张位图。
+        """
+        merged = {}
+        for item in items or []:
+            tc_id = _item_id(item)
+            slots = _item_slots(item)
+            if not tc_id or not slots:
+                continue
+            entry = merged.setdefault(tc_id, [_item_name(item), []])
+            entry[1].extend(slots)
+        self._selected_ids = list(merged)
+        self._selected_names = [name for name, _ in merged.values()]
+        slot_lists = [slots for _, slots in merged.values()]
+        if self._use_numpy:
+            self._selected_bitmaps = _pack_slots(slot_lists)
+            self._selected_union = np.bitwise_or.reduce(self._selected_bitmaps, axis=0)
+        else:
+            self._selected_bitmaps = [_slots_int(slots) for slots in slot_lists]
+            self._selected_union = 0
+            for bitmap in self._selected_bitmaps:
+                self._selected_union |= bitmap
+        self._result = None
+
+    # ---------- 冲突计算 ----------
+    def conflicts(self):
+        """
+        返回 {教学班ID: [冲突的已选课程名, ...]}（只含有冲突的教学班）
+        教学班本身已选时不与自己比较；未设置已选课程时返回空字典。
+        """
+        if self._result is not None:
+            return self._result
+        result = {}
+        if not self.has_selected or not self._selected_ids:
+            self._result = result
+            return result
+        if self._use_numpy:
+            hit_rows = np.flatnonzero(
+                np.bitwise_and(self._bitmaps, self._selected_union).any(axis=1)
+            )
+            if hit_rows.size:
+                # 只对命中的行求与每门已选课程的交集，定位冲突对象
+                pair_rows, pair_selected = np.nonzero(np.bitwise_and(
+                    self._bitmaps[hit_rows][:, None, :], self._selected_bitmaps[None, :, :]
+                ).any(axis=2))
+                grouped = {}
+                for row, index in zip(hit_rows[pair_rows].tolist(), pair_selected.tolist()):
+                    grouped.setdefault(row, []).append(index)
+                for row, hits in grouped.items():
+                    self._collect(result, row, hits)
+        else:
+            union = self._selected_union
+            for row, bitmap in enumerate(self._bitmaps):
+                if bitmap & union:
+                    hits = [
+                        index for index, selected in enumerate(self._selected_bitmaps)
+                        if bitmap & selected
+                    ]
+                    self._collect(result, row, hits)
+        self._result = result
+        return result
+
+    def _collect(self, result, row, selected_indexes):
+        tc_id = self._ids[row]
+        names = []
+        for index in selected_indexes:
+            if self._selected_ids[index] == tc_id:
+                continue
+            name = self._selected_names[index] or self._selected_ids[index]
+            if name not in names:
+                names.append(name)
+        if names and tc_id:
+            result[tc_id] = names
+
+    def conflict_status(self, tc_id):
+        """
+        本地冲突状态: (是否冲突, 冲突说明)
+        教学班不在目录中、没有可解析的时间或已选课程未加载时返回 None。
+        """
+        row = self._rows.get(tc_id)
+        if row is None or not self._timed[row] or not self.has_selected:
+            return None
+        names = self.conflicts().get(tc_id)
+        if not names:
+            return False, ''
+        return True, f"与已选课程 {'、'.join(names)} 时间冲突"
+
+    def annotate(self, course=None):
+        """
+        用本地冲突状态覆盖课程的 isConflict / conflictDesc
+        course 为 None 时处理整份目录；接口原值保存在 serverConflict / serverConflictDesc。
+        返回冲突状态发生变化的课程数。
+        """
+        courses = self._courses if course is None else [course]
+        changed = 0
+        for item in courses:
+            status = self.conflict_status(str(item.get('JXBID', '') or ''))
+            if status is None:
+                continue
+            is_conflict, desc = status
+            if 'serverConflict' not in item:
+                item['serverConflict'] = item.get('isConflict', False)
+                item['serverConflictDesc'] = item.get('conflictDesc', '')
+            if bool(item.get('isConflict')) != is_conflict:
+                changed += 1
+            item['isConflict'] = is_conflict
+            item['conflictDesc'] = desc
+        return changed
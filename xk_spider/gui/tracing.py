@@ -0,0 +1,263 @@
+"""
+关键路径追踪模块
+一次“发现余量 → 选课 → 核实”（含换课与紧急救援）记为一条追踪，追踪从余量响应解析完成的时刻开始，
+各阶段记为带单调时钟时间戳的片段。每次监控会话写一个紧凑的 JSONL 文件
+（logs/trace_YYYY-MM-DD_HHMMSS.jsonl，首条追踪开始时才创建），每行一个片段：
+    {"tr": 追踪号, "sp": 片段名, "t": 起点, "d": 耗时, ...}
+t 为相对会话开始的毫秒数，同一文件内的片段可以直接排序、相减。片段名：
+- query / notify / verify: 余量查询、余量通知分发、选课后核实
+- volunteer.do 等接口名: 追踪期间发出的每个请求，t 为请求实际发出的时刻，q 为排队（预算与并发槽）耗时
+- swap.resolve / swap.delete / swap.select / swap.verify / swap.rescue: 换课各步骤（同 SwapTimer）
+- exposure: 旧课空窗（退课请求发出 → 目标课核实选中或旧课抢回）
+- rescue.check / rescue.select: 紧急救援的每次联合核实与抢回尝试
+追踪结束时另写一行 {"tr", "end": 结果, "t", "d"}，会话结束时写一行发现→选课的分位数汇总。
+
+当前追踪保存在 contextvars 中：线程引擎的各线程、asyncio 引擎的各任务互不干扰，
+请求层据此把请求记入当前追踪，不必逐层传参；没有追踪时每个请求只多一次 ContextVar 读取。
+"""
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from xk_spider.storage import LOG_DIR
+
+
+SELECT_ENDPOINT = 'volunteer.do'
+TRACE_FILE_PREFIX = 'trace'
+
+_current_trace = contextvars.ContextVar('xk_current_trace', default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def trace_span(name, **fields):
+    """当前追踪中的一个片段（with 块）；没有追踪时什么也不做。"""
+    trace = _current_trace.get()
+    if trace is None:
+        return nullcontext()
+    return trace.span(name, **fields)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _quantiles(values):
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    return {
+        'n': len(ordered),
+        'p50': _ms(rank(0.50)),
+        'p95': _ms(rank(0.95)),
+        'p99': _ms(rank(0.99)),
+        'max': _ms(ordered[-1]),
+    }
+
+
+class Trace:
+    """一条追踪；片段可以从任意线程记录（如对冲查询的线程池）。"""
+
+    __slots__ = (
+        'tracer', 'trace_id', 'kind', 'tc_id', 'started', 'outcome',
+        'select_sent', 'select_answered', 'exposure', '_finished',
+    )
+
+    def __init__(self, tracer, trace_id, kind, tc_id, started):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.kind = kind
+        self.tc_id = tc_id
+        self.started = started
+        self.outcome = None
+        self.select_sent = None
+        self.select_answered = None
+        self.exposure = None
+        self._finished = False
+
+    @property
+    def clock(self):
+        return self.tracer.clock
+
+    def record(self, name, begin, end, **fields):
+        if name == 'exposure':
+            self.exposure = end - begin
+        self.tracer._write({'tr': self.trace_id, 'sp': name, **self.tracer._times(begin, end), **fields})
+
+    @contextmanager
+    def span(self, name, **fields):
+        begin = self.tracer.clock()
+        try:
+            yield
+        finally:
+            self.record(name, begin, self.tracer.clock(), **fields)
+
+    def request(self, endpoint, queued, sent, answered, status):
+        """记录一次请求：sent 为实际发出的时刻（已取得并发槽），answered 为收到响应或失败的时刻。"""
+        if endpoint == SELECT_ENDPOINT and self.select_sent is None:
+            self.select_sent, self.select_answered = sent, answered
+        self.record(endpoint, sent, answered, q=_ms(sent - queued), st=status)
+
+    def set_outcome(self, outcome):
+        """记录追踪结果，先记录的为准（如紧急救援的结果不会被随后的“换课失败”覆盖）。"""
+        if self.outcome is None:
+            self.outcome = outcome
+
+    def detach(self):
+        """当前线程不再持有这条追踪（交给换课线程继续），返回自身。"""
+        if _current_trace.get() is self:
+            _current_trace.set(None)
+        return self
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        self.tracer._finish(self)
+
+
+class SessionTracer:
+    """
+    一次监控会话的追踪器
+    begin() 开始追踪并设为当前追踪；scope() 划定追踪的生命周期，退出时结束块内开始的追踪。
+    文件写入带缓冲，追踪结束时才刷新，关键路径上只有一次内存写入。
+    write=False 时只做分位数汇总，不写文件（如离线回放）。
+    """
+
+    def __init__(self, directory=None, engine='', clock=time.monotonic, write=True):
+        self.clock = clock
+        self.directory = str(directory or LOG_DIR)
+        self.engine = engine
+        self.path = None
+        self._origin = clock()
+        self._file = None
+        self._disabled = not write
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # {类型: {'detect_to_sent': [...], 'detect_to_answered': [...], 'exposure': [...]}}
+        self._results = {}
+
+    def _times(self, begin, end):
+        return {'t': _ms(begin - self._origin), 'd': _ms(end - begin)}
+
+    def _open(self):
+        if self._file is not None or self._disabled:
+            return self._file
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            now = datetime.now()
+            self.path = os.path.join(
+                self.directory, f"{TRACE_FILE_PREFIX}_{now.strftime('%Y-%m-%d_%H%M%S')}.jsonl"
+            )
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(self._dump({
+                'session': now.isoformat(timespec='seconds'), 'engine': self.engine, 'pid': os.getpid(),
+            }))
+        except OSError:
+            # 追踪写不进去不影响抢课
+            self._disabled = True
+            self._file = None
+        return self._file
+
+    @staticmethod
+    def _dump(record):
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _write(self, record, flush=False):
+        line = self._dump(record)
+        with self._lock:
+            handle = self._open()
+            if handle is None:
+                return
+            handle.write(line)
+            if flush:
+                handle.flush()
+
+    def begin(self, kind, tc_id, started=None):
+        """开始一条追踪并设为当前追踪；started 为发现余量的时刻（余量响应解析完成）。"""
+        with self._lock:
+            self._next_id += 1
+            trace_id = self._next_id
+        trace = Trace(self, trace_id, kind, tc_id, self.clock() if started is None else started)
+        self._write({'tr': trace_id, 'begin': kind, 'tc': tc_id, 't': _ms(trace.started - self._origin)})
+        _current_trace.set(trace)
+        return trace
+
+    @contextmanager
+    def scope(self, trace=None):
+        """在 with 块内以 trace 为当前追踪；退出时结束块内仍为当前的追踪（已 detach 的除外）。"""
+        token = _current_trace.set(trace)
+        try:
+            yield
+        finally:
+            active = _current_trace.get()
+            _current_trace.reset(token)
+            if active is not None:
+                active.finish()
+
+    def _finish(self, trace):
+        now = self.clock()
+        outcome = trace.outcome or 'no_result'
+        with self._lock:
+            results = self._results.setdefault(
+                trace.kind, {'detect_to_sent': [], 'detect_to_answered': [], 'exposure': []}
+            )
+            if trace.select_sent is not None:
+                results['detect_to_sent'].append(trace.select_sent - trace.started)
+                results['detect_to_answered'].append(trace.select_answered - trace.started)
+            if trace.exposure is not None:
+                results['exposure'].append(trace.exposure)
+        self._write(
+            {'tr': trace.trace_id, 'end': outcome, **self._times(trace.started, now)}, flush=True
+        )
+
+    def summary_dict(self):
+        """{类型: {名称: {'n', 'p50', 'p95', 'p99', 'max'}}}，时间单位为毫秒。"""
+        with self._lock:
+            results = {kind: {name: list(values) for name, values in series.items()}
+                       for kind, series in self._results.items()}
+        return {
+            kind: {name: _quantiles(values) for name, values in series.items() if values}
+            for kind, series in sorted(results.items())
+        }
+
+    def summary(self):
+        """日志用的一行汇总，没有追踪返回空串。"""
+        labels = {
+            'detect_to_sent': '发现→选课发出',
+            'detect_to_answered': '发现→选课返回',
+            'exposure': '旧课空窗',
+        }
+        kinds = {'grab': '抢课', 'swap': '换课'}
+        parts = []
+        for kind, series in self.summary_dict().items():
+            items = [
+                f"{labels[name]} p50/p95/p99={stats['p50']:.0f}/{stats['p95']:.0f}/"
+                f"{stats['p99']:.0f}ms(n={stats['n']})"
+                for name, stats in series.items()
+            ]
+            parts.append(f"{kinds.get(kind, kind)} " + (', '.join(items) or '未发出选课'))
+        return '; '.join(parts)
+
+    def close(self):
+        """写入分位数汇总并关闭文件。"""
+        summary = self.summary_dict()
+        with self._lock:
+            handle, self._file = self._file, None
+            self._disabled = True
+        if handle is None:
+            return
+        try:
+            handle.write(self._dump({'summary': summary}))
+            handle.close()
+        except OSError:
+            pass
@@ -0,0 +1,305 @@
+"""
+HTTP 传输后端
+线程引擎的预构造请求（余量列表、选课、退课、已选核实）与一般请求经由可替换的传输后端发出，
+config.json 中 "http_transport" 选择：
+- "requests"（默认）：各线程自己的 requests.Session，行为与以往一致；
+- "urllib3"：直接在共享连接池上 urlopen，跳过 Session 的 Cookie/钩子/重定向处理与
+  Response 构造，每次请求的 Python 开销更小，连接仍由 ConnectionWarmer 保温；
+- "http2"：httpx 的 HTTP/2 客户端，所有轮询在同一条连接上多路并发（需要安装 h2）。
+登录、自动重登等依赖 Cookie 与重定向处理的流程始终使用 requests。
+三种后端的异常统一映射为 requests 的异常类型，调用方的错误处理不变。
+"""
+import asyncio
+import json
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    NewConnectionError,
+    ProtocolError,
+    ReadTimeoutError,
+    ResponseError,
+    SSLError,
+)
+from urllib3.util import Timeout
+
+from .request_templates import environment_send_options
+
+HTTP2_AVAILABLE = False
+_http2_import_error = ''
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except Exception as error:
+    httpx = None
+    _http2_import_error = f"{type(error).__name__}: {error}"
+
+
+TRANSPORT_NAMES = ('requests', 'urllib3', 'http2')
+DEFAULT_TRANSPORT = 'requests'
+
+# HTTP/2 禁止的逐跳请求头（requests 默认头里带有 Connection: keep-alive）
+_HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade', 'host',
+})
+
+
+def get_http2_error():
+    return _http2_import_error
+
+
+def normalize_transport_name(name):
+    name = str(name or DEFAULT_TRANSPORT).strip().lower()
+    return name if name in TRANSPORT_NAMES else DEFAULT_TRANSPORT
+
+
+def _split_timeout(timeout):
+    """requests 风格的 timeout（秒数或 (连接, 读取)）拆成 (连接, 读取)。"""
+    if isinstance(timeout, (tuple, list)):
+        return timeout[0], timeout[1]
+    return timeout, timeout
+
+
+class TransportResponse:
+    """非 requests 后端的响应：提供热路径用到的 requests.Response 属性。"""
+
+    __slots__ = ('status_code', 'headers', 'content', 'url', 'history')
+
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.history = ()
+
+    @property
+    def text(self):
+        content_type = str(self.headers.get('Content-Type', ''))
+        encoding = 'utf-8'
+        if 'charset=' in content_type:
+            encoding = content_type.split('charset=', 1)[1].split(';', 1)[0].strip() or encoding
+        try:
+            return self.content.decode(encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RequestsTransport:
+    """默认后端：当前线程的 requests.Session。"""
+
+    name = 'requests'
+
+    def __init__(self, session_getter):
+        self._session_getter = session_getter
+
+    def send_template(self, template, **kwargs):
+        return template.send(self._session_getter(), **kwargs)
+
+    def request(self, method, url, **kwargs):
+        return self._session_getter().request(method, url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class _PreparedTransport:
+    """非 requests 后端的公共部分：一般请求先用 requests 编码成 PreparedRequest 再发送。"""
+
+    def __init__(self, base_headers, fallback):
+        self._base_headers = dict(base_headers or {})
+        self._fallback = fallback
+
+    def send_template(self, template, timeout=None, allow_redirects=False, **kwargs):
+        options = template.send_options
+        if options.get('proxies') or allow_redirects:
+            # 配置了代理或需要跟随重定向时交给 requests 处理
+            return self._fallback.send_template(
+                template, timeout=timeout, allow_redirects=allow_redirects, **kwargs
+            )
+        return self._send(template.method, template.url(), template.headers, template.body,
+                          timeout, options.get('verify', True))
+
+    def request(self, method, url, headers=None, params=None, data=None, timeout=None,
+                allow_redirects=True, **kwargs):
+        merged = dict(self._base_headers)
+        merged.update(headers or {})
+        prepared = requests.Request(
+            method, url, headers=merged, params=params, data=data
+        ).prepare()
+        options = environment_send_options(prepared.url)
+        if options.get('proxies') or (allow_redirects and method.upper() != 'HEAD') or kwargs:
+            return self._fallback.request(
+                method, url, headers=headers, params=params, data=data, timeout=timeout,
+                allow_redirects=allow_redirects, **kwargs
+            )
+        return self._send(prepared.method, prepared.url, dict(prepared.headers), prepared.body,
+                          timeout, options.get('verify', True))
+
+    def _send(self, method, url, headers, body, timeout, verify):
+        raise NotImplementedError
+
+
+class Urllib3Transport(_PreparedTransport):
+    """
+    在共享连接池上直接 urlopen
+    连接池按 HTTPAdapter.send 相同的方式取得并设置证书校验，与 requests 后端共用同一个池。
+    """
+
+    name = 'urllib3'
+
+    def __init__(self, adapter, base_headers, fallback, retries=None):
+        super().__init__(base_headers, fallback)
+        self._adapter = adapter
+        self._retries = retries
+
+    def _pool_for(self, url, verify):
+        get_connection = getattr(self._adapter, 'get_connection_with_tls_context', None)
+        if get_connection is not None:
+            pool = get_connection(_PoolRequest(url), verify)
+        else:
+            pool = self._adapter.get_connection(url)
+        self._adapter.cert_verify(pool, url, verify, None)
+        return pool
+
+    def _send(self, method, url, headers, body, timeout, verify):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        connect, read = _split_timeout(timeout)
+        try:
+            raw = self._pool_for(url, verify).urlopen(
+                method, path, body=body, headers=headers,
+                retries=self._retries if self._retries is not None else False,
+                redirect=False, assert_same_host=False,
+                preload_content=True, decode_content=True,
+                timeout=Timeout(connect=connect, read=read),
+            )
+        except Exception as e:
+            raise _map_urllib3_error(e) from e
+        return TransportResponse(raw.status, raw.headers, raw.data, url)
+
+    def close(self):
+        pass
+
+
+class _PoolRequest:
+    """HTTPAdapter.get_connection_with_tls_context 只读取 request.url。"""
+
+    __slots__ = ('url',)
+
+    def __init__(self, url):
+        self.url = url
+
+
+def _map_urllib3_error(error):
+    """与 HTTPAdapter.send 相同地把 urllib3 异常换成 requests 异常。"""
+    reason = error.reason if isinstance(error, MaxRetryError) else error
+    if isinstance(reason, NewConnectionError):
+        # urllib3 2.x 中 NewConnectionError 是 ConnectTimeoutError 的子类
+        return requests.exceptions.ConnectionError(str(reason))
+    if isinstance(reason, ConnectTimeoutError):
+        return requests.exceptions.ConnectTimeout(str(reason))
+    if isinstance(reason, ReadTimeoutError):
+        return requests.exceptions.ReadTimeout(str(reason))
+    if isinstance(reason, SSLError):
+        return requests.exceptions.SSLError(str(reason))
+    if isinstance(reason, ResponseError):
+        return requests.exceptions.RetryError(str(reason))
+    if isinstance(reason, (ProtocolError, MaxRetryError)):
+        return requests.exceptions.ConnectionError(str(reason))
+    return requests.exceptions.RequestException(f"{type(reason).__name__}: {reason}")
+
+
+class Http2Transport(_PreparedTransport):
+    """
+    HTTP/2 多路复用（httpx 异步客户端）
+    httpcore 的同步 HTTP/2 连接被多个线程同时使用时可能乱序发出流 ID（服务器随即断开连接），
+    所以客户端运行在专用的事件循环线程上，各线程提交请求并等待结果；
+    max_connections=1，所有请求作为并发流复用同一条连接。
+    明文 http:// 地址按 HTTP/2 先验知识（h2c）直连，仅用于本机模拟服务器。
+    """
+
+    name = 'http2'
+
+    def __init__(self, base_headers, fallback, base_url, keepalive_expiry=None):
+        super().__init__(base_headers, fallback)
+        verify = environment_send_options(base_url).get('verify', True)
+        if isinstance(verify, str):
+            verify = ssl.create_default_context(cafile=verify)
+        cleartext = urlsplit(base_url).scheme == 'http'
+        self._client = httpx.AsyncClient(
+            http1=not cleartext,
+            http2=True,
+            verify=verify,
+            trust_env=False,
+            follow_redirects=False,
+            limits=httpx.Limits(
+                max_connections=1, max_keepalive_connections=1,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='http2-transport', daemon=True
+        )
+        self._thread.start()
+
+    def _send(self, method, url, headers, body, timeout, verify):
+        connect, read = _split_timeout(timeout)
+        headers = {
+            key: value for key, value in headers.items()
+            if key.lower() not in _HOP_BY_HOP_HEADERS
+        }
+        future = asyncio.run_coroutine_threadsafe(
+            self._client.request(
+                method, url, headers=headers, content=body,
+                timeout=httpx.Timeout(read, connect=connect),
+            ),
+            self._loop,
+        )
+        try:
+            resp = future.result()
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return TransportResponse(resp.status_code, resp.headers, resp.content, url)
+
+    def close(self):
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=2)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+
+
+def create_transport(name, session_getter, adapter=None, base_headers=None,
+                     base_url='', retries=None, keepalive_expiry=None):
+    """
+    按名称创建传输后端
+    返回 (transport, warning)；所选后端不可用时退回 requests 并在 warning 中说明原因。
+    """
+    fallback = RequestsTransport(session_getter)
+    name = normalize_transport_name(name)
+    if name == 'urllib3' and adapter is not None:
+        return Urllib3Transport(adapter, base_headers, fallback, retries=retries), ''
+    if name == 'http2':
+        if not HTTP2_AVAILABLE:
+            return fallback, f"HTTP/2 传输不可用（{get_http2_error()}），已改用 requests"
+        return Http2Transport(base_headers, fallback, base_url, keepalive_expiry=keepalive_expiry), ''
+    return fallback, ''
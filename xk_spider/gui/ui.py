@@ -6,6 +6,7 @@ import os
 import time
 import sys
 import subprocess
+import html
 import json
 import re
 import math
@@ -15,13 +16,14 @@ from PyQt5.QtWidgets import (
     QPushButton, QLabel, QLineEdit, QComboBox, QListWidget, QListWidgetItem,
     QTextEdit, QProgressBar, QMessageBox, QFrame, QGridLayout, QSizePolicy,
     QSpinBox, QAbstractSpinBox, QScrollArea, QCheckBox, QSplitter, QApplication, QMenu,
+    QDateTimeEdit,
     QGraphicsOpacityEffect, QAction,
     QDialog, QDialogButtonBox, QProgressDialog, QStackedWidget, QToolButton,
     QStyledItemDelegate, QStyleOptionViewItem, QStyle, QAbstractItemView,
     QAbstractButton
 )
 from PyQt5.QtCore import (
-    Qt, QTimer, pyqtSignal, QUrl, QSize, QPoint, QRect, QRectF, QEvent,
+    Qt, QTimer, pyqtSignal, QUrl, QSize, QPoint, QRect, QRectF, QEvent, QDateTime,
     QPersistentModelIndex,
     QPropertyAnimation, QParallelAnimationGroup, QVariantAnimation, QEasingCurve,
 )
@@ -36,6 +38,10 @@ from .workers import (
     SelectedCoursesWorker, WithdrawCourseWorker,
     UpdateCheckWorker, DownloadUpdateWorker,
 )
+from .async_engine import ASYNC_ENGINE_AVAILABLE, AsyncGrabWorker, get_async_engine_error
+from .transports import HTTP2_AVAILABLE, get_http2_error, normalize_transport_name
+from .timetable_index import TimetableIndex
+from .conflict_graph import ConflictGraph
 from .logger import get_logger
 from .utils import (
     default_webhook_config, make_legacy_feedback_channel,
@@ -747,6 +753,14 @@ class InlineSpinBox(QFrame):
     def value(self):
         return self._spin_box.value()
 
+    def setSpecialValueText(self, text):
+        """最小值显示为说明文字（例如 0 显示为“不限”）。"""
+        self._spin_box.setSpecialValueText(text)
+
+    def setStepToolTips(self, minus_tip, plus_tip):
+        self._minus_button.setToolTip(minus_tip)
+        self._plus_button.setToolTip(plus_tip)
+
     def _update_button_states(self, value):
         self._minus_button.setEnabled(value > self._spin_box.minimum())
         self._plus_button.setEnabled(value < self._spin_box.maximum())
@@ -939,6 +953,8 @@ class MainWindow(QMainWindow):
     VERSION = "v2.6.0"
     GITHUB_URL = "https://github.com/YHalo-wyh/YNU-xk_spider-Pro"
     RELEASES_URL = f"{GITHUB_URL}/releases"
+    # 请求统计面板最多显示的接口数（按请求次数排序）
+    REQUEST_STATS_ROWS = 4
     
     def __init__(self):
         super().__init__()
@@ -951,6 +967,8 @@ class MainWindow(QMainWindow):
         self.cookies = ''
         self.multi_grab_worker = None
         self._api_courses_grouped = {}
+        self._timetable_index = None
+        self._pending_conflict_graph = ConflictGraph()
         self._pending_monitor_courses = []
         self._is_searching = False
         self._current_search_keyword = ''
@@ -978,6 +996,13 @@ class MainWindow(QMainWindow):
         self.developer_mode_enabled = False
         self.feedback_url = ''
         self.developer_webhooks = []
+
+        # 监控引擎：'thread'（默认，线程池调度）或 'asyncio'（需要 httpx）
+        self.monitor_engine = 'thread'
+        # HTTP 传输后端：'requests'（默认）、'urllib3' 或 'http2'（需要 h2）
+        self.http_transport = 'requests'
+        self.metrics_port = 0  # 本机 OpenMetrics 端点端口，0 表示关闭
+        self.record_session = False  # 录制监控会话供离线回放（logs/session_*.jsonl.gz）
         
         # 日志系统
         self._logger = get_logger()
@@ -1009,6 +1034,7 @@ class MainWindow(QMainWindow):
         self._responsive_timer.setSingleShot(True)
         self._responsive_timer.setInterval(90)
         self._responsive_timer.timeout.connect(self._apply_responsive_layout)
+        self.curriculum_updated.connect(self._on_selected_timetable_changed)
         
         self.init_ui()
         self.init_menu()
@@ -1341,6 +1367,9 @@ class MainWindow(QMainWindow):
         self.grab_list.model().rowsRemoved.connect(
             lambda *_args: QTimer.singleShot(0, self._update_grab_list_height)
         )
+        # 所有增删待抢课程的路径（添加、移除、恢复、抢到、自动停止）都经过列表模型
+        self.grab_list.model().rowsInserted.connect(self._on_grab_rows_inserted)
+        self.grab_list.model().rowsAboutToBeRemoved.connect(self._on_grab_rows_removed)
         self.grab_list.remove_requested.connect(self._remove_grab_item)
         right_layout.addWidget(self.grab_list)
         self.grab_count_label = QLabel("待抢 0 门")
@@ -1349,8 +1378,10 @@ class MainWindow(QMainWindow):
 
         concurrency_frame = QFrame()
         concurrency_frame.setObjectName("softCard")
-        concurrency_layout = QHBoxLayout(concurrency_frame)
-        concurrency_layout.setContentsMargins(12, 8, 10, 8)
+        concurrency_frame_layout = QVBoxLayout(concurrency_frame)
+        concurrency_frame_layout.setContentsMargins(12, 8, 10, 8)
+        concurrency_frame_layout.setSpacing(6)
+        concurrency_layout = QHBoxLayout()
         concurrency_label = QLabel("HTTP 并发数")
         concurrency_label.setObjectName("fieldLabel")
         concurrency_layout.addWidget(concurrency_label)
@@ -1361,8 +1392,100 @@ class MainWindow(QMainWindow):
         self.concurrency_spin.setFixedSize(116, 38)
         self.concurrency_spin.setToolTip("同时进行的网络请求数量，建议 3 到 10")
         concurrency_layout.addWidget(self.concurrency_spin)
+        concurrency_frame_layout.addLayout(concurrency_layout)
+
+        rate_layout = QHBoxLayout()
+        rate_label = QLabel("请求速率 次/秒")
+        rate_label.setObjectName("fieldLabel")
+        rate_layout.addWidget(rate_label)
+        rate_layout.addStretch()
+        self.request_rate_spin = InlineSpinBox()
+        self.request_rate_spin.setRange(0, 50)
+        self.request_rate_spin.setValue(0)
+        self.request_rate_spin.setSpecialValueText("不限")
+        self.request_rate_spin.setFixedSize(116, 38)
+        self.request_rate_spin.setToolTip(
+            "每秒最多发出的请求数（令牌桶持续速率），0 表示不限速\n"
+            "设置后选退课、已选核实、登录等请求另有各自的每秒上限"
+        )
+        self.request_rate_spin.setStepToolTips("降低速率", "提高速率")
+        rate_layout.addWidget(self.request_rate_spin)
+        concurrency_frame_layout.addLayout(rate_layout)
+
+        burst_layout = QHBoxLayout()
+        burst_label = QLabel("突发请求数")
+        burst_label.setObjectName("fieldLabel")
+        burst_layout.addWidget(burst_label)
+        burst_layout.addStretch()
+        self.request_burst_spin = InlineSpinBox()
+        self.request_burst_spin.setRange(0, 50)
+        self.request_burst_spin.setValue(0)
+        self.request_burst_spin.setSpecialValueText("同速率")
+        self.request_burst_spin.setFixedSize(116, 38)
+        self.request_burst_spin.setToolTip("令牌桶容量：空闲后允许瞬间连发的请求数，0 表示与速率相同")
+        self.request_burst_spin.setStepToolTips("减少突发数", "增加突发数")
+        burst_layout.addWidget(self.request_burst_spin)
+        concurrency_frame_layout.addLayout(burst_layout)
+
+        opening_layout = QHBoxLayout()
+        self.opening_burst_checkbox = QCheckBox("定时开抢")
+        self.opening_burst_checkbox.setToolTip(
+            "到选课开放时刻（按服务器时间对齐）集中连发选课，持续设定秒数后回到正常监控"
+        )
+        opening_layout.addWidget(self.opening_burst_checkbox)
+        opening_layout.addStretch()
+        self.opening_time_edit = QDateTimeEdit()
+        self.opening_time_edit.setDisplayFormat("MM-dd HH:mm:ss")
+        self.opening_time_edit.setDateTime(self._default_opening_time())
+        self.opening_time_edit.setFixedSize(150, 38)
+        self.opening_time_edit.setToolTip("选课开放时刻（服务器时间）")
+        self.opening_time_edit.setEnabled(False)
+        opening_layout.addWidget(self.opening_time_edit)
+        concurrency_frame_layout.addLayout(opening_layout)
+
+        opening_window_layout = QHBoxLayout()
+        opening_window_label = QLabel("开抢持续 秒")
+        opening_window_label.setObjectName("fieldLabel")
+        opening_window_layout.addWidget(opening_window_label)
+        opening_window_layout.addStretch()
+        self.opening_window_spin = InlineSpinBox()
+        self.opening_window_spin.setRange(1, 30)
+        self.opening_window_spin.setValue(5)
+        self.opening_window_spin.setFixedSize(116, 38)
+        self.opening_window_spin.setToolTip("开放时刻起集中连发选课的时长，之后回到正常监控")
+        self.opening_window_spin.setStepToolTips("缩短", "延长")
+        self.opening_window_spin.setEnabled(False)
+        opening_window_layout.addWidget(self.opening_window_spin)
+        concurrency_frame_layout.addLayout(opening_window_layout)
+        self.opening_burst_checkbox.toggled.connect(self.opening_time_edit.setEnabled)
+        self.opening_burst_checkbox.toggled.connect(self.opening_window_spin.setEnabled)
+
+        self.request_rate_label = QLabel("实际 — / 配置 不限")
+        self.request_rate_label.setObjectName("mutedLabel")
+        self.request_rate_label.setToolTip("最近 5 秒实际发出的请求速率与配置的速率上限")
+        concurrency_frame_layout.addWidget(self.request_rate_label)
+        self.request_rate_spin.valueChanged.connect(lambda _value: self._reset_request_rate_label())
         right_layout.addWidget(concurrency_frame)
 
+        request_stats_frame = QFrame()
+        request_stats_frame.setObjectName("softCard")
+        request_stats_layout = QVBoxLayout(request_stats_frame)
+        request_stats_layout.setContentsMargins(12, 8, 10, 8)
+        request_stats_layout.setSpacing(4)
+        request_stats_title = QLabel("请求统计 · 最近 10 秒")
+        request_stats_title.setObjectName("fieldLabel")
+        request_stats_layout.addWidget(request_stats_title)
+        self.request_stats_label = QLabel()
+        self.request_stats_label.setObjectName("mutedLabel")
+        self.request_stats_label.setStyleSheet("font-size: 12px;")
+        self.request_stats_label.setTextFormat(Qt.RichText)
+        self.request_stats_label.setToolTip(
+            "各接口请求耗时的 p50/p95/p99（毫秒）与请求速率；并发槽等待为请求排队等待空闲并发槽的时间"
+        )
+        request_stats_layout.addWidget(self.request_stats_label)
+        self._reset_request_stats_panel()
+        right_layout.addWidget(request_stats_frame)
+
         buttons = QHBoxLayout()
         buttons.setSpacing(8)
         self.start_grab_btn = MotionButton("开始监控")
@@ -3280,6 +3403,46 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
     
+    def update_request_rate(self, achieved, configured):
+        """更新实际/配置请求速率读数。"""
+        configured_text = f"{configured:g} 次/秒" if configured else "不限"
+        self.request_rate_label.setText(f"实际 {achieved:.1f} / 配置 {configured_text}")
+
+    def update_request_stats(self, stats):
+        """刷新请求统计面板（stats 为 MetricsSnapshot.to_dict() 格式）。"""
+        def ms(seconds):
+            return "—" if seconds is None else f"{seconds * 1000:.0f}"
+
+        total = stats.get('total') or {}
+        if not total.get('count'):
+            self._reset_request_stats_panel()
+            return
+        rows = sorted(
+            (stats.get('endpoints') or {}).items(), key=lambda item: -item[1]['count']
+        )[:self.REQUEST_STATS_ROWS]
+        cells = "".join(
+            f"<tr><td>{html.escape(name)}</td><td align='right'>{ms(item['p50'])}</td>"
+            f"<td align='right'>{ms(item['p95'])}</td><td align='right'>{ms(item['p99'])}</td>"
+            f"<td align='right'>{item['rate']:.1f}</td></tr>"
+            for name, item in rows
+        )
+        self.request_stats_label.setText(
+            f"{total['rate']:.1f} 次/秒 · 错误率 {total['error_rate'] * 100:.1f}% · "
+            f"并发槽等待 p95 {ms(total['slot_wait_p95'])}ms"
+            "<table cellspacing='0' cellpadding='1' width='100%'>"
+            "<tr><td>接口</td><td align='right'>p50</td><td align='right'>p95</td>"
+            "<td align='right'>p99</td><td align='right'>次/秒</td></tr>"
+            f"{cells}</table>"
+        )
+
+    def _reset_request_stats_panel(self):
+        self.request_stats_label.setText("— 次/秒 · 错误率 — · 并发槽等待 —")
+
+    def _reset_request_rate_label(self):
+        configured = self.request_rate_spin.value()
+        configured_text = f"{configured} 次/秒" if configured else "不限"
+        self.request_rate_label.setText(f"实际 — / 配置 {configured_text}")
+
     def load_config(self):
         try:
             config = read_json(CONFIG_FILE, {})
@@ -3303,6 +3466,13 @@ class MainWindow(QMainWindow):
                     migrated = make_legacy_feedback_channel(self.feedback_url)
                     if migrated:
                         self.developer_webhooks = [migrated]
+
+                engine = str(config.get('monitor_engine', 'thread') or 'thread').strip().lower()
+                self.monitor_engine = engine if engine in ('thread', 'asyncio') else 'thread'
+                self.http_transport = normalize_transport_name(config.get('http_transport'))
+                metrics_port = parse_int(config.get('metrics_port'), 0)
+                self.metrics_port = metrics_port if 0 < metrics_port < 65536 else 0
+                self.record_session = bool(config.get('record_session', False))
         except:
             pass
     
@@ -3320,6 +3490,10 @@ class MainWindow(QMainWindow):
             'developer_mode_enabled': self.developer_mode_enabled,
             'feedback_url': self.feedback_url,
             'developer_webhooks': self.developer_webhooks,
+            'monitor_engine': self.monitor_engine,
+            'http_transport': self.http_transport,
+            'metrics_port': self.metrics_port,
+            'record_session': self.record_session,
         }
         try:
             write_json_atomic(CONFIG_FILE, config)
@@ -3333,6 +3507,13 @@ class MainWindow(QMainWindow):
             'courses': [],
             'course_type': self.course_type_combo.currentText(),
             'concurrency': self.concurrency_spin.value(),
+            'request_rate': self.request_rate_spin.value(),
+            'request_burst': self.request_burst_spin.value(),
+            'opening_burst': {
+                'enabled': self.opening_burst_checkbox.isChecked(),
+                't0': self.opening_time_edit.dateTime().toSecsSinceEpoch(),
+                'window': self.opening_window_spin.value(),
+            },
             'conflict_policy': self._active_conflict_policy if is_monitoring else None,
             'swap_risk_confirmed': self._swap_risk_confirmed if is_monitoring else False,
             'timestamp': time.time(),
@@ -3349,6 +3530,45 @@ class MainWindow(QMainWindow):
             write_json_atomic(MONITOR_STATE_FILE, state)
         except Exception as e:
             self._logger.error(f"保存监控状态失败: {e}")
+
+    @staticmethod
+    def _default_opening_time():
+        """默认开放时刻：下一个整点。"""
+        now = QDateTime.currentDateTime()
+        return now.addSecs(3600 - now.time().minute() * 60 - now.time().second())
+
+    def _restore_opening_burst(self, config):
+        """恢复定时开抢设置；开放时刻已过时不再勾选。"""
+        if not isinstance(config, dict):
+            return
+        if 'window' in config:
+            self.opening_window_spin.setValue(int(config['window']))
+        try:
+            t0 = int(config.get('t0') or 0)
+        except (TypeError, ValueError):
+            t0 = 0
+        future = t0 > time.time()
+        if future:
+            self.opening_time_edit.setDateTime(QDateTime.fromSecsSinceEpoch(t0))
+        self.opening_burst_checkbox.setChecked(bool(config.get('enabled')) and future)
+
+    def _opening_burst_config(self):
+        """
+        本次监控的定时开抢配置，未启用返回 None
+        开放时刻按服务器时间理解，由 Worker 用登录时同步的时钟偏差换算。
+        """
+        if not self.opening_burst_checkbox.isChecked():
+            return None
+        t0 = self.opening_time_edit.dateTime().toSecsSinceEpoch()
+        window = self.opening_window_spin.value()
+        if t0 + window <= time.time():
+            self.log("[WARN] 定时开抢的开放时刻已过，本次直接正常监控")
+            return None
+        self.log(
+            f"[INFO] 定时开抢: 开放时刻 {self.opening_time_edit.dateTime().toString('MM-dd HH:mm:ss')}，"
+            f"持续 {window} 秒"
+        )
+        return {'t0': t0, 'window': window}
 
     def load_monitor_state(self):
         """加载监控状态文件"""
@@ -3368,6 +3588,11 @@ class MainWindow(QMainWindow):
 
         if 'concurrency' in state:
             self.concurrency_spin.setValue(state['concurrency'])
+        if 'request_rate' in state:
+            self.request_rate_spin.setValue(state['request_rate'])
+        if 'request_burst' in state:
+            self.request_burst_spin.setValue(state['request_burst'])
+        self._restore_opening_burst(state.get('opening_burst'))
 
         existing_ids = {
             self.grab_list.item(i).data(Qt.UserRole).get('JXBID', '')
@@ -3621,9 +3846,14 @@ class MainWindow(QMainWindow):
             courses = self._pending_restore_state['courses']
             self.log(f"[INFO] 从状态文件恢复 {len(courses)} 门监控课程")
             
-            # 恢复并发数设置
+            # 恢复并发数与请求速率设置
             if 'concurrency' in self._pending_restore_state:
                 self.concurrency_spin.setValue(self._pending_restore_state['concurrency'])
+            if 'request_rate' in self._pending_restore_state:
+                self.request_rate_spin.setValue(self._pending_restore_state['request_rate'])
+            if 'request_burst' in self._pending_restore_state:
+                self.request_burst_spin.setValue(self._pending_restore_state['request_burst'])
+            self._restore_opening_burst(self._pending_restore_state.get('opening_burst'))
             
             # 添加课程到待抢列表
             for course in courses:
@@ -3735,6 +3965,7 @@ class MainWindow(QMainWindow):
         self.course_list.clear()
         self.clear_cards()
         self._api_courses_grouped = {}
+        self._timetable_index = None
         
         if not was_monitoring:
             self.log("[INFO] 已退出登录")
@@ -3781,6 +4012,7 @@ class MainWindow(QMainWindow):
             self.course_list.clear()
             self.clear_cards()
             self._api_courses_grouped = {}
+            self._timetable_index = None
             self.course_count_label.setText("加载中...")
             self.log(f"[API] 刷新课程列表: {course_type_name}" + (f" (搜索: {search_keyword})" if search_keyword else ""))
         
@@ -3905,6 +4137,7 @@ class MainWindow(QMainWindow):
                 self._showing_search_empty_state = False
 
             self._api_courses_grouped = courses_grouped
+            self._rebuild_timetable_index()
             
             current_names = set(self._api_courses_grouped.keys())
             existing_names = set()
@@ -3946,6 +4179,7 @@ class MainWindow(QMainWindow):
         self.course_list.clear()
         self.clear_cards()
         self._api_courses_grouped = {}
+        self._timetable_index = None
         self.course_count_label.setText("切换中...")
         
         # 强制刷新（终止旧请求）
@@ -3971,6 +4205,7 @@ class MainWindow(QMainWindow):
             self.course_list.clear()
             self.clear_cards()
             self._api_courses_grouped = {}
+            self._timetable_index = None
             
             self.refresh_courses(keyword=search_text)
         else:
@@ -3982,6 +4217,59 @@ class MainWindow(QMainWindow):
         course_name = item.data(Qt.UserRole)
         if course_name and course_name in self._api_courses_grouped:
             self.show_course_cards(course_name, self._api_courses_grouped[course_name])
+
+    def _rebuild_timetable_index(self):
+        """课程目录更新后重建课表位图索引，并按当前已选课程计算本地冲突状态。"""
+        index = TimetableIndex.from_grouped(self._api_courses_grouped)
+        if self._curriculum_loaded:
+            index.set_selected(self._curriculum_arranged)
+        self._timetable_index = index
+        self._apply_local_conflicts()
+
+    def _on_selected_timetable_changed(self, arranged, unarranged, error):
+        """已选课程（课表）变化后重算整份目录的冲突状态，并刷新当前教学班卡片。"""
+        index = self._timetable_index
+        if error or index is None or not self._curriculum_loaded:
+            return
+        index.set_selected(arranged)
+        changed = self._apply_local_conflicts()
+        self._logger.info(
+            f"[冲突] 已选课程更新，本地重算 {len(index)} 个教学班："
+            f"{len(index.conflicts())} 个冲突，{changed} 个状态变化"
+        )
+        if not changed:
+            return
+        current = self.course_list.currentItem()
+        course_name = current.data(Qt.UserRole) if current else None
+        if (
+            course_name in self._api_courses_grouped
+            and self.schedule_title.text() == course_name
+        ):
+            self.show_course_cards(course_name, self._api_courses_grouped[course_name])
+
+    def _apply_local_conflicts(self):
+        """
+        用课表位图索引的结果覆盖课程目录与待抢列表中的 isConflict / conflictDesc
+        返回课程目录中冲突状态发生变化的教学班数。
+        """
+        index = self._timetable_index
+        if index is None or not index.has_selected:
+            return 0
+        changed = index.annotate()
+        grab_changed = False
+        for row in range(self.grab_list.count()):
+            item = self.grab_list.item(row)
+            course = item.data(Qt.UserRole) if item else None
+            if not isinstance(course, dict) or course.get('JXBID') not in index:
+                continue
+            previous = (course.get('isConflict'), course.get('conflictDesc'))
+            index.annotate(course)
+            if (course.get('isConflict'), course.get('conflictDesc')) != previous:
+                item.setData(Qt.UserRole, course)
+                grab_changed = True
+        if grab_changed:
+            self._refresh_grab_item_visuals()
+        return changed
     
     def clear_cards(self):
         while self.cards_layout.count():
@@ -4187,125 +4475,32 @@ class MainWindow(QMainWindow):
             or ''
         )
 
-    def _parse_time_slots(self, time_str):
-        if not time_str:
-            return []
-
-        slots = []
-        segments = re.split(r'[,;，；/]', str(time_str))
-        day_map = {
-            '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7,
-            '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
-        }
-
-        for segment in segments:
-            segment = segment.strip()
-            if not segment:
-                continue
-
-            slot = {'weeks': set(), 'day': 0, 'periods': set()}
-
-            week_match = re.search(r'第?(\d+)-(\d+)周(?:\(([单双])\))?', segment)
-            if week_match:
-                start_week = int(week_match.group(1))
-                end_week = int(week_match.group(2))
-                odd_even = week_match.group(3)
-                for week in range(start_week, end_week + 1):
-                    if odd_even == '单' and week % 2 == 0:
-                        continue
-                    if odd_even == '双' and week % 2 == 1:
-                        continue
-                    slot['weeks'].add(week)
-            else:
-                single_week = re.search(r'第?(\d+)周', segment)
-                if single_week:
-                    slot['weeks'].add(int(single_week.group(1)))
-
-            day_match = re.search(r'(?:星期|周|礼拜)([一二三四五六日天1-7])', segment)
-            if day_match:
-                slot['day'] = day_map.get(day_match.group(1), 0)
-
-            period_match = re.search(r'第?(\d+)-(\d+)节', segment)
-            if period_match:
-                start_period = int(period_match.group(1))
-                end_period = int(period_match.group(2))
-                for period in range(start_period, end_period + 1):
-                    slot['periods'].add(period)
-            else:
-                period_singles = re.findall(r'第(\d+)节', segment)
-                if period_singles:
-                    for period in period_singles:
-                        slot['periods'].add(int(period))
-                else:
-                    period_singles = re.findall(r'(\d+)节', segment)
-                    for period in period_singles:
-                        slot['periods'].add(int(period))
-                    comma_periods = re.search(r'(\d+(?:,\d+)+)节', segment)
-                    if comma_periods:
-                        for period in comma_periods.group(1).split(','):
-                            if period.strip():
-                                slot['periods'].add(int(period.strip()))
-
-            if slot['weeks'] and slot['day'] and slot['periods']:
-                slots.append(slot)
-            elif slot['day'] and slot['periods']:
-                slot['weeks'] = set(range(1, 19))
-                slots.append(slot)
-
-        return slots
-
-    def _check_time_conflict(self, time_str1, time_str2):
-        slots1 = self._parse_time_slots(time_str1)
-        slots2 = self._parse_time_slots(time_str2)
-        if not slots1 or not slots2:
-            return False
+    def _on_grab_rows_inserted(self, _parent, first, last):
+        """待抢列表新增课程时增量更新冲突图。"""
+        for row in range(first, last + 1):
+            item = self.grab_list.item(row)
+            course = item.data(Qt.UserRole) if item else None
+            if isinstance(course, dict):
+                self._pending_conflict_graph.add(
+                    str(course.get('JXBID', '') or ''), self._course_time_text(course)
+                )
 
-        for slot1 in slots1:
-            for slot2 in slots2:
-                if slot1['day'] != slot2['day']:
-                    continue
-                if not (slot1['weeks'] & slot2['weeks']):
-                    continue
-                if slot1['periods'] & slot2['periods']:
-                    return True
-        return False
+    def _on_grab_rows_removed(self, _parent, first, last):
+        """待抢列表移除课程前从冲突图中摘除。"""
+        for row in range(first, last + 1):
+            item = self.grab_list.item(row)
+            course = item.data(Qt.UserRole) if item else None
+            if isinstance(course, dict):
+                self._pending_conflict_graph.remove(str(course.get('JXBID', '') or ''))
 
     def _build_pending_conflict_groups(self, courses):
-        """按待抢课程之间的时间冲突构建连通冲突组。"""
-        indexed = []
-        for index, course in enumerate(courses):
-            tc_id = str(course.get('JXBID', '') or '')
-            time_text = self._course_time_text(course)
-            if tc_id and time_text:
-                indexed.append((index, course, tc_id, time_text))
-
-        edges = {item[2]: set() for item in indexed}
-        course_by_id = {item[2]: item[1] for item in indexed}
-        for left_pos in range(len(indexed)):
-            _, left_course, left_id, left_time = indexed[left_pos]
-            for right_pos in range(left_pos + 1, len(indexed)):
-                _, right_course, right_id, right_time = indexed[right_pos]
-                if self._check_time_conflict(left_time, right_time):
-                    edges[left_id].add(right_id)
-                    edges[right_id].add(left_id)
-
+        """按待抢课程之间的时间冲突返回连通冲突组（读取增量维护的冲突图）。"""
+        course_by_id = {str(course.get('JXBID', '') or ''): course for course in courses}
         groups = []
-        visited = set()
-        for tc_id in edges:
-            if tc_id in visited or not edges[tc_id]:
-                continue
-            stack = [tc_id]
-            component = []
-            visited.add(tc_id)
-            while stack:
-                current = stack.pop()
-                component.append(course_by_id[current])
-                for neighbor in edges[current]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        stack.append(neighbor)
-            if len(component) >= 2:
-                groups.append(component)
+        for group in self._pending_conflict_graph.groups():
+            members = [course_by_id[tc_id] for tc_id in group if tc_id in course_by_id]
+            if len(members) >= 2:
+                groups.append(members)
         return groups
 
     def _show_pending_conflict_policy_dialog(self, groups):
@@ -4522,14 +4717,34 @@ class MainWindow(QMainWindow):
             else:
                 self.log(f"[WARN] 自定义 Webhook 配置无效，本次未启用: {error}")
 	        
-        self.log(f"[INFO] 开始监控 {len(courses)} 门课程 (HTTP并发: {self.concurrency_spin.value()})")
+        request_rate = self.request_rate_spin.value()
+        self.log(
+            f"[INFO] 开始监控 {len(courses)} 门课程 (HTTP并发: {self.concurrency_spin.value()}, "
+            f"请求速率: {f'{request_rate} 次/秒' if request_rate else '不限'})"
+        )
         if serverchan_key:
             self.log(f"[INFO] Server酱通知已启用")
         if webhook_channels:
             enabled_count = sum(1 for item in webhook_channels if item.get('enabled', True))
             self.log(f"[INFO] 开发者模式自定义 Webhook 已启用，启用通道: {enabled_count}")
 	        
-        self.multi_grab_worker = MultiGrabWorker(
+        worker_class = MultiGrabWorker
+        if self.monitor_engine == 'asyncio':
+            if ASYNC_ENGINE_AVAILABLE:
+                worker_class = AsyncGrabWorker
+                self.log("[INFO] 使用 asyncio 监控引擎")
+            else:
+                self.log(
+                    f"[WARN] asyncio 监控引擎不可用（{get_async_engine_error()}），已改用默认引擎"
+                )
+        http_transport = self.http_transport
+        if http_transport == 'http2' and not HTTP2_AVAILABLE:
+            self.log(f"[WARN] HTTP/2 传输不可用（{get_http2_error()}），已改用 requests")
+            http_transport = 'requests'
+        elif http_transport != 'requests':
+            self.log(f"[INFO] HTTP 传输后端: {http_transport}")
+
+        self.multi_grab_worker = worker_class(
             courses=courses,
             student_code=self.student_code,
             batch_code=self.batch_code,
@@ -4539,6 +4754,12 @@ class MainWindow(QMainWindow):
             username=self.username_input.text(),
             password=self.password_input.text(),
             max_workers=self.concurrency_spin.value(),
+            request_rate=request_rate,
+            request_burst=self.request_burst_spin.value(),
+            opening_burst=self._opening_burst_config(),
+            http_transport=http_transport,
+            metrics_port=self.metrics_port,
+            record_session=self.record_session,
             serverchan_key=serverchan_key,
             webhook_channels=webhook_channels,
             conflict_policy=conflict_policy,
@@ -4553,6 +4774,9 @@ class MainWindow(QMainWindow):
         self.multi_grab_worker.finished.connect(self.on_worker_finished)
         self.multi_grab_worker.heartbeat.connect(self.update_heartbeat)
         self.multi_grab_worker.courses_retired.connect(self.on_courses_retired)
+        self.multi_grab_worker.rate_stats.connect(self.update_request_rate)
+        self.multi_grab_worker.request_stats.connect(self.update_request_stats)
+        self._reset_request_stats_panel()
 
         # 写入守护信号并按需启动 watchdog
         self.write_watchdog_signal('start', pid=os.getpid())
@@ -4708,6 +4932,7 @@ class MainWindow(QMainWindow):
         try:
             self.start_grab_btn.setEnabled(True)
             self.stop_grab_btn.setEnabled(False)
+            self._reset_request_rate_label()
             
             if self._pending_monitor_courses and not self.is_logged_in:
                 self.log("[INFO] Worker 异常退出，尝试自动重登...")
@@ -0,0 +1,149 @@
+"""
+监控列表注册表
+按教学班 ID 索引待抢课程，带版本号与变更事件：
+调度器订阅 添加/移除/暂停/恢复 事件，不再轮询列表快照；
+轮询热路径上的成员检查是一次字典查找，不复制列表、不加锁。
+"""
+import threading
+
+
+# 变更事件
+ADDED = 'added'
+REMOVED = 'removed'
+PAUSED = 'paused'
+RESUMED = 'resumed'
+
+
+class WatchlistRegistry:
+    """
+    监控列表（线程安全）
+    - 写操作在锁内修改索引并递增 version，随后在锁外按订阅顺序通知监听者：
+      listener(event, tc_id, course)；
+    - get()/active()/in 只读当前字典，单次查找在 GIL 下是原子的；
+    - 暂停的课程仍留在列表中（不算“全部处理完毕”），但 active() 返回 None。
+    """
+
+    def __init__(self, courses=()):
+        self._cond = threading.Condition()
+        self._courses = {}
+        self._paused = set()
+        self._listeners = []
+        self.version = 0
+        for course in courses:
+            tc_id = course.get('JXBID', '')
+            if tc_id and tc_id not in self._courses:
+                self._courses[tc_id] = course
+
+    # ---------- 订阅 ----------
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, events):
+        for event, tc_id, course in events:
+            for listener in self._listeners:
+                listener(event, tc_id, course)
+
+    # ---------- 查询 ----------
+    def get(self, tc_id):
+        """按教学班 ID 取课程（含暂停中的课程），不存在返回 None。"""
+        return self._courses.get(tc_id)
+
+    def active(self, tc_id):
+        """取正在监控（未暂停）的课程，不存在或已暂停返回 None。"""
+        if tc_id in self._paused:
+            return None
+        return self._courses.get(tc_id)
+
+    def is_paused(self, tc_id):
+        return tc_id in self._paused
+
+    def __contains__(self, tc_id):
+        return tc_id in self._courses
+
+    def __len__(self):
+        return len(self._courses)
+
+    def __bool__(self):
+        return bool(self._courses)
+
+    def snapshot(self, include_paused=True):
+        """按加入顺序返回课程列表副本（启动排期、健康检查等低频场景使用）。"""
+        with self._cond:
+            if include_paused or not self._paused:
+                return list(self._courses.values())
+            return [
+                course for tc_id, course in self._courses.items()
+                if tc_id not in self._paused
+            ]
+
+    # ---------- 修改 ----------
+    def add(self, course):
+        """加入课程，已存在时返回 False。"""
+        tc_id = course.get('JXBID', '')
+        with self._cond:
+            if not tc_id or tc_id in self._courses:
+                return False
+            self._courses[tc_id] = course
+            self.version += 1
+        self._notify([(ADDED, tc_id, course)])
+        return True
+
+    def remove(self, tc_id):
+        """移除课程，返回被移除的课程，不存在返回 None。"""
+        removed = self.remove_many([tc_id])
+        return removed[0] if removed else None
+
+    def remove_many(self, tc_ids):
+        """批量移除课程，返回实际移除的课程列表。"""
+        remove_ids = {tc_id for tc_id in tc_ids if tc_id}
+        removed = []
+        with self._cond:
+            if len(remove_ids) > 1:
+                # 按加入顺序移除，便于日志与通知中的课程顺序与列表一致
+                remove_ids = [tc_id for tc_id in self._courses if tc_id in remove_ids]
+            for tc_id in remove_ids:
+                course = self._courses.pop(tc_id, None)
+                if course is not None:
+                    self._paused.discard(tc_id)
+                    removed.append(course)
+            if removed:
+                self.version += 1
+            if not self._courses:
+                self._cond.notify_all()
+        self._notify([(REMOVED, course.get('JXBID', ''), course) for course in removed])
+        return removed
+
+    def pause(self, tc_id):
+        """暂停监控（课程保留在列表中），返回是否发生变化。"""
+        with self._cond:
+            course = self._courses.get(tc_id)
+            if course is None or tc_id in self._paused:
+                return False
+            self._paused.add(tc_id)
+            self.version += 1
+        self._notify([(PAUSED, tc_id, course)])
+        return True
+
+    def resume(self, tc_id):
+        """恢复暂停的课程，返回是否发生变化。"""
+        with self._cond:
+            course = self._courses.get(tc_id)
+            if course is None or tc_id not in self._paused:
+                return False
+            self._paused.discard(tc_id)
+            self.version += 1
+        self._notify([(RESUMED, tc_id, course)])
+        return True
+
+    # ---------- 等待 ----------
+    def wait_empty(self, timeout=None):
+        """阻塞直到列表为空或超时（或被 wake() 唤醒），返回列表是否为空。"""
+        with self._cond:
+            if self._courses:
+                self._cond.wait(timeout)
+            return not self._courses
+
+    def wake(self):
+        """唤醒 wait_empty 的等待者（停止监控时调用）。"""
+        with self._cond:
+            self._cond.notify_all()
@@ -1,23 +1,56 @@
 """
 业务逻辑核心模块 - Workers
-高并发非阻塞架构：每门课程独立监控线程
+高并发非阻塞架构：中央截止时间调度器 + 固定工作线程池
 """
+import contextvars
 import json
 import time
 import re
 import os
 import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import requests
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from PyQt5.QtCore import QThread, pyqtSignal, QMutex, QMutexLocker
 
 from .config import (
     get_api_endpoint, get_course_type_code,
-    BASE_URL
+    parse_bool_field, parse_int_field,
+    API_ENDPOINT_MAP, BASE_URL
 )
+from .capacity import CapacityBatcher, build_capacity_index, capacity_group_key
+from .connections import DEFAULT_WARM_TARGET, KEEPALIVE_REFRESH_AFTER, ConnectionWarmer
+from .course_state import CourseStateTable, UNKNOWN_REMAIN
+from .latency import LatencyTracker
+from .metrics import (
+    BUCKET_COUNT, EventCounters, RequestMetrics, body_size, endpoint_name, response_size,
+)
+from .openmetrics import MetricFamily, MetricsExporter
+from .rate_control import PollRateController
+from .recording import RecordingTransport, SessionRecorder
+from .opening_burst import (
+    CLOCK_MAX_ERROR,
+    CONNECT_LEAD,
+    BurstTimingLog,
+    OpeningBurst,
+    sleep_until,
+)
+from .rescue import SEAT_CHOSEN, RescueCadence
+from .request_templates import RequestTemplate, RequestTemplateCache, build_session_headers
+from .scheduler import DeadlineScheduler, DEFER, STOP
+from .selected_cache import shared_selected_state
+from .server_clock import shared_server_clock
+from .swap_plan import SwapPlanBook, SwapStats, SwapTimer
+from .throttle import (
+    PriorityAdmission, RequestBudget, classify_endpoint, is_critical,
+)
+from .timeslots import find_slot_conflict, mask_values, parse_time_slots
+from .tracing import SessionTracer, current_trace, trace_span
+from .transports import create_transport, normalize_transport_name
+from .watchlist import ADDED, PAUSED, REMOVED, RESUMED, WatchlistRegistry
 from .utils import (
     captcha_ocr_available, classify_captcha,
     create_ocr_instance, get_ocr_error, OCR_AVAILABLE, send_custom_webhooks,
@@ -27,34 +60,6 @@ from .utils import (
 from .logger import get_logger
 
 
-# ========== 状态解析工具 ==========
-def parse_bool_field(value):
-    """解析 API 返回的布尔字段（可能是 "0"/"1"/True/False/None）"""
-    if value is None:
-        return False
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        return value == "1" or value.lower() == "true"
-    if isinstance(value, int):
-        return value == 1
-    return False
-
-
-def parse_int_field(value, default=0):
-    """安全解析整数字段"""
-    if value is None:
-        return default
-    if isinstance(value, int):
-        return value
-    if isinstance(value, str):
-        try:
-            return int(value)
-        except ValueError:
-            return default
-    return default
-
-
 class UpdateCheckWorker(QThread):
     """后台检查更新的 Worker"""
     finished = pyqtSignal(bool, str, str, str)  # (has_update, latest_version, download_url, error)
@@ -453,6 +458,45 @@ class CurriculumFetchWorker(QThread):
         return data if isinstance(data, list) else []
 
 
+def fetch_course_result(session, token, student_code, batch_code, timeout=(4, 12)):
+    """
+    界面 Worker 用的一次 courseResult.do 请求（作为 shared_selected_state 的 fetch）
+    返回: ('ok', 响应字典) / ('session_expired', None) / ('failed', 原因)
+    """
+    try:
+        response = session.get(
+            f"{BASE_URL}/elective/courseResult.do",
+            params={
+                "timestamp": int(time.time() * 1000),
+                "studentCode": student_code,
+                "electiveBatchCode": batch_code,
+            },
+            headers={
+                "Accept": "application/json, text/javascript, */*; q=0.01",
+                "X-Requested-With": "XMLHttpRequest",
+                "token": token,
+                "Referer": f"{BASE_URL}/*default/grablessons.do?token={token}",
+            },
+            timeout=timeout,
+            allow_redirects=False,
+        )
+        if response.status_code in (302, 401, 403):
+            return 'session_expired', None
+        if response.status_code != 200:
+            return 'failed', f"HTTP {response.status_code}"
+        payload = response.json()
+        code = str(payload.get('code', ''))
+        if code == '302':
+            return 'session_expired', None
+        if code == '-1':
+            return 'failed', payload.get('msg') or "code=-1"
+        return 'ok', payload
+    except requests.exceptions.Timeout:
+        return 'failed', "请求超时"
+    except Exception as error:
+        return 'failed', type(error).__name__
+
+
 class SelectedCoursesWorker(QThread):
     """Fetch the authoritative selected-course list from courseResult.do."""
 
@@ -472,31 +516,23 @@ class SelectedCoursesWorker(QThread):
     def run(self):
         try:
             with requests.Session() as session:
-                response = session.get(
-                    f"{BASE_URL}/elective/courseResult.do",
-                    params={
-                        "timestamp": int(time.time() * 1000),
-                        "studentCode": self.student_code,
-                        "electiveBatchCode": self.batch_code,
-                    },
-                    headers={
-                        "Accept": "application/json, text/javascript, */*; q=0.01",
-                        "X-Requested-With": "XMLHttpRequest",
-                        "token": self.token,
-                        "Referer": f"{BASE_URL}/*default/grablessons.do?token={self.token}",
-                    },
-                    cookies=self._cookies(self.cookies),
-                    timeout=(4, 12),
-                    allow_redirects=False,
+                session.cookies.update(self._cookies(self.cookies))
+                # 与监控线程共用已选课程状态：刚查过时直接复用，在途时等待同一请求
+                status, payload = shared_selected_state(self.student_code, self.batch_code).get(
+                    lambda: fetch_course_result(
+                        session, self.token, self.student_code, self.batch_code
+                    )
                 )
-            if response.status_code in (302, 401, 403):
+            if status == 'session_expired':
                 self.result.emit([], "登录状态已过期，请重新登录后查看已选课程")
                 return
-            response.raise_for_status()
-            payload = response.json()
-            code = str(payload.get('code', ''))
-            if code in ('302', '-1'):
-                self.result.emit([], payload.get('msg') or "获取已选课程失败")
+            if status != 'ok':
+                if payload == "请求超时":
+                    self.result.emit([], "获取已选课程超时，请稍后重试")
+                elif str(payload).startswith('HTTP'):
+                    self.result.emit([], f"获取已选课程失败（{payload}）")
+                else:
+                    self.result.emit([], f"获取已选课程失败：{payload or '未知错误'}")
                 return
             courses = payload.get('dataList') or payload.get('data') or []
             if not isinstance(courses, list):
@@ -504,11 +540,6 @@ class SelectedCoursesWorker(QThread):
             courses = [item for item in courses if isinstance(item, dict)]
             courses.sort(key=lambda item: str(item.get('courseName') or ''))
             self.result.emit(courses, '')
-        except requests.exceptions.Timeout:
-            self.result.emit([], "获取已选课程超时，请稍后重试")
-        except requests.exceptions.HTTPError as error:
-            status = error.response.status_code if error.response is not None else 0
-            self.result.emit([], f"获取已选课程失败（HTTP {status or '未知'}）")
         except Exception as error:
             self.result.emit([], f"获取已选课程失败：{type(error).__name__}")
 
@@ -552,6 +583,7 @@ class WithdrawCourseWorker(QThread):
             self.result.emit(False, "课程缺少教学班编号，无法退选", self.course)
             return
 
+        selected_state = shared_selected_state(self.student_code, self.batch_code)
         try:
             self.status.emit(f"[退选] 准备提交：{name}（{tc_id}）")
             self._logger.info(f"手动退选准备: name={name}, tc_id={tc_id}")
@@ -595,21 +627,18 @@ class WithdrawCourseWorker(QThread):
                     self.result.emit(False, message or "服务器拒绝退选", self.course)
                     return
 
+                # 课表已变化：让共用的已选课程缓存失效，核实必须使用退选之后的查询
+                selected_state.invalidate(deleted=[tc_id])
                 self.status.emit(f"[退选] 服务器已受理，正在核实课表：{name}")
-                verify = session.get(
-                    f"{BASE_URL}/elective/courseResult.do",
-                    params={
-                        "timestamp": int(time.time() * 1000),
-                        "studentCode": self.student_code,
-                        "electiveBatchCode": self.batch_code,
-                    },
-                    headers=self._headers(),
-                    timeout=(4, 12),
-                    allow_redirects=False,
+                verify_status, verify_payload = selected_state.get(
+                    lambda: fetch_course_result(
+                        session, self.token, self.student_code, self.batch_code
+                    ),
+                    max_age=0,
                 )
-                if verify.status_code != 200:
+                if verify_status == 'failed' and str(verify_payload).startswith('HTTP'):
                     self._logger.warning(
-                        f"手动退选核实异常: tc_id={tc_id}, HTTP={verify.status_code}"
+                        f"手动退选核实异常: tc_id={tc_id}, {verify_payload}"
                     )
                     self.result.emit(
                         False,
@@ -617,8 +646,7 @@ class WithdrawCourseWorker(QThread):
                         self.course,
                     )
                     return
-                verify_payload = verify.json()
-                if str(verify_payload.get('code', '')) in ('302', '-1'):
+                if verify_status != 'ok':
                     self.result.emit(
                         False,
                         "服务器已受理退选，但当前无法核实，请重新登录后确认",
@@ -639,6 +667,7 @@ class WithdrawCourseWorker(QThread):
             self.result.emit(True, "退选成功并已完成核实", self.course)
         except requests.exceptions.Timeout:
             self._logger.warning(f"手动退选超时，结果不确定: tc_id={tc_id}")
+            selected_state.invalidate(deleted=[tc_id])
             self.result.emit(
                 False, "退选请求超时，结果暂时无法确定，请刷新已选课程核实", self.course
             )
@@ -690,18 +719,18 @@ class LoginWorker(QThread):
         return int(time.time() * 1000) + self._server_time_offset
     
     def _sync_server_time(self):
-        try:
-            local_before = int(time.time() * 1000)
-            resp = requests.head(f"{BASE_URL}/*default/index.do", timeout=(2, 3))
-            local_after = int(time.time() * 1000)
-            server_date = resp.headers.get('Date')
-            if server_date:
-                from email.utils import parsedate_to_datetime
-                server_time = int(parsedate_to_datetime(server_date).timestamp() * 1000)
-                local_mid = (local_before + local_after) // 2
-                self._server_time_offset = server_time - local_mid
-        except:
+        """
+        同步服务器时钟（结果同时供监控线程的定时开抢使用）
+        登录前只做一次单样本快速同步，多样本精确同步与周期刷新在后台线程进行。
+        """
+        clock = shared_server_clock()
+        url = f"{BASE_URL}/*default/index.do"
+        if clock.sync(url):
+            self._server_time_offset = int(clock.offset * 1000)
+            self._logger.info(f"服务器时钟偏差: {clock.describe()}")
+        else:
             self._server_time_offset = 0
+        clock.start_refresh(url)
     
     def _as_true(self, value):
         """兼容多种布尔字段格式"""
@@ -1143,11 +1172,52 @@ class LoginWorker(QThread):
         self.failed.emit(message)
 
 
+# 余量列表接口（指标导出中单独给出余量查询耗时直方图）
+CAPACITY_ENDPOINTS = frozenset(API_ENDPOINT_MAP.values()) | {'recommendedCourse.do'}
+
+
 class MultiGrabWorker(QThread):
     """
     高并发非阻塞抢课 Worker
-    每门课程独立监控线程，互不阻塞
+    中央调度器按固定频率轮询所有课程，线程数只由 max_workers 决定
     """
+    # 同一课程类型下达到该数量的查询组时，改为一次整类列表请求
+    BATCH_TYPE_WIDE_MIN_GROUPS = 3
+
+    # 轮询节奏（秒）：固定频率周期 / 查询失败后重试 / 选课失败后快速重试
+    POLL_INTERVAL = 1.0
+    QUERY_FAILED_DELAY = 1.5
+    GRAB_RETRY_DELAY = 0.3
+    # 冲突组首选课程的调度权重
+    PREFERRED_COURSE_WEIGHT = 1.5
+    # 自适应轮询：全局预算（次/秒，None 表示 课程数 / POLL_INTERVAL）与重新分配周期（秒）
+    POLL_BUDGET_RPS = None
+    RATE_REBALANCE_INTERVAL = 2.0
+    # 并发槽中只给关键路径请求（选课/退课/核实）使用的预留数量
+    RESERVED_CRITICAL_SLOTS = 1
+    # 换课：选课仍报冲突时等待退课生效再重试一次 / 紧急救援重试间隔（高频但不过分）
+    SWAP_SETTLE_DELAY = 0.3
+    RESCUE_RETRY_INTERVAL = 0.7
+    # 紧急救援：看不到旧课名额时查询间隔放慢的上限 / 名额出现后的快速间隔与连发选课次数
+    RESCUE_MAX_INTERVAL = 3.0
+    RESCUE_FAST_INTERVAL = 0.3
+    RESCUE_BURST = 3
+    # 登录检测可复用多久以内的已选课程查询结果（秒）
+    LOGIN_CHECK_REUSE_AGE = 30.0
+    # 请求指标：界面面板刷新周期 / 面板统计的时间窗口 / 运行日志汇总周期（秒）
+    METRICS_EMIT_INTERVAL = 2.0
+    METRICS_PANEL_WINDOW = 10.0
+    METRICS_LOG_INTERVAL = 60.0
+
+    # 监控请求的公共请求头（线程引擎的每个 Session 与 asyncio 引擎的客户端共用）
+    HTTP_HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "X-Requested-With": "XMLHttpRequest",
+        "Origin": "https://xk.ynu.edu.cn",
+    }
+
     # 信号定义
     success = pyqtSignal(str, dict)       # (消息, 课程数据)
     failed = pyqtSignal(str)              # 错误消息
@@ -1158,12 +1228,22 @@ class MultiGrabWorker(QThread):
     heartbeat = pyqtSignal(int)           # 心跳信号 (总请求次数)
     login_status = pyqtSignal(bool, str)  # 登录状态信号 (是否在线, 状态描述)
     courses_retired = pyqtSignal(list, str)  # (自动停止的课程ID列表, 原因)
+    rate_stats = pyqtSignal(float, float)    # (实际请求速率, 配置速率) 次/秒
+    request_stats = pyqtSignal(dict)         # 最近窗口的请求指标 (MetricsSnapshot.to_dict())
     
     def __init__(self, courses, student_code, batch_code, token, cookies,
                  campus='02', username='', password='', max_workers=5,
                  serverchan_key='', feedback_url='', webhook_channels=None,
-                 conflict_policy=None):
+                 conflict_policy=None, request_rate=0, request_burst=0,
+                 opening_burst=None, http_transport='requests', metrics_port=0,
+                 record_session=False, clock=time.monotonic, wall_clock=time.time,
+                 sleep=time.sleep):
         super().__init__()
+        # 时钟与等待：监控逻辑及其组件的计时、缓存年龄与退避等待都经由这三个函数，
+        # 会话回放（replay.py）注入虚拟时钟，不影响进程内其它线程
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._sleep = sleep
         self.student_code = student_code
         self.batch_code = batch_code
         self.token = token
@@ -1190,9 +1270,24 @@ class MultiGrabWorker(QThread):
             for course_id in group.get('course_ids', []) or []:
                 self._course_conflict_group[str(course_id)] = group_id
         
-        # 线程安全：课程列表保护
-        self._courses_mutex = QMutex()
-        self._courses = list(courses)  # 深拷贝
+        # 监控列表：按教学班 ID 索引，变更通过事件驱动调度器
+        self._watchlist = WatchlistRegistry(courses)
+        self._watchlist.subscribe(self._on_watchlist_event)
+
+        # 余量批量查询：同组课程每轮只发一次列表请求
+        self._capacity_batcher = CapacityBatcher(self._fetch_capacity_listing, clock=clock)
+        self._capacity_plan = (-1, set())
+
+        # 已选课程：与界面共用的 single-flight 缓存，选课/退课后失效
+        self._selected_state = shared_selected_state(student_code, batch_code)
+
+        # 换课计划：冲突课程的旧课在后台预先定位，换课时不再临时查询
+        self._swap_plans = SwapPlanBook(clock=clock)
+        self._swap_stats = SwapStats()
+
+        # 定时开抢：{'t0': 服务器时间, 'window': 秒}，未配置时为 None
+        self._opening_burst = OpeningBurst.from_config(opening_burst)
+        self._server_clock = shared_server_clock()
         
         # 控制标志
         self._running = True
@@ -1200,23 +1295,35 @@ class MultiGrabWorker(QThread):
         self._relogin_mutex = QMutex()  # 重登互斥锁
         self._relogin_failed_permanently = False  # 永久失败标志（密码错误等）
         
-        # 每门课程的状态追踪（减少日志噪音）
-        self._course_states = {}  # tc_id -> {'last_remain': int, 'last_status': str}
+        # 每门课程的状态追踪（减少日志噪音，供健康检查与统计读取）
+        self._course_states = CourseStateTable(clock=wall_clock)
+
+        # 中央调度器（run 时创建）
+        self._scheduler = None
+
+        # 自适应轮询频率：名额变动频繁的课程查得更勤，总频率不超过预算
+        self._poll_rates = PollRateController(
+            base_interval=self.POLL_INTERVAL, budget_rps=self.POLL_BUDGET_RPS, clock=clock
+        )
+        self._last_rate_rebalance = 0.0
         
         # 心跳计数器（线程安全）
         self._request_count = 0
         self._request_count_lock = threading.Lock()
-        self._last_heartbeat_time = time.time()
+        self._last_heartbeat_time = self._wall_clock()
         self._last_login_check_time = 0  # 初始化为0，启动后立即检测一次
         self._login_check_in_progress = False  # 防止登录检测线程重复创建
         
         # 健康检查机制
-        self._last_activity_time = time.time()
+        self._last_activity_time = self._wall_clock()
         self._health_check_interval = 120  # 2分钟检查一次健康状态
         
         # 真并发请求层：并发数限制“同时在途的 HTTP 请求”，每个线程使用
         # 独立 Session，避免 requests.Session 被多线程共享导致状态竞争。
-        self._request_slots = threading.BoundedSemaphore(self.max_workers)
+        # 选课/退课/核实走优先通道：预留槽位并优先获得空闲槽位，不排在余量轮询之后。
+        self._request_slots = PriorityAdmission(
+            self.max_workers, reserved=self.RESERVED_CRITICAL_SLOTS
+        )
         self._session_local = threading.local()
         self._sessions = set()
         self._sessions_lock = threading.Lock()
@@ -1224,6 +1331,35 @@ class MultiGrabWorker(QThread):
         self._peak_active_requests = 0
         self._active_requests_lock = threading.Lock()
 
+        # 请求指标：按接口的耗时/并发槽等待直方图与状态码、字节数（见 metrics.py）
+        self._metrics = RequestMetrics(clock=clock)
+        self._metrics_stop = threading.Event()
+        self._metrics_thread = None
+        # 低频事件（选课、换课、救援、重登、OCR）计数，供 /metrics 导出
+        self._events = EventCounters()
+        # 本机 OpenMetrics 端点：metrics_port 为 0 时不启动
+        self.metrics_port = max(0, parse_int_field(metrics_port, 0))
+        self._metrics_exporter = None
+        # 关键路径追踪：发现余量 → 选课 → 核实 / 换课 / 救援 的分段时间写入每次会话的 JSONL 文件
+        self._tracer = SessionTracer(engine=type(self).__name__, clock=clock)
+        # 会话录制：record_session 为真时把监控期间的请求与响应脱敏后写入 logs/session_*.jsonl.gz
+        self.record_session = bool(record_session)
+        self._recorder = None
+
+        # 请求速率预算：令牌桶限制每秒请求数（0 表示不限速），按接口类别分别计量
+        try:
+            self.request_rate = max(0.0, float(request_rate or 0))
+            self.request_burst = max(0, int(request_burst or 0))
+        except (TypeError, ValueError):
+            self.request_rate, self.request_burst = 0.0, 0
+        self._request_budget = RequestBudget(
+            self.request_rate, self.request_burst or None, clock=clock
+        )
+        self._last_rate_report = 0.0
+
+        # 预构造请求模板：请求头/Cookie/表单只在课程加入或登录态变化（会话纪元 +1）时构造
+        self._request_templates = RequestTemplateCache()
+
         # HTTP 重试配置由每个线程自己的 Session 复用。
         self._retry_config = Retry(
             total=2,
@@ -1231,32 +1367,44 @@ class MultiGrabWorker(QThread):
             status_forcelist=[500, 502, 503, 504]
         )
 
-        # 日志
+        # 共享连接池：各线程 Session 挂同一个 HTTPAdapter，后台保温线程保持热连接
+        self._connections = ConnectionWarmer(
+            maxsize=self.max_workers + 1,
+            warm_target=min(self.max_workers, DEFAULT_WARM_TARGET),
+            retries=self._retry_config,
+        )
+
+        # 日志（创建传输后端时可能需要记录回退警告，须先于其初始化）
         self._logger = get_logger()
 
+        # 传输后端：轮询热路径的请求经由 requests / urllib3 / HTTP/2 发出（见 transports.py）
+        self._http_transport = normalize_transport_name(http_transport)
+        self._transport, transport_warning = create_transport(
+            self._http_transport,
+            self._get_http_session,
+            adapter=self._connections.adapter,
+            base_headers=self.HTTP_HEADERS,
+            base_url=BASE_URL,
+            retries=self._retry_config,
+            keepalive_expiry=KEEPALIVE_REFRESH_AFTER,
+        )
+        if transport_warning:
+            self._logger.warning(transport_warning)
+
+        # 只读查询的自适应超时与请求对冲：按接口统计时延，对冲请求在专用线程池中发出
+        self._latency = LatencyTracker()
+        self._hedge_pool = None
+        self._hedge_pool_lock = threading.Lock()
+
         # OCR 实例（用于自动重登）
         self.ocr = None
         if OCR_AVAILABLE:
             self.ocr = create_ocr_instance()
 
     def _create_http_session(self):
-        """创建当前线程专用的 HTTP Session。"""
-        session = requests.Session()
-        adapter = HTTPAdapter(
-            pool_connections=2,
-            pool_maxsize=2,
-            max_retries=self._retry_config,
-            pool_block=True,
-        )
-        session.mount('https://', adapter)
-        session.mount('http://', adapter)
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "X-Requested-With": "XMLHttpRequest",
-            "Origin": "https://xk.ynu.edu.cn",
-        })
+        """创建当前线程专用的 HTTP Session（连接取自共享连接池）。"""
+        session = self._connections.mount(requests.Session())
+        session.headers.update(self.HTTP_HEADERS)
         with self._sessions_lock:
             self._sessions.add(session)
         return session
@@ -1268,13 +1416,57 @@ class MultiGrabWorker(QThread):
             self._session_local.session = session
         return session
 
-    def _request_with_session(self, session, method, url, **kwargs):
-        """通过有界并发槽发送请求，并记录实际并发峰值。"""
-        acquired = False
-        while self._running:
-            acquired = self._request_slots.acquire(timeout=0.2)
-            if acquired:
-                break
+    def _wait_request_budget(self, endpoint_class):
+        """按请求预算等待令牌；等待期间监控停止则放弃请求。"""
+        delay = self._request_budget.reserve(endpoint_class)
+        deadline = self._clock() + delay
+        while delay > 0:
+            if not self._running:
+                raise requests.exceptions.RequestException("监控已停止")
+            self._sleep(min(delay, 0.2))
+            delay = deadline - self._clock()
+
+    def _report_request_rate(self):
+        """每秒最多一次，把实际请求速率与配置速率发给 UI。"""
+        now = self._clock()
+        if now - self._last_rate_report < 1.0:
+            return
+        self._last_rate_report = now
+        try:
+            self.rate_stats.emit(self._request_budget.achieved_rate(), self.request_rate)
+        except Exception:
+            pass
+
+    def _request_with_session(self, session, method, url, endpoint_class=None, **kwargs):
+        """
+        通过请求预算与有界并发槽发送请求，并记录实际并发峰值。
+        endpoint_class 缺省时按 URL 判断（见 throttle.classify_endpoint）。
+        """
+        return self._admit_and_send(
+            endpoint_class or classify_endpoint(url), session.request, method, url,
+            endpoint=endpoint_name(url), bytes_out=body_size(kwargs.get('data')), **kwargs
+        )
+
+    def _send_template(self, template, endpoint_class=None, **kwargs):
+        """经由传输后端发送预构造的请求模板：只盖时间戳，不再合并请求头与 Cookie。"""
+        return self._admit_and_send(
+            endpoint_class or template.endpoint_class,
+            self._transport.send_template, template,
+            endpoint=template.endpoint, bytes_out=body_size(template.body), **kwargs
+        )
+
+    def _admit_and_send(self, endpoint_class, send, *args, endpoint='other', bytes_out=0, **kwargs):
+        """
+        请求预算 → 并发槽 → send(*args, **kwargs)，并按 endpoint 记录请求指标
+        （并发槽等待、耗时、状态码、收发字节数）。
+        """
+        self._wait_request_budget(endpoint_class)
+
+        queued = self._clock()
+        acquired = self._request_slots.acquire(
+            critical=is_critical(endpoint_class),
+            cancelled=lambda: not self._running,
+        )
         if not acquired:
             raise requests.exceptions.RequestException("监控已停止")
 
@@ -1283,19 +1475,293 @@ class MultiGrabWorker(QThread):
             self._peak_active_requests = max(
                 self._peak_active_requests, self._active_requests
             )
+        started = self._clock()
+        status, bytes_in = None, 0
         try:
-            return session.request(method, url, **kwargs)
+            self._request_budget.mark_sent()
+            resp = send(*args, **kwargs)
+            status, bytes_in = getattr(resp, 'status_code', None), response_size(resp)
+            return resp
+        except Exception as e:
+            status = type(e).__name__
+            raise
         finally:
+            finished = self._clock()
             with self._active_requests_lock:
                 self._active_requests -= 1
             self._request_slots.release()
+            self._metrics.record(
+                endpoint, status, finished - started, started - queued, bytes_in, bytes_out
+            )
+            trace = current_trace()
+            if trace is not None:
+                trace.request(endpoint, queued, started, finished, status)
+            self._report_request_rate()
+
+    def _request(self, method, url, endpoint_class=None, **kwargs):
+        """经由传输后端发送一般请求；依赖 Cookie 的登录流程使用 _request_with_session。"""
+        return self._admit_and_send(
+            endpoint_class or classify_endpoint(url), self._transport.request, method, url,
+            endpoint=endpoint_name(url), bytes_out=body_size(kwargs.get('data')), **kwargs
+        )
+
+    def _timed_send(self, template, endpoint_class, timeout, **kwargs):
+        """发送模板并把时延（不含预算与并发槽等待）记入 _latency，超时记为截尾样本。"""
+        def send():
+            started = self._clock()
+            try:
+                resp = self._transport.send_template(template, timeout=timeout, **kwargs)
+            except requests.exceptions.Timeout:
+                self._latency.record_timeout(template.endpoint, timeout[1])
+                raise
+            self._latency.record(template.endpoint, self._clock() - started)
+            return resp
+        return self._admit_and_send(
+            endpoint_class or template.endpoint_class, send,
+            endpoint=template.endpoint, bytes_out=body_size(template.body),
+        )
+
+    def _get_hedge_pool(self):
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                # 首发与对冲各需一个线程；线程各有自己的 Session，对冲请求走另一条连接
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers * 2, thread_name_prefix='read-hedge'
+                )
+            return self._hedge_pool
+
+    def _send_read_template(self, template, endpoint_class=None, timeout=(3, 5), **kwargs):
+        """
+        发送只读查询模板（余量列表、已选课程）：读超时按该接口 p99 自适应，
+        首发到 p95 仍未返回时在另一条连接上对冲一次，取先成功返回的响应。
+        选课/退课不经过这里，不做对冲。
+        """
+        endpoint = template.endpoint
+        connect, read = timeout
+        timeout = (connect, self._latency.read_timeout(endpoint, read))
+        hedge_after = self._latency.hedge_delay(endpoint)
+        if hedge_after is None:
+            return self._timed_send(template, endpoint_class, timeout, **kwargs)
+
+        pool = self._get_hedge_pool()
+        # 带上当前上下文，核实等查询在线程池中发出时仍记入当前追踪
+        primary = pool.submit(
+            contextvars.copy_context().run,
+            self._timed_send, template, endpoint_class, timeout, **kwargs
+        )
+        done, _ = wait([primary], timeout=hedge_after)
+        if done or not self._running or not self._latency.try_hedge(endpoint):
+            return primary.result()
+
+        backup = pool.submit(
+            contextvars.copy_context().run,
+            self._timed_send, template, endpoint_class, timeout, **kwargs
+        )
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._latency.record_hedge_win(endpoint)
+                    # 落后的请求在线程池中自然结束，连接留在池中复用
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _log_latency_summary(self):
+        summary = self._latency.summary()
+        if summary:
+            self._logger.info(f"只读查询时延: {summary}")
+
+    def _start_connection_warmer(self):
+        """后台保温：共享连接池保持 warm_target 条热连接，保温请求计入“其它”类预算。"""
+        self._connections.start(
+            f"{BASE_URL}/*default/index.do",
+            headers=self.HTTP_HEADERS,
+            admit=lambda send: self._admit_and_send('other', send, endpoint='keepalive'),
+        )
+
+    # ---------- 请求指标 ----------
+    def metrics_snapshot(self):
+        """本次运行累计的请求指标（MetricsSnapshot.to_dict() 格式），任意线程均可调用。"""
+        return self._metrics.snapshot().to_dict()
+
+    def _start_metrics_reporter(self):
+        """后台线程：每 METRICS_EMIT_INTERVAL 秒向界面发送最近窗口的指标，定期写一行日志汇总。"""
+        self._metrics_stop.clear()
+        self._metrics_thread = threading.Thread(
+            target=self._metrics_loop, name='request-metrics', daemon=True
+        )
+        self._metrics_thread.start()
+
+    def _metrics_loop(self):
+        history = deque(
+            [self._metrics.snapshot()],
+            maxlen=max(1, round(self.METRICS_PANEL_WINDOW / self.METRICS_EMIT_INTERVAL)),
+        )
+        logged = history[0]
+        while not self._metrics_stop.wait(self.METRICS_EMIT_INTERVAL):
+            current = self._metrics.snapshot()
+            try:
+                self.request_stats.emit(current.since(history[0]).to_dict())
+            except Exception:
+                pass
+            history.append(current)
+            if current.taken_at - logged.taken_at >= self.METRICS_LOG_INTERVAL:
+                window = current.since(logged)
+                summary = window.summary()
+                if summary:
+                    self._logger.info(f"请求统计(最近 {window.elapsed:.0f} 秒): {summary}")
+                logged = current
+
+    def _stop_metrics_reporter(self):
+        self._metrics_stop.set()
+        thread, self._metrics_thread = self._metrics_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    def _start_metrics_exporter(self):
+        """metrics_port 非 0 时在本机启动 /metrics 端点；端口被占用只记录警告，不影响监控。"""
+        if not self.metrics_port:
+            return
+        exporter = MetricsExporter(self._collect_metric_families, self.metrics_port)
+        try:
+            port = exporter.start()
+        except OSError as e:
+            self._logger.warning(f"指标端点启动失败: 端口 {self.metrics_port}, {e}")
+            self.status.emit(f"[WARN] 指标端点启动失败（端口 {self.metrics_port}）: {e}")
+            return
+        self._metrics_exporter = exporter
+        self.status.emit(f"[INFO] 指标端点: http://{exporter.host}:{port}/metrics")
+
+    def _stop_metrics_exporter(self):
+        exporter, self._metrics_exporter = self._metrics_exporter, None
+        if exporter is not None:
+            exporter.stop()
+
+    def _collect_metric_families(self):
+        """
+        /metrics 抓取时在导出线程中调用
+        各统计只在取快照时短暂持锁（课程余量读取不加锁），组装与渲染期间不持有任何锁。
+        """
+        snapshot = self._metrics.snapshot()
+        counts, histograms = self._events.snapshot()
+        remains = self._course_states.remains()
+
+        requests_family = MetricFamily(
+            'xk_requests', 'counter', '经由并发槽发出的请求数（status 为状态码，请求异常时为异常类名）'
+        )
+        capacity_family = MetricFamily(
+            'xk_capacity_query_duration_seconds', 'histogram', '余量列表请求耗时（不含排队等待）'
+        )
+        for name, stats in sorted(snapshot.endpoints.items()):
+            for status, count in sorted(stats.statuses.items(), key=lambda item: str(item[0])):
+                status = 'none' if status is None else status
+                requests_family.add(count, (('endpoint', name), ('status', status)))
+            if name in CAPACITY_ENDPOINTS:
+                capacity_family.add_histogram(
+                    stats.latency, stats.latency_sum, (('endpoint', name),)
+                )
 
-    def _request(self, method, url, **kwargs):
-        return self._request_with_session(
-            self._get_http_session(), method, url, **kwargs
+        def event_family(name, event, label, help_text, known=()):
+            family = MetricFamily(name, 'counter', help_text)
+            values = dict.fromkeys(known, 0)
+            values.update({key[1]: count for key, count in counts.items() if key[0] == event})
+            for value, count in sorted(values.items()):
+                family.add(count, ((label, value),))
+            return family
+
+        ocr_buckets, ocr_total = histograms.get('ocr', ([0] * BUCKET_COUNT, 0.0))
+        ocr_family = MetricFamily('xk_ocr_duration_seconds', 'histogram', '自动重登验证码识别耗时')
+        ocr_family.add_histogram(ocr_buckets, ocr_total)
+        epoch_family = MetricFamily(
+            'xk_session_epoch', 'gauge', '会话纪元（登录态更新一次加 1）'
         )
+        epoch_family.add(self._request_templates.epoch)
+        remain_family = MetricFamily('xk_course_remain', 'gauge', '各教学班最近一次查询到的余量')
+        for tc_id, remain, _capacity in sorted(remains):
+            if remain != UNKNOWN_REMAIN:
+                remain_family.add(remain, (('tc_id', tc_id),))
+
+        return [
+            requests_family,
+            capacity_family,
+            event_family(
+                'xk_grabs', 'grab', 'result', '选课尝试（attempted）与核实选中（succeeded）次数',
+                known=('attempted', 'succeeded'),
+            ),
+            event_family('xk_swaps', 'swap', 'result', '换课结果次数', known=('success', 'failed')),
+            event_family(
+                'xk_rescues', 'rescue', 'outcome', '紧急救援结果次数',
+                known=('recovered', 'already_selected', 'interrupted'),
+            ),
+            event_family('xk_relogins', 'relogin', 'result', '自动重登尝试次数', known=('success', 'failed')),
+            ocr_family,
+            epoch_family,
+            remain_family,
+        ]
+
+    def _start_session_recorder(self):
+        """record_session 为真时开始录制：包装传输后端，凭据在写入前脱敏（见 recording.py）。"""
+        if not self.record_session or self._recorder is not None:
+            return
+        try:
+            recorder = SessionRecorder(
+                BASE_URL,
+                header={
+                    'courses': self._get_courses_snapshot(),
+                    'batch_code': self.batch_code,
+                    'campus': self.campus,
+                    'engine': type(self).__name__,
+                },
+                secrets=(self.token, self.student_code, self.username, self.password),
+                clock=self._clock,
+            )
+        except OSError as e:
+            self._logger.warning(f"会话录制启动失败: {e}")
+            return
+        recorder.update_secrets(cookies=self.cookies)
+        self._recorder = recorder
+        self._transport = RecordingTransport(self._transport, recorder)
+        self.status.emit(f"[INFO] 会话录制: {recorder.path}")
+
+    def _stop_session_recorder(self):
+        recorder, self._recorder = self._recorder, None
+        if recorder is None:
+            return
+        recorder.close()
+        self._logger.info(f"会话录制: 共 {recorder.count} 个请求, 文件: {recorder.path}")
+
+    def _log_trace_summary(self):
+        """输出发现→选课的分位数汇总并关闭追踪文件。"""
+        summary = self._tracer.summary()
+        self._tracer.close()
+        if summary:
+            self._logger.info(f"关键路径追踪: {summary}, 追踪文件: {self._tracer.path}")
+
+    def _log_metrics_summary(self):
+        summary = self._metrics.snapshot().summary()
+        if summary:
+            self._logger.info(f"请求统计(全程): {summary}")
+
+    def _log_connection_summary(self):
+        self._logger.info(f"连接统计: {self._connections.stats.summary()}")
 
     def _close_http_sessions(self):
+        self._stop_metrics_reporter()
+        self._stop_metrics_exporter()
+        self._connections.stop()
+        with self._hedge_pool_lock:
+            hedge_pool, self._hedge_pool = self._hedge_pool, None
+        if hedge_pool is not None:
+            hedge_pool.shutdown(wait=False)
+        try:
+            self._transport.close()
+        except Exception:
+            pass
+        self._stop_session_recorder()
         with self._sessions_lock:
             sessions = list(self._sessions)
             self._sessions.clear()
@@ -1344,23 +1810,8 @@ class MultiGrabWorker(QThread):
         return None
 
     def _remove_courses_safe(self, tc_ids):
-        """从内部列表安全批量移除课程，返回实际移除的课程信息。"""
-        remove_ids = {str(tc_id) for tc_id in tc_ids if tc_id}
-        if not remove_ids:
-            return []
-        removed = []
-        self._courses_mutex.lock()
-        try:
-            remaining = []
-            for course in self._courses:
-                if str(course.get('JXBID', '')) in remove_ids:
-                    removed.append(course)
-                else:
-                    remaining.append(course)
-            self._courses = remaining
-        finally:
-            self._courses_mutex.unlock()
-        return removed
+        """从监控列表批量移除课程，返回实际移除的课程信息。"""
+        return self._watchlist.remove_many(tc_ids)
 
     def _retire_conflicting_pending_courses(self, winner_course):
         """
@@ -1442,7 +1893,7 @@ class MultiGrabWorker(QThread):
             self._request_count += 1
             count = self._request_count
         
-        current_time = time.time()
+        current_time = self._wall_clock()
         self._last_activity_time = current_time  # 更新活动时间
         
         # 每 10 次请求或每 5 秒发送一次心跳信号到 UI（减少跨线程通信）
@@ -1467,57 +1918,48 @@ class MultiGrabWorker(QThread):
         if (current_time - self._last_login_check_time) >= 60 and not self._login_check_in_progress:
             self._last_login_check_time = current_time
             self._login_check_in_progress = True
-            # 在单独线程中执行登录状态检测，避免阻塞主监控循环
-            threading.Thread(target=self._check_login_status_safe, daemon=True).start()
+            self._start_login_check()
+
+    def _start_login_check(self):
+        # 在单独线程中执行登录状态检测，避免阻塞主监控循环
+        threading.Thread(target=self._check_login_status_safe, daemon=True).start()
     
     def add_course(self, course):
-        """线程安全地添加课程"""
-        self._courses_mutex.lock()
-        try:
-            tc_id = course.get('JXBID', '')
-            if not any(c.get('JXBID') == tc_id for c in self._courses):
-                self._courses.append(course)
-        finally:
-            self._courses_mutex.unlock()
+        """线程安全地添加课程（由监控列表事件排期）"""
+        self._watchlist.add(course)
     
     def remove_course(self, tc_id):
         """线程安全地移除课程"""
-        self._courses_mutex.lock()
-        try:
-            self._courses = [c for c in self._courses if c.get('JXBID') != tc_id]
-        finally:
-            self._courses_mutex.unlock()
+        self._watchlist.remove(tc_id)
+
+    def pause_course(self, tc_id):
+        """暂停监控课程，课程保留在列表中"""
+        return self._watchlist.pause(tc_id)
+
+    def resume_course(self, tc_id):
+        """恢复暂停的课程"""
+        return self._watchlist.resume(tc_id)
+
+    def _on_watchlist_event(self, event, tc_id, course):
+        """监控列表变更：添加/恢复时排期，移除/暂停时撤出调度。"""
+        if event in (ADDED, RESUMED):
+            if self._running:
+                self._schedule_course(course)
+        elif event in (REMOVED, PAUSED):
+            self._unschedule_course(tc_id)
     
     def _get_courses_snapshot(self):
-        """获取课程列表快照"""
-        self._courses_mutex.lock()
-        try:
-            return list(self._courses)
-        finally:
-            self._courses_mutex.unlock()
+        """获取课程列表快照（低频场景使用，热路径用 _find_course）"""
+        return self._watchlist.snapshot()
     
     def _remove_course_safe(self, tc_id):
-        """从内部列表安全移除课程"""
-        self._courses_mutex.lock()
-        try:
-            self._courses = [c for c in self._courses if c.get('JXBID') != tc_id]
-        finally:
-            self._courses_mutex.unlock()
+        """从监控列表移除课程"""
+        self._watchlist.remove(tc_id)
     
     def stop(self):
         """停止所有监控"""
         self._running = False
-    
-    def _parse_cookies(self, cookies_str):
-        """解析 Cookie 字符串为字典"""
-        cookie_dict = {}
-        if not cookies_str:
-            return cookie_dict
-        for item in cookies_str.split('; '):
-            if '=' in item:
-                k, v = item.split('=', 1)
-                cookie_dict[k] = v
-        return cookie_dict
+        self._watchlist.wake()
     
     def _check_login_status_safe(self):
         """安全的登录状态检测 - 带超时和异常处理"""
@@ -1537,51 +1979,31 @@ class MultiGrabWorker(QThread):
             
         try:
             self.status.emit("[登录] 正在检测登录状态...")
-            # 使用已选课程接口检测登录状态
-            timestamp = str(int(time.time() * 1000))
-            url = f"{BASE_URL}/elective/courseResult.do"
-            
-            params = {
-                "timestamp": timestamp,
-                "studentCode": self.student_code,
-                "electiveBatchCode": self.batch_code,
-            }
-            
-            resp = self._request('GET',
-                url,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                params=params,
-                timeout=(3, 8),  # 增加超时时间，避免卡住
-                allow_redirects=False
+            # 使用已选课程接口检测登录状态；近期其它路径刚成功查过时直接复用
+            status, result = self._selected_state.get(
+                lambda: self._fetch_selected_courses(endpoint_class='login', timeout=(3, 8)),
+                max_age=self.LOGIN_CHECK_REUSE_AGE,
             )
             
-            # 检查 302 跳转（Session 过期）
-            if resp.status_code == 302:
+            if status == 'session_expired':
                 self.login_status.emit(False, "Session 已过期")
                 self.status.emit("[登录] Session 已过期，需要重新登录")
                 self._handle_session_expired()
-                return
-            
-            if resp.status_code == 200:
-                result = resp.json()
-                # 检查响应内容是否表示过期
-                if self._is_session_expired(result=result):
-                    self.login_status.emit(False, "Session 已过期")
-                    self.status.emit("[登录] Session 已过期，需要重新登录")
-                    self._handle_session_expired()
-                else:
-                    self.login_status.emit(True, "在线")
-                    self.status.emit("[登录] 登录状态正常")
+            elif status == 'ok':
+                self.login_status.emit(True, "在线")
+                self.status.emit("[登录] 登录状态正常")
+            elif str(result).startswith('HTTP'):
+                # 非 200 状态码，可能是服务器问题或登录过期
+                self.login_status.emit(False, result)
+                self.status.emit(f"[登录] 异常状态 {result}，尝试重登...")
+                self._handle_session_expired()
+            elif result == "请求超时":
+                self.login_status.emit(False, "网络超时")
+                self.status.emit("[登录] 网络超时，稍后重试")
             else:
-                # 非 200 状态码，可能是服务器问题或登录过期
-                self.login_status.emit(False, f"HTTP {resp.status_code}")
-                self.status.emit(f"[登录] 异常状态 HTTP {resp.status_code}，尝试重登...")
-                self._handle_session_expired()
+                self.login_status.emit(False, f"检测失败")
+                self.status.emit(f"[登录] 检测异常: {result}")
                 
-        except requests.exceptions.Timeout:
-            self.login_status.emit(False, "网络超时")
-            self.status.emit("[登录] 网络超时，稍后重试")
         except Exception as e:
             self.login_status.emit(False, f"检测失败")
             self.status.emit(f"[登录] 检测异常: {str(e)[:50]}")
@@ -1593,6 +2015,68 @@ class MultiGrabWorker(QThread):
             "token": self.token,
             "Referer": f"{BASE_URL}/*default/grablessons.do?token={self.token}",
         }
+
+    def _update_session(self, token, cookies):
+        """更新登录态并推进会话纪元，已构造的请求模板随之失效。"""
+        self.token = token
+        self.cookies = cookies
+        self._request_templates.bump_epoch()
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.update_secrets(token, cookies)
+
+    def _session_headers(self):
+        """当前会话纪元的完整请求头（含 Cookie），每个纪元只合并一次。"""
+        return self._request_templates.session_headers(
+            lambda: build_session_headers(self.HTTP_HEADERS, self._get_headers(), self.cookies)
+        )
+
+    def _template(self, key, method, url, make_fields):
+        """
+        取出请求模板，不存在或会话纪元已变化时构造
+        make_fields() 返回 (params, data)，只在构造时调用
+        """
+        def build(epoch):
+            params, data = make_fields()
+            return RequestTemplate(
+                method, url, self._session_headers(), params=params, data=data, epoch=epoch
+            )
+        return self._request_templates.get(key, build)
+
+    def _capacity_template(self, key):
+        return self._template(
+            ('capacity', key), 'POST', f"{BASE_URL}/elective/{key[1]}",
+            lambda: (None, self._capacity_query_data(key)),
+        )
+
+    def _select_template(self, course):
+        return self._template(
+            ('select', course.get('JXBID', '')), 'POST', f"{BASE_URL}/elective/volunteer.do",
+            lambda: (None, self._select_payload(course)[0]),
+        )
+
+    def _delete_template(self, tc_id):
+        return self._template(
+            ('delete', tc_id), 'GET', f"{BASE_URL}/elective/deleteVolunteer.do",
+            lambda: (self._delete_params(tc_id), None),
+        )
+
+    def _selected_courses_template(self):
+        return self._template(
+            ('selected',), 'GET', f"{BASE_URL}/elective/courseResult.do",
+            lambda: (self._selected_courses_params(), None),
+        )
+
+    def _warm_request_templates(self, course):
+        """课程加入监控时预先构造它的余量查询与选课模板。"""
+        for key in self._capacity_keys(course):
+            self._capacity_template(key)
+        self._select_template(course)
+
+    def _discard_request_templates(self, tc_id):
+        self._request_templates.discard(
+            lambda key: key[0] in ('select', 'delete') and key[1] == tc_id
+        )
     
     def _is_session_expired(self, response=None, result=None, msg=''):
         """
@@ -1648,7 +2132,7 @@ class MultiGrabWorker(QThread):
             max_wait = 30  # 最多等待30秒
             waited = 0
             while waited < max_wait:
-                time.sleep(0.5)
+                self._sleep(0.5)
                 waited += 0.5
                 # 尝试获取锁检查是否完成
                 if self._relogin_mutex.tryLock():
@@ -1679,7 +2163,14 @@ class MultiGrabWorker(QThread):
                     return False
                 
                 self.status.emit(f"[自动重登] 尝试 {attempt + 1}/{max_relogin_attempts}...")
+                relogin_started = self._clock()
                 success, new_token, new_cookies = self._do_relogin()
+                self._events.inc('relogin', 'success' if success else 'failed')
+                recorder = self._recorder
+                if recorder is not None:
+                    recorder.event(
+                        'relogin', relogin_started, self._clock() - relogin_started, ok=success
+                    )
                 
                 if success:
                     self.status.emit("[自动重登] 恢复成功")
@@ -1689,7 +2180,7 @@ class MultiGrabWorker(QThread):
                 if self._relogin_failed_permanently:
                     return False
                 
-                time.sleep(0.5)
+                self._sleep(0.5)
             
             self.status.emit("[自动重登] 恢复失败，已达最大尝试次数")
             return False
@@ -1698,157 +2189,194 @@ class MultiGrabWorker(QThread):
             self._relogin_in_progress = False
             self._relogin_mutex.unlock()
     
-    def _api_query_course_capacity(self, course, retry_on_expired=True):
+    def _capacity_keys(self, course):
         """
-        查询课程余量
-        返回: (remain, capacity, course_info) 或 (None, None, None) 表示查询失败
-        特殊返回: ('session_expired', None, None) 表示需要重登且重登失败
+        返回课程余量查询依次尝试的分组键
+        同一类型下监控的课程组数达到阈值时，先尝试整类列表（queryContent 为空），
+        列表被截断或过滤导致找不到时再回退到按课程号查询。
         """
-        tc_id = course.get('JXBID', '')
-        course_type = course.get('type', 'recommend')
-        course_number = course.get('number', '')
-        course_name = course.get('KCM', '')
-        
-        # 优先使用课程号查询，更精确
-        query_content = course_number if course_number else course_name
-        
-        try:
-            api_endpoint = get_api_endpoint(course_type)
-            course_type_code = get_course_type_code(course_type)
-            
-            query_param = {
-                "data": {
-                    "studentCode": self.student_code,
-                    "campus": self.campus,  # 使用传入的校区代码
-                    "electiveBatchCode": self.batch_code,
-                    "isMajor": "1",
-                    "teachingClassType": course_type_code,
-                    "checkConflict": "2",
-                    "checkCapacity": "2",
-                    "queryContent": query_content
-                },
-                "pageSize": "500",  # 大分页防止截断
-                "pageNumber": "0",
-                "order": ""
+        version, wide_types = self._capacity_plan
+        if version != self._watchlist.version:
+            version = self._watchlist.version
+            groups_by_type = {}
+            for watched in self._watchlist.snapshot(include_paused=False):
+                key = capacity_group_key(watched)
+                groups_by_type.setdefault(key[:2], set()).add(key)
+            wide_types = {
+                type_key for type_key, keys in groups_by_type.items()
+                if len(keys) >= self.BATCH_TYPE_WIDE_MIN_GROUPS
             }
-            
-            url = f"{BASE_URL}/elective/{api_endpoint}"
-            data = {"querySetting": json.dumps(query_param, ensure_ascii=False)}
-            
-            resp = self._request('POST',
-                url,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                data=data,
+            active_keys = {key for keys in groups_by_type.values() for key in keys}
+            active_keys.update(type_key + ('',) for type_key in wide_types)
+            self._capacity_batcher.discard_unused(active_keys)
+            self._request_templates.discard(
+                lambda key: key[0] == 'capacity' and key[1] not in active_keys
+            )
+            self._capacity_plan = (version, wide_types)
+
+        own_key = capacity_group_key(course)
+        if own_key[:2] in wide_types:
+            return (capacity_group_key(course, query_content=''), own_key)
+        return (own_key,)
+
+    def _capacity_query_data(self, key):
+        """构造余量列表查询的表单数据。"""
+        course_type_code, _, query_content = key
+        query_param = {
+            "data": {
+                "studentCode": self.student_code,
+                "campus": self.campus,  # 使用传入的校区代码
+                "electiveBatchCode": self.batch_code,
+                "isMajor": "1",
+                "teachingClassType": course_type_code,
+                "checkConflict": "2",
+                "checkCapacity": "2",
+                "queryContent": query_content
+            },
+            "pageSize": "500",  # 大分页防止截断
+            "pageNumber": "0",
+            "order": ""
+        }
+        return {"querySetting": json.dumps(query_param, ensure_ascii=False)}
+
+    def _fetch_capacity_listing(self, key, retry_on_expired=True):
+        """
+        拉取一组课程列表并按教学班 ID 建立索引
+        返回: ('ok', index) / ('session_expired', {}) / ('failed', {})
+        """
+        generation = self._selected_state.generation
+        try:
+            resp = self._send_read_template(
+                self._capacity_template(key),
                 timeout=(3, 5),
                 allow_redirects=False  # 禁止自动重定向，便于检测302
             )
-            
+
             # 检查 302 跳转
             if resp.status_code == 302 or self._is_session_expired(response=resp):
                 if retry_on_expired:
                     if self._handle_session_expired():
                         # 重登成功，立即重试
-                        return self._api_query_course_capacity(course, retry_on_expired=False)
-                return 'session_expired', None, None
-            
+                        return self._fetch_capacity_listing(key, retry_on_expired=False)
+                return 'session_expired', {}
+
             if resp.status_code != 200:
-                return None, None, None
-            
+                return 'failed', {}
+
             result = resp.json()
-            
+
             # 检查 Session 过期
             if self._is_session_expired(result=result):
                 if retry_on_expired:
                     if self._handle_session_expired():
-                        return self._api_query_course_capacity(course, retry_on_expired=False)
-                return 'session_expired', None, None
-            
-            data_list = result.get('dataList', [])
-            
-            # 在返回列表中查找目标教学班
-            for item in data_list:
-                tc_list = item.get('tcList', [])
-                if tc_list:
-                    for tc in tc_list:
-                        if tc.get('teachingClassID') == tc_id or tc.get('JXBID') == tc_id:
-                            capacity = parse_int_field(tc.get('classCapacity') or tc.get('KRL'))
-                            selected = parse_int_field(tc.get('numberOfFirstVolunteer') or tc.get('YXRS'))
-                            remain = capacity - selected
-                            
-                            # 正确解析状态字段
-                            tc['isFull'] = parse_bool_field(tc.get('isFull'))
-                            tc['isConflict'] = parse_bool_field(tc.get('isConflict'))
-                            tc['isChoose'] = parse_bool_field(tc.get('isChoose') or tc.get('isChosen'))
-                            
-                            return remain, capacity, tc
-                else:
-                    # 单层结构
-                    item_tc_id = item.get('teachingClassID') or item.get('JXBID', '')
-                    if item_tc_id == tc_id:
-                        capacity = parse_int_field(item.get('classCapacity') or item.get('KRL'))
-                        selected = parse_int_field(item.get('numberOfFirstVolunteer') or item.get('YXRS'))
-                        remain = capacity - selected
-                        
-                        item['isFull'] = parse_bool_field(item.get('isFull'))
-                        item['isConflict'] = parse_bool_field(item.get('isConflict'))
-                        item['isChoose'] = parse_bool_field(item.get('isChoose') or item.get('isChosen'))
-                        
-                        return remain, capacity, item
-            
-            # 未找到目标课程（可能被过滤），返回 None 触发盲抢
-            return None, None, None
-            
+                        return self._fetch_capacity_listing(key, retry_on_expired=False)
+                return 'session_expired', {}
+
+            index = build_capacity_index(result.get('dataList', []))
+            self._observe_chosen(index, generation)
+            return 'ok', index
+
         except requests.exceptions.Timeout:
-            return None, None, None
+            return 'failed', {}
         except Exception:
-            return None, None, None
+            return 'failed', {}
 
-    def _api_select_course_fast(self, course, retry_on_expired=True):
+    def _observe_chosen(self, index, generation):
+        """余量列表中 isChoose=True 的教学班作为免费的已选确认。"""
+        chosen = [tc_id for tc_id, entry in index.items() if entry[2]['isChoose']]
+        if chosen:
+            self._selected_state.observe_chosen(chosen, generation)
+
+    def _api_query_course_capacity(self, course, retry_on_expired=True):
         """
-        快速选课 API
-        POST /elective/volunteer.do
-        参数: addParam={"data": {...}}
-        返回: (success: bool, msg: str, need_rollback: bool)
-        
-        修复: 正确处理 course_type 为数字字符串的情况
+        查询课程余量（同组课程合并为一次列表请求）
+        返回: (remain, capacity, course_info) 或 (None, None, None) 表示查询失败
+        特殊返回: ('session_expired', None, None) 表示需要重登且重登失败
         """
         tc_id = course.get('JXBID', '')
+        entry = None
+        for key in self._capacity_keys(course):
+            status, entry = self._capacity_batcher.lookup(key, tc_id)
+            if status == 'session_expired':
+                return 'session_expired', None, None
+            if status != 'ok' or entry is not None:
+                break
+
+        # 查询失败或未找到目标课程（可能被过滤），返回 None 由调用方跳过
+        if entry is None:
+            return None, None, None
+
+        capacity, selected, course_info = entry
+        return capacity - selected, capacity, dict(course_info)
+
+    @staticmethod
+    def _course_type_code(course):
         course_type = course.get('type', 'recommend')
-        
         # 修复: 处理 course_type 为数字字符串的情况（直接使用，不查字典）
         if isinstance(course_type, str) and course_type.isdigit():
-            course_type_code = course_type
-        else:
-            course_type_code = get_course_type_code(course_type)
-        
-        try:
-            url = f"{BASE_URL}/elective/volunteer.do"
-            
-            # 正确的参数结构: addParam={"data": {...}}
-            add_param = {
-                "data": {
-                    "operationType": "1",
-                    "studentCode": self.student_code,
-                    "electiveBatchCode": self.batch_code,
-                    "teachingClassId": tc_id,
-                    "teachingClassType": course_type_code,
-                    "isMajor": "1",
-                    "campus": self.campus,  # 使用传入的校区代码
-                }
-            }
-            
-            payload = {
-                "addParam": json.dumps(add_param, ensure_ascii=False)
+            return course_type
+        return get_course_type_code(course_type)
+
+    def _select_payload(self, course):
+        """
+        构造选课请求体，正确的参数结构: addParam={"data": {...}}
+        返回: (payload, course_type_code)
+        """
+        tc_id = course.get('JXBID', '')
+        course_type_code = self._course_type_code(course)
+
+        add_param = {
+            "data": {
+                "operationType": "1",
+                "studentCode": self.student_code,
+                "electiveBatchCode": self.batch_code,
+                "teachingClassId": tc_id,
+                "teachingClassType": course_type_code,
+                "isMajor": "1",
+                "campus": self.campus,  # 使用传入的校区代码
             }
+        }
+        return {"addParam": json.dumps(add_param, ensure_ascii=False)}, course_type_code
+
+    def _interpret_select_result(self, tc_id, code, msg):
+        """把选课接口的 code/msg 转换为 (success, msg, need_rollback)。"""
+        if code == '1':
+            self._logger.info(f"选课成功: {tc_id}")
+            self._capacity_batcher.invalidate()
+            self._selected_state.invalidate()
+            return True, "选课成功", False
+        elif '已选' in msg or '重复' in msg:
+            return True, "课程已选中", False
+        elif '冲突' in msg:
+            self._logger.warning(f"选课冲突: {msg}")
+            return False, f"时间冲突: {msg}", True  # 需要回滚
+        elif '容量' in msg or '已满' in msg or '人数' in msg:
+            return False, "课程已满", False
+        else:
+            self._logger.warning(f"选课失败: {msg}")
+            return False, msg or "选课失败", False
+
+    def _api_select_course_fast(self, course, retry_on_expired=True):
+        """
+        快速选课 API
+        POST /elective/volunteer.do
+        参数: addParam={"data": {...}}
+        返回: (success: bool, msg: str, need_rollback: bool)
+        
+        修复: 正确处理 course_type 为数字字符串的情况
+        """
+        tc_id = course.get('JXBID', '')
+        if retry_on_expired:
+            # 重登后的重试不重复计数
+            self._events.inc('grab', 'attempted')
+        
+        try:
+            template = self._select_template(course)
             
-            self._logger.info(f"选课请求: tc_id={tc_id}, type={course_type_code}")
+            self._logger.info(f"选课请求: tc_id={tc_id}, type={self._course_type_code(course)}")
             
-            resp = self._request('POST',
-                url,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                data=payload,
+            resp = self._send_template(
+                template,
                 timeout=(3, 5),
                 allow_redirects=False
             )
@@ -1877,26 +2405,43 @@ class MultiGrabWorker(QThread):
                         return self._api_select_course_fast(course, retry_on_expired=False)
                 return False, "session_expired", False
             
-            if code == '1':
-                self._logger.info(f"选课成功: {tc_id}")
-                return True, "选课成功", False
-            elif '已选' in msg or '重复' in msg:
-                return True, "课程已选中", False
-            elif '冲突' in msg:
-                self._logger.warning(f"选课冲突: {msg}")
-                return False, f"时间冲突: {msg}", True  # 需要回滚
-            elif '容量' in msg or '已满' in msg or '人数' in msg:
-                return False, "课程已满", False
-            else:
-                self._logger.warning(f"选课失败: {msg}")
-                return False, msg or "选课失败", False
+            return self._interpret_select_result(tc_id, code, msg)
                 
         except requests.exceptions.Timeout:
+            # 超时时服务端可能已受理，已选课程缓存必须失效
+            self._selected_state.invalidate()
             return False, "请求超时", False
         except Exception as e:
             self._logger.error(f"选课异常: {e}")
+            self._selected_state.invalidate()
             return False, str(e)[:50], False
     
+    def _delete_params(self, tc_id):
+        """构造退课请求参数：timestamp + deleteParam JSON。"""
+        delete_param = {
+            "data": {
+                "operationType": "2",
+                "studentCode": self.student_code,
+                "electiveBatchCode": self.batch_code,
+                "teachingClassId": tc_id,
+                "isMajor": "1",
+            }
+        }
+        return {
+            "timestamp": str(int(self._wall_clock() * 1000)),
+            "deleteParam": json.dumps(delete_param, ensure_ascii=False),
+        }
+
+    def _interpret_delete_result(self, tc_id, code, msg):
+        """把退课接口的 code/msg 转换为 (success, msg)。"""
+        if code == '1':
+            self._logger.info(f"退课成功: {tc_id}")
+            self._capacity_batcher.invalidate()
+            self._selected_state.invalidate(deleted=[tc_id])
+            return True, "退课成功"
+        self._logger.warning(f"退课失败: {msg}")
+        return False, msg or "退课失败"
+
     def _api_delete_course(self, tc_id, course_type='recommend', retry_on_expired=True):
         """
         退课 API
@@ -1904,32 +2449,12 @@ class MultiGrabWorker(QThread):
         返回: (success: bool, msg: str)
         """
         try:
-            timestamp = str(int(time.time() * 1000))
-            url = f"{BASE_URL}/elective/deleteVolunteer.do"
-            
-            # 构建 deleteParam JSON
-            delete_param = {
-                "data": {
-                    "operationType": "2",
-                    "studentCode": self.student_code,
-                    "electiveBatchCode": self.batch_code,
-                    "teachingClassId": tc_id,
-                    "isMajor": "1",
-                }
-            }
+            template = self._delete_template(tc_id)
             
-            params = {
-                "timestamp": timestamp,
-                "deleteParam": json.dumps(delete_param, ensure_ascii=False),
-            }
-            
-            self._logger.info(f"退课请求: tc_id={tc_id}, params={params}")
+            self._logger.info(f"退课请求: tc_id={tc_id}, url={template.url()}")
             
-            resp = self._request('GET',
-                url,
-                params=params,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
+            resp = self._send_template(
+                template,
                 timeout=(3, 5),
                 allow_redirects=False
             )
@@ -1958,246 +2483,82 @@ class MultiGrabWorker(QThread):
                         return self._api_delete_course(tc_id, course_type, retry_on_expired=False)
                 return False, "session_expired"
             
-            if code == '1':
-                self._logger.info(f"退课成功: {tc_id}")
-                return True, "退课成功"
-            else:
-                self._logger.warning(f"退课失败: {msg}")
-                return False, msg or "退课失败"
+            return self._interpret_delete_result(tc_id, code, msg)
                 
         except Exception as e:
             self._logger.error(f"退课异常: {e}")
+            # 结果不确定：撤销该课程的已选确认，后续核实重新查询
+            self._selected_state.invalidate(deleted=[tc_id])
             return False, str(e)[:50]
     
-    def _api_get_selected_courses(self):
+    def _selected_courses_params(self):
+        return {
+            "timestamp": str(int(self._wall_clock() * 1000)),
+            "studentCode": self.student_code,
+            "electiveBatchCode": self.batch_code,
+        }
+
+    def _parse_selected_courses(self, result):
+        """解析已选课程接口响应为 [{'id', 'name', 'time', 'type', 'teacher', 'number'}]。"""
+        selected_courses = []
+        data_list = result.get('dataList', []) or result.get('data', [])
+        for item in data_list:
+            tc_id = item.get('teachingClassID') or item.get('JXBID', '') or item.get('tcId', '')
+            if tc_id:
+                selected_courses.append({
+                    'id': tc_id,
+                    'name': item.get('courseName') or item.get('KCM') or item.get('KCMC', ''),
+                    'time': item.get('classTime') or item.get('SKSJ') or item.get('teachingPlace', '') or item.get('time', ''),
+                    'type': item.get('teachingClassType') or item.get('type', 'recommend'),
+                    'teacher': item.get('teacherName') or item.get('SKJS', ''),
+                    'number': item.get('courseNumber') or item.get('KCH', ''),
+                })
+        return selected_courses
+
+    def _fetch_selected_courses(self, endpoint_class=None, timeout=(3, 5)):
         """
-        获取已选课程列表
+        请求一次已选课程接口（由 _selected_state 合并调用）
         GET /elective/courseResult.do?timestamp=xxx&studentCode=xxx&electiveBatchCode=xxx
-        返回: list of tc_id 或 None
+        返回: ('ok', 响应字典) / ('session_expired', None) / ('failed', 原因)
+        code=-1 与其它接口一样按 _is_session_expired 计为登录态失效。
         """
         try:
-            timestamp = str(int(time.time() * 1000))
-            url = f"{BASE_URL}/elective/courseResult.do"
-            
-            params = {
-                "timestamp": timestamp,
-                "studentCode": self.student_code,
-                "electiveBatchCode": self.batch_code,
-            }
-            
-            resp = self._request('GET',
-                url,
-                params=params,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                timeout=(3, 5),
+            resp = self._send_read_template(
+                self._selected_courses_template(),
+                timeout=timeout,
+                allow_redirects=False,
+                endpoint_class=endpoint_class,
             )
-            
+            if resp.status_code == 302 or self._is_session_expired(response=resp):
+                return 'session_expired', None
             if resp.status_code != 200:
-                self._logger.warning(f"获取已选课程失败: HTTP {resp.status_code}")
-                return None
-            
+                return 'failed', f"HTTP {resp.status_code}"
             result = resp.json()
-            if result.get('code') == '-1':
-                return None
-            
-            selected_ids = []
-            data_list = result.get('dataList', []) or result.get('data', [])
-            for item in data_list:
-                tc_id = item.get('teachingClassID') or item.get('JXBID', '') or item.get('tcId', '')
-                if tc_id:
-                    selected_ids.append(tc_id)
-            
-            return selected_ids
-            
+            if self._is_session_expired(result=result):
+                return 'session_expired', None
+            return 'ok', result
+        except requests.exceptions.Timeout:
+            return 'failed', "请求超时"
         except Exception as e:
-            self._logger.error(f"获取已选课程异常: {e}")
-            return None
-    
-    def _api_get_selected_courses_details(self):
+            return 'failed', str(e)[:50]
+
+    def _api_get_selected_courses_details(self, max_age=None):
         """
         获取已选课程详情列表（包含时间信息）
-        GET /elective/courseResult.do
         返回: [{'id': tc_id, 'name': name, 'time': time_str, 'type': type}] 或 None
         """
-        try:
-            timestamp = str(int(time.time() * 1000))
-            url = f"{BASE_URL}/elective/courseResult.do"
-            
-            params = {
-                "timestamp": timestamp,
-                "studentCode": self.student_code,
-                "electiveBatchCode": self.batch_code,
-            }
-            
-            resp = self._request('GET',
-                url,
-                params=params,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                timeout=(3, 5),
-            )
-            
-            if resp.status_code != 200:
-                self._logger.warning(f"获取已选课程详情失败: HTTP {resp.status_code}")
-                return None
-            
-            result = resp.json()
-            self._logger.info(f"已选课程响应: {json.dumps(result, ensure_ascii=False)[:500]}")
-            
-            if result.get('code') == '-1':
-                return None
-            
-            selected_courses = []
-            data_list = result.get('dataList', []) or result.get('data', [])
-            for item in data_list:
-                tc_id = item.get('teachingClassID') or item.get('JXBID', '') or item.get('tcId', '')
-                if tc_id:
-                    selected_courses.append({
-                        'id': tc_id,
-                        'name': item.get('courseName') or item.get('KCM') or item.get('KCMC', ''),
-                        'time': item.get('classTime') or item.get('SKSJ') or item.get('teachingPlace', '') or item.get('time', ''),
-                        'type': item.get('teachingClassType') or item.get('type', 'recommend'),
-                        'teacher': item.get('teacherName') or item.get('SKJS', ''),
-                    })
-            
-            self._logger.info(f"解析到 {len(selected_courses)} 门已选课程")
-            return selected_courses
-            
-        except Exception as e:
-            self._logger.error(f"获取已选课程详情异常: {e}")
+        status, result = self._selected_state.get(self._fetch_selected_courses, max_age=max_age)
+        if status != 'ok':
+            self._logger.warning(f"获取已选课程失败: {result or status}")
             return None
-    
-    def _parse_time_slots(self, time_str):
-        """
-        解析教务系统时间格式
-        输入: "1-18周 星期二 5-6节" 或 "1-18周 星期二 第5-6节" 或 "1-9周 星期一 1-2节, 11-18周 星期一 1-2节"
-        输出: [{'weeks': set, 'day': int, 'periods': set}, ...]
-        
-        修复: 支持 "第5-6节" 和 "第5节" 格式
-        """
-        if not time_str:
-            self._logger.debug(f"时间字符串为空")
-            return []
-        
-        self._logger.debug(f"解析时间: {time_str}")
-        
-        slots = []
-        # 按逗号、分号、斜杠分割多个时间段
-        segments = re.split(r'[,;，；/]', time_str)
-        
-        day_map = {
-            '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7,
-            '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
-        }
-        
-        for segment in segments:
-            segment = segment.strip()
-            if not segment:
-                continue
-            
-            slot = {'weeks': set(), 'day': 0, 'periods': set()}
-            
-            # 解析周次: "1-18周" 或 "1-17周(单)" 或 "2-18周(双)" 或 "第1-18周"
-            week_match = re.search(r'第?(\d+)-(\d+)周(?:\(([单双])\))?', segment)
-            if week_match:
-                start_week = int(week_match.group(1))
-                end_week = int(week_match.group(2))
-                odd_even = week_match.group(3)  # 单/双/None
-                
-                for w in range(start_week, end_week + 1):
-                    if odd_even == '单' and w % 2 == 0:
-                        continue
-                    if odd_even == '双' and w % 2 == 1:
-                        continue
-                    slot['weeks'].add(w)
-            else:
-                # 尝试匹配单周: "第5周" 或 "5周"
-                single_week = re.search(r'第?(\d+)周', segment)
-                if single_week:
-                    slot['weeks'].add(int(single_week.group(1)))
-            
-            # 解析星期: "星期二" 或 "周二" 或 "礼拜二"
-            day_match = re.search(r'(?:星期|周|礼拜)([一二三四五六日天1-7])', segment)
-            if day_match:
-                day_char = day_match.group(1)
-                slot['day'] = day_map.get(day_char, 0)
-            
-            # 解析节次: "5-6节" 或 "第5-6节" 或 "5,6节" 或 "第5节"
-            # 修复: 正确处理"第"字前缀
-            # 先尝试范围格式: "第5-6节" 或 "5-6节"
-            period_match = re.search(r'第?(\d+)-(\d+)节', segment)
-            if period_match:
-                start_period = int(period_match.group(1))
-                end_period = int(period_match.group(2))
-                for p in range(start_period, end_period + 1):
-                    slot['periods'].add(p)
-            else:
-                # 尝试单节格式: "第5节" 或 "5节"
-                period_singles = re.findall(r'第(\d+)节', segment)
-                if period_singles:
-                    for p in period_singles:
-                        slot['periods'].add(int(p))
-                else:
-                    # 尝试不带"第"字的格式: "5节" 或 "5,6节"
-                    period_singles = re.findall(r'(\d+)节', segment)
-                    for p in period_singles:
-                        slot['periods'].add(int(p))
-                    # 也尝试匹配逗号分隔: "5,6节"
-                    comma_periods = re.search(r'(\d+(?:,\d+)+)节', segment)
-                    if comma_periods:
-                        for p in comma_periods.group(1).split(','):
-                            if p.strip():
-                                slot['periods'].add(int(p.strip()))
-            
-            # 只有解析出有效数据才添加
-            if slot['weeks'] and slot['day'] and slot['periods']:
-                self._logger.debug(f"解析成功: weeks={slot['weeks']}, day={slot['day']}, periods={slot['periods']}")
-                slots.append(slot)
-            elif slot['day'] and slot['periods']:
-                # 如果没有周次信息，假设是全周
-                slot['weeks'] = set(range(1, 19))
-                self._logger.debug(f"解析成功(默认全周): day={slot['day']}, periods={slot['periods']}")
-                slots.append(slot)
-        
-        if not slots:
-            self._logger.warning(f"时间解析失败: {time_str}")
-        
-        return slots
-    
-    def _check_time_conflict(self, time_str1, time_str2):
-        """
-        检查两个时间字符串是否存在冲突
-        返回: True 表示有冲突，False 表示无冲突
-        """
-        slots1 = self._parse_time_slots(time_str1)
-        slots2 = self._parse_time_slots(time_str2)
-        
-        self._logger.debug(f"比对时间冲突: '{time_str1}' vs '{time_str2}'")
-        self._logger.debug(f"slots1={len(slots1)}, slots2={len(slots2)}")
-        
-        if not slots1 or not slots2:
-            self._logger.debug("无法解析时间，跳过时间比对")
-            return False  # 无法解析时默认无冲突
-        
-        for s1 in slots1:
-            for s2 in slots2:
-                # 检查星期是否相同
-                if s1['day'] != s2['day']:
-                    continue
-                
-                # 检查周次是否有交集
-                common_weeks = s1['weeks'] & s2['weeks']
-                if not common_weeks:
-                    continue
-                
-                # 检查节次是否有交集
-                common_periods = s1['periods'] & s2['periods']
-                if common_periods:
-                    self._logger.info(f"发现时间冲突: day={s1['day']}, weeks={common_weeks}, periods={common_periods}")
-                    return True  # 存在冲突
-        
-        return False
+        return self._parse_selected_courses(result)
+
+    def _api_get_selected_courses(self, max_age=None):
+        """获取已选课程 ID 列表，失败返回 None。"""
+        selected = self._api_get_selected_courses_details(max_age=max_age)
+        if selected is None:
+            return None
+        return [item['id'] for item in selected]
     
     def _find_conflict_course(self, target_course):
         """
@@ -2208,6 +2569,98 @@ class MultiGrabWorker(QThread):
         3. 结果为 0 门或多门时拒绝自动退课
         返回: {'id': tc_id, 'name': name, ...} 或 None
         """
+        selected_courses = self._api_get_selected_courses_details()
+        return self._match_conflict_course(target_course, selected_courses)
+
+    @staticmethod
+    def _rollback_course(conflict_course, course):
+        """紧急救援时查询旧课余量、重新选回旧课所用的课程字典。"""
+        return {
+            'JXBID': conflict_course['id'],
+            'KCM': conflict_course.get('name', ''),
+            'number': conflict_course.get('number', ''),
+            'type': conflict_course.get('type', course.get('type', 'recommend')),
+        }
+
+    def _swap_plan_key(self, course):
+        return course.get('JXBID', ''), str(course.get('conflictDesc', '') or '')
+
+    def _refresh_swap_plan(self, course, course_info):
+        """
+        冲突课程（包括仍满员的）每次查询后检查换课计划，
+        计划缺失或已过期时在后台重新解析，不阻塞轮询
+        """
+        if course_info.get('conflictDesc'):
+            course['conflictDesc'] = course_info.get('conflictDesc')
+        tc_id, conflict_desc = self._swap_plan_key(course)
+        if self._swap_plans.is_fresh(tc_id, self._selected_state.generation, conflict_desc):
+            return
+        if self._swap_plans.begin_refresh(tc_id):
+            self._start_swap_plan_refresh(course)
+
+    def _start_swap_plan_refresh(self, course):
+        tc_id = course.get('JXBID', '')
+        threading.Thread(
+            target=self._resolve_swap_plan, args=(course,), name=f"swap-plan-{tc_id}", daemon=True
+        ).start()
+
+    def _resolve_swap_plan(self, course):
+        tc_id = course.get('JXBID', '')
+        try:
+            generation = self._selected_state.generation
+            selected_courses = self._api_get_selected_courses_details()
+            if selected_courses is not None:
+                self._store_swap_plan(course, selected_courses, generation)
+        except Exception as e:
+            self._logger.error(f"换课计划解析异常: {tc_id}, {type(e).__name__}: {e}")
+        finally:
+            self._swap_plans.end_refresh(tc_id)
+
+    def _store_swap_plan(self, course, selected_courses, generation):
+        """
+        由已选课程列表解析换课计划并预热退课 / 回滚请求模板（两种引擎共用）
+        generation 为已选课程查询发出前的代次；无法唯一定位旧课时丢弃旧计划。
+        """
+        tc_id, conflict_desc = self._swap_plan_key(course)
+        conflict_course = self._match_conflict_course(course, selected_courses)
+        if not conflict_course:
+            self._swap_plans.discard(tc_id)
+            return None
+        plan = self._swap_plans.store(tc_id, conflict_course, conflict_desc, generation)
+        self._delete_template(conflict_course['id'])
+        self._select_template(self._rollback_course(conflict_course, course))
+        self._logger.info(
+            f"换课计划已就绪: {course.get('KCM', '')} → 退 {conflict_course['name']} "
+            f"(ID: {conflict_course['id']})"
+        )
+        return plan
+
+    def _take_swap_plan(self, course, timer):
+        """换课开始时取可用的换课计划，返回冲突课程或 None（需实时定位）。"""
+        tc_id, conflict_desc = self._swap_plan_key(course)
+        plan = self._swap_plans.get(tc_id, self._selected_state.generation, conflict_desc)
+        if plan is None:
+            return None
+        timer.plan_hit = True
+        return plan.conflict
+
+    def _report_swap_timing(self, course, timer):
+        """换课结束时输出分步耗时与旧课空窗，并计入统计（两种引擎共用）。"""
+        self._swap_stats.record(timer)
+        text = timer.describe()
+        self.status.emit(f"[换课] 步骤耗时: {text}")
+        self._logger.info(f"换课计时: {course.get('KCM', '')}, {text}")
+
+    def _log_swap_summary(self):
+        summary = self._swap_stats.summary()
+        if summary:
+            self._logger.info(
+                f"换课统计: {summary}, 换课计划 命中={self._swap_plans.hit_count} "
+                f"未命中={self._swap_plans.miss_count}"
+            )
+
+    def _match_conflict_course(self, target_course, selected_courses):
+        """在给定的已选课程列表中唯一定位冲突课程（两种引擎共用）。"""
         target_name = target_course.get('KCM', '')
         target_time = target_course.get('SKSJ', '') or target_course.get('classTime', '')
         conflict_desc = target_course.get('conflictDesc', '')
@@ -2215,7 +2668,6 @@ class MultiGrabWorker(QThread):
         self._logger.info(f"查找冲突课程: target={target_name}, time={target_time}")
         self._logger.info(f"conflictDesc: {conflict_desc}")
         
-        selected_courses = self._api_get_selected_courses_details()
         if not selected_courses:
             self._logger.warning("获取已选课程列表失败")
             return None
@@ -2253,12 +2705,17 @@ class MultiGrabWorker(QThread):
                 return None
         
         # 策略2: conflictDesc 未给出可识别课程名时，用时间交集唯一匹配。
-        if target_time:
+        target_slots = parse_time_slots(target_time)
+        if target_slots:
             self._logger.info("尝试通过时间比对匹配...")
             time_matches = []
             for selected in selected_courses:
-                selected_time = selected.get('time', '')
-                if selected_time and self._check_time_conflict(target_time, selected_time):
+                overlap = find_slot_conflict(target_slots, parse_time_slots(selected.get('time', '')))
+                if overlap is not None:
+                    self._logger.info(
+                        f"发现时间冲突: {selected.get('name', '')} day={overlap.day}, "
+                        f"weeks={mask_values(overlap.weeks)}, periods={mask_values(overlap.periods)}"
+                    )
                     time_matches.append(selected)
 
             if len(time_matches) == 1:
@@ -2276,9 +2733,12 @@ class MultiGrabWorker(QThread):
         self._logger.warning("无法唯一定位冲突课程，已阻止自动退课")
         return None
     
-    def _check_course_selected(self, tc_id):
-        """检查课程是否已选中"""
-        selected = self._api_get_selected_courses()
+    def _check_course_selected(self, tc_id, max_age=None):
+        """检查课程是否已选中（余量列表已给出 isChoose 确认时不再查询）"""
+        if self._selected_state.is_confirmed(tc_id):
+            self._logger.info(f"余量列表 isChoose 已确认选中: {tc_id}")
+            return True
+        selected = self._api_get_selected_courses(max_age=max_age)
         if selected is None:
             return None  # 查询失败
         return tc_id in selected
@@ -2293,13 +2753,14 @@ class MultiGrabWorker(QThread):
         """
         has_false = False
         for i in range(max_attempts):
-            result = self._check_course_selected(tc_id)
+            # 首次可复用选课/退课之后的查询结果；重试必须重新查询
+            result = self._check_course_selected(tc_id, max_age=None if i == 0 else 0)
             if result is True:
                 return True
             if result is False:
                 has_false = True
             if i < max_attempts - 1:
-                time.sleep(retry_interval)
+                self._sleep(retry_interval)
         if has_false:
             return False
         return None
@@ -2307,14 +2768,22 @@ class MultiGrabWorker(QThread):
     def _handle_conflict_rollback(self, course):
         """
         处理时间冲突的自动换课机制 - 亡命回滚版本
-        Step 1: 智能定位冲突课程
+        Step 1: 取预解析的换课计划（没有时智能定位冲突课程）
         Step 2: 退掉冲突的旧课
         Step 3: 抢入目标课程
         Step 4: 核实是否成功
         Step 5: 失败则进入紧急救援模式 - 未成功持续回滚直到成功
+        各步骤耗时与旧课空窗在结束时输出。
         
         返回: (success: bool, conflict_course_info: dict or None)
         """
+        timer = SwapTimer(clock=self._clock, trace=current_trace())
+        try:
+            return self._run_conflict_rollback(course, timer)
+        finally:
+            self._report_swap_timing(course, timer)
+
+    def _run_conflict_rollback(self, course, timer):
         tc_id = course.get('JXBID', '')
         course_name = course.get('KCM', '')
         course_type = course.get('type', 'recommend')
@@ -2323,9 +2792,14 @@ class MultiGrabWorker(QThread):
         self.status.emit(f"[换课] 开始处理时间冲突: {course_name}")
         self._logger.info(f"开始换课流程: {course_name}, 时间: {target_time}")
         
-        # Step 1: 智能定位冲突课程
-        self.status.emit(f"[换课] Step 1: 定位冲突课程...")
-        conflict_course = self._find_conflict_course(course)
+        # Step 1: 优先使用后台预解析的换课计划，关键路径上不再查询已选课程
+        conflict_course = self._take_swap_plan(course, timer)
+        if conflict_course:
+            self.status.emit(f"[换课] Step 1: 使用预解析的换课计划")
+        else:
+            self.status.emit(f"[换课] Step 1: 定位冲突课程...")
+            conflict_course = self._find_conflict_course(course)
+        timer.mark('resolve')
         
         if not conflict_course:
             self.status.emit(f"[换课] 无法定位冲突课程，请手动处理")
@@ -2339,28 +2813,38 @@ class MultiGrabWorker(QThread):
         self.status.emit(f"[换课] 发现冲突: {conflict_name}")
         self._logger.info(f"冲突课程: {conflict_name} (ID: {conflict_tc_id})")
         
-        # Step 2: 退掉冲突的旧课
+        # Step 2: 退掉冲突的旧课（旧课空窗从这里开始）
         self.status.emit(f"[换课] Step 2: 退选 {conflict_name}...")
+        timer.open_window()
         success, msg = self._api_delete_course(conflict_tc_id, conflict_type)
+        timer.mark('delete')
         
         if not success:
+            timer.cancel_window()
             self.status.emit(f"[换课] 退课失败: {msg}")
             self._logger.error(f"退课失败: {conflict_name}, 原因: {msg}")
             return False, conflict_course
         
         self._logger.info(f"退课成功: {conflict_name}")
-        time.sleep(0.3)
         
-        # Step 3: 抢入目标课程
+        # Step 3: 立即抢入目标课程；仍报冲突说明退课尚未生效，稍等后重试一次
         self.status.emit(f"[换课] Step 3: 选课 {course_name}...")
-        success, msg, _ = self._api_select_course_fast(course)
+        success, msg, need_rollback = self._api_select_course_fast(course)
+        timer.mark('select')
+        if need_rollback:
+            self._sleep(self.SWAP_SETTLE_DELAY)
+            timer.mark('settle')
+            success, msg, _ = self._api_select_course_fast(course)
+            timer.mark('select')
         target_uncertain = False
         
         if success:
             # Step 4: 核实
             is_selected = self._verify_course_selected(tc_id)
+            timer.mark('verify')
             
             if is_selected:
+                timer.close_window()
                 self.status.emit(f"[换课] Step 4: 换课成功！{conflict_name} → {course_name}")
                 self._logger.info(f"换课成功: {conflict_name} → {course_name}")
                 return True, conflict_course
@@ -2377,103 +2861,158 @@ class MultiGrabWorker(QThread):
         self.status.emit(f"[换课] Step 5: 选课失败({msg})，进入紧急救援模式...")
         self._logger.warning(f"选课失败: {course_name}, 原因: {msg}, 开始亡命回滚")
         
-        # 紧急救援参数
-        RETRY_INTERVAL = 0.7  # 0.7秒间隔（高频但不过分）
-
-        attempt_count = 0
-
-        self.status.emit(f"[紧急救援] 开始持续回滚 {conflict_name}，直到成功为止...")
+        self.status.emit(f"[紧急救援] 开始盯守 {conflict_name} 的余量，出现名额立即抢回...")
         self._logger.error(f"进入紧急救援模式: 尝试抢回 {conflict_name}")
         
+        rescue_course = self._rollback_course(conflict_course, course)
+        cadence = self._rescue_cadence()
+        # 目标课选课接口曾返回成功但核实异常时，先确认目标课是否已在课表中，
+        # 避免误把刚抢到的新课又换回去
+        verify_due = target_uncertain
+        
         while self._running:
-            attempt_count += 1
+            # 目标课与旧课用一次已选课程查询联合核实
+            if cadence.next_round() or verify_due:
+                verify_due = False
+                with trace_span('rescue.check'):
+                    checked = self._check_swap_courses(tc_id, conflict_tc_id, max_age=0)
+                settled = self._settle_rescue_check(course, conflict_name, cadence, timer, checked)
+                if settled is not None:
+                    return settled, conflict_course
             
-            # 每10次尝试更新一次状态（减少UI刷新）
-            if attempt_count % 10 == 1:
-                self.status.emit(
-                    f"[紧急救援] 第{attempt_count}次尝试抢回 {conflict_name}"
-                )
-
-            # 如果目标课选课接口曾返回成功但核实接口异常，先确认目标课是否已经在课表中。
-            # 一旦确认目标课已选，就视为换课成功，避免误把刚抢到的新课又换回去。
-            if target_uncertain or attempt_count % 5 == 0:
-                target_selected = self._verify_course_selected(
-                    tc_id,
-                    max_attempts=1,
-                    retry_interval=0
-                )
-                if target_selected is True:
-                    self.status.emit(f"[紧急救援] 已确认目标课程 {course_name} 在课表中，停止回滚")
-                    self._logger.info(f"安全救援确认目标课已选: {course_name}")
-                    return True, conflict_course
+            # 走正常的余量查询路径盯住旧课，只在看到名额时连发选课
+            remain, _, course_info = self._api_query_course_capacity(rescue_course)
+            self._increment_request_count()
+            seat = cadence.observe(remain, course_info)
+            if seat == SEAT_CHOSEN:
+                verify_due = True
             
-            # 尝试选回旧课
-            rollback_success, rollback_msg, _ = self._api_select_course_fast({
-                'JXBID': conflict_tc_id, 
-                'type': conflict_type
-            })
-            
-            # 心跳维持（防止UI假死）
-            self._increment_request_count()
-            
-            if rollback_success:
-                # 核实是否真的选上了
-                is_selected = self._verify_course_selected(conflict_tc_id)
-                
-                if is_selected is True:
-                    self.status.emit(f"[紧急救援] 成功抢回 {conflict_name}！(尝试{attempt_count}次)")
-                    self._logger.info(f"紧急救援成功: {conflict_name}, 尝试次数: {attempt_count}")
-                    self._send_notifications(
-                        f"回滚成功: {conflict_name}",
-                        f"目标课程 {course_name} 未确认成功，已抢回原课程 {conflict_name}。尝试次数: {attempt_count}",
-                        event='rollback_success',
-                        context=self._course_context(
-                            course,
-                            old_course_name=conflict_name,
-                            new_course_name=course_name,
-                            attempt_count=attempt_count,
-                            message=f"回滚成功: {conflict_name}"
-                        )
+            burst = cadence.burst_size(seat)
+            for shot in range(burst):
+                cadence.select_count += 1
+                if cadence.select_count % 10 == 1:
+                    self.status.emit(
+                        f"[紧急救援] 第{cadence.select_count}次尝试抢回 {conflict_name}"
                     )
-                    return False, conflict_course
-            
-            # 检查是否因为"已选"而失败（说明已经抢回了）
-            if rollback_msg and ('已选' in rollback_msg or '重复' in rollback_msg):
-                self.status.emit(f"[紧急救援] {conflict_name} 已在课表中！")
-                self._logger.info(f"紧急救援成功(已选): {conflict_name}")
-                self._send_notifications(
-                    f"回滚确认: {conflict_name}",
-                    f"系统返回 {conflict_name} 已在课表中，回滚视为成功。",
-                    event='rollback_success',
-                    context=self._course_context(
-                        course,
-                        old_course_name=conflict_name,
-                        new_course_name=course_name,
-                        attempt_count=attempt_count,
-                        message=f"回滚确认成功: {conflict_name}"
+                with trace_span('rescue.select', attempt=cadence.select_count):
+                    rollback_success, rollback_msg, _ = self._api_select_course_fast(rescue_course)
+                
+                if rollback_success:
+                    # 核实是否真的选上了（选课后缓存已失效，这里是新查询）
+                    with trace_span('rescue.check'):
+                        checked = self._check_swap_courses(tc_id, conflict_tc_id)
+                    settled = self._settle_rescue_check(
+                        course, conflict_name, cadence, timer, checked
                     )
-                )
-                return False, conflict_course
+                    if settled is not None:
+                        return settled, conflict_course
+                    verify_due = True
+                
+                # 检查是否因为"已选"而失败（说明已经抢回了）
+                if rollback_msg and ('已选' in rollback_msg or '重复' in rollback_msg):
+                    self._settle_rescue_check(
+                        course, conflict_name, cadence, timer, (False, True), 'already_selected'
+                    )
+                    return False, conflict_course
+                if rollback_success or rollback_msg == "课程已满":
+                    break
+                if shot < burst - 1:
+                    self._sleep(cadence.burst_interval)
             
-            # 短暂休眠后继续
-            time.sleep(RETRY_INTERVAL)
+            self._sleep(cadence.next_delay())
         
         # 被外部停止
-        self.status.emit(f"[紧急救援] 监控已停止，请手动检查 {conflict_name}")
-        self._logger.warning(f"紧急救援被中断: {conflict_name}")
+        timer.mark('rescue')
+        self._logger.info(f"救援节奏: {conflict_name}, {cadence.describe()}")
+        self._report_rescue_result(course, conflict_name, cadence.select_count, 'interrupted')
+        return False, conflict_course
+
+    def _rescue_cadence(self):
+        return RescueCadence(
+            base_interval=self.RESCUE_RETRY_INTERVAL,
+            max_interval=self.RESCUE_MAX_INTERVAL,
+            fast_interval=self.RESCUE_FAST_INTERVAL,
+            burst=self.RESCUE_BURST,
+            clock=self._clock,
+        )
+
+    def _check_swap_courses(self, tc_id, conflict_tc_id, max_age=None):
+        """
+        一次已选课程查询同时核实目标课与旧课（紧急救援用）
+        返回: (目标课已选, 旧课已选)，查询失败返回 None
+        """
+        if self._selected_state.is_confirmed(tc_id):
+            return True, False
+        if self._selected_state.is_confirmed(conflict_tc_id):
+            return False, True
+        selected = self._api_get_selected_courses(max_age=max_age)
+        if selected is None:
+            return None
+        return tc_id in selected, conflict_tc_id in selected
+
+    def _settle_rescue_check(self, course, conflict_name, cadence, timer, checked,
+                             outcome='recovered'):
+        """
+        处理一次目标课 / 旧课联合核实的结果（两种引擎共用）
+        返回: True 目标课已选（换课成功）/ False 旧课已抢回 / None 继续救援
+        """
+        if checked is None:
+            return None
+        target_selected, old_selected = checked
+        if not (target_selected or old_selected):
+            return None
+        timer.mark('rescue')
+        timer.close_window()
+        self._logger.info(f"救援节奏: {conflict_name}, {cadence.describe()}")
+        if target_selected:
+            course_name = course.get('KCM', '')
+            self.status.emit(f"[紧急救援] 已确认目标课程 {course_name} 在课表中，停止回滚")
+            self._logger.info(f"安全救援确认目标课已选: {course_name}")
+            return True
+        self._report_rescue_result(course, conflict_name, cadence.select_count, outcome)
+        return False
+
+    def _report_rescue_result(self, course, conflict_name, attempt_count, outcome):
+        """
+        紧急救援结束时的状态、日志与通知（两种引擎共用）
+        outcome: 'recovered' 核实抢回 / 'already_selected' 服务端返回已选 / 'interrupted' 监控被停止
+        """
+        self._events.inc('rescue', outcome)
+        self._set_trace_outcome(f"rescue_{outcome}")
+        course_name = course.get('KCM', '')
+        if outcome == 'recovered':
+            self.status.emit(f"[紧急救援] 成功抢回 {conflict_name}！(尝试{attempt_count}次)")
+            self._logger.info(f"紧急救援成功: {conflict_name}, 尝试次数: {attempt_count}")
+            title = f"回滚成功: {conflict_name}"
+            content = f"目标课程 {course_name} 未确认成功，已抢回原课程 {conflict_name}。尝试次数: {attempt_count}"
+            event = 'rollback_success'
+            message = f"回滚成功: {conflict_name}"
+        elif outcome == 'already_selected':
+            self.status.emit(f"[紧急救援] {conflict_name} 已在课表中！")
+            self._logger.info(f"紧急救援成功(已选): {conflict_name}")
+            title = f"回滚确认: {conflict_name}"
+            content = f"系统返回 {conflict_name} 已在课表中，回滚视为成功。"
+            event = 'rollback_success'
+            message = f"回滚确认成功: {conflict_name}"
+        else:
+            self.status.emit(f"[紧急救援] 监控已停止，请手动检查 {conflict_name}")
+            self._logger.warning(f"紧急救援被中断: {conflict_name}")
+            title = f"🆘 回滚未确认: {conflict_name}"
+            content = f"监控已停止，未能确认原课程 {conflict_name} 是否已抢回，请立即手动检查。"
+            event = 'rollback_failed'
+            message = f"回滚未确认: {conflict_name}"
         self._send_notifications(
-            f"🆘 回滚未确认: {conflict_name}",
-            f"监控已停止，未能确认原课程 {conflict_name} 是否已抢回，请立即手动检查。",
-            event='rollback_failed',
+            title,
+            content,
+            event=event,
             context=self._course_context(
                 course,
                 old_course_name=conflict_name,
                 new_course_name=course_name,
                 attempt_count=attempt_count,
-                message=f"回滚未确认: {conflict_name}"
+                message=message
             )
         )
-        return False, conflict_course
 
     def _do_relogin(self):
         """
@@ -2490,7 +3029,7 @@ class MultiGrabWorker(QThread):
             self._relogin_failed_permanently = True
             return False, '', ''
         
-        session = requests.Session()
+        session = self._connections.mount(requests.Session())
         with self._sessions_lock:
             self._sessions.add(session)
         session.headers.update({
@@ -2514,7 +3053,7 @@ class MultiGrabWorker(QThread):
                     continue
                 
                 # 获取 vtoken
-                timestamp = str(int(time.time() * 1000))
+                timestamp = str(int(self._wall_clock() * 1000))
                 resp = self._request_with_session(
                     session, 'GET',
                     f"{BASE_URL}/student/4/vcode.do?timestamp={timestamp}",
@@ -2540,7 +3079,9 @@ class MultiGrabWorker(QThread):
                     continue
                 
                 # OCR 识别
+                ocr_started = self._clock()
                 captcha_code = classify_captcha(resp_img.content, self.ocr)
+                self._events.observe('ocr', self._clock() - ocr_started)
                 if not captcha_code:
                     continue
                 
@@ -2550,7 +3091,7 @@ class MultiGrabWorker(QThread):
                 
                 # 登录
                 login_params = {
-                    "timestrap": str(int(time.time() * 1000)),
+                    "timestrap": str(int(self._wall_clock() * 1000)),
                     "loginName": self.username,
                     "loginPwd": self.password,
                     "verifyCode": captcha_code,
@@ -2576,15 +3117,14 @@ class MultiGrabWorker(QThread):
                     new_cookies = '; '.join([f"{k}={v}" for k, v in session.cookies.get_dict().items()])
                     
                     if new_token:
-                        self.token = new_token
-                        self.cookies = new_cookies
+                        self._update_session(new_token, new_cookies)
                         self.session_updated.emit(new_token, new_cookies)
                         return True, new_token, new_cookies
                 
                 # 验证码错误，重试
                 msg = result.get('msg', '')
                 if '验证码' in msg:
-                    time.sleep(0.2)
+                    self._sleep(0.2)
                     continue
                 
                 # 云南大学前端约定 code=2 表示登录名或密码不正确。
@@ -2594,7 +3134,7 @@ class MultiGrabWorker(QThread):
                     return False, '', ''
                 
             except Exception as e:
-                time.sleep(0.3)
+                self._sleep(0.3)
                 continue
         
         return False, '', ''
@@ -2607,259 +3147,355 @@ class MultiGrabWorker(QThread):
         success = self._handle_session_expired()
         return success, self.token, self.cookies
     
-    def _monitor_course_loop(self, course):
+    def _find_course(self, tc_id):
+        """按教学班 ID 查找仍在监控（且未暂停）的课程。"""
+        return self._watchlist.active(tc_id)
+
+    def _course_weight(self, course):
         """
-        单门课程的独立监控循环 - 安全优先版本
-        每门课程在自己的线程中独立运行，互不阻塞
-        
-        核心安全策略:
-        1. 彻底删除盲抢逻辑 - 查询失败时直接跳过
-        2. 最高优先级检查 isFull 字段 - 防止幽灵余量
-        3. 仅当 isFull=False 且 remain>0 时才允许抢课
+        课程调度优先级权重（越大轮询越频繁）
+        课程自带 priority 字段时使用该值；冲突组首选课程默认提高优先级。
         """
+        try:
+            priority = float(course.get('priority') or 0)
+        except (TypeError, ValueError):
+            priority = 0
+        if priority > 0:
+            return priority
+        group = self._get_conflict_group(course.get('JXBID', ''))
+        if group and str(group.get('preferred_id') or '') == str(course.get('JXBID', '')):
+            return self.PREFERRED_COURSE_WEIGHT
+        return 1.0
+
+    def _schedule_course(self, course, delay=0.0):
+        """把课程加入中央调度器，并初始化状态追踪。"""
         tc_id = course.get('JXBID', '')
+        if not tc_id or self._scheduler is None:
+            return
+        if self._scheduler.is_busy(tc_id):
+            # 正在轮询或挂起等待换课线程的课程由其自身重新排期（见 _start_swap）
+            return
+        self._course_states.reset(tc_id)
+        self._poll_rates.track(tc_id, priority=self._course_weight(course))
+        self._warm_request_templates(course)
+        self._scheduler.add(
+            tc_id,
+            weight=self.POLL_INTERVAL / self._poll_rates.interval(tc_id),
+            delay=delay,
+        )
+
+    def _maybe_rebalance_poll_rates(self):
+        """按 RATE_REBALANCE_INTERVAL 节流，重新分配各课程轮询频率。"""
+        now = self._clock()
+        if now - self._last_rate_rebalance < self.RATE_REBALANCE_INTERVAL:
+            return
+        self._last_rate_rebalance = now
+        intervals = self._poll_rates.rebalance()
+        if self._scheduler is not None:
+            for tc_id, interval in intervals.items():
+                self._scheduler.set_weight(tc_id, self.POLL_INTERVAL / interval)
+
+    @staticmethod
+    def _set_trace_outcome(outcome):
+        trace = current_trace()
+        if trace is not None:
+            trace.set_outcome(outcome)
+
+    def _finish_swap(self, course, swap_success, conflict_info):
+        """换课流程结束后的通知与清理，返回是否换课成功。"""
+        self._events.inc('swap', 'success' if swap_success else 'failed')
+        self._set_trace_outcome('swapped' if swap_success else 'swap_failed')
         course_name = course.get('KCM', '')
         teacher = course.get('SKJS', '')
-        
-        # 初始化状态追踪
-        self._course_states[tc_id] = {
-            'last_remain': -999,
-            'last_status': '',
-            'last_update_time': time.time(),  # 添加最后更新时间
-        }
-        
-        while self._running:
-            # 检查课程是否还在列表中
-            courses_snapshot = self._get_courses_snapshot()
-            if not any(c.get('JXBID') == tc_id for c in courses_snapshot):
-                break
-            
-            # 查询余量
-            remain, capacity, course_info = self._api_query_course_capacity(course)
-            
-            # 心跳：每次查询后增加计数并更新状态时间
-            self._increment_request_count()
-            
-            # 更新课程状态的最后活动时间
-            if tc_id in self._course_states:
-                self._course_states[tc_id]['last_update_time'] = time.time()
-            
-            # Session 过期处理（已在 _api_query_course_capacity 内部自动重试）
-            if remain == 'session_expired':
-                # 自动重登已失败，通知 UI
-                self.need_relogin.emit()
-                break
-            
-            state = self._course_states.get(tc_id, {})
-            
-            # ========== 安全策略 1: 彻底删除盲抢逻辑 ==========
-            # 查询失败 (remain is None) - 直接跳过，绝不盲抢
-            if remain is None:
-                if state.get('last_status') != 'query_failed':
-                    self.status.emit(f"[SKIP] {course_name} 查询失败，跳过本次循环（安全模式）")
-                    self._logger.warning(f"查询失败，跳过: {course_name}")
-                    state['last_status'] = 'query_failed'
-                
-                # 休眠后继续下次查询
-                time.sleep(1.5)
-                continue
-            
-            # 成功查询到余量，打印状态日志
-            is_full_flag = course_info.get('isFull', False) if course_info else False
-            status_mark = "满" if is_full_flag or remain <= 0 else "有余量"
-            self.status.emit(f"[查询] {course_name} 余量: {remain}/{capacity} ({status_mark})")
-            
-            # 状态变化检测（减少日志噪音）
-            last_remain = state.get('last_remain', -999)
-            
-            # 检查是否已选
-            if course_info and course_info.get('isChoose'):
-                if state.get('last_status') != 'chosen':
-                    self.status.emit(f"[INFO] {course_name} 已选中")
-                    state['last_status'] = 'chosen'
-                self._handle_success_cleanup(course)
-                break
-            
-            # ========== 安全策略 2: 最高优先级检查 isFull ==========
-            # 必须首先检查 isFull 字段（系统标记）
-            is_full_flag = course_info.get('isFull', False) if course_info else False
-            
-            # 幽灵余量防御：即使计算出 remain > 0，但 isFull=True 时，绝对禁止抢课
-            if is_full_flag:
-                if remain > 0:
-                    # 发现幽灵余量！
-                    if state.get('last_status') != 'ghost_capacity':
-                        self.status.emit(
-                            f"[GHOST] {course_name} 显示余量{remain}但isFull=True，"
-                            f"跳过以防误退课（幽灵余量）"
-                        )
-                        self._logger.warning(
-                            f"幽灵余量检测: {course_name}, remain={remain}, isFull=True"
-                        )
-                        state['last_status'] = 'ghost_capacity'
+        if swap_success:
+            conflict_name = conflict_info.get('name', '未知') if conflict_info else '未知'
+            self.success.emit(
+                f"换课成功: {conflict_name} → {course_name} - {teacher}",
+                course
+            )
+            self._send_notifications(
+                f"换课成功: {course_name}",
+                f"**新课程**: {course_name}\n\n**教师**: {teacher}\n\n**方式**: 换课成功\n\n**原课程**: {conflict_name}",
+                event='swap_success',
+                context=self._course_context(
+                    course,
+                    old_course_name=conflict_name,
+                    new_course_name=course_name,
+                    message=f"换课成功: {conflict_name} → {course_name}"
+                )
+            )
+            self._handle_success_cleanup(course)
+            return True
+        self.status.emit(f"[CONFLICT] 换课失败，等待下次余量...")
+        return False
+
+    def _start_swap(self, course):
+        """
+        在独立线程中执行换课（含可能长时间运行的紧急救援），
+        期间该课程在调度器中挂起，不占用轮询工作线程。
+        """
+        tc_id = course.get('JXBID', '')
+        # 当前追踪交给换课线程，由它在换课结束时写入结果
+        trace = current_trace()
+        if trace is not None:
+            trace.detach()
+
+        def _swap():
+            swapped = False
+            try:
+                with self._tracer.scope(trace):
+                    swap_success, conflict_info = self._handle_conflict_rollback(course)
+                    swapped = self._finish_swap(course, swap_success, conflict_info)
+            except Exception as e:
+                self._logger.error(f"换课线程异常: {tc_id}, {type(e).__name__}: {e}")
+            finally:
+                if swapped:
+                    self._drop_course_state(tc_id)
+                    self._scheduler.remove(tc_id)
                 else:
-                    # 正常的已满状态
-                    if last_remain > 0 or (last_remain == -999 and state.get('last_status') != 'full'):
-                        state['last_status'] = 'full'
-                
-                state['last_remain'] = remain
-                time.sleep(1.0)
-                continue
-            
-            # ========== 安全策略 3: 行动条件 - isFull=False 且 remain>0 ==========
+                    self._scheduler.resume(tc_id, delay=2.0)
+
+        threading.Thread(target=_swap, name=f"swap-{tc_id}", daemon=True).start()
+        return DEFER
+
+    def _drop_course_state(self, tc_id):
+        self._course_states.discard(tc_id)
+        self._poll_rates.untrack(tc_id)
+        self._discard_request_templates(tc_id)
+        self._swap_plans.discard(tc_id)
+
+    def _unschedule_course(self, tc_id):
+        if self._scheduler is not None and tc_id:
+            self._scheduler.remove(tc_id)
+        self._drop_course_state(tc_id)
+
+    def _evaluate_capacity(self, course, state, remain, capacity, course_info,
+                           query_started=None, answered=None):
+        """
+        根据一次成功的余量查询决定下一步动作（线程引擎与 asyncio 引擎共用）
+        通过全部安全检查时从 answered（余量响应解析完成）开始一条关键路径追踪，
+        需在 self._tracer.scope() 内调用。
+        返回:
+        - 'chosen': 课程已在课表中
+        - 'wait': 已满或幽灵余量，按正常节奏继续轮询
+        - 'swap': 有余量且查询已标记冲突，进入换课
+        - 'grab': 通过全部安全检查，可以直接选课
+        """
+        course_name = course.get('KCM', '')
+        teacher = course.get('SKJS', '')
+
+        # 记录名额变化，用于自适应轮询频率
+        self._poll_rates.observe(course.get('JXBID', ''), (remain, capacity))
+        self._maybe_rebalance_poll_rates()
+
+        # 成功查询到余量，打印状态日志
+        is_full_flag = course_info.get('isFull', False) if course_info else False
+        status_mark = "满" if is_full_flag or remain <= 0 else "有余量"
+        self.status.emit(f"[查询] {course_name} 余量: {remain}/{capacity} ({status_mark})")
+
+        # 状态变化检测（减少日志噪音）
+        last_remain = state.observe(remain, capacity, course_info)
+
+        # 检查是否已选
+        if course_info and course_info.get('isChoose'):
+            if state.set_status('chosen'):
+                self.status.emit(f"[INFO] {course_name} 已选中")
+            return 'chosen'
+
+        # 冲突课程在满员期间就预先定位旧课，名额出现时直接退课换课
+        if course_info and course_info.get('isConflict', False):
+            self._refresh_swap_plan(course, course_info)
+
+        # ========== 安全策略 2: 最高优先级检查 isFull ==========
+        # 幽灵余量防御：即使计算出 remain > 0，但 isFull=True 时，绝对禁止抢课
+        if is_full_flag:
             if remain > 0:
-                # 通过安全检查！可以进入抢课流程
-                if last_remain <= 0 or state.get('last_status') != 'available':
+                # 发现幽灵余量！
+                if state.set_status('ghost_capacity'):
                     self.status.emit(
-                        f"[ALERT] {course_name} 发现余量！余={remain}/{capacity} "
-                        f"(isFull=False, 安全)"
+                        f"[GHOST] {course_name} 显示余量{remain}但isFull=True，"
+                        f"跳过以防误退课（幽灵余量）"
+                    )
+                    self._logger.warning(
+                        f"幽灵余量检测: {course_name}, remain={remain}, isFull=True"
                     )
-                    self.course_available.emit(course_name, teacher, remain, capacity)
-                    state['last_status'] = 'available'
-                    
-                    self._send_notifications(
-                        f"发现余量: {course_name}",
-                        f"**课程**: {course_name}\n\n**教师**: {teacher}\n\n**余量**: {remain}/{capacity}\n\n正在尝试抢课...",
-                        event='course_available',
-                        context=self._course_context(
-                            course,
-                            remain=remain,
-                            capacity=capacity,
-                            message=f"{course_name} 发现余量 {remain}/{capacity}"
-                        )
-                    )
-                
-                state['last_remain'] = remain
-                
-                # ========== 主动出击策略 ==========
-                # 检查查询结果中是否已标记冲突（isConflict）
-                is_conflict_from_query = course_info and course_info.get('isConflict', False)
-                
-                if is_conflict_from_query:
-                    # 查询已告知冲突，直接启动换课流程，不浪费请求
-                    self.status.emit(f"[CONFLICT] {course_name} 检测到时间冲突，主动启动换课...")
-                    self._logger.info(f"主动换课: {course_name}, isConflict=True from query")
-                    
-                    # 更新课程的 conflictDesc（从查询结果获取）
-                    if course_info.get('conflictDesc'):
-                        course['conflictDesc'] = course_info.get('conflictDesc')
-                    
-                    swap_success, conflict_info = self._handle_conflict_rollback(course)
-                    
-                    if swap_success:
-                        conflict_name = conflict_info.get('name', '未知') if conflict_info else '未知'
-                        self.success.emit(
-                            f"换课成功: {conflict_name} → {course_name} - {teacher}",
-                            course
-                        )
-                        self._send_notifications(
-                            f"换课成功: {course_name}",
-                            f"**新课程**: {course_name}\n\n**教师**: {teacher}\n\n**方式**: 换课成功\n\n**原课程**: {conflict_name}",
-                            event='swap_success',
-                            context=self._course_context(
-                                course,
-                                old_course_name=conflict_name,
-                                new_course_name=course_name,
-                                message=f"换课成功: {conflict_name} → {course_name}"
-                            )
-                        )
-                        self._handle_success_cleanup(course)
-                        break
-                    else:
-                        self.status.emit(f"[CONFLICT] 换课失败，等待下次余量...")
-                        time.sleep(2.0)
-                        continue
-                
-                # 无冲突标记，直接尝试选课
-                self.status.emit(f"[GRAB] 尝试选课: {course_name}...")
-                success, msg, need_rollback = self._api_select_course_fast(course)
-                
-                self._logger.info(f"选课结果: {course_name}, success={success}, msg={msg}, need_rollback={need_rollback}")
-                
-                if success:
-                    # 核实
-                    is_selected = self._verify_course_selected(tc_id)
-                    if is_selected is True:
-                        self.success.emit(f"抢课成功: {course_name} - {teacher}", course)
-                        self._send_notifications(
-                            f"抢课成功: {course_name}",
-                            f"**课程**: {course_name}\n\n**教师**: {teacher}\n\n**方式**: 正常抢课",
-                            event='select_success',
-                            context=self._course_context(
-                                course,
-                                message=f"抢课成功: {course_name}"
-                            )
-                        )
-                        self._handle_success_cleanup(course)
-                        break
-                    else:
-                        if is_selected is None:
-                            self.status.emit(f"[WARN] 选课返回成功但核实查询失败，暂不发送成功通知，继续监控...")
-                        else:
-                            self.status.emit(f"[WARN] 选课返回成功但核实未选中，继续监控...")
-                
-                elif msg == "session_expired":
-                    self.need_relogin.emit()
-                    break
-                
-                elif need_rollback:
-                    # 服务器返回冲突（备用路径）
-                    self.status.emit(f"[CONFLICT] {course_name} 服务器返回冲突，启动换课...")
-                    state['last_status'] = 'conflict'
-                    
-                    swap_success, conflict_info = self._handle_conflict_rollback(course)
-                    
-                    if swap_success:
-                        conflict_name = conflict_info.get('name', '未知') if conflict_info else '未知'
-                        self.success.emit(
-                            f"换课成功: {conflict_name} → {course_name} - {teacher}",
-                            course
-                        )
-                        self._send_notifications(
-                            f"换课成功: {course_name}",
-                            f"**新课程**: {course_name}\n\n**教师**: {teacher}\n\n**方式**: 换课成功\n\n**原课程**: {conflict_name}",
-                            event='swap_success',
-                            context=self._course_context(
-                                course,
-                                old_course_name=conflict_name,
-                                new_course_name=course_name,
-                                message=f"换课成功: {conflict_name} → {course_name}"
-                            )
-                        )
-                        self._handle_success_cleanup(course)
-                        break
-                    else:
-                        self.status.emit(f"[CONFLICT] 换课失败，等待下次余量...")
-                        time.sleep(2.0)
-                        continue
-                
-                else:
-                    # 其他失败原因（已满、其他错误）
-                    self.status.emit(f"[FAIL] {course_name} 选课失败: {msg}")
-                
-                # 快速重试
-                time.sleep(0.3)
-                continue
-            
             else:
-                # 无余量
-                if last_remain > 0 or (last_remain == -999 and state.get('last_status') != 'full'):
-                    # 状态从有余量变为无余量，或首次检测
-                    state['last_status'] = 'full'
-                
-                state['last_remain'] = remain
-            
+                # 正常的已满状态
+                if last_remain > 0 or last_remain == UNKNOWN_REMAIN:
+                    state.set_status('full')
+            return 'wait'
+
+        if remain <= 0:
+            # 无余量
+            if last_remain > 0 or last_remain == UNKNOWN_REMAIN:
+                # 状态从有余量变为无余量，或首次检测
+                state.set_status('full')
             # 正常轮询间隔
-            time.sleep(1.0)
+            return 'wait'
+
+        # ========== 安全策略 3: 行动条件 - isFull=False 且 remain>0 ==========
+        # 通过安全检查！可以进入抢课流程
+        conflict = bool(course_info and course_info.get('isConflict', False))
+        trace = self._tracer.begin('swap' if conflict else 'grab', course.get('JXBID', ''), answered)
+        if query_started is not None:
+            trace.record('query', query_started, trace.started, remain=remain, capacity=capacity)
+        if state.set_status('available') or last_remain <= 0:
+            self.status.emit(
+                f"[ALERT] {course_name} 发现余量！余={remain}/{capacity} "
+                f"(isFull=False, 安全)"
+            )
+            self.course_available.emit(course_name, teacher, remain, capacity)
+
+            with trace.span('notify'):
+                self._send_notifications(
+                    f"发现余量: {course_name}",
+                    f"**课程**: {course_name}\n\n**教师**: {teacher}\n\n**余量**: {remain}/{capacity}\n\n正在尝试抢课...",
+                    event='course_available',
+                    context=self._course_context(
+                        course,
+                        remain=remain,
+                        capacity=capacity,
+                        message=f"{course_name} 发现余量 {remain}/{capacity}"
+                    )
+                )
+
+        # ========== 主动出击策略 ==========
+        # 检查查询结果中是否已标记冲突（isConflict）
+        if conflict:
+            # 查询已告知冲突，直接启动换课流程，不浪费请求
+            self.status.emit(f"[CONFLICT] {course_name} 检测到时间冲突，主动启动换课...")
+            self._logger.info(f"主动换课: {course_name}, isConflict=True from query")
+            return 'swap'
+        return 'grab'
+
+    def _report_grab_success(self, course):
+        """核实选中后的成功通知（不含清理）。"""
+        self._events.inc('grab', 'succeeded')
+        self._set_trace_outcome('selected')
+        course_name = course.get('KCM', '')
+        teacher = course.get('SKJS', '')
+        self.success.emit(f"抢课成功: {course_name} - {teacher}", course)
+        self._send_notifications(
+            f"抢课成功: {course_name}",
+            f"**课程**: {course_name}\n\n**教师**: {teacher}\n\n**方式**: 正常抢课",
+            event='select_success',
+            context=self._course_context(
+                course,
+                message=f"抢课成功: {course_name}"
+            )
+        )
+
+    def _poll_course(self, tc_id):
+        """
+        单门课程的一次监控检查 - 安全优先版本（由中央调度器按到期时间调用）
+        
+        核心安全策略:
+        1. 彻底删除盲抢逻辑 - 查询失败时直接跳过
+        2. 最高优先级检查 isFull 字段 - 防止幽灵余量
+        3. 仅当 isFull=False 且 remain>0 时才允许抢课
+        
+        返回: None 按固定频率继续；数字 N 表示 N 秒后再查；
+              STOP 停止监控该课程；DEFER 挂起等待换课线程结束
+        """
+        # 本次检查中发现余量时开始的追踪在检查结束（或交给换课线程）时写入
+        with self._tracer.scope():
+            return self._poll_course_once(tc_id)
+
+    def _poll_course_once(self, tc_id):
+        if not self._running:
+            return STOP
+
+        # 检查课程是否还在列表中
+        course = self._find_course(tc_id)
+        if course is None:
+            self._drop_course_state(tc_id)
+            return STOP
+
+        course_name = course.get('KCM', '')
+
+        # 查询余量
+        started = self._clock()
+        remain, capacity, course_info = self._api_query_course_capacity(course)
+        answered = self._clock()
+        
+        # 心跳：每次查询后增加计数并更新状态时间
+        self._increment_request_count()
+        
+        # 更新课程状态的轮询次数、时延与最后活动时间
+        state = self._course_states.ensure(tc_id)
+        state.record_poll(answered - started)
+        
+        # Session 过期处理（已在 _api_query_course_capacity 内部自动重试）
+        if remain == 'session_expired':
+            # 自动重登已失败，通知 UI
+            self.need_relogin.emit()
+            self._drop_course_state(tc_id)
+            return STOP
+        
+        # ========== 安全策略 1: 彻底删除盲抢逻辑 ==========
+        # 查询失败 (remain is None) - 直接跳过，绝不盲抢
+        if remain is None:
+            if state.set_status('query_failed'):
+                self.status.emit(f"[SKIP] {course_name} 查询失败，跳过本次循环（安全模式）")
+                self._logger.warning(f"查询失败，跳过: {course_name}")
+            
+            # 稍后继续下次查询
+            return self.QUERY_FAILED_DELAY
+        
+        action = self._evaluate_capacity(
+            course, state, remain, capacity, course_info, started, answered
+        )
+        if action == 'chosen':
+            self._handle_success_cleanup(course)
+            self._drop_course_state(tc_id)
+            return STOP
+        if action == 'wait':
+            return None
+        if action == 'swap':
+            return self._start_swap(course)
+        
+        # 无冲突标记，直接尝试选课
+        self.status.emit(f"[GRAB] 尝试选课: {course_name}...")
+        success, msg, need_rollback = self._api_select_course_fast(course)
+        
+        self._logger.info(f"选课结果: {course_name}, success={success}, msg={msg}, need_rollback={need_rollback}")
+        
+        if success:
+            # 核实
+            with trace_span('verify'):
+                is_selected = self._verify_course_selected(tc_id)
+            if is_selected is True:
+                self._report_grab_success(course)
+                self._handle_success_cleanup(course)
+                self._drop_course_state(tc_id)
+                return STOP
+            if is_selected is None:
+                self.status.emit(f"[WARN] 选课返回成功但核实查询失败，暂不发送成功通知，继续监控...")
+            else:
+                self.status.emit(f"[WARN] 选课返回成功但核实未选中，继续监控...")
+        
+        elif msg == "session_expired":
+            self.need_relogin.emit()
+            self._drop_course_state(tc_id)
+            return STOP
+        
+        elif need_rollback:
+            # 服务器返回冲突（备用路径）
+            self.status.emit(f"[CONFLICT] {course_name} 服务器返回冲突，启动换课...")
+            state.set_status('conflict')
+            return self._start_swap(course)
         
-        # 清理状态
-        if tc_id in self._course_states:
-            del self._course_states[tc_id]
+        else:
+            # 其他失败原因（已满、其他错误）
+            self.status.emit(f"[FAIL] {course_name} 选课失败: {msg}")
+        
+        # 快速重试
+        return self.GRAB_RETRY_DELAY
     
     def run(self):
         """
         主运行方法
-        为每门课程启动独立的监控线程，非阻塞
+        所有课程交给中央调度器，由固定数量的工作线程按到期时间轮询
         """
         courses = self._get_courses_snapshot()
         
@@ -2870,62 +3506,218 @@ class MultiGrabWorker(QThread):
         self.status.emit(
             f"[INFO] 启动监控: {len(courses)} 门课程，HTTP并发上限: {self.max_workers}"
         )
+        self._logger.info(f"HTTP 传输后端: {self._transport.name}")
+        self._start_connection_warmer()
+        self._start_metrics_reporter()
+        self._start_metrics_exporter()
+        self._start_session_recorder()
+
+        # 定时开抢：到开放时刻先集中连发选课，结束后以剩余课程进入正常监控
+        if self._opening_burst is not None:
+            self._run_opening_burst()
+            courses = self._get_courses_snapshot()
+            if not self._running:
+                self._close_http_sessions()
+                return
         
-        # 为每门课程创建独立监控线程
-        threads = []
+        self._scheduler = DeadlineScheduler(
+            self._poll_course,
+            workers=self.max_workers,
+            period=self.POLL_INTERVAL,
+            name='course-monitor',
+        )
         for course in courses:
-            t = threading.Thread(
-                target=self._monitor_course_loop,
-                args=(course,),
-                daemon=True
-            )
-            t.start()
-            threads.append(t)
+            self._schedule_course(course)
+        self._scheduler.start()
         
         # 启动健康检查线程
         health_thread = threading.Thread(target=self._health_check_loop, daemon=True)
         health_thread.start()
         
-        # 主线程等待所有监控线程结束或被停止
+        # 主线程等待所有课程处理完毕或被停止；列表变更由监控列表事件直接排期
         while self._running:
-            # 检查是否还有课程在监控
-            if not self._get_courses_snapshot():
+            if self._watchlist.wait_empty(timeout=5.0):
                 self.status.emit("[INFO] 所有课程已处理完毕")
                 break
-            
-            # 检查是否有新添加的课程需要启动监控
-            current_courses = self._get_courses_snapshot()
-            monitored_ids = set(self._course_states.keys())
-            
-            for course in current_courses:
-                tc_id = course.get('JXBID', '')
-                if tc_id and tc_id not in monitored_ids:
-                    # 新课程，启动监控
-                    t = threading.Thread(
-                        target=self._monitor_course_loop,
-                        args=(course,),
-                        daemon=True
-                    )
-                    t.start()
-                    threads.append(t)
-            
-            # 定期清理已结束的线程引用，防止列表无限增长
-            threads = [t for t in threads if t.is_alive()]
-            
-            time.sleep(0.5)
         
-        # 等待所有线程结束
+        # 停止调度器并等待工作线程结束
         self._running = False
-        for t in threads:
-            t.join(timeout=2)
+        self._scheduler.stop(timeout=2)
 
         self._close_http_sessions()
         self._logger.info(
             f"HTTP并发统计: 配置={self.max_workers}, 实际峰值={self._peak_active_requests}"
         )
+        self._logger.info(
+            f"余量查询合并: 课程查询={self._capacity_batcher.lookup_count}, "
+            f"实际列表请求={self._capacity_batcher.request_count}"
+        )
+        self._log_poll_rate_summary()
+        self._log_request_budget_summary()
+        self._log_swap_summary()
+        self._log_connection_summary()
+        self._log_latency_summary()
+        self._log_metrics_summary()
+        self._log_trace_summary()
         
         # 停止日志由 UI 统一输出，避免重复“监控已停止”
     
+    # ---------- 定时开抢 ----------
+    def _run_opening_burst(self):
+        """
+        定时开抢阶段（两种引擎共用，均在调用线程中阻塞执行）
+        T0 前预热，T0 起按 OpeningBurst.shot_offsets 为每门课程连发选课，窗口结束后返回。
+        """
+        burst = self._opening_burst
+        clock = self._server_clock
+        t0_local = clock.to_local(burst.t0)
+        if t0_local + burst.window <= self._wall_clock():
+            self.status.emit(f"[定时] 开放时刻 {burst.t0_text()} 已过，直接进入正常监控")
+            return
+        self.status.emit(
+            f"[定时] 开放时刻 {burst.t0_text()}（服务器时间，时钟偏差 {clock.describe()}），"
+            f"提前 {burst.prepare_lead:.0f}s 预热，开抢持续 {burst.window:g}s"
+        )
+        if not clock.synced:
+            self._logger.warning("定时开抢: 服务器时钟未同步，按本地时间对齐")
+
+        running = lambda: self._running
+        wait_until = lambda deadline: sleep_until(
+            deadline, running=running, clock=self._wall_clock, sleep=self._sleep
+        )
+        if not wait_until(t0_local - burst.prepare_lead):
+            return
+        courses = self._get_courses_snapshot()
+        self._prepare_opening_burst(courses)
+        # 预热阶段可能重新校准了时钟
+        t0_local = clock.to_local(burst.t0)
+        if not wait_until(t0_local - CONNECT_LEAD):
+            return
+
+        select_rate = self._request_budget.class_rate('select')
+        offsets = burst.shot_offsets(len(courses), select_rate)
+        # 时钟已精确校准时，首发推迟一个误差上界，保证不早于 T0 到达而被拒
+        error = clock.current_error()
+        if error is not None and error <= CLOCK_MAX_ERROR:
+            offsets = [offset + error for offset in offsets]
+            self.status.emit(f"[定时] 首发推迟 {error * 1000:.0f}ms（时钟误差上界）")
+        shooters = min(self.max_workers, len(courses))
+        timing = BurstTimingLog()
+        threads = [
+            threading.Thread(
+                target=self._opening_burst_shooter,
+                args=(courses[index::shooters], offsets, timing),
+                name=f"opening-burst-{index}",
+                daemon=True,
+            )
+            for index in range(shooters)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.status.emit(f"[定时] 开抢窗口结束: {timing.summary()}，回到正常监控")
+        self._logger.info(f"定时开抢: {timing.summary()}")
+
+    def _prepare_opening_burst(self, courses):
+        """
+        开放前预热：时钟误差超过 CLOCK_MAX_ERROR 时先做一次精确同步，
+        再校验登录态（失效时立即重登）并预构造所有课程的请求模板。
+        """
+        clock = self._server_clock
+        error = clock.current_error()
+        if error is None or error > CLOCK_MAX_ERROR:
+            self.status.emit(f"[定时] 时钟误差 {clock.describe()}，开放前精确校准...")
+            clock.refine(f"{BASE_URL}/*default/index.do")
+            self.status.emit(f"[定时] 时钟校准完成: 偏差 {clock.describe()}")
+        self.status.emit(f"[定时] 预热: 校验登录态、预构造 {len(courses)} 门课程的选课请求...")
+        if not self._test_login_status():
+            self.status.emit("[定时] 登录态无效，开放前重新登录...")
+            self._handle_session_expired()
+        for course in courses:
+            self._warm_request_templates(course)
+
+    def _warm_connection(self):
+        """经由传输后端发一次轻量请求，提前完成 TCP/TLS 握手。"""
+        try:
+            self._request(
+                'HEAD', f"{BASE_URL}/*default/index.do",
+                endpoint_class='other', timeout=(2, 3), allow_redirects=False,
+            )
+        except Exception as e:
+            self._logger.warning(f"定时开抢连接预热失败: {type(e).__name__}")
+
+    def _opening_burst_shooter(self, courses, offsets, timing):
+        """一个开抢线程：预先建立连接，在每个计划时刻依次为分到的课程发出选课。"""
+        self._warm_connection()
+        pending = list(courses)
+        clock = self._server_clock
+        t0 = self._opening_burst.t0
+        for shot, offset in enumerate(offsets):
+            scheduled = t0 + offset
+            if not pending or not sleep_until(
+                clock.to_local(scheduled), running=lambda: self._running,
+                clock=self._wall_clock, sleep=self._sleep,
+            ):
+                return
+            for course in list(pending):
+                if self._find_course(course.get('JXBID', '')) is None:
+                    pending.remove(course)
+                    continue
+                timing.record(scheduled, clock.now(), first=shot == 0)
+                if self._opening_burst_fire(course):
+                    pending.remove(course)
+
+    def _opening_burst_fire(self, course):
+        """开抢阶段的一次选课，返回该课程是否结束开抢（已选中 / 冲突 / 登录失效）。"""
+        tc_id = course.get('JXBID', '')
+        course_name = course.get('KCM', '')
+        success, msg, need_rollback = self._api_select_course_fast(course)
+        self._increment_request_count()
+        if success:
+            is_selected = self._verify_course_selected(tc_id)
+            if is_selected is True:
+                self.status.emit(f"[定时] {course_name} 开抢成功")
+                self._report_grab_success(course)
+                self._handle_success_cleanup(course)
+                return True
+            return False
+        if msg == "session_expired":
+            self.status.emit(f"[定时] {course_name} 登录失效，停止开抢")
+            return True
+        if need_rollback:
+            # 换课需要先退旧课，交给正常监控的换课流程处理
+            self.status.emit(f"[定时] {course_name} 与已选课程冲突，转入正常监控换课")
+            return True
+        return False
+
+    def _log_request_budget_summary(self, admission=None):
+        class_counts, waited = self._request_budget.stats()
+        rate_text = f"{self.request_rate:g} 次/秒" if self.request_rate else "不限"
+        counts_text = ', '.join(f"{name}={count}" for name, count in sorted(class_counts.items()))
+        self._logger.info(
+            f"请求预算: 配置={rate_text}, 各类请求 {counts_text or '无'}, 累计限速等待 {waited:.1f}s"
+        )
+        admission = admission or self._request_slots
+        critical_count, critical_avg, critical_max = admission.stats()
+        if critical_count:
+            self._logger.info(
+                f"优先通道: 关键请求 {critical_count} 次, 等待并发槽 平均={critical_avg * 1000:.0f}ms "
+                f"最长={critical_max * 1000:.0f}ms (预留槽位 {admission.reserved})"
+            )
+
+    def _log_poll_rate_summary(self):
+        """记录自适应轮询的名额变化次数与当前频率分布。"""
+        snapshot = self._poll_rates.snapshot()
+        if snapshot:
+            intervals = sorted(interval for _, interval in snapshot.values())
+            self._logger.info(
+                f"自适应轮询: 名额变化 {self._poll_rates.change_count} 次, "
+                f"间隔 最短={intervals[0]:.2f}s 中位={intervals[len(intervals) // 2]:.2f}s "
+                f"最长={intervals[-1]:.2f}s"
+            )
+
     def _health_check_loop(self):
         """
         增强版健康检查循环 - 多层检测 + 自动恢复
@@ -2942,12 +3734,12 @@ class MultiGrabWorker(QThread):
         
         while self._running:
             try:
-                time.sleep(self._health_check_interval)  # 120秒检查间隔
+                self._sleep(self._health_check_interval)  # 120秒检查间隔
                 
                 if not self._running:
                     break
                 
-                current_time = time.time()
+                current_time = self._wall_clock()
                 inactive_duration = current_time - self._last_activity_time
                 
                 # 获取当前请求计数
@@ -3016,30 +3808,38 @@ class MultiGrabWorker(QThread):
                 
                 last_request_count = current_request_count
                 
-                # ========== 第3层：课程状态检测 ==========
-                # 检测是否有课程监控线程卡死
+                # ========== 第3层：课程调度检测 ==========
+                # 检测是否有课程脱离调度器，脱离的课程重新排期
+                # （被 DEFER 挂起等待换课线程的任务仍在调度器任务表中，不会被当作脱离）
                 courses_snapshot = self._get_courses_snapshot()
-                active_courses = len(self._course_states)
-                expected_courses = len(courses_snapshot)
+                state_summary = self._course_states.summary()
+                missing = [
+                    course for course in courses_snapshot
+                    if self._scheduler is not None
+                    and course.get('JXBID', '') not in self._scheduler
+                ]
                 
-                if expected_courses > 0 and active_courses < expected_courses:
-                    missing_courses = expected_courses - active_courses
+                if missing:
                     self.status.emit(
-                        f"[健康检查] 检测到 {missing_courses} 门课程监控线程可能已停止"
+                        f"[健康检查] 检测到 {len(missing)} 门课程未在调度中，已重新排期"
                     )
-                    self._logger.warning(f"健康检查: 缺失监控线程 {missing_courses} 个")
+                    self._logger.warning(f"健康检查: 缺失调度任务 {len(missing)} 个")
+                    for course in missing:
+                        self._schedule_course(course)
                 
                 # ========== 第4层：定期健康报告 ==========
                 # 每10分钟报告一次健康状态
                 if int(current_time) % 600 == 0:  # 10分钟整点
                     self.status.emit(
-                        f"[健康检查] 状态正常 | 活跃课程: {active_courses} | "
+                        f"[健康检查] 状态正常 | 活跃课程: {state_summary['courses']} "
+                        f"(有余量 {state_summary['available']}) | "
+                        f"平均查询时延: {state_summary['avg_latency'] * 1000:.0f}ms | "
                         f"总请求: {current_request_count} | 运行时长: {int((current_time - self._last_activity_time)/60)}分钟"
                     )
                 
             except Exception as e:
                 self._logger.error(f"健康检查异常: {str(e)[:50]}")
-                time.sleep(60)  # 异常后等待1分钟再继续
+                self._sleep(60)  # 异常后等待1分钟再继续
     
     def _attempt_auto_recovery(self):
         """
@@ -3094,50 +3894,44 @@ class MultiGrabWorker(QThread):
         """测试网络连接"""
         try:
             import socket
-            socket.create_connection(("xk.ynu.edu.cn", 443), timeout=5)
+            from urllib.parse import urlsplit
+            # 按 BASE_URL 的主机测试（XK_BASE_URL 指向模拟服务器时随之改变）
+            parts = urlsplit(BASE_URL)
+            default_port = 443 if parts.scheme == 'https' else 80
+            socket.create_connection((parts.hostname, parts.port or default_port), timeout=5)
             return True
         except:
             return False
     
     def _test_login_status(self):
-        """快速测试登录状态"""
-        try:
-            timestamp = str(int(time.time() * 1000))
-            url = f"{BASE_URL}/elective/courseResult.do"
-            
-            resp = self._request('GET',
-                url,
-                headers=self._get_headers(),
-                cookies=self._parse_cookies(self.cookies),
-                params={"timestamp": timestamp, "studentCode": self.student_code, "electiveBatchCode": self.batch_code},
-                timeout=(3, 5),
-            )
-            
-            return resp.status_code == 200 and not self._is_session_expired(response=resp)
-        except:
-            return False
+        """快速测试登录状态（必须是本次调用之后完成的查询）"""
+        status, _ = self._selected_state.get(
+            lambda: self._fetch_selected_courses(endpoint_class='login'),
+            max_age=0,
+        )
+        return status == 'ok'
     
     def _reset_monitoring_state(self):
         """重置监控状态"""
         try:
             # 重置活动时间
-            self._last_activity_time = time.time()
-            
-            # 清理可能卡死的课程状态
-            dead_courses = []
-            current_time = time.time()
+            self._last_activity_time = self._wall_clock()
             
-            for tc_id, state in self._course_states.items():
-                # 如果某个课程状态超过10分钟没更新，认为可能卡死
-                last_update = state.get('last_update_time', current_time)
-                if current_time - last_update > 600:  # 10分钟
-                    dead_courses.append(tc_id)
+            # 清理可能卡死的课程状态：超过10分钟没有查询记录
+            dead_courses = self._course_states.stale(600)
             
-            # 清理卡死的课程状态，让它们重新启动监控
+            # 清理卡死的课程状态，并重新排期让它们重新启动监控；
+            # 换课/救援线程仍在进行（任务被 DEFER 挂起）的课程长时间没有查询记录属正常，跳过
+            if self._scheduler is not None:
+                dead_courses = [
+                    tc_id for tc_id in dead_courses if not self._scheduler.is_busy(tc_id)
+                ]
             for tc_id in dead_courses:
-                if tc_id in self._course_states:
-                    del self._course_states[tc_id]
+                if self._course_states.discard(tc_id):
                     self._logger.info(f"清理可能卡死的课程状态: {tc_id}")
+                course = self._find_course(tc_id)
+                if course is not None:
+                    self._schedule_course(course)
             
             if dead_courses:
                 self.status.emit(f"[自动恢复] 清理了 {len(dead_courses)} 个可能卡死的监控状态")